@@ -1,22 +1,37 @@
+import hmac
 import time
 from flask import Flask, jsonify, request, make_response, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_jwt_extended import JWTManager
 import jwt
 from core.config import Config
 from core.database import Database
 from core.routes import register_routes
 from services.activity_service import ActivityService
+from services.hardware_service import HardwareService
 from core.swagger_config import api_bp
 from utils.performance_metrics import get_performance_metrics
 from utils.auth_utils import get_auth_header
+from utils.compression import compress_response
+from core.json_provider import FastJSONProvider
+from utils.periodic_task import PeriodicTask
+from utils.query_accounting import begin_request, finish_request, server_timing_header
+from utils.tracing import get_tracer
+from utils.alert_stream import get_alert_stream_broker
 
 def create_app():
     """Factory function para crear la aplicación Flask"""
     app = Flask(__name__)
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
     
     # Configuración de la aplicación
     app.config.from_object(Config)
+
+    if Config.PROXY_FIX_X_FOR:
+        # REMOTE_ADDR pasa a ser la IP del cliente según los proxies de confianza
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_FIX_X_FOR)
     
     # Habilitar CORS para todos los endpoints con soporte para cookies
     CORS(app, 
@@ -54,10 +69,28 @@ def create_app():
             'errors': ['Token faltante']
         }), 401
 
+    # Revisión periódica de hardware vencido (un worker por intervalo)
+    stale_sweep = PeriodicTask(
+        'hardware_status_sweep',
+        Config.HARDWARE_STATUS_SWEEP_INTERVAL_SECONDS,
+        HardwareService().check_physical_status_stale
+    )
+
+    tracer = get_tracer()
+
     @app.before_request
     def handle_options_requests():
         """Responde a las peticiones OPTIONS para evitar errores 404"""
         g.request_start = time.perf_counter()
+        internal = _is_internal_request()
+        g.server_timing = Config.SERVER_TIMING_ENABLED or internal
+        if Config.QUERY_ACCOUNTING_ENABLED:
+            begin_request(_route_name(), measure_bytes=g.server_timing)
+        g.trace_root = tracer.start_request(
+            _route_name(), request.headers.get('traceparent'), trusted=internal,
+            **{'http.method': request.method, 'http.target': request.path}
+        )
+        stale_sweep.ensure_started()
         if request.method == 'OPTIONS':
             response = make_response()
             response.status_code = 204
@@ -69,9 +102,14 @@ def create_app():
     def after_request_handler(response):
         """Agrega encabezados CORS y registra actividad"""
         start_time = getattr(g, 'request_start', None)
+        query_stats = finish_request()
         if start_time is not None:
             duration_ms = (time.perf_counter() - start_time) * 1000
-            get_performance_metrics().record(duration_ms, response.status_code)
+            metrics = get_performance_metrics()
+            metrics.record(duration_ms, response.status_code)
+            metrics.record_route(_route_name(), duration_ms, query_stats)
+            if g.get('server_timing'):
+                response.headers['Server-Timing'] = server_timing_header(query_stats, duration_ms)
         empresa_id = getattr(g, 'empresa_id', None)
         if not empresa_id:
             empresa_id = _get_empresa_id_from_request()
@@ -94,12 +132,34 @@ def create_app():
         internal_header = Config.INTERNAL_TOKEN_HEADER or 'X-Internal-Token'
         response.headers.setdefault(
             'Access-Control-Allow-Headers',
-            f'Content-Type,Authorization,{internal_header}'
+            f'Content-Type,Authorization,If-None-Match,If-Modified-Since,{internal_header}'
         )
         response.headers.setdefault('Access-Control-Allow-Methods',
                                    'GET,POST,PUT,DELETE,OPTIONS')
+        response.headers.setdefault('Access-Control-Expose-Headers', 'ETag,Last-Modified,Server-Timing')
+        response = compress_response(response, request.headers.get('Accept-Encoding'))
+        tracer.finish_request(g.pop('trace_root', None), response.status_code)
         return response
 
+    @app.teardown_request
+    def teardown_request_state(error=None):
+        # Si after_request no corrió, no arrastrar el acumulado ni la traza a la siguiente petición del hilo
+        finish_request()
+        root = g.pop('trace_root', None)
+        if root is not None:
+            if error is not None:
+                root.record_error(error)
+            tracer.finish_request(root)
+
+    def _route_name():
+        rule = request.url_rule.rule if request.url_rule is not None else '<sin ruta>'
+        return f'{request.method} {rule}'
+
+    def _is_internal_request():
+        expected_token = Config.INTERNAL_TOKEN
+        token = request.headers.get(Config.INTERNAL_TOKEN_HEADER or 'X-Internal-Token')
+        return bool(expected_token and token and hmac.compare_digest(token, expected_token))
+
     def _get_empresa_id_from_request():
         auth_token = request.cookies.get('auth_token')
         if not auth_token:
@@ -126,6 +186,9 @@ def create_app():
         # print("Error: No se pudo conectar a MongoDB")
         exit(1)
     
+    # Modo del stream de alertas (una vez, antes de la primera publicación)
+    get_alert_stream_broker().configure(max_subscribers=Config.ALERT_STREAM_API_MAX_SUBSCRIBERS)
+
     # Registrar rutas
     register_routes(app)
     
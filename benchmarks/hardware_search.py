@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark de búsqueda de hardware: regex sin ancla frente a claves por prefijo.
+
+Crea una colección temporal con N documentos sintéticos de hardware (con las
+claves de búsqueda que genera el modelo) y, para cada término, compara:
+
+- regex: el `$or` de siete regex case-insensitive de la implementación anterior.
+- prefix: `search_keys` con `$all` + orden por relevancia (`HardwareRepository.search`).
+
+Reporta milisegundos por consulta y documentos examinados (explain). La
+colección se elimina al terminar salvo con `--keep`.
+
+Uso:
+    python benchmarks/hardware_search.py [--sizes 10000,100000] [--repeat 20] [--keep]
+"""
+
+import sys
+import os
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+from core.database import Database
+from models.hardware import Hardware
+from utils.search_keys import search_condition, search_page_pipeline, search_tokens
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+BENCH_COLLECTION = 'bench_hardware_search'
+TIPOS = ['SEMAFORO', 'ALARMA', 'BOTONERA', 'SIRENA', 'CAMARA']
+SEDES = ['Principal', 'Norte', 'Sur', 'Bodega', 'Planta Medellín', 'Oficina Bogotá']
+MARCAS = ['Siemens', 'Honeywell', 'Bosch', 'Hikvision', 'Schneider', 'Dahua']
+TERMS = ['semaforo', 'sirena norte', 'honey', 'bodega bosch', 'medellin']
+PAGE_SIZE = 50
+
+
+def synthetic_hardware(count, seed=7):
+    """Documentos de hardware con la forma que escribe el modelo"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    empresas = [ObjectId() for _ in range(50)]
+    for index in range(count):
+        tipo = rng.choice(TIPOS)
+        hardware = Hardware(
+            nombre=f'{tipo.lower()}-{index:06d}',
+            tipo=tipo,
+            empresa_id=rng.choice(empresas),
+            sede=rng.choice(SEDES),
+            datos={'brand': rng.choice(MARCAS), 'model': f'M{rng.randint(100, 999)}', 'status': 'ok'}
+        )
+        hardware.fecha_creacion = now - timedelta(minutes=index)
+        yield hardware.to_dict()
+
+
+def legacy_query(term):
+    return {
+        'activa': True,
+        '$or': [
+            {field: {'$regex': term, '$options': 'i'}}
+            for field in ('nombre', 'tipo', 'sede', 'datos.brand', 'datos.model',
+                          'datos.datos.brand', 'datos.datos.model')
+        ]
+    }
+
+
+def prefix_query(term):
+    tokens = search_tokens(term)
+    return {'$and': [{'activa': True}, search_condition(tokens)]}, tokens
+
+
+def load(collection, count, batch_size=5000):
+    collection.drop()
+    batch = []
+    for doc in synthetic_hardware(count):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    collection.create_index([('activa', 1)])
+    collection.create_index([('search_keys', 1)])
+    collection.create_index([('fecha_creacion', -1)])
+
+
+def time_query(run, repeat):
+    """Retorna ms por ejecución"""
+    run()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def docs_examined(collection, query):
+    explain = collection.find(query).explain()
+    return explain.get('executionStats', {}).get('totalDocsExamined')
+
+
+def run(sizes, repeat, keep=False):
+    db = Database().get_database()
+    collection = db[BENCH_COLLECTION]
+    try:
+        for size in sizes:
+            logger.info(f"📦 Cargando {size} documentos sintéticos...")
+            load(collection, size)
+            for term in TERMS:
+                legacy = legacy_query(term)
+                prefix, tokens = prefix_query(term)
+
+                legacy_ms = time_query(
+                    lambda: list(collection.find(legacy).sort('fecha_creacion', -1).limit(PAGE_SIZE)),
+                    repeat
+                )
+                prefix_ms = time_query(
+                    lambda: list(collection.aggregate(
+                        search_page_pipeline(prefix, tokens, {'fecha_creacion': -1}, 0, PAGE_SIZE)
+                    )),
+                    repeat
+                )
+                legacy_total = collection.count_documents(legacy)
+                prefix_total = collection.count_documents(prefix)
+                logger.info(
+                    f"   [{size}] '{term}': regex {legacy_ms:8.2f} ms "
+                    f"({legacy_total} resultados, {docs_examined(collection, legacy)} examinados) | "
+                    f"prefix {prefix_ms:8.2f} ms ({prefix_total} resultados, "
+                    f"{docs_examined(collection, prefix)} examinados)"
+                )
+    finally:
+        if not keep:
+            collection.drop()
+    return True
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark de búsqueda de hardware')
+    parser.add_argument('--sizes', default='10000,100000', help='Tamaños de flota separados por coma')
+    parser.add_argument('--repeat', type=int, default=20, help='Repeticiones por consulta')
+    parser.add_argument('--keep', action='store_true', help='No eliminar la colección temporal')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    logger.info("⏱️ BENCHMARK DE BÚSQUEDA DE HARDWARE")
+    try:
+        result = run(sizes, args.repeat, keep=args.keep)
+    except Exception as e:
+        logger.error(f"❌ Error durante el benchmark: {str(e)}")
+        sys.exit(1)
+    sys.exit(0 if result else 2)
+
+
+if __name__ == "__main__":
+    main()
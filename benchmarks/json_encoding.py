@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización y compresión de respuestas JSON.
+
+Carga alertas reales de `mqtt_alerts`, arma el mismo payload que devuelve
+`GET /api/mqtt-alerts` y compara:
+
+- Tiempo y bytes del proveedor JSON por defecto de Flask frente a
+  `FastJSONProvider` (orjson si está instalado).
+- Tamaño del cuerpo sin comprimir, con gzip y con brotli.
+
+Uso:
+    python benchmarks/json_encoding.py [--limit 200] [--repeat 50]
+"""
+
+import sys
+import os
+import argparse
+import gzip
+import logging
+import time
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from core.config import Config
+from core.database import Database
+from core.json_provider import FastJSONProvider, orjson
+from models.mqtt_alert import MqttAlert
+from utils.compression import brotli
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def load_payload(limit):
+    """Construye el payload de listado a partir de alertas reales"""
+    db = Database().get_database()
+    docs = list(db.mqtt_alerts.find().sort('fecha_creacion', -1).limit(limit))
+    alerts = [MqttAlert.from_dict(doc).to_json() for doc in docs]
+    return {
+        'success': True,
+        'data': alerts,
+        'pagination': {'page': 1, 'limit': limit, 'total': len(alerts), 'pages': 1}
+    }
+
+
+def time_dumps(dumps, payload, repeat):
+    """Retorna (ms por serialización, bytes resultantes)"""
+    body = dumps(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        dumps(payload)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return elapsed_ms, body
+
+
+def run(limit, repeat):
+    payload = load_payload(limit)
+    if not payload['data']:
+        logger.warning("⚠️ No hay alertas en la base de datos; nada que medir")
+        return None
+
+    app = Flask('benchmark')
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    default_ms, default_body = time_dumps(default_provider.dumps, payload, repeat)
+    fast_ms, fast_body = time_dumps(fast_provider.dumps_bytes, payload, repeat)
+
+    logger.info(f"📄 {len(payload['data'])} alertas, {repeat} repeticiones")
+    logger.info(f"   DefaultJSONProvider: {default_ms:8.3f} ms  {len(default_body):>10} bytes")
+    logger.info(
+        f"   FastJSONProvider ({'orjson' if orjson else 'json'}): "
+        f"{fast_ms:8.3f} ms  {len(fast_body):>10} bytes  (x{default_ms / fast_ms:.1f})"
+    )
+
+    start = time.perf_counter()
+    gzip_body = gzip.compress(fast_body, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+    gzip_ms = (time.perf_counter() - start) * 1000
+    logger.info(
+        f"   gzip (nivel {Config.COMPRESSION_GZIP_LEVEL}): {gzip_ms:8.3f} ms  "
+        f"{len(gzip_body):>10} bytes  ({len(gzip_body) / len(fast_body):.1%})"
+    )
+
+    if brotli is not None:
+        start = time.perf_counter()
+        br_body = brotli.compress(fast_body, quality=Config.COMPRESSION_BROTLI_QUALITY)
+        br_ms = (time.perf_counter() - start) * 1000
+        logger.info(
+            f"   brotli (calidad {Config.COMPRESSION_BROTLI_QUALITY}): {br_ms:8.3f} ms  "
+            f"{len(br_body):>10} bytes  ({len(br_body) / len(fast_body):.1%})"
+        )
+    else:
+        logger.info("   brotli no instalado; se omite")
+    return True
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON y compresión')
+    parser.add_argument('--limit', type=int, default=200, help='Número de alertas a cargar')
+    parser.add_argument('--repeat', type=int, default=50, help='Repeticiones por medición')
+    args = parser.parse_args()
+
+    logger.info("⏱️ BENCHMARK DE SERIALIZACIÓN JSON")
+    try:
+        result = run(args.limit, args.repeat)
+    except Exception as e:
+        logger.error(f"❌ Error durante el benchmark: {str(e)}")
+        sys.exit(1)
+    sys.exit(0 if result else 2)
+
+
+if __name__ == "__main__":
+    main()
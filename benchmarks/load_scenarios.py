@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Escenarios de carga sobre la API con tenants sintéticos.
+
+Ejecuta uno o varios escenarios contra la app Flask en el mismo proceso
+(`--mode inprocess`, por defecto) o contra un servidor en marcha
+(`--mode http --base-url ...`, que debe usar la misma base de benchmark):
+
+- alert_storm: hardware que se autentica y crea alertas (`/api/mqtt-alerts/`).
+- status_flurry: respondedores que marcan disponible/embarcado en alertas activas.
+- dashboard_polling: empresas que consultan alertas activas, estadísticas y flota.
+- heartbeat_flood: lotes de heartbeats (`/api/hardware/physical-status/batch`).
+- login_burst: inicios de sesión simultáneos de las empresas.
+
+Por escenario reporta rendimiento, latencias p50/p95/p99 y operaciones de
+MongoDB por petición HTTP (diferencia de `serverStatus.opcounters`, por lo
+que el mongod local no debe tener otra carga). El resultado se escribe como
+JSON para compararlo con una línea base.
+
+Los datos se generan con `benchmarks/tenant_generator.py` (o con
+`--generate`). Solo se ejecuta contra un mongod local.
+
+Uso:
+    python benchmarks/load_scenarios.py [--scenario all] [--requests 500] [--concurrency 8]
+        [--mode inprocess|http] [--base-url http://localhost:5002] [--generate]
+        [--manifest benchmarks/results/tenants.json] [--output benchmarks/results/load.json]
+"""
+
+import sys
+import os
+import argparse
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenant_generator import (
+    DEFAULT_DATABASE, DEFAULT_MANIFEST, configure_environment, generate, reset, write_manifest
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+SCENARIOS = ('alert_storm', 'status_flurry', 'dashboard_polling', 'heartbeat_flood', 'login_burst')
+DASHBOARD_PATHS = (
+    '/api/mqtt-alerts/active',
+    '/api/mqtt-alerts/stats',
+    '/api/hardware/physical-status/fleet',
+    '/api/hardware/?limit=50',
+)
+
+
+class Response:
+    """Respuesta mínima común a ambos clientes"""
+
+    def __init__(self, status, body, cookies):
+        self.status = status
+        self.body = body
+        self.cookies = cookies
+
+
+class InProcessClient:
+    """Cliente de pruebas de Flask, uno por hilo"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            # Sin cookies: cada petición se autentica solo con sus encabezados
+            client = self._local.client = self.app.test_client(use_cookies=False)
+        response = client.open(path, method=method, json=json_body, headers=headers or {})
+        cookies = SimpleCookie()
+        for header in response.headers.getlist('Set-Cookie'):
+            cookies.load(header)
+        return Response(
+            response.status_code,
+            response.get_json(silent=True),
+            {key: morsel.value for key, morsel in cookies.items()}
+        )
+
+
+class HttpClient:
+    """Cliente HTTP con una sesión de requests por hilo"""
+
+    def __init__(self, base_url):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, json_body=None, headers=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.request(method, self.base_url + path, json=json_body, headers=headers or {}, timeout=60)
+        session.cookies.clear()
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return Response(response.status_code, body, response.cookies.get_dict())
+
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def mongo_opcounters(db):
+    counters = db.client.admin.command('serverStatus')['opcounters']
+    return {key: int(value) for key, value in counters.items() if key != 'deprecated'}
+
+
+class ScenarioContext:
+    """Datos compartidos por los escenarios"""
+
+    def __init__(self, client, manifest, internal_header, internal_token, heartbeat_batch, seed=11):
+        self.client = client
+        self.manifest = manifest
+        self.internal_header = internal_header
+        self.internal_token = internal_token
+        self.heartbeat_batch = heartbeat_batch
+        self.seed = seed
+        self.empresas = {empresa['nombre']: empresa for empresa in manifest['empresas']}
+
+    def rng(self, worker):
+        return random.Random(self.seed * 1000 + worker)
+
+    def login(self, username):
+        response = self.client.request('POST', '/auth/login', {
+            'usuario': username, 'password': self.manifest['password']
+        })
+        return response, response.cookies.get('auth_token')
+
+
+def alert_storm(ctx):
+    hardware = ctx.manifest['hardware']
+
+    def step(rng):
+        item = rng.choice(hardware)
+        auth = ctx.client.request('POST', '/api/hardware-auth/authenticate', {
+            'empresa': item['empresa'], 'sede': item['sede'],
+            'tipo_hardware': item['tipo'], 'hardware': item['nombre']
+        })
+        if auth.status != 200 or not (auth.body or {}).get('token'):
+            return [auth.status]
+        tipo = rng.choice(ctx.empresas[item['empresa']]['tipos_alarma'])
+        created = ctx.client.request('POST', '/api/mqtt-alerts/', {
+            'data': {'tipo_alarma': tipo, 'descripcion': f'Benchmark {tipo}'}
+        }, headers={'Authorization': f"Bearer {auth.body['token']}"})
+        return [auth.status, created.status]
+
+    return step
+
+
+def status_flurry(ctx):
+    alerts = [alert for alert in ctx.manifest['active_alerts'] if alert['usuario_ids']]
+    if not alerts:
+        raise ValueError('El manifiesto no tiene alertas activas con destinatarios')
+
+    def step(rng):
+        alert = rng.choice(alerts)
+        response = ctx.client.request('PATCH', '/api/mqtt-alerts/update-user-status', {
+            'alert_id': alert['id'],
+            'usuario_id': rng.choice(alert['usuario_ids']),
+            'disponible': rng.random() < 0.7,
+            'embarcado': rng.random() < 0.3
+        })
+        return [response.status]
+
+    return step
+
+
+def dashboard_polling(ctx):
+    tokens = []
+    for empresa in ctx.manifest['empresas']:
+        response, token = ctx.login(empresa['username'])
+        if not token:
+            raise ValueError(f"No se pudo iniciar sesión como {empresa['username']} ({response.status})")
+        tokens.append(token)
+
+    def step(rng):
+        response = ctx.client.request(
+            'GET', rng.choice(DASHBOARD_PATHS),
+            headers={'Authorization': f'Bearer {rng.choice(tokens)}'}
+        )
+        return [response.status]
+
+    return step
+
+
+def heartbeat_flood(ctx):
+    topics = [item['topic'] for item in ctx.manifest['hardware']]
+    headers = {ctx.internal_header: ctx.internal_token}
+
+    def step(rng):
+        batch = rng.sample(topics, min(ctx.heartbeat_batch, len(topics)))
+        response = ctx.client.request('PUT', '/api/hardware/physical-status/batch', {
+            'items': [
+                {'topic': topic, 'physical_status': {
+                    'estado': 'Activo' if rng.random() < 0.95 else 'Falla',
+                    'bateria': rng.randint(20, 100)
+                }}
+                for topic in batch
+            ]
+        }, headers=headers)
+        return [response.status]
+
+    return step
+
+
+def login_burst(ctx):
+    usernames = [empresa['username'] for empresa in ctx.manifest['empresas']]
+
+    def step(rng):
+        response, _ = ctx.login(rng.choice(usernames))
+        return [response.status]
+
+    return step
+
+
+SCENARIO_BUILDERS = {
+    'alert_storm': alert_storm,
+    'status_flurry': status_flurry,
+    'dashboard_polling': dashboard_polling,
+    'heartbeat_flood': heartbeat_flood,
+    'login_burst': login_burst,
+}
+
+
+def run_scenario(name, ctx, db, total, concurrency):
+    """Ejecuta `total` operaciones con `concurrency` hilos y retorna el reporte"""
+    step = SCENARIO_BUILDERS[name](ctx)
+    counter = itertools.count()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = ctx.rng(index)
+        local_latencies = []
+        local_statuses = {}
+        while next(counter) < total:
+            start = time.perf_counter()
+            try:
+                codes = step(rng)
+            except Exception as exc:
+                logger.debug(f'{name}: {exc}')
+                codes = ['exception']
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            for code in codes:
+                local_statuses[str(code)] = local_statuses.get(str(code), 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    before = mongo_opcounters(db)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    after = mongo_opcounters(db)
+
+    # La lectura de serverStatus cuenta como un comando
+    mongo_ops = {key: after[key] - before.get(key, 0) for key in after}
+    mongo_ops['command'] = max(0, mongo_ops.get('command', 0) - 1)
+    http_requests = sum(statuses.values())
+    errors = sum(count for code, count in statuses.items() if not code.startswith('2'))
+    latencies.sort()
+    total_ops = sum(mongo_ops.values())
+    return {
+        'operations': len(latencies),
+        'http_requests': http_requests,
+        'errors': errors,
+        'status_codes': statuses,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_ops_per_second': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2) if latencies else None,
+            'p95': round(percentile(latencies, 0.95), 2) if latencies else None,
+            'p99': round(percentile(latencies, 0.99), 2) if latencies else None,
+            'max': round(latencies[-1], 2) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        },
+        'mongo_ops': {
+            'total': total_ops,
+            'per_request': round(total_ops / http_requests, 2) if http_requests else None,
+            'by_type': mongo_ops,
+        },
+    }
+
+
+def load_manifest(args, db):
+    if args.generate or not os.path.exists(args.manifest):
+        logger.info("🏭 Generando tenants sintéticos...")
+        reset(db)
+        manifest = generate(
+            db, empresas=args.empresas, sedes=args.sedes, usuarios=args.usuarios,
+            hardware=args.hardware, alertas=args.alertas, image_kb=args.image_kb
+        )
+        write_manifest(manifest, args.manifest)
+        return manifest
+    with open(args.manifest, encoding='utf-8') as handle:
+        manifest = json.load(handle)
+    if manifest.get('database') != db.name:
+        raise ValueError(f"El manifiesto es de la base '{manifest.get('database')}', no de '{db.name}'")
+    return manifest
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description='Escenarios de carga con tenants sintéticos')
+    parser.add_argument('--scenario', default='all', help=f"all o lista separada por coma de: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=500, help='Operaciones por escenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultáneos')
+    parser.add_argument('--mode', choices=['inprocess', 'http'], default='inprocess')
+    parser.add_argument('--base-url', default='http://localhost:5002')
+    parser.add_argument('--heartbeat-batch', type=int, default=200, help='Heartbeats por lote')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--mongo-uri', help='URI de un mongod local (por defecto MONGO_URI)')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--generate', action='store_true', help='Regenerar los tenants antes de medir')
+    parser.add_argument('--empresas', type=int, default=5)
+    parser.add_argument('--sedes', type=int, default=3)
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--hardware', type=int, default=10)
+    parser.add_argument('--alertas', type=int, default=200)
+    parser.add_argument('--image-kb', type=int, default=48)
+    parser.add_argument('--output', help='Archivo JSON de resultados (por defecto solo se imprime)')
+    args = parser.parse_args()
+
+    names = SCENARIOS if args.scenario == 'all' else [name.strip() for name in args.scenario.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        logger.error(f"❌ Escenarios desconocidos: {', '.join(unknown)}")
+        sys.exit(2)
+
+    try:
+        configure_environment(args.database, args.mongo_uri)
+    except ValueError as e:
+        logger.error(f"❌ {str(e)}")
+        sys.exit(2)
+
+    logger.info("⏱️ BENCHMARK DE ESCENARIOS DE CARGA")
+    try:
+        from core.config import Config
+        from core.database import Database
+        db = Database().get_database()
+        manifest = load_manifest(args, db)
+
+        if args.mode == 'inprocess':
+            from app import create_app
+            client = InProcessClient(create_app())
+        else:
+            client = HttpClient(args.base_url)
+
+        ctx = ScenarioContext(
+            client, manifest, Config.INTERNAL_TOKEN_HEADER or 'X-Internal-Token',
+            Config.INTERNAL_TOKEN, args.heartbeat_batch
+        )
+        report = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'mode': args.mode,
+                'base_url': args.base_url if args.mode == 'http' else None,
+                'database': db.name,
+                'requests': args.requests,
+                'concurrency': args.concurrency,
+                'sizes': manifest.get('sizes'),
+            },
+            'scenarios': {}
+        }
+        for name in names:
+            logger.info(f"🚀 {name}: {args.requests} operaciones, {args.concurrency} clientes")
+            result = run_scenario(name, ctx, db, args.requests, args.concurrency)
+            report['scenarios'][name] = result
+            logger.info(
+                f"   {result['throughput_ops_per_second']} ops/s | p50 {result['latency_ms']['p50']} ms | "
+                f"p95 {result['latency_ms']['p95']} ms | p99 {result['latency_ms']['p99']} ms | "
+                f"{result['mongo_ops']['per_request']} ops Mongo/petición | {result['errors']} errores"
+            )
+    except Exception as e:
+        logger.error(f"❌ Error durante el benchmark: {str(e)}")
+        sys.exit(1)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(output)
+        logger.info(f"✅ Resultados escritos en {args.output}")
+    else:
+        print(output)
+    failed = any(result['errors'] for result in report['scenarios'].values())
+    sys.exit(2 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
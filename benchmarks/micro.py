@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks de rutas calientes con líneas base en JSON.
+
+`run` mide cada función en microsegundos por llamada y guarda un JSON.
+Cada benchmark se calibra hasta que una muestra dura `--min-time`, y luego
+se toman `--samples` muestras. `compare` contrasta dos archivos por mediana
+y termina con código 2 si algún benchmark empeoró más de `--threshold` %.
+
+Grupos:
+- mqtt_alert: `MqttAlert.from_dict`/`to_dict`/`to_json` con alertas pequeñas y con imágenes.
+- tipo_alerta: `_extract_tipo_alerta_identifiers` y, con `--with-db`,
+  `_resolve_tipo_alerta` contra un catálogo sembrado en la base de benchmark.
+- roles: `utils.role_utils.sanitize_roles`.
+- topic: `Hardware.generate_topic`.
+- metrics: `PerformanceMetrics.record`.
+- jwt: decodificación del token en `require_empresa_or_admin_token`.
+
+Los grupos tipo_alerta y jwt importan la app. Por eso usan la configuración
+de la base de benchmark y requieren un mongod local.
+
+Uso:
+    python benchmarks/micro.py run [--only mqtt_alert,roles] [--samples 7] [--min-time 0.2]
+        [--with-db] [--output benchmarks/results/micro.json]
+    python benchmarks/micro.py compare base.json nuevo.json [--threshold 10]
+"""
+
+import sys
+import os
+import argparse
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import datetime, timedelta
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_codec import synthetic_alerts
+from tenant_generator import DEFAULT_DATABASE, configure_environment, fake_image
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class SkipBenchmark(Exception):
+    """El benchmark no puede ejecutarse en este entorno"""
+
+
+def _app_environment():
+    """Prepara la configuración de la base de benchmark antes de importar la app"""
+    try:
+        configure_environment(DEFAULT_DATABASE)
+    except ValueError as e:
+        raise SkipBenchmark(str(e))
+
+
+# ---------------------------------------------------------------------------
+# Definición de benchmarks: cada setup retorna la función a medir (sin argumentos)
+# ---------------------------------------------------------------------------
+
+def _alert_documents():
+    import random
+    small = synthetic_alerts(1)[0]
+    heavy = synthetic_alerts(1, recipients=60)[0]
+    image = fake_image(random.Random(3), 64)
+    heavy['image_alert'] = image
+    heavy['data']['tipo_alarma_detalle'] = {'nombre': 'Incendio', 'imagen_base64': image}
+    return {'small': small, 'image': heavy}
+
+
+def mqtt_alert_benchmarks(options):
+    from models.mqtt_alert import MqttAlert
+
+    benchmarks = {}
+    for size, doc in _alert_documents().items():
+        alert = MqttAlert.from_dict(doc)
+        benchmarks[f'mqtt_alert.from_dict.{size}'] = lambda doc=doc: MqttAlert.from_dict(doc)
+        benchmarks[f'mqtt_alert.to_dict.{size}'] = alert.to_dict
+        benchmarks[f'mqtt_alert.to_json.{size}'] = alert.to_json
+    return benchmarks
+
+
+def _seed_tipo_alarma_catalog(empresas=50):
+    """Catálogo de tipos de alarma para varias empresas; retorna una empresa objetivo"""
+    from bson import ObjectId
+    from core.database import Database
+    from models.tipo_alarma import TipoAlarma
+    from tenant_generator import CATALOGO_ALARMAS
+
+    collection = Database().get_database().tipos_alarma
+    collection.delete_many({'descripcion': 'micro-benchmark'})
+    empresa_ids = [ObjectId() for _ in range(empresas)]
+    docs = []
+    for empresa_id in empresa_ids:
+        for nombre, color, implementos, recomendaciones in CATALOGO_ALARMAS:
+            tipo = TipoAlarma(
+                nombre=nombre, descripcion='micro-benchmark', tipo_alerta=color, color_alerta=color,
+                imagen_base64='data:image/png;base64,AAAA', recomendaciones=recomendaciones,
+                implementos_necesarios=implementos, empresa_id=empresa_id
+            )
+            docs.append(tipo.to_dict())
+    collection.insert_many(docs)
+    return empresa_ids[empresas // 2]
+
+
+def tipo_alerta_benchmarks(options):
+    _app_environment()
+    from bson import ObjectId
+    from controllers.mqtt_alert_controller import MqttAlertController
+
+    # Sin __init__: estos métodos no usan los servicios del controlador
+    controller = MqttAlertController.__new__(MqttAlertController)
+    extract = controller._extract_tipo_alerta_identifiers
+    object_id = str(ObjectId())
+    payload = {'nombre': 'Incendio', 'tipo_alerta': 'ROJO', 'codigo': 'INC'}
+    benchmarks = {
+        'tipo_alerta.extract.nombre': lambda: extract('Incendio'),
+        'tipo_alerta.extract.object_id': lambda: extract(object_id),
+        'tipo_alerta.extract.dict': lambda: extract(payload),
+    }
+    if options.with_db:
+        empresa_id = _seed_tipo_alarma_catalog()
+        resolve = controller._resolve_tipo_alerta
+        benchmarks['tipo_alerta.resolve.nombre'] = lambda: resolve('Incendio', empresa_id)
+        benchmarks['tipo_alerta.resolve.color'] = lambda: resolve('rojo', empresa_id)
+    return benchmarks
+
+
+def roles_benchmarks(options):
+    from utils.role_utils import sanitize_roles
+
+    roles = [
+        'Brigadista', {'nombre': 'coordinador', 'is_creator': True}, ' vigilante ',
+        {'name': 'Operario'}, 'brigadista', {'nombre': ''}, None,
+        {'nombre': 'Jefe de turno', 'is_creator': 'true'}, 'Enfermería', {'rol': 'seguridad'},
+    ]
+    return {'roles.sanitize_roles': lambda: sanitize_roles(roles)}
+
+
+def topic_benchmarks(options):
+    from models.hardware import Hardware
+
+    hardware = Hardware()
+    return {
+        'topic.generate_topic': lambda: hardware.generate_topic(
+            'Empresa Demo S.A.', 'Sede Norte #2', 'semaforo', 'Semáforo 01'
+        )
+    }
+
+
+def metrics_benchmarks(options):
+    from utils.performance_metrics import PerformanceMetrics
+
+    metrics = PerformanceMetrics()
+    return {'metrics.record': lambda: metrics.record(12.5, 200)}
+
+
+def jwt_benchmarks(options):
+    _app_environment()
+    import jwt
+    from flask import Flask
+    from core.config import Config
+    from utils.permissions import require_empresa_or_admin_token
+
+    token = jwt.encode(
+        {'sub': 'bench', 'role': 'empresa', 'exp': datetime.utcnow() + timedelta(hours=1)},
+        Config.JWT_SECRET_KEY, algorithm='HS256'
+    )
+    view = require_empresa_or_admin_token(lambda: 'ok')
+    app = Flask(__name__)
+    # El contexto queda activo durante la medición; se descarta al salir del proceso
+    context = app.test_request_context(headers={'Authorization': f'Bearer {token}'})
+    context.push()
+    return {'jwt.require_empresa_or_admin_token': view}
+
+
+GROUPS = {
+    'mqtt_alert': mqtt_alert_benchmarks,
+    'tipo_alerta': tipo_alerta_benchmarks,
+    'roles': roles_benchmarks,
+    'topic': topic_benchmarks,
+    'metrics': metrics_benchmarks,
+    'jwt': jwt_benchmarks,
+}
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+def _time_loops(func, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def measure(func, samples, min_time):
+    """Microsegundos por llamada de cada muestra"""
+    # Calibración al estilo de timeit: duplicar las iteraciones hasta llegar a min_time
+    loops = 1
+    while _time_loops(func, loops) < min_time and loops < 1 << 24:
+        loops *= 2
+    timings = [_time_loops(func, loops) * 1_000_000 / loops for _ in range(samples)]
+    return {
+        'median_us': round(statistics.median(timings), 4),
+        'min_us': round(min(timings), 4),
+        'mean_us': round(statistics.fmean(timings), 4),
+        'stdev_us': round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0,
+        'loops': loops,
+        'samples': samples,
+    }
+
+
+def run(options):
+    names = list(GROUPS) if not options.only else [name.strip() for name in options.only.split(',') if name.strip()]
+    unknown = [name for name in names if name not in GROUPS]
+    if unknown:
+        raise ValueError(f"Grupos desconocidos: {', '.join(unknown)}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'samples': options.samples,
+            'min_time': options.min_time,
+        },
+        'benchmarks': {},
+        'skipped': {},
+    }
+    for group in names:
+        try:
+            benchmarks = GROUPS[group](options)
+        except (SkipBenchmark, ImportError) as e:
+            report['skipped'][group] = str(e)
+            logger.warning(f"⚠️ {group}: omitido ({e})")
+            continue
+        for name, func in benchmarks.items():
+            result = measure(func, options.samples, options.min_time)
+            result['group'] = group
+            report['benchmarks'][name] = result
+            logger.info(f"   {name:<40} {result['median_us']:>12.3f} µs (±{result['stdev_us']:.3f})")
+    return report
+
+
+def compare(base, current, threshold):
+    """Lista de (nombre, base, actual, cambio %) y nombres con regresión"""
+    rows = []
+    regressions = []
+    for name, result in sorted(current['benchmarks'].items()):
+        previous = base['benchmarks'].get(name)
+        if not previous or not previous.get('median_us'):
+            rows.append((name, None, result['median_us'], None))
+            continue
+        change = (result['median_us'] / previous['median_us'] - 1) * 100
+        rows.append((name, previous['median_us'], result['median_us'], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description='Micro-benchmarks de rutas calientes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Ejecutar y guardar resultados')
+    run_parser.add_argument('--only', help=f"Grupos separados por coma: {', '.join(GROUPS)}")
+    run_parser.add_argument('--samples', type=int, default=7)
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='Segundos mínimos por muestra')
+    run_parser.add_argument('--with-db', action='store_true', help='Incluir benchmarks contra MongoDB local')
+    run_parser.add_argument('--output', help='Archivo JSON (por defecto benchmarks/results/micro-<fecha>.json)')
+
+    compare_parser = subparsers.add_parser('compare', help='Comparar con una línea base')
+    compare_parser.add_argument('base')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='Regresión máxima permitida en %%')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        logger.info("⏱️ MICRO-BENCHMARKS")
+        try:
+            report = run(args)
+        except Exception as e:
+            logger.error(f"❌ Error durante el benchmark: {str(e)}")
+            sys.exit(1)
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"micro-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2, ensure_ascii=False)
+        logger.info(f"✅ Resultados escritos en {output}")
+        sys.exit(0)
+
+    try:
+        rows, regressions = compare(_load(args.base), _load(args.current), args.threshold)
+    except Exception as e:
+        logger.error(f"❌ Error comparando resultados: {str(e)}")
+        sys.exit(1)
+    logger.info(f"📊 COMPARACIÓN (umbral {args.threshold:.1f} %)")
+    for name, previous, current, change in rows:
+        if change is None:
+            logger.info(f"   {name:<40} {'—':>12} → {current:>12.3f} µs (nuevo)")
+            continue
+        flag = '❌' if name in regressions else ('✅' if change < -args.threshold else '  ')
+        logger.info(f"{flag} {name:<40} {previous:>12.3f} → {current:>12.3f} µs ({change:+.1f} %)")
+    if regressions:
+        logger.error(f"❌ {len(regressions)} regresiones por encima del {args.threshold:.1f} %")
+        sys.exit(2)
+    logger.info("✅ Sin regresiones")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de la capa de modelos: documento de MongoDB -> JSON.
+
+Compara tres caminos para un listado de alertas:
+
+- legacy: `cls()` + asignación de atributos + recorrido recursivo de los
+  campos anidados (equivalente a la implementación anterior).
+- model: `MqttAlert.from_dict(doc).to_json()` (constructor rápido + codec).
+- document: `MqttAlert.json_from_document(doc)` (codec directo, sin modelo).
+
+Por defecto usa documentos sintéticos con la forma de una alerta real; con
+`--from-db` carga alertas de la colección `mqtt_alerts`.
+
+Uso:
+    python benchmarks/model_codec.py [--count 50] [--repeat 200] [--from-db]
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+from models.mqtt_alert import MqttAlert
+from utils.bson_codec import to_jsonable
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_alerts(count, recipients=15):
+    """Genera documentos con la forma de las alertas creadas por hardware"""
+    now = datetime.utcnow()
+    empresa_id = ObjectId()
+    docs = []
+    for index in range(count):
+        creada = now - timedelta(minutes=index)
+        docs.append({
+            '_id': ObjectId(),
+            'empresa_id': empresa_id,
+            'empresa_nombre': 'Empresa Demo',
+            'sede': 'Principal',
+            'sede_key': 'principal',
+            'data': {'origen': 'mqtt', 'hardware_id': ObjectId(), 'recibido': creada, 'valores': [1, 2, 3]},
+            'tipo_alerta': 'ROJO',
+            'nombre_alerta': 'Incendio',
+            'descripcion': 'Alerta de incendio en bodega',
+            'prioridad': 'alta',
+            'image_alert': 'https://example.com/incendio.png',
+            'elementos_necesarios': ['Extintor', 'Botiquín'],
+            'instrucciones': ['Evacuar', 'Llamar a bomberos'],
+            'numeros_telefonicos': [
+                {
+                    'numero': f'+57300{index:03d}{n:04d}',
+                    'nombre': f'Usuario {n}',
+                    'usuario_id': str(ObjectId()),
+                    'disponible': n % 2 == 0,
+                    'embarcado': False
+                }
+                for n in range(recipients)
+            ],
+            'topic': 'empresademo/principal/SEMAFORO/sem01',
+            'topics_otros_hardware': ['empresademo/principal/ALARMA/al01'],
+            'activacion_alerta': {'tipo_activacion': 'hardware', 'nombre': 'sem01', 'id': ObjectId()},
+            'ubicacion': {'direccion': 'Calle 1 # 2-3', 'url_maps': 'https://maps.example.com'},
+            'activo': True,
+            'fecha_creacion': creada,
+            'fecha_actualizacion': creada,
+            'fecha_desactivacion': None,
+            'desactivado_por': {},
+            'mensaje_desactivacion': None
+        })
+    return docs
+
+
+def load_alerts(count):
+    """Carga alertas reales desde MongoDB"""
+    from core.database import Database
+    db = Database().get_database()
+    return list(db.mqtt_alerts.find().sort('fecha_creacion', -1).limit(count))
+
+
+def legacy_to_json(doc):
+    """Reproduce el camino anterior: __init__ completo y recorrido de campos anidados"""
+    alert = MqttAlert()
+    for field in MqttAlert.__slots__:
+        if field in doc:
+            setattr(alert, field, doc[field])
+    result = {}
+    for field, _, _ in MqttAlert.JSON_SCHEMA:
+        value = getattr(alert, field)
+        if field in ('data', 'activacion_alerta') or isinstance(value, (ObjectId, datetime)):
+            value = to_jsonable(value)
+        result[field] = value
+    return result
+
+
+def model_to_json(doc):
+    return MqttAlert.from_dict(doc).to_json()
+
+
+def document_to_json(doc):
+    return MqttAlert.json_from_document(doc)
+
+
+def measure(func, docs, repeat):
+    """Retorna microsegundos por documento"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            func(doc)
+    return (time.perf_counter() - start) * 1_000_000 / (repeat * len(docs))
+
+
+def run(count, repeat, from_db=False):
+    docs = load_alerts(count) if from_db else synthetic_alerts(count)
+    if not docs:
+        logger.warning("⚠️ No hay alertas para medir")
+        return None
+
+    # Los dos caminos nuevos deben producir la misma salida
+    reference = [document_to_json(doc) for doc in docs]
+    if [model_to_json(doc) for doc in docs] != reference:
+        logger.error("❌ from_dict().to_json() no coincide con json_from_document()")
+        return False
+
+    results = {}
+    for name, func in (('legacy', legacy_to_json), ('model', model_to_json), ('document', document_to_json)):
+        results[name] = measure(func, docs, repeat)
+
+    logger.info(f"📄 {len(docs)} alertas ({'MongoDB' if from_db else 'sintéticas'}), {repeat} repeticiones")
+    for name, micros in results.items():
+        logger.info(f"   {name:<9} {micros:8.2f} µs/doc  (x{results['legacy'] / micros:.2f})")
+    return True
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description='Micro-benchmark de serialización de modelos')
+    parser.add_argument('--count', type=int, default=50, help='Alertas por listado')
+    parser.add_argument('--repeat', type=int, default=200, help='Repeticiones por medición')
+    parser.add_argument('--from-db', action='store_true', help='Usar alertas reales de MongoDB')
+    args = parser.parse_args()
+
+    logger.info("⏱️ MICRO-BENCHMARK DE MODELOS")
+    try:
+        result = run(args.count, args.repeat, from_db=args.from_db)
+    except Exception as e:
+        logger.error(f"❌ Error durante el benchmark: {str(e)}")
+        sys.exit(1)
+    sys.exit(0 if result else 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""MongoDB en proceso (mongomock) para contar consultas sin un mongod.
+
+`install(database)` conecta el singleton `Database` a un cliente mongomock;
+debe llamarse antes de construir repositorios o `create_app()`.
+
+mongomock no implementa el profiler ni los eventos de monitoreo de PyMongo,
+así que `CommandRecorder` envuelve las operaciones de las colecciones y
+registra cada llamada como un comando: operación, colección, filtro y
+argumentos con nombre. Las llamadas internas de mongomock (por ejemplo
+`find_one` sobre `find`) no se cuentan dos veces. Los `getMore` no existen
+aquí y los documentos examinados no se pueden medir.
+
+mongomock no aplica collations: las igualdades sin distinguir mayúsculas se
+comportan como comparaciones exactas.
+
+Solo para benchmarks y pruebas; la app no depende de mongomock.
+"""
+
+import json
+import os
+import threading
+
+import mongomock
+from mongomock.collection import Collection
+
+# Operaciones de Collection que equivalen a un comando en el servidor
+OPERATIONS = (
+    'find', 'find_one', 'find_one_and_update', 'find_one_and_replace', 'find_one_and_delete',
+    'aggregate', 'count_documents', 'estimated_document_count', 'distinct',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'replace_one',
+    'delete_one', 'delete_many', 'bulk_write', 'create_index', 'create_indexes',
+    'drop', 'watch',
+)
+
+_state = threading.local()
+_recorders = []
+_recorders_lock = threading.Lock()
+_patched = False
+
+
+def install(database):
+    """Conecta `core.database.Database` a una base mongomock y la retorna.
+
+    Importar `core` importa las rutas, y estas construyen repositorios que
+    se conectan al importarse: el cliente se sustituye en `pymongo` antes de
+    ese primer import. Todos los clientes comparten los mismos datos.
+    """
+    import pymongo
+
+    client = mongomock.MongoClient()
+
+    def client_factory(*args, **kwargs):
+        return client
+
+    pymongo.MongoClient = client_factory
+    os.environ['DATABASE_NAME'] = database
+
+    import core.database as database_module
+
+    database_module.MongoClient = client_factory
+    instance = database_module.Database()
+    if instance._client is not client:
+        instance._client = client
+        instance._db = client[database]
+    return instance._db
+
+
+def _wrap(name, original):
+    def wrapper(self, *args, **kwargs):
+        depth = getattr(_state, 'depth', 0)
+        if depth == 0:
+            with _recorders_lock:
+                recorders = list(_recorders)
+            for recorder in recorders:
+                recorder._record(name, self.name, args, kwargs)
+        _state.depth = depth + 1
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            _state.depth = depth
+
+    wrapper.__name__ = original.__name__
+    wrapper.__doc__ = original.__doc__
+    return wrapper
+
+
+def _patch():
+    global _patched
+    if _patched:
+        return
+    for name in OPERATIONS:
+        original = getattr(Collection, name, None)
+        if original is not None:
+            setattr(Collection, name, _wrap(name, original))
+    _patched = True
+
+
+class CommandRecorder:
+    """Registra las operaciones sobre colecciones mientras está activo"""
+
+    def __init__(self, ignore_indexes=True):
+        # La creación de índices ocurre al construir repositorios, no por petición
+        self.ignore_indexes = ignore_indexes
+        self.commands = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _patch()
+        with _recorders_lock:
+            _recorders.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with _recorders_lock:
+            _recorders.remove(self)
+
+    def _record(self, name, collection, args, kwargs):
+        if self.ignore_indexes and name in ('create_index', 'create_indexes'):
+            return
+        query = args[0] if args else kwargs.get('filter', kwargs.get('pipeline'))
+        with self._lock:
+            self.commands.append({
+                'name': name,
+                'collection': collection,
+                'query': query,
+                'kwargs': {key: value for key, value in kwargs.items() if key != 'filter'},
+            })
+
+    def reset(self):
+        with self._lock:
+            self.commands = []
+
+    def count(self, collection=None, name=None):
+        return sum(
+            1 for command in self.commands
+            if (collection is None or command['collection'] == collection)
+            and (name is None or command['name'] == name)
+        )
+
+    def shapes(self):
+        """Forma de cada comando con los valores reemplazados por `?`"""
+        from utils.query_accounting import query_shape
+
+        return [
+            f"{command['name']} {command['collection']} "
+            f"{json.dumps(query_shape(command['query']), ensure_ascii=False, sort_keys=True, default=str)}"
+            for command in self.commands
+        ]
@@ -0,0 +1,668 @@
+#!/usr/bin/env python3
+"""
+Presupuesto de consultas a MongoDB por endpoint.
+
+Levanta `create_app()` contra una base desechable en un mongod local, la
+llena con tenants sintéticos de dos tamaños (`small` y `large`) y llama cada
+endpoint declarado en `ENDPOINTS` con el profiler de MongoDB activo. Por
+endpoint se cuentan los comandos, los documentos examinados y los devueltos.
+
+Un endpoint falla si:
+- responde con un código inesperado (los fixtures no sirven para medirlo),
+- supera su presupuesto de comandos o de documentos examinados en `large`,
+- ejecuta más comandos en `large` que en `small`: el número de consultas
+  crece con los datos (patrón N+1). Los `getMore` no cuentan para esta
+  comparación porque dependen del tamaño del lote.
+
+Los fallos listan la forma de las consultas del endpoint (valores
+reemplazados por `?`) y, si el código no es el esperado, el inicio de la
+respuesta. Cada tamaño se mide en un proceso nuevo para que las caches por
+worker empiecen vacías. Las rutas de `core/routes.py` sin presupuesto ni
+exclusión en `EXCLUDED_RULES` se informan y, con `--strict`, también hacen
+fallar la revisión. Las escrituras se miden después de las lecturas y las
+eliminaciones al final, todas sobre la misma empresa.
+
+Los presupuestos de comandos son un objetivo, no la medición: lo medido en
+`large` más un 25 % de margen (mínimo un comando). El margen absorbe las
+diferencias entre mongomock y mongod (conteos, escrituras en lote) y los
+cambios pequeños; un patrón N+1 lo detecta igual la comparación entre
+`small` y `large`. Los endpoints que no consultan la base tienen presupuesto
+0 y no tienen margen. Los límites de documentos examinados siguen la misma
+regla sobre lo que la consulta tiene que leer en `large` (anotado junto a la
+entrada); `examined=None` solo se usa con la razón escrita al lado.
+
+Se ejecuta contra un mongod local; la base se elimina al terminar salvo con
+`--keep`. Es el modo que corre en CI (`.github/workflows/tests.yml`, con un
+servicio `mongo`) y el único que revisa los documentos examinados. Con
+`--backend mongomock` no necesita mongod: la app corre sobre la base en
+memoria de `mongo_stand_in.py` y los comandos se cuentan envolviendo las
+colecciones; sirve para revisar los comandos en local sin mongod.
+
+Uso:
+    python benchmarks/query_budget.py [--database rescue_query_budget] [--mongo-uri mongodb://localhost:27017]
+        [--backend mongod|mongomock] [--only /api/hardware] [--strict] [--keep]
+        [--output benchmarks/results/query_budget.json]
+"""
+
+import sys
+import os
+import argparse
+import json
+import logging
+import subprocess
+import tempfile
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.parse import quote
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tenant_generator import TIPOS_HARDWARE, configure_environment, generate
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE = 'rescue_query_budget'
+
+# Tamaños de fixtures: `large` multiplica cada dimensión
+FIXTURE_SIZES = {
+    'small': {'empresas': 2, 'sedes': 2, 'usuarios': 3, 'hardware': 3, 'alertas': 10},
+    'large': {'empresas': 6, 'sedes': 3, 'usuarios': 15, 'hardware': 20, 'alertas': 80},
+}
+
+# Blueprints definidos en core/routes.py (los de Swagger y tipos se revisan aparte)
+ROUTE_BLUEPRINTS = {
+    'auth', 'empresas', 'admin', 'hardware', 'hardware_types', 'dashboard',
+    'multitenant', 'mqtt_alerts', 'hardware_auth', 'phone_lookup', 'contact'
+}
+
+# Rutas que no se pueden medir con una sola petición
+EXCLUDED_RULES = {
+    ('GET', '/api/mqtt-alerts/stream'): 'stream SSE sin fin',
+    ('POST', '/api/hardware/'): 'geocodifica la dirección contra Nominatim',
+    ('POST', '/api/contact/send'): 'envía el correo por Resend',
+}
+
+
+def endpoint(method, rule, role, commands, examined=20, per_returned=None, query='', body=None, status=200,
+             stand_in=True):
+    """Presupuesto de un endpoint.
+
+    `examined` es el máximo de documentos examinados; en listados,
+    `per_returned` permite además examinar esa cantidad por documento
+    devuelto. `examined=None` desactiva el límite de documentos; solo para
+    agregaciones globales que recorren la colección por diseño, con la razón
+    en un comentario junto a la entrada. `stand_in=False`
+    marca los endpoints que usan operadores que mongomock no implementa: solo
+    se miden contra mongod.
+    """
+    return {
+        'method': method, 'rule': rule, 'role': role, 'commands': commands,
+        'examined': examined, 'per_returned': per_returned, 'query': query,
+        'body': body, 'status': status, 'stand_in': stand_in
+    }
+
+
+ENDPOINTS = [
+    # Autenticación
+    endpoint('POST', '/auth/login', None, 9, body={'usuario': '{empresa_username}', 'password': '{password}'}),
+    endpoint('GET', '/auth/sessions', 'empresa', 2, per_returned=1.5),
+
+    # Empresas
+    endpoint('GET', '/api/empresas/', 'super_admin', 5, per_returned=1.5),
+    endpoint('GET', '/api/empresas/dashboard/all', 'super_admin', 5, per_returned=1.5),
+    endpoint('GET', '/api/empresas/<empresa_id>', 'super_admin', 5),
+    endpoint('GET', '/api/empresas/mis-empresas', 'super_admin', 5, per_returned=1.5),
+    endpoint('GET', '/api/empresas/buscar-por-ubicacion', 'super_admin', 2, per_returned=1.5, query='ubicacion={ubicacion}'),
+    # examined=None: conteos globales sobre todas las empresas
+    endpoint('GET', '/api/empresas/estadisticas', 'super_admin', 3, examined=None),
+    endpoint('GET', '/api/empresas/<empresa_id>/including-inactive', 'super_admin', 5),
+    # Usuarios, hardware y alertas de la empresa: 45 + 60 + 80 en large
+    endpoint('GET', '/api/empresas/<empresa_id>/statistics', 'empresa', 12, examined=240),
+    endpoint('GET', '/api/empresas/<empresa_id>/activity', 'super_admin', 2, per_returned=1.5),
+
+    # Administración
+    endpoint('GET', '/api/admin/activity', 'super_admin', 2, per_returned=1.5),
+    endpoint('GET', '/api/admin/activity-admin', 'super_admin', 2, per_returned=1.5),
+    # examined=None: distribución de todas las empresas del sistema
+    endpoint('GET', '/api/admin/distribution', 'super_admin', 3, examined=None),
+
+    # Hardware: el nombre de la empresa se resuelve con una sola consulta $in
+    endpoint('GET', '/api/hardware/', 'super_admin', 10, per_returned=1.5),
+    endpoint('GET', '/api/hardware/empresa/<empresa_id>', 'empresa', 9, per_returned=1.5),
+    endpoint('GET', '/api/hardware/<hardware_id>', 'super_admin', 9),
+    endpoint('GET', '/api/hardware/<hardware_id>/direccion-url', 'super_admin', 2),
+    endpoint('GET', '/api/hardware/physical-status/fleet', 'super_admin', 0, examined=0),
+    endpoint('GET', '/api/hardware/all-including-inactive', 'super_admin', 9, per_returned=1.5),
+    endpoint('GET', '/api/hardware/empresa/<empresa_id>/including-inactive', 'empresa', 9, per_returned=1.5),
+    endpoint('GET', '/api/hardware-types/', 'super_admin', 2, per_returned=1.5),
+    endpoint('GET', '/api/hardware-types/<type_id>', 'super_admin', 2),
+    endpoint('POST', '/api/hardware-auth/authenticate', None, 2, body={
+        'empresa': '{empresa_nombre}', 'sede': '{sede}',
+        'tipo_hardware': '{hardware_tipo}', 'hardware': '{hardware_nombre}'
+    }),
+
+    # Dashboard del super admin
+    # examined=None: totales de empresas, usuarios y hardware de todo el sistema
+    endpoint('GET', '/api/dashboard/stats', 'super_admin', 7, examined=None),
+    endpoint('GET', '/api/dashboard/recent-companies', 'super_admin', 2, per_returned=1.5),
+    endpoint('GET', '/api/dashboard/recent-users', 'super_admin', 2, per_returned=1.5),
+    # examined=None: actividad de los últimos 30 días de todas las empresas
+    endpoint('GET', '/api/dashboard/activity-chart', 'super_admin', 3, examined=None),
+    # examined=None: conteos por tipo sobre todas las empresas
+    endpoint('GET', '/api/dashboard/distribution-chart', 'super_admin', 5, examined=None),
+    # examined=None: estado de toda la flota de hardware
+    endpoint('GET', '/api/dashboard/hardware-stats', 'super_admin', 2, examined=None),
+    # examined=None: sesiones activas de todo el sistema
+    endpoint('GET', '/api/dashboard/system-performance', 'super_admin', 2, examined=None),
+
+    # Usuarios por empresa
+    endpoint('GET', '/empresas/<empresa_id>/usuarios', 'empresa', 4, per_returned=1.5),
+    endpoint('GET', '/empresas/<empresa_id>/usuarios/<usuario_id>', 'empresa', 4),
+    endpoint('GET', '/empresas/<empresa_id>/usuarios/including-inactive', 'empresa', 4, per_returned=1.5),
+
+    # Alertas
+    endpoint('GET', '/api/mqtt-alerts/', 'empresa', 7, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/<alert_id>', 'empresa', 8),
+    endpoint('GET', '/api/mqtt-alerts/empresa/<empresa_id>', 'empresa', 7, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/active', 'empresa', 7, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/unauthorized', 'empresa', 7, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/inactive', 'empresa', 13, per_returned=1.5),
+    # examined=None: agrupa todas las alertas, activas y archivadas
+    endpoint('GET', '/api/mqtt-alerts/stats', 'empresa', 9, examined=None),
+    endpoint('GET', '/api/mqtt-alerts/empresa/<empresa_id>/active-by-sede', 'empresa', 7, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/verify-empresa-sede', 'empresa', 4,
+             query='empresa_nombre={empresa_nombre}&sede={sede}'),
+    endpoint('GET', '/api/mqtt-alerts/verify-hardware', 'empresa', 4, query='hardware_nombre={hardware_nombre}'),
+
+    # Consultas públicas
+    endpoint('GET', '/api/phone-lookup/', None, 2, query='telefono={telefono}'),
+    endpoint('GET', '/api/contact/', 'super_admin', 2, per_returned=1.5),
+    endpoint('GET', '/api/contact/<contact_id>', 'super_admin', 2),
+    endpoint('GET', '/api/contact/status/<status>', 'super_admin', 2, per_returned=1.5),
+    endpoint('GET', '/api/mqtt-alerts/test-flow', None, 0, examined=0),
+
+    # Escrituras: después de las lecturas para no alterar lo que miden
+    endpoint('POST', '/auth/refresh', 'session', 5),
+    endpoint('POST', '/auth/logout', 'session', 3),
+    endpoint('POST', '/auth/logout-all', 'session', 3, body={}),
+    # Hardware de la empresa por el índice de empresa_id: 60 en large
+    endpoint('POST', '/api/hardware/physical-status/check', 'empresa', 3, examined=75),
+    endpoint('PUT', '/api/hardware/physical-status', 'internal', 3, body={
+        'empresa_nombre': '{empresa_nombre}', 'hardware_nombre': '{hardware_nombre}',
+        'physical_status': {'estado': 'Activo'}
+    }),
+    # Un heartbeat por cada hardware de la empresa: el lote no debe crecer en comandos y cada
+    # heartbeat examina solo su documento por el índice de topic (60 en large)
+    endpoint('PUT', '/api/hardware/physical-status/batch', 'internal', 2, examined=75,
+             body={'items': '{heartbeats}'}),
+    # Destinatarios y hardware de la sede se filtran sobre el índice de empresa_id: 45 + 60 en large
+    endpoint('POST', '/api/mqtt-alerts/', 'hardware', 15, examined=140, status=201, body={
+        'data': {'tipo_alerta_id': '{tipo_alarma_id}', 'descripcion': 'Alerta de benchmark'}
+    }),
+    endpoint('POST', '/api/mqtt-alerts/process', 'hardware', 5, body={
+        'empresa': '{empresa_nombre}', 'sede': '{sede}', 'tipo_alarma': '{tipo_alarma_id}'
+    }),
+    # Igual que la alerta de hardware: usuarios y hardware de la empresa, 45 + 60 en large
+    endpoint('POST', '/api/mqtt-alerts/user-alert', None, 9, examined=140, status=201, body={
+        'creador': {'usuario_id': '{usuario_id}', 'tipo': 'usuario'},
+        'tipo_alerta_id': '{tipo_alarma_id}', 'descripcion': 'Alerta de benchmark'
+    }),
+    endpoint('POST', '/api/mqtt-alerts/user-alert/details', None, 2, body={
+        'alert_id': '{alert_id}', 'user_id': '{usuario_id}'
+    }),
+    # arrayFilters: un solo find_one_and_update en mongod
+    endpoint('PATCH', '/api/mqtt-alerts/update-user-status', None, 2, stand_in=False, body={
+        'alert_id': '{alert_id}', 'usuario_id': '{usuario_id}', 'disponible': True
+    }),
+    endpoint('PUT', '/api/mqtt-alerts/<alert_id>', 'empresa', 5, body={'data': {'nota': 'benchmark'}}),
+    endpoint('PATCH', '/api/mqtt-alerts/<alert_id>/authorize', 'empresa', 3, body={'usuario_id': '{usuario_id}'}),
+    endpoint('PUT', '/api/mqtt-alerts/user-alert/deactivate', None, 3, body={
+        'alert_id': '{alert_id}', 'desactivado_por_id': '{empresa_id}', 'desactivado_por_tipo': 'empresa'
+    }),
+    endpoint('PATCH', '/api/mqtt-alerts/<alert_id>/toggle-status', 'empresa', 3),
+    endpoint('POST', '/api/empresas/', 'super_admin', 5, status=201, body={
+        'nombre': 'Empresa Benchmark Nueva', 'descripcion': 'Empresa creada por el benchmark',
+        'ubicacion': 'Medellín', 'username': 'budget-nueva', 'email': 'budget-nueva@bench.local',
+        'password': '{password}', 'sedes': ['Principal']
+    }),
+    endpoint('PUT', '/api/empresas/<empresa_id>', 'super_admin', 3, body={'descripcion': 'Descripción actualizada'}),
+    endpoint('PATCH', '/api/empresas/<empresa_id>/toggle-status', 'super_admin', 3, body={}),
+    endpoint('POST', '/api/hardware-types/', 'super_admin', 3, status=201, body={
+        'nombre': 'BENCHMARK', 'descripcion': 'Tipo de hardware de benchmark'
+    }),
+    endpoint('PUT', '/api/hardware-types/<type_id>', 'super_admin', 4, body={'descripcion': 'Descripción actualizada'}),
+    endpoint('PUT', '/api/hardware/<hardware_id>', 'super_admin', 7, body={'datos': {'nota': 'benchmark'}}),
+    endpoint('PATCH', '/api/hardware/<hardware_id>/toggle-status', 'super_admin', 3, body={}),
+    endpoint('POST', '/empresas/<empresa_id>/usuarios', 'empresa', 10, status=201, body={
+        'nombre': 'Usuario Benchmark', 'cedula': '123456789', 'rol': 'brigadista',
+        'telefono': '573009990000', 'email': 'usuario-budget@bench.local', 'sede': '{sede}'
+    }),
+    endpoint('PUT', '/empresas/<empresa_id>/usuarios/<usuario_id>', 'empresa', 12, body={
+        'nombre': 'Usuario Actualizado', 'telefono': '573009990001'
+    }),
+    endpoint('PATCH', '/empresas/<empresa_id>/usuarios/<usuario_id>/toggle-status', 'empresa', 7, body={}),
+
+    # Eliminaciones al final: la empresa medida desaparece con la última
+    endpoint('DELETE', '/auth/sessions/<session_id>', 'session', 3),
+    endpoint('DELETE', '/empresas/<empresa_id>/usuarios/<usuario_id>', 'super_admin', 4),
+    endpoint('DELETE', '/api/mqtt-alerts/<alert_id>', 'empresa', 4),
+    endpoint('DELETE', '/api/hardware/<hardware_id>', 'super_admin', 2),
+    endpoint('DELETE', '/api/hardware-types/<type_id>', 'super_admin', 2),
+    endpoint('DELETE', '/api/empresas/<empresa_id>', 'super_admin', 3),
+]
+
+
+# ---------------------------------------------------------------------------
+# Medición (proceso hijo, un tamaño de fixtures)
+# ---------------------------------------------------------------------------
+
+def _fill(value, fixtures):
+    if isinstance(value, str) and value.startswith('{') and value.endswith('}') and value[1:-1] in fixtures:
+        # Un marcador solo conserva el tipo del fixture (listas en cuerpos de lote)
+        return fixtures[value[1:-1]]
+    if isinstance(value, str):
+        return value.format(**fixtures)
+    if isinstance(value, dict):
+        return {key: _fill(item, fixtures) for key, item in value.items()}
+    return value
+
+
+def build_path(entry, fixtures):
+    path = entry['rule']
+    for key, value in fixtures.items():
+        path = path.replace(f'<{key}>', str(value))
+    query = _fill(entry['query'], {key: quote(str(value)) for key, value in fixtures.items()})
+    return f'{path}?{query}' if query else path
+
+
+def seed_fixtures(db, manifest):
+    """Administrador de prueba y valores para rellenar las rutas"""
+    from bson import ObjectId
+    from models.contact import Contact
+    from models.hardware_type import HardwareType
+
+    db.hardware_types.insert_many([
+        HardwareType(nombre=tipo, descripcion='Tipo de hardware de benchmark').to_dict()
+        for tipo in TIPOS_HARDWARE
+    ])
+    admin_id = ObjectId()
+    db.administradores.insert_one({
+        '_id': admin_id, 'username': 'budget-admin', 'usuario': 'budget-admin',
+        'email': 'budget-admin@bench.local', 'role': 'super_admin', 'rol': 'super_admin',
+        'activo': True, 'is_active': True, 'created_at': datetime.utcnow()
+    })
+    # Se mide contra la empresa del medio para no favorecer a la primera insertada
+    empresa = manifest['empresas'][len(manifest['empresas']) // 2]
+    hardware = next(item for item in manifest['hardware'] if item['empresa'] == empresa['nombre'])
+    # Alerta activa y uno de sus destinatarios: las escrituras sobre la alerta lo necesitan
+    alerta = db.mqtt_alerts.find_one(
+        {'empresa_id': ObjectId(empresa['id']), 'activo': True, 'numeros_telefonicos.0': {'$exists': True}},
+        {'numeros_telefonicos': 1}
+    )
+    usuario_id = alerta['numeros_telefonicos'][0]['usuario_id'] if alerta else None
+    usuario = db.usuarios.find_one({'_id': ObjectId(usuario_id)} if usuario_id else {'empresa_id': ObjectId(empresa['id'])},
+                                   {'telefono': 1})
+    tipo_hardware = db.hardware_types.find_one({}, {'_id': 1})
+    # El administrador de prueba es el creador de la empresa medida (requisito para editarla)
+    db.empresas.update_one({'_id': ObjectId(empresa['id'])}, {'$set': {'creado_por': admin_id}})
+    # Con dirección ya geocodificada la edición del hardware no consulta Nominatim
+    db.hardware.update_one({'_id': ObjectId(hardware['id'])}, {'$set': {'direccion': 'Calle 10 # 20-30, Medellín'}})
+    tipo_alarma = db.tipos_alarma.find_one({'empresa_id': ObjectId(empresa['id'])}, {'_id': 1})
+    contacto = Contact(
+        firstName='Budget', lastName='Bench', email='contacto@bench.local', company=empresa['nombre'],
+        phone=None, projectType='benchmark', message='Contacto de benchmark', privacy=True,
+        created_at=datetime.utcnow()
+    )
+    contact_id = db.contacts.insert_one(contacto.to_dict()).inserted_id
+    heartbeats = [
+        {'topic': item['topic'], 'physical_status': {'estado': 'Activo'}}
+        for item in manifest['hardware'] if item['empresa'] == empresa['nombre']
+    ]
+    return {
+        'admin_id': str(admin_id),
+        'empresa_id': empresa['id'],
+        'empresa_nombre': empresa['nombre'],
+        'empresa_username': empresa['username'],
+        'password': manifest['password'],
+        'sede': hardware['sede'],
+        'hardware_id': hardware['id'],
+        'hardware_nombre': hardware['nombre'],
+        'hardware_tipo': hardware['tipo'],
+        'usuario_id': str(usuario['_id']) if usuario else str(ObjectId()),
+        'telefono': usuario.get('telefono', '') if usuario else '',
+        'alert_id': str(alerta['_id']) if alerta else str(ObjectId()),
+        'type_id': str(tipo_hardware['_id']) if tipo_hardware else str(ObjectId()),
+        'tipo_alarma_id': str(tipo_alarma['_id']) if tipo_alarma else str(ObjectId()),
+        'contact_id': str(contact_id),
+        'status': contacto.status,
+        'heartbeats': heartbeats,
+        'session_id': str(ObjectId()),
+        'ubicacion': 'Medellín',
+    }
+
+
+def recorded(recorder, call):
+    """Como `profiled` pero con el `CommandRecorder` del stand-in"""
+    recorder.reset()
+    result = call()
+    return result, list(recorder.commands)
+
+
+def profiled(db, call):
+    """Ejecuta `call` con el profiler activo y retorna (resultado, entradas)"""
+    db.command('profile', 0)
+    db.system.profile.drop()
+    db.command('profile', 2)
+    try:
+        result = call()
+    finally:
+        db.command('profile', 0)
+    entries = [
+        entry for entry in db.system.profile.find().sort('ts', 1)
+        if not entry.get('ns', '').endswith('.system.profile')
+        and 'profile' not in (entry.get('command') or {})
+    ]
+    return result, entries
+
+
+def summarize_recorded(commands):
+    """Resumen de los comandos del stand-in: sin documentos examinados ni getMore"""
+    from utils.query_accounting import query_shape
+
+    return {
+        'commands': len(commands), 'get_more': 0, 'examined': None, 'returned': None,
+        'shapes': [
+            f"{command['name']} {command['collection']} "
+            f"{json.dumps(query_shape(command['query']), ensure_ascii=False, sort_keys=True, default=str)}"
+            for command in commands
+        ]
+    }
+
+
+def summarize(entries):
+    from utils.query_accounting import command_shape
+
+    summary = {'commands': 0, 'get_more': 0, 'examined': 0, 'returned': 0, 'shapes': []}
+    for entry in entries:
+        command = entry.get('command') or {}
+        name = next(iter(command), entry.get('op'))
+        if name == 'getMore':
+            summary['get_more'] += 1
+        else:
+            summary['commands'] += 1
+        summary['examined'] += int(entry.get('docsExamined', 0) or 0)
+        summary['returned'] += int(entry.get('nreturned', 0) or 0)
+        summary['shapes'].append(f"{name} {entry.get('ns')} {command_shape(name, command)}")
+    return summary
+
+
+def measure_size(size, backend='mongod'):
+    """Mide todos los endpoints con los fixtures de `size`"""
+    recorder = None
+    if backend == 'mongomock':
+        from mongo_stand_in import CommandRecorder, install
+        install(os.environ['DATABASE_NAME'])
+        recorder = CommandRecorder()
+
+    from core.config import Config
+    from core.database import Database
+    from flask_jwt_extended import create_access_token
+    from services.hardware_auth_service import HardwareAuthService
+
+    db = Database().get_database()
+    db.client.drop_database(db.name)
+    logger.info(f"🏭 Fixtures '{size}': {FIXTURE_SIZES[size]}")
+    manifest = generate(db, image_kb=2, **FIXTURE_SIZES[size])
+    fixtures = seed_fixtures(db, manifest)
+
+    from app import create_app
+    app = create_app()
+    client = app.test_client(use_cookies=False)
+    with app.app_context():
+        tokens = {
+            'super_admin': create_access_token(identity=fixtures['admin_id'], additional_claims={'role': 'super_admin'}),
+            'empresa': create_access_token(identity=fixtures['empresa_id'], additional_claims={'role': 'empresa'}),
+        }
+
+    def headers_for(role):
+        if role == 'internal':
+            return {Config.INTERNAL_TOKEN_HEADER or 'X-Internal-Token': Config.INTERNAL_TOKEN}
+        if role == 'hardware':
+            # Los tokens de hardware son de un solo uso: uno nuevo por petición, fuera de la medición
+            token = HardwareAuthService().authenticate_hardware(
+                fixtures['empresa_nombre'], fixtures['sede'], fixtures['hardware_tipo'], fixtures['hardware_nombre']
+            )['token']
+            return {'Authorization': f'Bearer {token}'}
+        if role == 'session':
+            # Sesión propia por petición (logout y refresh la consumen), abierta fuera de la medición
+            response = client.post('/auth/login', json={
+                'usuario': fixtures['empresa_username'], 'password': fixtures['password']
+            })
+            cookies = SimpleCookie()
+            for header in response.headers.getlist('Set-Cookie'):
+                cookies.load(header)
+            session = db.sessions.find_one({}, {'_id': 1}, sort=[('_id', -1)])
+            fixtures['session_id'] = str(session['_id'])
+            return {
+                'Cookie': '; '.join(f'{name}={morsel.value}' for name, morsel in cookies.items()),
+                'Authorization': f"Bearer {cookies['auth_token'].value}"
+            }
+        return {'Authorization': f'Bearer {tokens[role]}'} if role else {}
+
+    results = {}
+    for entry in ENDPOINTS:
+        if recorder is not None and not entry['stand_in']:
+            continue
+        headers = headers_for(entry['role'])
+        path = build_path(entry, fixtures)
+        body = _fill(entry['body'], fixtures)
+
+        def call():
+            response = client.open(path, method=entry['method'], json=body, headers=headers)
+            # Consumir el cuerpo dentro de la ventana del profiler (respuestas en streaming)
+            data = response.get_data(as_text=True)
+            return response.status_code, data
+
+        if recorder is not None:
+            with recorder:
+                status, commands = recorded(recorder, call)
+            summary = summarize_recorded(commands)
+        else:
+            status, entries = profiled(db, call)
+            summary = summarize(entries)
+        status, data = status
+        summary['status'] = status
+        summary['path'] = path
+        if status != entry['status']:
+            # Para diagnosticar fixtures que no sirven
+            summary['response'] = data[:300]
+        results[f"{entry['method']} {entry['rule']}"] = summary
+
+    rules = sorted(
+        f'{method} {rule.rule}'
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint.split('.')[0] in ROUTE_BLUEPRINTS
+        for method in rule.methods - {'HEAD', 'OPTIONS'}
+    )
+    return {'size': size, 'sizes': FIXTURE_SIZES[size], 'endpoints': results, 'rules': rules}
+
+
+def run_worker(args):
+    """Proceso hijo: mide un tamaño y escribe el resultado en `--output`"""
+    # Sin tareas en segundo plano ni pool de bcrypt: solo deben contar las consultas de la petición
+    os.environ['HARDWARE_STATUS_SWEEP_INTERVAL_SECONDS'] = '0'
+    os.environ['SESSION_REVOCATION_POLL_SECONDS'] = '3600'
+    os.environ['PASSWORD_HASH_PROCESSES'] = '0'
+    os.environ['BCRYPT_ROUNDS'] = '4'
+    os.environ['SLOW_QUERY_THRESHOLD_MS'] = '0'
+    # El servicio de correo exige su configuración al construirse; no se envía nada
+    for name, value in (('RESEND_API_KEY', 'bench-resend-key'), ('RESEND_DOMAIN', 'bench.local'),
+                        ('CONTACT_EMAIL', 'contacto@bench.local')):
+        os.environ.setdefault(name, value)
+    # Los clientes HTTP salientes (fanout MQTT, WhatsApp) fallan al instante en vez de esperar DNS
+    os.environ['MQTT_SERVICE_URL'] = 'http://127.0.0.1:9'
+    os.environ['WHATSAPP_SERVICE_URL'] = 'http://127.0.0.1:9/api'
+    if args.backend == 'mongomock':
+        # mongomock no tiene change streams
+        os.environ['ALERT_STREAM_MODE'] = 'local'
+    result = measure_size(args.worker, args.backend)
+    with open(args.output, 'w', encoding='utf-8') as handle:
+        json.dump(result, handle, ensure_ascii=False, default=str)
+
+
+# ---------------------------------------------------------------------------
+# Evaluación (proceso principal)
+# ---------------------------------------------------------------------------
+
+def evaluate(entry, small, large):
+    """Lista de problemas del endpoint, vacía si cumple el presupuesto"""
+    problems = []
+    if large['status'] != entry['status'] or small['status'] != entry['status']:
+        problems.append(
+            f"código {small['status']}/{large['status']} (esperado {entry['status']}): los fixtures no permiten medirlo"
+        )
+        if large.get('response'):
+            problems.append(f"respuesta: {large['response']}")
+        return problems
+    if large['commands'] > entry['commands']:
+        problems.append(f"{large['commands']} comandos (presupuesto {entry['commands']})")
+    if large['commands'] > small['commands']:
+        problems.append(
+            f"los comandos crecen con los datos: {small['commands']} en small, {large['commands']} en large"
+        )
+    if entry['examined'] is not None and large['examined'] is not None:
+        allowed = entry['examined'] + (entry['per_returned'] or 0) * large['returned']
+        if large['examined'] > allowed:
+            problems.append(
+                f"{large['examined']} documentos examinados para {large['returned']} devueltos (máximo {int(allowed)})"
+            )
+    return problems
+
+
+def _spawn(size, args, directory):
+    output = os.path.join(directory, f'{size}.json')
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', size,
+        '--database', args.database, '--output', output, '--backend', args.backend
+    ]
+    if args.mongo_uri:
+        command += ['--mongo-uri', args.mongo_uri]
+    completed = subprocess.run(command)
+    if completed.returncode != 0:
+        raise RuntimeError(f"La medición '{size}' terminó con código {completed.returncode}")
+    with open(output, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def _drop_database(args):
+    if args.backend == 'mongomock':
+        # La base en memoria desaparece con el proceso hijo
+        return
+    configure_environment(args.database, args.mongo_uri)
+    from core.database import Database
+    db = Database().get_database()
+    db.client.drop_database(db.name)
+
+
+def main():
+    """Función principal de la revisión"""
+    parser = argparse.ArgumentParser(description='Presupuesto de consultas a MongoDB por endpoint')
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--mongo-uri', help='URI de un mongod local (por defecto MONGO_URI)')
+    parser.add_argument('--backend', choices=['mongod', 'mongomock'], default='mongod',
+                        help='mongod local con profiler, o mongomock en proceso (solo comandos)')
+    parser.add_argument('--only', help='Revisar solo las rutas que contienen este texto')
+    parser.add_argument('--strict', action='store_true', help='Fallar también por rutas sin presupuesto')
+    parser.add_argument('--keep', action='store_true', help='No eliminar la base al terminar')
+    parser.add_argument('--output', help='Archivo JSON con las mediciones')
+    parser.add_argument('--worker', choices=sorted(FIXTURE_SIZES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend == 'mongomock':
+        # La URI no se usa, pero la configuración de la app la exige
+        os.environ.setdefault('MONGO_URI', 'mongodb://localhost:27017')
+    try:
+        configure_environment(args.database, args.mongo_uri)
+    except ValueError as e:
+        logger.error(f"❌ {str(e)}")
+        sys.exit(2)
+
+    if args.worker:
+        try:
+            run_worker(args)
+        except Exception as e:
+            logger.error(f"❌ Error midiendo '{args.worker}': {str(e)}")
+            sys.exit(1)
+        sys.exit(0)
+
+    selected = [entry for entry in ENDPOINTS if not args.only or args.only in entry['rule']]
+    if args.backend == 'mongomock':
+        for entry in [entry for entry in selected if not entry['stand_in']]:
+            logger.info(f"⏭️ {entry['method']} {entry['rule']}: solo se mide contra mongod")
+        selected = [entry for entry in selected if entry['stand_in']]
+
+    logger.info("📏 PRESUPUESTO DE CONSULTAS POR ENDPOINT")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            runs = {size: _spawn(size, args, directory) for size in ('small', 'large')}
+    except Exception as e:
+        logger.error(f"❌ Error durante la revisión: {str(e)}")
+        sys.exit(1)
+    finally:
+        if not args.keep:
+            try:
+                _drop_database(args)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo eliminar la base '{args.database}': {str(e)}")
+
+    failures = {}
+    for entry in selected:
+        key = f"{entry['method']} {entry['rule']}"
+        small, large = runs['small']['endpoints'][key], runs['large']['endpoints'][key]
+        problems = evaluate(entry, small, large)
+        flag = '❌' if problems else '✅'
+        documents = (
+            f" {large['examined']:>6} examinados {large['returned']:>6} devueltos"
+            if large['examined'] is not None else ''
+        )
+        logger.info(f"{flag} {key:<60} {large['commands']:>3}/{entry['commands']:<3} cmds{documents}")
+        if problems:
+            failures[key] = problems
+            for problem in problems:
+                logger.error(f"      {problem}")
+            for shape in large['shapes']:
+                logger.error(f"      · {shape}")
+
+    measured = {f"{entry['method']} {entry['rule']}" for entry in ENDPOINTS}
+    excluded = {f'{method} {rule}' for method, rule in EXCLUDED_RULES}
+    uncovered = [rule for rule in runs['large']['rules'] if rule not in measured and rule not in excluded]
+    if uncovered and not args.only:
+        log = logger.error if args.strict else logger.warning
+        log(f"⚠️ {len(uncovered)} rutas sin presupuesto:")
+        for rule in uncovered:
+            log(f"      {rule}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'meta': {'timestamp': datetime.utcnow().isoformat(), 'sizes': FIXTURE_SIZES},
+                'runs': runs, 'failures': failures, 'uncovered': uncovered
+            }, handle, indent=2, ensure_ascii=False)
+        logger.info(f"✅ Mediciones escritas en {args.output}")
+
+    if failures or (args.strict and uncovered and not args.only):
+        logger.error(f"❌ {len(failures)} endpoints fuera de presupuesto")
+        sys.exit(2)
+    logger.info("✅ Todos los endpoints dentro del presupuesto")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
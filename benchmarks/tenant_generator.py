@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Generador de tenants sintéticos para los benchmarks de carga.
+
+Crea en una base de datos de benchmark N empresas, cada una con M sedes,
+K usuarios y H hardware por sede, un catálogo de tipos de alarma por
+empresa (con imagen base64 del tamaño indicado) y un historial de alertas
+con destinatarios reales de la sede. Todas las empresas comparten la
+contraseña `BENCH_PASSWORD` para el escenario de login.
+
+Escribe un manifiesto JSON con los identificadores que necesitan los
+escenarios (`benchmarks/load_scenarios.py`).
+
+Solo se ejecuta contra un mongod local: se rechazan URIs con hosts que no
+sean localhost/127.0.0.1/::1 y las URIs `mongodb+srv`.
+
+Uso:
+    python benchmarks/tenant_generator.py [--empresas 5] [--sedes 3] [--usuarios 20]
+        [--hardware 10] [--alertas 200] [--image-kb 48] [--database rescue_bench]
+        [--manifest benchmarks/results/tenants.json]
+"""
+
+import sys
+import os
+import argparse
+import base64
+import json
+import logging
+import random
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+BENCH_PASSWORD = 'bench-password'
+DEFAULT_DATABASE = 'rescue_bench'
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1', '[::1]'}
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'tenants.json')
+
+# Colecciones que escribe el generador (se vacían con --reset)
+COLLECTIONS = ('empresas', 'usuarios', 'hardware', 'tipos_alarma', 'mqtt_alerts')
+
+TIPOS_HARDWARE = ['SEMAFORO', 'ALARMA', 'BOTONERA', 'SIRENA']
+CATALOGO_ALARMAS = [
+    ('Incendio', 'ROJO', ['Extintor', 'Botiquín'], ['Evacuar', 'Llamar a bomberos']),
+    ('Sismo', 'NARANJA', ['Linterna', 'Radio'], ['Ubicarse en zona segura']),
+    ('Inundacion', 'AZUL', ['Bomba de agua'], ['Cortar energía', 'Subir a pisos altos']),
+    ('Emergencia medica', 'AMARILLO', ['Botiquín', 'DEA'], ['Llamar a la línea de emergencia']),
+    ('Simulacro', 'VERDE', [], ['Seguir la ruta de evacuación']),
+]
+ROLES = ['brigadista', 'coordinador', 'vigilante', 'operario']
+
+
+def ensure_local_uri(uri):
+    """Lanza ValueError si la URI no apunta a un mongod local"""
+    if not uri:
+        raise ValueError('MONGO_URI no está configurada')
+    parts = urlsplit(uri)
+    if parts.scheme != 'mongodb':
+        raise ValueError(f'Solo se admite mongodb:// local, no {parts.scheme}://')
+    netloc = parts.netloc.rsplit('@', 1)[-1]
+    for host in netloc.split(','):
+        name = host[:host.index(']') + 1] if host.startswith('[') else host.split(':')[0]
+        if name not in LOCAL_HOSTS:
+            raise ValueError(f'El benchmark solo se ejecuta contra un mongod local (host: {name})')
+    return uri
+
+
+def configure_environment(database, mongo_uri=None):
+    """Apunta la configuración de la app a la base de benchmark (antes de importar core)"""
+    if mongo_uri:
+        os.environ['MONGO_URI'] = mongo_uri
+    from dotenv import load_dotenv
+    load_dotenv()
+    ensure_local_uri(os.getenv('MONGO_URI'))
+    os.environ['DATABASE_NAME'] = database
+    os.environ.setdefault('SECRET_KEY', 'bench-secret')
+    os.environ.setdefault('JWT_SECRET_KEY', 'bench-jwt-secret')
+    os.environ.setdefault('INTERNAL_TOKEN', 'bench-internal-token')
+
+
+def fake_image(rng, size_kb):
+    """Imagen base64 con el tamaño aproximado de las que suben las empresas"""
+    raw = bytes(rng.getrandbits(8) for _ in range(size_kb * 1024))
+    return 'data:image/png;base64,' + base64.b64encode(raw).decode('ascii')
+
+
+def generate(db, empresas=5, sedes=3, usuarios=20, hardware=10, alertas=200,
+             image_kb=48, active_ratio=0.1, seed=7):
+    """Inserta los tenants y retorna el manifiesto"""
+    import bcrypt
+    from bson import ObjectId
+
+    from core.config import Config
+    from models.empresa import Empresa
+    from models.hardware import Hardware
+    from models.tipo_alarma import TipoAlarma
+    from models.usuario import Usuario
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    # Un solo hash para todas las empresas: generar el dataset no debe costar N bcrypt
+    password_hash = bcrypt.hashpw(
+        BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)
+    ).decode('utf-8')
+    images = [fake_image(rng, image_kb) for _ in CATALOGO_ALARMAS]
+
+    manifest = {
+        'database': db.name,
+        'password': BENCH_PASSWORD,
+        'generated_at': now.isoformat(),
+        'sizes': {
+            'empresas': empresas, 'sedes': sedes, 'usuarios': usuarios,
+            'hardware': hardware, 'alertas': alertas, 'image_kb': image_kb
+        },
+        'empresas': [],
+        'hardware': [],
+        'active_alerts': []
+    }
+
+    for e in range(empresas):
+        nombre_empresa = f'BenchEmpresa{e:03d}'
+        sede_names = [f'Sede{s:02d}' for s in range(sedes)]
+        empresa = Empresa(
+            nombre=nombre_empresa,
+            descripcion='Empresa sintética de benchmark',
+            ubicacion='Medellín',
+            creado_por=ObjectId(),
+            username=f'bench{e:03d}',
+            email=f'bench{e:03d}@bench.local',
+            password_hash=password_hash,
+            sedes=sede_names,
+            roles=[{'nombre': rol, 'is_creator': rol == 'coordinador'} for rol in ROLES]
+        )
+        db.empresas.insert_one(empresa.to_dict())
+
+        tipos = []
+        for index, (nombre, color, implementos, recomendaciones) in enumerate(CATALOGO_ALARMAS):
+            tipo = TipoAlarma(
+                nombre=nombre, descripcion=f'{nombre} en instalaciones', tipo_alerta=color,
+                color_alerta=color, imagen_base64=images[index], recomendaciones=recomendaciones,
+                implementos_necesarios=implementos, empresa_id=empresa._id
+            )
+            doc = tipo.to_dict()
+            doc['_id'] = tipo._id
+            tipos.append(doc)
+        db.tipos_alarma.insert_many(tipos)
+
+        usuarios_por_sede = {}
+        hardware_por_sede = {}
+        for s_index, sede in enumerate(sede_names):
+            docs = []
+            for u in range(usuarios):
+                usuario = Usuario(
+                    nombre=f'Usuario {e}-{sede}-{u}', cedula=f'9{e:03d}{s_index:02d}{u:04d}',
+                    rol=rng.choice(ROLES), empresa_id=empresa._id,
+                    telefono=f'+573{e:03d}{s_index:02d}{u:04d}', email=f'u{e}-{sede}-{u}@bench.local', sede=sede
+                )
+                usuario._id = ObjectId()
+                docs.append(usuario.to_dict())
+            db.usuarios.insert_many(docs)
+            usuarios_por_sede[sede] = docs
+
+            docs = []
+            for h in range(hardware):
+                tipo_hw = TIPOS_HARDWARE[h % len(TIPOS_HARDWARE)]
+                item = Hardware(
+                    nombre=f'hw{e:03d}-{sede.lower()}-{h:03d}', tipo=tipo_hw, empresa_id=empresa._id,
+                    sede=sede, datos={'brand': 'Bench', 'model': f'M{h:03d}'},
+                    physical_status={'estado': 'Activo', 'updated_at': now}
+                )
+                item.topic = item.generate_topic(nombre_empresa, sede, tipo_hw, item.nombre)
+                docs.append(item.to_dict())
+                manifest['hardware'].append({
+                    'id': str(item._id), 'nombre': item.nombre, 'empresa': nombre_empresa,
+                    'sede': sede, 'tipo': tipo_hw, 'topic': item.topic
+                })
+            db.hardware.insert_many(docs)
+            hardware_por_sede[sede] = docs
+
+        alert_docs = []
+        for a in range(alertas):
+            sede = rng.choice(sede_names)
+            origen = rng.choice(hardware_por_sede[sede])
+            tipo = rng.choice(tipos)
+            creada = now - timedelta(minutes=a * 7)
+            activo = a < alertas * active_ratio
+            destinatarios = [
+                {
+                    'numero': usuario['telefono'],
+                    'nombre': usuario['nombre'],
+                    'usuario_id': str(usuario['_id']),
+                    'disponible': False,
+                    'embarcado': False
+                }
+                for usuario in usuarios_por_sede[sede]
+            ]
+            alert_docs.append({
+                '_id': ObjectId(),
+                'empresa_id': empresa._id,
+                'empresa_nombre': nombre_empresa,
+                'sede': sede,
+                'data': {'origen': 'mqtt', 'hardware_id': str(origen['_id']), 'tipo_alarma': tipo['nombre']},
+                'tipo_alerta': tipo['tipo_alerta'],
+                'nombre_alerta': tipo['nombre'],
+                'descripcion': f"{tipo['nombre']} reportado por {origen['nombre']}",
+                'prioridad': 'alta' if tipo['tipo_alerta'] == 'ROJO' else 'media',
+                'image_alert': tipo['imagen_base64'],
+                'elementos_necesarios': tipo['implementos_necesarios'],
+                'instrucciones': tipo['recomendaciones'],
+                'numeros_telefonicos': destinatarios,
+                'topic': origen['topic'],
+                'topics_otros_hardware': [hw['topic'] for hw in hardware_por_sede[sede] if hw is not origen][:5],
+                'activacion_alerta': {'tipo_activacion': 'hardware', 'nombre': origen['nombre'], 'id': origen['_id']},
+                'activo': activo,
+                'fecha_creacion': creada,
+                'fecha_actualizacion': creada,
+                'fecha_desactivacion': None if activo else creada + timedelta(minutes=30),
+            })
+            if activo:
+                manifest['active_alerts'].append({
+                    'id': str(alert_docs[-1]['_id']),
+                    'usuario_ids': [d['usuario_id'] for d in destinatarios]
+                })
+        if alert_docs:
+            db.mqtt_alerts.insert_many(alert_docs)
+
+        manifest['empresas'].append({
+            'id': str(empresa._id), 'nombre': nombre_empresa, 'username': empresa.username,
+            'sedes': sede_names, 'tipos_alarma': [tipo['nombre'] for tipo in tipos]
+        })
+        logger.info(f"   {nombre_empresa}: {sedes} sedes, {sedes * usuarios} usuarios, "
+                    f"{sedes * hardware} hardware, {len(alert_docs)} alertas")
+    return manifest
+
+
+def reset(db):
+    for name in COLLECTIONS:
+        db[name].delete_many({})
+
+
+def write_manifest(manifest, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2, ensure_ascii=False)
+
+
+def main():
+    """Función principal del generador"""
+    parser = argparse.ArgumentParser(description='Generador de tenants sintéticos para benchmarks')
+    parser.add_argument('--empresas', type=int, default=5)
+    parser.add_argument('--sedes', type=int, default=3, help='Sedes por empresa')
+    parser.add_argument('--usuarios', type=int, default=20, help='Usuarios por sede')
+    parser.add_argument('--hardware', type=int, default=10, help='Hardware por sede')
+    parser.add_argument('--alertas', type=int, default=200, help='Alertas históricas por empresa')
+    parser.add_argument('--image-kb', type=int, default=48, help='Tamaño de las imágenes del catálogo')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--database', default=DEFAULT_DATABASE)
+    parser.add_argument('--mongo-uri', help='URI de un mongod local (por defecto MONGO_URI)')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST)
+    parser.add_argument('--no-reset', action='store_true', help='No vaciar las colecciones antes')
+    args = parser.parse_args()
+
+    try:
+        configure_environment(args.database, args.mongo_uri)
+    except ValueError as e:
+        logger.error(f"❌ {str(e)}")
+        sys.exit(2)
+
+    logger.info(f"🏭 GENERANDO TENANTS SINTÉTICOS EN '{args.database}'")
+    try:
+        from core.database import Database
+        db = Database().get_database()
+        if not args.no_reset:
+            reset(db)
+        manifest = generate(
+            db, empresas=args.empresas, sedes=args.sedes, usuarios=args.usuarios,
+            hardware=args.hardware, alertas=args.alertas, image_kb=args.image_kb, seed=args.seed
+        )
+        write_manifest(manifest, args.manifest)
+    except Exception as e:
+        logger.error(f"❌ Error generando datos: {str(e)}")
+        sys.exit(1)
+
+    logger.info(f"✅ Manifiesto escrito en {args.manifest}")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
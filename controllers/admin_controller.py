@@ -4,7 +4,9 @@ from utils.permissions import (
     require_super_admin_token,
     require_empresa_or_admin_token,
 )
+from utils.tracing import trace_methods
 
+@trace_methods
 class AdminController:
     def __init__(self):
         self.dashboard_service = DashboardService()
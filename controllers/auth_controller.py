@@ -1,8 +1,9 @@
 from flask import request, jsonify, make_response
 from services.auth_service import AuthService
 from middleware.security_middleware import SecurityMiddleware
-from flask_jwt_extended import decode_token
+from utils.tracing import trace_methods
 
+@trace_methods
 class AuthController:
     def __init__(self):
         self.auth_service = AuthService()
@@ -21,7 +22,8 @@ class AuthController:
             # Preparar datos de la request para el sistema de sesiones
             request_data = {
                 'remote_addr': request.environ.get('REMOTE_ADDR'),
-                'user_agent': request.headers.get('User-Agent')
+                'user_agent': request.headers.get('User-Agent'),
+                'client_fingerprint': self.security_middleware.get_client_fingerprint(request)
             }
             
             result = self.auth_service.login(usuario, password, request_data)
@@ -38,17 +40,6 @@ class AuthController:
                 
                 response = make_response(jsonify(response_data), 200)
                 
-                # Decode access token to get JWT ID (jti)
-                decoded_token = decode_token(access_token)
-                jti = decoded_token.get('jti', None)
-                
-                # Create secure session record
-                self.security_middleware.create_session_record(
-                    user_id=result['data']['id'],
-                    fingerprint=self.security_middleware.get_client_fingerprint(request),
-                    jti=jti
-                )
-                
                 # Configurar cookie de access token para desarrollo HTTP
                 response.set_cookie(
                     'auth_token',
@@ -74,7 +65,13 @@ class AuthController:
                 )
                 
                 return response
-            return jsonify({'success': False, 'errors': result.get('errors', ['Credenciales inválidas'])}), 401
+            response = make_response(
+                jsonify({'success': False, 'errors': result.get('errors', ['Credenciales inválidas'])}),
+                result.get('status_code', 401)
+            )
+            if result.get('retry_after'):
+                response.headers['Retry-After'] = str(result['retry_after'])
+            return response
         except Exception as e:
             return jsonify({'success': False, 'errors': ['Error interno del servidor']}), 500
     
@@ -1,6 +1,8 @@
 from flask import request, jsonify
 from services.contact_service import ContactService
+from utils.tracing import trace_methods
 
+@trace_methods
 class ContactController:
     """Controlador para manejar las peticiones de contacto"""
     
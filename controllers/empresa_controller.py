@@ -3,11 +3,13 @@ from services.empresa_service import EmpresaService
 from utils.permissions import require_super_admin_token, require_empresa_or_admin_token
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
 import logging
+from utils.tracing import trace_methods
 
 # Configurar logger
 logger = logging.getLogger(__name__)
 
 
+@trace_methods
 class EmpresaController:
     def __init__(self):
         self.empresa_service = EmpresaService()
@@ -56,7 +58,6 @@ class EmpresaController:
                 500,
             )
 
-    @require_empresa_or_admin_token
     def get_empresa(self, empresa_id):
         """Endpoint para obtener una empresa por ID"""
         try:
@@ -78,7 +79,6 @@ class EmpresaController:
                 500,
             )
 
-    @require_empresa_or_admin_token
     def get_all_empresas(self):
         """Endpoint para obtener todas las empresas activas (para formularios)"""
         try:
@@ -117,7 +117,6 @@ class EmpresaController:
                 500,
             )
 
-    @require_super_admin_token
     def get_all_empresas_dashboard(self):
         """Endpoint para obtener TODAS las empresas (activas e inactivas) para dashboards"""
         try:
@@ -160,7 +159,6 @@ class EmpresaController:
                 500,
             )
 
-    @require_super_admin_token
     def get_my_empresas(self):
         """Endpoint para obtener empresas creadas por el super admin autenticado"""
         try:
@@ -223,7 +221,7 @@ class EmpresaController:
                     200,
                 )
             else:
-                return jsonify(result), 400
+                return jsonify(result), result.pop("status_code", 400)
 
         except Exception as e:
             return (
@@ -325,7 +323,6 @@ class EmpresaController:
                 500,
             )
     
-    @require_super_admin_token
     def get_empresa_including_inactive(self, empresa_id):
         """Endpoint para obtener una empresa por ID incluyendo inactivas (solo super admin)"""
         try:
@@ -391,7 +388,7 @@ class EmpresaController:
                     200,
                 )
             else:
-                return jsonify(result), 400
+                return jsonify(result), result.pop("status_code", 400)
 
         except Exception as e:
             return (
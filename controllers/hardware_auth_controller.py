@@ -1,7 +1,9 @@
 from flask import jsonify, request
 from services.hardware_auth_service import HardwareAuthService
+from utils.tracing import trace_methods
 
 
+@trace_methods
 class HardwareAuthController:
     """
     Controlador simple para autenticación de hardware.
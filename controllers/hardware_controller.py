@@ -1,12 +1,44 @@
-from flask import request, jsonify, g
+from flask import request, jsonify, g, Response, current_app, stream_with_context
 from services.hardware_service import HardwareService
 from decorators.internal_token_decorator import require_internal_token
 from utils.permissions import require_empresa_or_admin_token, require_super_admin_token
+from utils.tracing import trace_methods
 
+@trace_methods
 class HardwareController:
     def __init__(self):
         self.service = HardwareService()
 
+    def _alternate_listing(self, filters, include_inactive):
+        """Respuesta en streaming NDJSON o por cursor si se pidió; None para el listado normal"""
+        wants_ndjson = (
+            request.args.get('format') == 'ndjson'
+            or request.accept_mimetypes.best == 'application/x-ndjson'
+        )
+        if wants_ndjson:
+            rows = self.service.iter_hardware_json(filters, include_inactive)
+            dumps = current_app.json.dumps
+
+            def generate():
+                try:
+                    for row in rows:
+                        yield dumps(row) + '\n'
+                except Exception as exc:
+                    yield dumps({'success': False, 'errors': [str(exc)]}) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        if 'cursor' in request.args:
+            result = self.service.get_hardware_keyset_page(
+                filters,
+                include_inactive=include_inactive,
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', type=int)
+            )
+            status = 200 if result.get('success') else result.pop('status_code', 500)
+            return jsonify(result), status
+        return None
+
     @require_super_admin_token
     def create_hardware(self):
         try:
@@ -17,7 +49,6 @@ class HardwareController:
         except Exception as exc:
             return jsonify({'success': False, 'errors': [str(exc)]}), 500
 
-    @require_super_admin_token
     def get_hardware_list(self):
         """Obtener todos los hardware activos (solo super admin)"""
         try:
@@ -45,9 +76,17 @@ class HardwareController:
                 except ValueError:
                     pass
             
+            alternate = self._alternate_listing(filters, include_inactive=False)
+            if alternate is not None:
+                return alternate
+
             # Pass filters to service if any exist
             filter_params = filters if filters else None
-            result = self.service.get_all_hardware(filter_params)
+            result = self.service.get_all_hardware(
+                filter_params,
+                page=request.args.get('page', type=int),
+                limit=request.args.get('limit', type=int)
+            )
             status = 200 if result.get('success') else 500
             return jsonify(result), status
         except Exception as exc:
@@ -70,7 +109,7 @@ class HardwareController:
             # print(f"json entrante: {data} ")
             result = self.service.update_hardware(hardware_id, data)
             # print(f"result: {result}")
-            status = 200 if result.get('success') else 400
+            status = 200 if result.get('success') else result.pop('status_code', 400)
             return jsonify(result), status
         except Exception as exc:
             return jsonify({'success': False, 'errors': [str(exc)]}), 500
@@ -86,6 +125,9 @@ class HardwareController:
 
     def get_hardware_by_empresa(self, empresa_id):
         try:
+            alternate = self._alternate_listing({'empresa_id': empresa_id}, include_inactive=False)
+            if alternate is not None:
+                return alternate
             result = self.service.get_hardware_by_empresa(empresa_id)
             status = 200 if result.get('success') else 404
             return jsonify(result), status
@@ -99,12 +141,11 @@ class HardwareController:
             data = request.get_json() or {}
             activa = data.get('activa', True)
             result = self.service.toggle_hardware_status(hardware_id, activa)
-            status = 200 if result.get('success') else 404
+            status = 200 if result.get('success') else result.pop('status_code', 404)
             return jsonify(result), status
         except Exception as exc:
             return jsonify({'success': False, 'errors': [str(exc)]}), 500
 
-    @require_super_admin_token
     def get_all_hardware_including_inactive(self):
         """Obtener todos los hardware incluyendo inactivos (solo super admin)"""
         try:
@@ -135,9 +176,17 @@ class HardwareController:
                 except ValueError:
                     pass
             
+            alternate = self._alternate_listing(filters, include_inactive=True)
+            if alternate is not None:
+                return alternate
+
             # Pass filters to service if any exist
             filter_params = filters if filters else None
-            result = self.service.get_all_hardware_including_inactive(filter_params)
+            result = self.service.get_all_hardware_including_inactive(
+                filter_params,
+                page=request.args.get('page', type=int),
+                limit=request.args.get('limit', type=int)
+            )
             status = 200 if result.get('success') else 500
             return jsonify(result), status
         except Exception as exc:
@@ -146,6 +195,9 @@ class HardwareController:
     def get_hardware_by_empresa_including_inactive(self, empresa_id):
         """Obtener hardware de una empresa incluyendo inactivos"""
         try:
+            alternate = self._alternate_listing({'empresa_id': empresa_id}, include_inactive=True)
+            if alternate is not None:
+                return alternate
             result = self.service.get_hardware_by_empresa_including_inactive(empresa_id)
             status = 200 if result.get('success') else 404
             return jsonify(result), status
@@ -178,6 +230,28 @@ class HardwareController:
         except Exception as exc:
             return jsonify({'success': False, 'errors': [str(exc)]}), 500
 
+    @require_internal_token
+    def update_physical_status_batch(self):
+        """Actualizar physical_status de muchos hardware por topic (token interno)"""
+        try:
+            data = request.get_json(silent=True) or {}
+            result = self.service.update_physical_status_batch(data.get('items'))
+            status = 200 if result.get('success') else 400
+            return jsonify(result), status
+        except Exception as exc:
+            return jsonify({'success': False, 'errors': [str(exc)]}), 500
+
+    @require_empresa_or_admin_token
+    def get_fleet_status(self):
+        """Última señal recibida de cada hardware (vista del worker)"""
+        try:
+            empresa_id = g.user_id if g.role == 'empresa' else None
+            result = self.service.get_fleet_status(empresa_id)
+            status = 200 if result.get('success') else 500
+            return jsonify(result), status
+        except Exception as exc:
+            return jsonify({'success': False, 'errors': [str(exc)]}), 500
+
     @require_empresa_or_admin_token
     def check_physical_status_stale(self):
         """Revisar hardware vencido y marcar estado inactivo"""
@@ -1,7 +1,9 @@
 from flask import request, jsonify
 from services.hardware_type_service import HardwareTypeService
 from utils.permissions import require_empresa_or_admin_token, require_super_admin_token
+from utils.tracing import trace_methods
 
+@trace_methods
 class HardwareTypeController:
     def __init__(self):
         self.service = HardwareTypeService()
@@ -1,4 +1,4 @@
-from flask import jsonify, request
+from flask import jsonify, request, g, Response, stream_with_context
 from services.mqtt_alert_service import MqttAlertService
 from services.hardware_auth_service import HardwareAuthService
 from utils.auth_utils import get_auth_header, get_auth_cookie
@@ -6,7 +6,12 @@ from models.mqtt_alert import MqttAlert
 from datetime import datetime
 from bson import ObjectId
 from utils.geocoding import generar_url_google_maps, generar_url_openstreetmap
+from utils.alert_stream import AlertStreamFullError, get_alert_stream_broker
+from utils.change_tracking import VersionConflictError
+from core.config import Config
+from utils.tracing import trace_methods
 
+@trace_methods
 class MqttAlertController:
     """Controlador para gestionar las alertas MQTT"""
 
@@ -16,19 +21,21 @@ class MqttAlertController:
 
     def _notify_mqtt_fanout(self, alert_data: dict) -> None:
         """Notificar a MqttConnection para fanout MQTT - fire and forget en hilo separado"""
+        import contextvars
         import threading
-        import requests as _requests
         import logging as _logging
         from core.config import Config
+        from utils.tracing import http_request
 
         def _fire():
             try:
                 url = f"{Config.MQTT_SERVICE_URL}/internal/fanout-alert"
-                _requests.post(url, json=alert_data, timeout=5)
+                http_request('mqtt-fanout', 'POST', url, propagate=True, json=alert_data, timeout=5)
             except Exception as e:
                 _logging.getLogger(__name__).warning("Fanout MQTT no disponible: %s", e)
 
-        threading.Thread(target=_fire, daemon=True).start()
+        # El hilo hereda el span activo para que el fanout quede en la misma traza
+        threading.Thread(target=contextvars.copy_context().run, args=(_fire,), daemon=True).start()
 
     def _extract_tipo_alerta_identifiers(self, raw_tipo_alerta):
         """Extrae identificadores válidos desde el payload recibido."""
@@ -472,7 +479,7 @@ class MqttAlertController:
             
             # Buscar automáticamente los números telefónicos de usuarios de esa empresa y sede
             usuarios_relacionados = self.service.alert_repo.get_users_by_empresa_sede(
-                empresa.nombre, hardware.sede
+                sede=hardware.sede, empresa_id=empresa._id
             )
             
             # Extraer números telefónicos con nombres
@@ -553,6 +560,7 @@ class MqttAlertController:
             # Crear alerta con la información del hardware usando el método de fábrica actualizado
             alert = MqttAlert.create_from_hardware(
                 empresa_nombre=empresa.nombre,
+                empresa_id=empresa._id,
                 sede=hardware.sede,
                 hardware_nombre=hardware.nombre,
                 hardware_id=hardware_id,
@@ -610,6 +618,14 @@ class MqttAlertController:
                     'error': 'Alerta no encontrada'
                 }), 404
             
+            # Concurrencia optimista: el cliente puede enviar la versión que leyó
+            if 'version' in data and data['version'] != existing_alert.version:
+                return jsonify({
+                    'success': False,
+                    'error': str(VersionConflictError())
+                }), 409
+            existing_alert.track_changes()
+            
             # Actualizar campos
             if 'empresa_nombre' in data:
                 existing_alert.empresa_nombre = data['empresa_nombre']
@@ -638,7 +654,13 @@ class MqttAlertController:
                 }), 400
             
             # Actualizar en base de datos
-            success = self.service.alert_repo.update_alert(alert_id, existing_alert)
+            try:
+                success = self.service.alert_repo.update_alert(alert_id, existing_alert)
+            except VersionConflictError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 409
             
             if success:
                 return jsonify({
@@ -702,7 +724,7 @@ class MqttAlertController:
             if result['success']:
                 return jsonify(result), 200
             else:
-                return jsonify(result), 404
+                return jsonify(result), result.pop('status_code', 404)
             
         except Exception as e:
             return jsonify({
@@ -719,7 +741,7 @@ class MqttAlertController:
             if result['success']:
                 return jsonify(result), 200
             else:
-                return jsonify(result), 404
+                return jsonify(result), result.pop('status_code', 404)
             
         except Exception as e:
             return jsonify({
@@ -734,10 +756,6 @@ class MqttAlertController:
             page = int(request.args.get('page', 1))
             limit = int(request.args.get('limit', 50))
             
-            # Buscar nombre de empresa por ID
-            # TODO: Implementar búsqueda por ID si es necesario
-            # Por ahora usar el empresa_id como nombre directamente
-            
             result = self.service.get_alerts_by_empresa(empresa_id, page, limit)
             return jsonify(result), 200
             
@@ -905,6 +923,56 @@ class MqttAlertController:
                 'message': str(e)
             }), 500
     
+    def stream_alerts(self):
+        """Stream SSE de eventos de alertas de la empresa autenticada"""
+        try:
+            empresa_id = getattr(g, 'empresa_id', None)
+            if not empresa_id:
+                return jsonify({
+                    'success': False,
+                    'error': 'Empresa no identificada'
+                }), 401
+            
+            sede = request.args.get('sede')
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            
+            broker = get_alert_stream_broker()
+            try:
+                subscription = broker.subscribe(empresa_id, sede=sede, last_event_id=last_event_id)
+            except AlertStreamFullError:
+                response = jsonify({
+                    'success': False,
+                    'error': 'Demasiadas conexiones de stream abiertas, intente más tarde'
+                })
+                response.status_code = 503
+                response.headers['Retry-After'] = '30'
+                return response
+            
+            def generate():
+                try:
+                    # Tiempo de reconexión sugerido al navegador (ms)
+                    yield 'retry: 5000\n\n'
+                    for message in subscription.iter_messages(Config.ALERT_STREAM_HEARTBEAT_SECONDS):
+                        yield message
+                finally:
+                    broker.unsubscribe(subscription)
+            
+            return Response(
+                stream_with_context(generate()),
+                mimetype='text/event-stream',
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+            
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': 'Error interno del servidor',
+                'message': str(e)
+            }), 500
+    
     def get_active_alerts_by_empresa_sede(self, empresa_id):
         """Obtener alertas activas por empresa y sede con paginación"""
         try:
@@ -1239,7 +1307,7 @@ class MqttAlertController:
             
             # Obtener números telefónicos de usuarios de la misma empresa y sede
             usuarios_relacionados = self.service.alert_repo.get_users_by_empresa_sede(
-                empresa.nombre, sede
+                sede=sede, empresa_id=empresa._id
             )
             
             # Extraer números telefónicos
@@ -1340,6 +1408,7 @@ class MqttAlertController:
             # Crear alerta usando el método de fábrica para usuarios actualizado
             alert = MqttAlert.create_from_user(
                 empresa_nombre=empresa.nombre,
+                empresa_id=empresa._id,
                 sede=sede,
                 usuario_id=creador_id_final,
                 usuario_nombre=creador_nombre,
@@ -1385,6 +1454,21 @@ class MqttAlertController:
                 'message': str(e)
             }), 500
 
+    @staticmethod
+    def _deactivation_topics(alert_data):
+        """Topics a notificar al desactivar: los guardados en la alerta, sin botoneras"""
+        topics = []
+        candidatos = [alert_data.get('topic')] + list(alert_data.get('topics_otros_hardware') or [])
+        for topic in candidatos:
+            if not topic or topic in topics:
+                continue
+            # Formato del topic: empresa/sede/TIPO/nombre
+            partes = topic.split('/')
+            if len(partes) > 2 and partes[2].upper() == 'BOTONERA':
+                continue
+            topics.append(topic)
+        return topics
+
     def deactivate_alert_from_body(self):
         """Desactiva una alerta usando alert_id en el cuerpo, junto con desactivado_por_id y desactivado_por_tipo"""
         try:
@@ -1519,6 +1603,7 @@ class MqttAlertController:
                 }), 400
             
             # Validar que quien desactiva existe (opcional: verificar según tipo)
+            empresa = None
             if desactivado_por_tipo == 'usuario':
                 from repositories.usuario_repository import UsuarioRepository
                 usuario_repo = UsuarioRepository()
@@ -1546,141 +1631,60 @@ class MqttAlertController:
                         'success': False,
                         'error': 'Empresa no encontrada'
                     }), 404
-                
-                # Verificar que la empresa corresponda a la alerta (necesitamos buscar la alerta primero)
-                alert_temp = self.service.alert_repo.get_alert_by_id(alert_id)
-                if not alert_temp:
-                    return jsonify({
-                        'success': False,
-                        'error': 'Alerta no encontrada para validación de empresa'
-                    }), 404
-                
-                # Validar que la empresa corresponda a la alerta
-                if empresa.nombre != alert_temp.empresa_nombre:
-                    return jsonify({
-                        'success': False,
-                        'error': 'La empresa no está autorizada para desactivar esta alerta',
-                        'message': f'Esta alerta pertenece a la empresa "{alert_temp.empresa_nombre}" y no puede ser desactivada por "{empresa.nombre}"'
-                    }), 403
+
             # Para administrador y super_admin podrías agregar más validaciones si es necesario
 
-            # Buscar la alerta
-            # print(f"🔍 Buscando alerta con ID: {alert_id}")
-            alert = self.service.alert_repo.get_alert_by_id(alert_id)
-            if not alert:
-                # print(f"❌ ERROR: Alerta no encontrada con ID: {alert_id}")
+            # Desactivación condicional: solo si sigue activa (y pertenece a la empresa, si aplica)
+            repo = self.service.alert_repo
+            alert_data, motivo = repo.deactivate_alert(
+                alert_id,
+                desactivado_por_id=desactivado_por_id,
+                desactivado_por_tipo=desactivado_por_tipo,
+                mensaje_desactivacion=mensaje_desactivacion,
+                empresa=empresa
+            )
+
+            if motivo == repo.LIFECYCLE_NOT_FOUND:
                 return jsonify({
                     'success': False,
                     'error': 'Alerta no encontrada'
                 }), 404
-            
-            # print(f"✅ Alerta encontrada: {alert}")
-            # print(f"🔍 Estado actual de la alerta - activo: {alert.activo}")
 
-            # Verificar si la alerta ya fue desactivada
-            if not alert.activo:
-                # print(f"⚠️ Alerta ya estaba desactivada")
-                # Obtener números telefónicos reales de la alerta ya desactivada
-                numeros_telefonicos = alert.numeros_telefonicos if hasattr(alert, 'numeros_telefonicos') and alert.numeros_telefonicos else []
-                
-                # Si no hay números en la alerta, buscar usuarios relacionados (fallback)
-                if not numeros_telefonicos:
-                    usuarios_relacionados = self.service.alert_repo.get_users_by_empresa_sede(
-                        alert.empresa_nombre, alert.sede
-                    )
-                    
-                    for usr in usuarios_relacionados:
-                        if usr.get('telefono'):
-                            numeros_telefonicos.append({
-                                'numero': usr['telefono'],
-                                'nombre': usr.get('nombre', ''),
-                                'usuario_id': str(usr.get('_id')),
-                                'rol': usr.get('rol_detalle'),
-                                'disponible': False,  # Fallback por defecto
-                                'embarcado': False    # Fallback por defecto
-                            })
-                
+            if motivo == repo.LIFECYCLE_FORBIDDEN:
                 return jsonify({
-                    'success': True,
-                    'message': 'Alerta ya fue desactivada previamente',
-                    'already_deactivated': True,
-                    'numeros_telefonicos': numeros_telefonicos,
-                    'desactivado_por': alert.desactivado_por,
-                    'fecha_desactivacion': alert.fecha_desactivacion.isoformat() if alert.fecha_desactivacion else None,
-                    'mensaje_desactivacion': alert.mensaje_desactivacion  # Incluir el mensaje de desactivación
-                }), 200
+                    'success': False,
+                    'error': 'La empresa no está autorizada para desactivar esta alerta',
+                    'message': f'Esta alerta pertenece a la empresa "{alert_data.get("empresa_nombre")}" y no puede ser desactivada por "{empresa.nombre}"'
+                }), 403
 
-            # Obtener números telefónicos reales de la alerta existente
-            # En lugar de recrear desde cero, usar los datos que ya existen en la alerta
-            numeros_telefonicos = alert.numeros_telefonicos if hasattr(alert, 'numeros_telefonicos') and alert.numeros_telefonicos else []
-            
-            # Si no hay números en la alerta, buscar usuarios relacionados (fallback)
-            if not numeros_telefonicos:
-                usuarios_relacionados = self.service.alert_repo.get_users_by_empresa_sede(
-                    alert.empresa_nombre, alert.sede
-                )
-                
-                for usr in usuarios_relacionados:
-                    if usr.get('telefono'):
-                        numeros_telefonicos.append({
-                            'numero': usr['telefono'],
-                            'nombre': usr.get('nombre', ''),
-                            'usuario_id': str(usr.get('_id')),
-                            'rol': usr.get('rol_detalle'),
-                            'disponible': False,  # Fallback por defecto
-                            'embarcado': False    # Fallback por defecto
-                        })
-
-            # Obtener topics de hardware de la empresa y sede (excluyendo botoneras)
-            from repositories.hardware_repository import HardwareRepository
-            hardware_repo = HardwareRepository()
-            todos_hardware = hardware_repo.find_with_filters({
-                'activa': True  # Solo hardware activo
-            })
-            
-            topics = []
-            for hw in todos_hardware:
-                # Filtrar por empresa y sede, y excluir botoneras
-                if (hw.topic and 
-                    hw.tipo.upper() != 'BOTONERA' and
-                    hasattr(hw, 'empresa_id')):
-                    
-                    # Obtener información de la empresa del hardware
-                    from repositories.empresa_repository import EmpresaRepository
-                    empresa_repo = EmpresaRepository()
-                    hw_empresa = empresa_repo.find_by_id(hw.empresa_id)
-                    
-                    # Solo incluir si coincide con empresa y sede de la alerta
-                    if (hw_empresa and 
-                        hw_empresa.nombre == alert.empresa_nombre and 
-                        hw.sede == alert.sede):
-                        topics.append(hw.topic)
+            # Destinatarios y topics salen de la propia alerta
+            numeros_telefonicos = alert_data.get('numeros_telefonicos') or []
+            fecha_desactivacion = alert_data.get('fecha_desactivacion')
 
-            # Desactivar con información de quien desactiva
-            alert.deactivate(desactivado_por_id=desactivado_por_id, desactivado_por_tipo=desactivado_por_tipo, mensaje_desactivacion=mensaje_desactivacion)
-            
-            # Actualizar en base de datos
-            success = self.service.alert_repo.update_alert(alert_id, alert)
-            
-            if success:
+            if motivo == repo.LIFECYCLE_ALREADY_DEACTIVATED:
                 return jsonify({
                     'success': True,
-                    'message': 'Alerta desactivada exitosamente',
-                    'topics': topics,  # Topics de hardware de la empresa y sede
+                    'message': 'Alerta ya fue desactivada previamente',
+                    'already_deactivated': True,
                     'numeros_telefonicos': numeros_telefonicos,
-                    'desactivado_por': {
-                        'id': desactivado_por_id,
-                        'tipo': desactivado_por_tipo,
-                        'fecha_desactivacion': alert.fecha_desactivacion.isoformat()
-                    },
-                    'prioridad': alert.prioridad,  # Incluir la prioridad de la alerta
-                    'mensaje_desactivacion': alert.mensaje_desactivacion  # Incluir el mensaje de desactivación
+                    'desactivado_por': alert_data.get('desactivado_por', {}),
+                    'fecha_desactivacion': fecha_desactivacion.isoformat() if fecha_desactivacion else None,
+                    'mensaje_desactivacion': alert_data.get('mensaje_desactivacion')  # Incluir el mensaje de desactivación
                 }), 200
-            else:
-                return jsonify({
-                    'success': False,
-                    'error': 'No se pudo desactivar la alerta'
-                }), 500
+
+            return jsonify({
+                'success': True,
+                'message': 'Alerta desactivada exitosamente',
+                'topics': self._deactivation_topics(alert_data),  # Topics de hardware de la empresa y sede
+                'numeros_telefonicos': numeros_telefonicos,
+                'desactivado_por': {
+                    'id': desactivado_por_id,
+                    'tipo': desactivado_por_tipo,
+                    'fecha_desactivacion': fecha_desactivacion.isoformat()
+                },
+                'prioridad': alert_data.get('prioridad', 'media'),  # Incluir la prioridad de la alerta
+                'mensaje_desactivacion': alert_data.get('mensaje_desactivacion')  # Incluir el mensaje de desactivación
+            }), 200
 
         except Exception as e:
             # print(f"❌ EXCEPCIÓN en deactivate_alert_from_body: {e}")
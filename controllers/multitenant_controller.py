@@ -1,7 +1,9 @@
 from flask import request, jsonify
 from services.usuario_service import UsuarioService
 from utils.permissions import require_empresa_or_admin_token
+from utils.tracing import trace_methods
 
+@trace_methods
 class MultiTenantController:
     def __init__(self):
         self.usuario_service = UsuarioService()
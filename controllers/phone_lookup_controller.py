@@ -1,7 +1,9 @@
 from flask import jsonify, request
 from services.phone_lookup_service import PhoneLookupService
+from utils.tracing import trace_methods
 
 
+@trace_methods
 class PhoneLookupController:
     """
     Controlador para buscar información de una persona por su número de teléfono.
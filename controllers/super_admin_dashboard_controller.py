@@ -3,9 +3,11 @@ from services.super_admin_dashboard_service import SuperAdminDashboardService
 from utils.permissions import require_super_admin_token
 from utils.response_helpers import success_response, error_response
 import logging
+from utils.tracing import trace_methods
 
 logger = logging.getLogger(__name__)
 
+@trace_methods
 class SuperAdminDashboardController:
     """Controller para el dashboard del Super Admin"""
     
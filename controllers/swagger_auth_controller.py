@@ -10,7 +10,6 @@ from core.swagger_config import (
 )
 from services.auth_service import AuthService
 from middleware.security_middleware import SecurityMiddleware
-from flask_jwt_extended import decode_token
 
 # Instancias de servicios
 auth_service = AuthService()
@@ -50,7 +49,12 @@ class LoginAPI(Resource):
             if not usuario or not password:
                 return {'success': False, 'errors': ['Credenciales inválidas']}, 401
 
-            result = auth_service.login(usuario, password)
+            request_data = {
+                'remote_addr': request.environ.get('REMOTE_ADDR'),
+                'user_agent': request.headers.get('User-Agent'),
+                'client_fingerprint': security_middleware.get_client_fingerprint(request)
+            }
+            result = auth_service.login(usuario, password, request_data)
 
             if result['success']:
                 # Crear respuesta exitosa con cookies seguras
@@ -66,17 +70,6 @@ class LoginAPI(Resource):
                 from flask import current_app
                 response = current_app.make_response((response_data, 200))
                 
-                # Decode access token to get JWT ID (jti)
-                decoded_token = decode_token(access_token)
-                jti = decoded_token.get('jti', None)
-                
-                # Create secure session record
-                security_middleware.create_session_record(
-                    user_id=result['data']['id'],
-                    fingerprint=security_middleware.get_client_fingerprint(request),
-                    jti=jti
-                )
-                
                 # Configurar cookie de access token para desarrollo HTTP
                 response.set_cookie(
                     'auth_token',
@@ -103,7 +96,8 @@ class LoginAPI(Resource):
                 
                 return response
             
-            return {'success': False, 'errors': result.get('errors', ['Credenciales inválidas'])}, 401
+            headers = {'Retry-After': str(result['retry_after'])} if result.get('retry_after') else {}
+            return {'success': False, 'errors': result.get('errors', ['Credenciales inválidas'])}, result.get('status_code', 401), headers
         except Exception as e:
             return {'success': False, 'errors': ['Error interno del servidor']}, 500
 
@@ -8,6 +8,7 @@ from core.swagger_config import (
     error_response_model
 )
 from controllers.empresa_controller import EmpresaController
+from utils.permissions import require_empresa_or_admin_token
 
 # Instancia del controlador original
 empresa_controller = EmpresaController()
@@ -98,7 +99,8 @@ class EmpresaAPI(Resource):
     def get(self, empresa_id):
         """Obtener empresa por ID"""
         try:
-            response = empresa_controller.get_empresa(empresa_id)
+            # La ruta de core/routes.py valida el token; aquí se hace antes de delegar
+            response = require_empresa_or_admin_token(empresa_controller.get_empresa)(empresa_id)
             
             if hasattr(response, 'get_json'):
                 data = response.get_json()
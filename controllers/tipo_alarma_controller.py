@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from services.tipo_alarma_service import TipoAlarmaService
 from utils.permissions import require_super_admin_token, require_empresa_or_admin_token
+from utils.conditional_get import conditional_get
 
 # Blueprint para gestionar tipos de alarma
 tipo_alarma_bp = Blueprint('tipo_alarma', __name__)
@@ -50,6 +51,7 @@ def create_tipo_alarma():
 
 @tipo_alarma_bp.route('/tipos-alarma', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def list_tipos_alarma():
     """Obtiene todos los tipos de alarma con paginación"""
     page, limit = _get_pagination_params()
@@ -64,6 +66,7 @@ def list_tipos_alarma():
 
 @tipo_alarma_bp.route('/tipos-alarma/<tipo_alarma_id>', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def get_tipo_alarma(tipo_alarma_id):
     """Obtiene un tipo de alarma por su identificador"""
     result = tipo_alarma_service.get_tipo_alarma_by_id(tipo_alarma_id)
@@ -97,6 +100,7 @@ def toggle_tipo_alarma_status(tipo_alarma_id):
 
 @tipo_alarma_bp.route('/tipos-alarma/empresa/<empresa_id>', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def list_tipos_alarma_by_empresa(empresa_id):
     """Obtiene tipos de alarma asociados a una empresa específica"""
     page, limit = _get_pagination_params()
@@ -111,6 +115,7 @@ def list_tipos_alarma_by_empresa(empresa_id):
 
 
 @tipo_alarma_bp.route('/tipos-alarma/empresa/<empresa_id>/todos', methods=['GET'])
+@conditional_get('tipos_alarma')
 def list_tipos_alarma_by_empresa_full(empresa_id):
     """GET /api/tipos-alarma/empresa/<empresa_id>/todos - Lista sin paginación (SIN AUTENTICACIÓN)"""
     solo_activos_raw = (request.args.get('solo_activos') or '').strip().lower()
@@ -126,6 +131,7 @@ def list_tipos_alarma_by_empresa_full(empresa_id):
 
 @tipo_alarma_bp.route('/tipos-alarma/tipo-alerta/<tipo_alerta>', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def list_tipos_alarma_by_tipo_alerta(tipo_alerta):
     """Obtiene tipos de alarma filtrados por tipo de alerta"""
     page, limit = _get_pagination_params()
@@ -141,6 +147,7 @@ def list_tipos_alarma_by_tipo_alerta(tipo_alerta):
 
 @tipo_alarma_bp.route('/tipos-alarma/activos', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def list_tipos_alarma_activos():
     """Obtiene únicamente tipos de alarma activos"""
     page, limit = _get_pagination_params()
@@ -155,6 +162,7 @@ def list_tipos_alarma_activos():
 
 @tipo_alarma_bp.route('/tipos-alarma/inactivos', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def list_tipos_alarma_inactivos():
     """Obtiene únicamente tipos de alarma inactivos"""
     page, limit = _get_pagination_params()
@@ -169,6 +177,7 @@ def list_tipos_alarma_inactivos():
 
 @tipo_alarma_bp.route('/tipos-alarma/search', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('tipos_alarma')
 def search_tipos_alarma():
     """Busca tipos de alarma por nombre o descripción"""
     query = request.args.get('query', '')
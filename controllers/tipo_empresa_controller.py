@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, g
 from services.tipo_empresa_service import TipoEmpresaService
 from utils.permissions import require_super_admin_token
+from utils.conditional_get import conditional_get
 import logging
 
 # Configurar logger
@@ -29,6 +30,7 @@ def create_tipo_empresa():
 
 @tipo_empresa_controller.route('/tipos_empresa/<tipo_empresa_id>', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa', 'empresas')
 def get_tipo_empresa(tipo_empresa_id):
     """Obtiene un tipo de empresa por su ID incluyendo las empresas asociadas"""
     # SIEMPRE incluir las empresas asociadas por defecto
@@ -38,6 +40,7 @@ def get_tipo_empresa(tipo_empresa_id):
 
 @tipo_empresa_controller.route('/tipos_empresa', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa')
 def get_all_tipos_empresa():
     """Obtiene todos los tipos de empresa activos (para formularios)"""
     logger.info("=== GET ALL TIPOS EMPRESA (SOLO ACTIVOS) ===")
@@ -75,6 +78,7 @@ def delete_tipo_empresa(tipo_empresa_id):
 
 @tipo_empresa_controller.route('/tipos_empresa/search', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa')
 def search_tipos_empresa():
     """Busca tipos de empresa por nombre o descripción"""
     query = request.args.get('query', '')
@@ -86,6 +90,7 @@ def search_tipos_empresa():
 
 @tipo_empresa_controller.route('/tipos_empresa/activos', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa')
 def get_tipos_empresa_activos():
     """Obtiene solo los tipos de empresa activos (para selects/dropdowns)"""
     result = tipo_empresa_service.get_tipos_empresa_activos()
@@ -114,6 +119,7 @@ def toggle_status_tipo_empresa(tipo_empresa_id):
 
 @tipo_empresa_controller.route('/tipos_empresa/admin/all', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa')
 def get_all_tipos_empresa_including_inactive():
     """Obtiene todos los tipos de empresa incluyendo inactivos (solo para administradores)"""
     logger.info("=== GET ALL TIPOS EMPRESA ADMIN (INCLUYENDO INACTIVOS) ===")
@@ -133,6 +139,7 @@ def get_all_tipos_empresa_including_inactive():
 
 @tipo_empresa_controller.route('/tipos_empresa/dashboard/all', methods=['GET'])
 @require_super_admin_token
+@conditional_get('tipos_empresa', 'empresas')
 def get_all_tipos_empresa_dashboard():
     """Obtiene TODOS los tipos de empresa (activos e inactivos) para dashboards"""
     logger.info("=== GET ALL TIPOS EMPRESA DASHBOARD (TODAS) ===")
@@ -14,7 +14,95 @@ class Config:
     INTERNAL_TOKEN_HEADER = os.getenv('INTERNAL_TOKEN_HEADER', 'X-Internal-Token')
     HARDWARE_STATUS_DEFAULT_EXCLUDED_TYPES = os.getenv('HARDWARE_STATUS_DEFAULT_EXCLUDED_TYPES', '')
     HARDWARE_STATUS_STALE_SECONDS = int(os.getenv('HARDWARE_STATUS_STALE_SECONDS', 600))
-    
+    # Cada cuánto se revisa el hardware vencido en segundo plano (0 desactiva)
+    HARDWARE_STATUS_SWEEP_INTERVAL_SECONDS = int(os.getenv('HARDWARE_STATUS_SWEEP_INTERVAL_SECONDS', 60))
+
+    # Listados de hardware: tamaño máximo de página y lote del cursor en streaming NDJSON
+    HARDWARE_PAGE_MAX_LIMIT = int(os.getenv('HARDWARE_PAGE_MAX_LIMIT', 500))
+    HARDWARE_STREAM_BATCH_SIZE = int(os.getenv('HARDWARE_STREAM_BATCH_SIZE', 500))
+
+    # Heartbeats de hardware por lotes y coalescencia de escrituras por worker
+    HEARTBEAT_BATCH_MAX_ITEMS = int(os.getenv('HEARTBEAT_BATCH_MAX_ITEMS', 1000))
+    HEARTBEAT_TOUCH_INTERVAL_SECONDS = int(os.getenv('HEARTBEAT_TOUCH_INTERVAL_SECONDS', 60))
+    HEARTBEAT_FULL_WRITE_INTERVAL_SECONDS = int(os.getenv('HEARTBEAT_FULL_WRITE_INTERVAL_SECONDS', 300))
+    HEARTBEAT_TABLE_SIZE = int(os.getenv('HEARTBEAT_TABLE_SIZE', 20000))
+
+    # Normalización de teléfonos y cache de búsqueda por teléfono
+    DEFAULT_PHONE_COUNTRY_CODE = os.getenv('DEFAULT_PHONE_COUNTRY_CODE', '57')
+    PHONE_LOOKUP_LEGACY_FALLBACK = os.getenv('PHONE_LOOKUP_LEGACY_FALLBACK', 'True').lower() == 'true'
+    PHONE_LOOKUP_CACHE_SIZE = int(os.getenv('PHONE_LOOKUP_CACHE_SIZE', 2048))
+    PHONE_LOOKUP_CACHE_TTL_SECONDS = int(os.getenv('PHONE_LOOKUP_CACHE_TTL_SECONDS', 60))
+
+    # Cache por worker de nombres de empresa para enriquecer listados
+    EMPRESA_CACHE_SIZE = int(os.getenv('EMPRESA_CACHE_SIZE', 1024))
+    EMPRESA_CACHE_TTL_SECONDS = int(os.getenv('EMPRESA_CACHE_TTL_SECONDS', 60))
+
+    # Proxies de confianza delante de la app que agregan X-Forwarded-For (0: conexión directa)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+
+    # Login: costo de bcrypt, pool de verificación por worker y límite de intentos fallidos
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+    PASSWORD_HASH_PROCESSES = int(os.getenv('PASSWORD_HASH_PROCESSES', 2))
+    PASSWORD_VERIFY_CONCURRENCY = int(os.getenv('PASSWORD_VERIFY_CONCURRENCY', 4))
+    PASSWORD_VERIFY_QUEUE_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_VERIFY_QUEUE_TIMEOUT_SECONDS', 2))
+    LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv('LOGIN_THROTTLE_WINDOW_SECONDS', 300))
+    # El límite por IP solo sirve si REMOTE_ADDR es la IP del cliente: detrás de un
+    # proxy requiere PROXY_FIX_X_FOR; si no, todos los clientes comparten la IP del proxy
+    LOGIN_THROTTLE_BY_IP = os.getenv('LOGIN_THROTTLE_BY_IP', 'False').lower() == 'true'
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', 20))
+    LOGIN_MAX_FAILURES_PER_USERNAME = int(os.getenv('LOGIN_MAX_FAILURES_PER_USERNAME', 5))
+
+    # Sesiones invalidadas: tiempo que se conservan antes de que el índice TTL las elimine
+    SESSION_INVALIDATED_RETENTION_SECONDS = int(os.getenv('SESSION_INVALIDATED_RETENTION_SECONDS', 24 * 60 * 60))
+
+    # Cache por worker de sesiones validadas; una revocación se respeta en todos
+    # los workers en a lo sumo SESSION_REVOCATION_POLL_SECONDS
+    SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', 4096))
+    SESSION_CACHE_TTL_SECONDS = int(os.getenv('SESSION_CACHE_TTL_SECONDS', 30))
+    SESSION_REVOCATION_POLL_SECONDS = float(os.getenv('SESSION_REVOCATION_POLL_SECONDS', 5))
+    # Revocaciones recientes que se conservan para desalojar solo a esos usuarios;
+    # un worker con más atraso vacía su cache completo
+    SESSION_REVOCATION_LOG_SIZE = int(os.getenv('SESSION_REVOCATION_LOG_SIZE', 256))
+
+    # Contabilidad de comandos de MongoDB por petición: Server-Timing y log de consultas lentas.
+    # Sin SERVER_TIMING_ENABLED el header solo se envía a peticiones con el token interno
+    QUERY_ACCOUNTING_ENABLED = os.getenv('QUERY_ACCOUNTING_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'False').lower() == 'true'
+
+    # Trazas: fracción de peticiones muestreadas (0 desactiva) y exportador jsonl | otlp
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', 0))
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'jsonl')
+    TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'rescue-back')
+    TRACING_JSONL_PATH = os.getenv('TRACING_JSONL_PATH', 'logs/traces.jsonl')
+    TRACING_JSONL_MAX_BYTES = int(os.getenv('TRACING_JSONL_MAX_BYTES', 10 * 1024 * 1024))
+    TRACING_JSONL_BACKUPS = int(os.getenv('TRACING_JSONL_BACKUPS', 5))
+    TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+
+    # Stream SSE de alertas: auto | change_stream | local
+    ALERT_STREAM_MODE = os.getenv('ALERT_STREAM_MODE', 'auto')
+    ALERT_STREAM_HEARTBEAT_SECONDS = int(os.getenv('ALERT_STREAM_HEARTBEAT_SECONDS', 15))
+    ALERT_STREAM_QUEUE_SIZE = int(os.getenv('ALERT_STREAM_QUEUE_SIZE', 100))
+    ALERT_STREAM_REPLAY_SIZE = int(os.getenv('ALERT_STREAM_REPLAY_SIZE', 500))
+    # Conexiones SSE por worker del servidor de streams (gevent, stream_app.py)
+    ALERT_STREAM_MAX_SUBSCRIBERS = int(os.getenv('ALERT_STREAM_MAX_SUBSCRIBERS', 1000))
+    # Conexiones SSE por worker de la API: cada una ocupa un hilo de gthread (--threads 8).
+    # Solo para desarrollo o despliegues sin servidor de streams
+    ALERT_STREAM_API_MAX_SUBSCRIBERS = int(os.getenv('ALERT_STREAM_API_MAX_SUBSCRIBERS', 2))
+
+    # Compresión de respuestas (gzip/brotli según Accept-Encoding)
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 5))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # Archivo de alertas desactivadas (scripts/archive_alerts.py)
+    ALERT_ARCHIVE_AFTER_DAYS = int(os.getenv('ALERT_ARCHIVE_AFTER_DAYS', 90))
+    ALERT_ARCHIVE_BATCH_SIZE = int(os.getenv('ALERT_ARCHIVE_BATCH_SIZE', 200))
+    ALERT_ARCHIVE_BATCH_SLEEP_SECONDS = float(os.getenv('ALERT_ARCHIVE_BATCH_SLEEP_SECONDS', 0.5))
+    ALERT_ARCHIVE_SEGMENT_DIR = os.getenv('ALERT_ARCHIVE_SEGMENT_DIR', 'archive/mqtt_alerts')
+    ALERT_ARCHIVE_ZSTD_LEVEL = int(os.getenv('ALERT_ARCHIVE_ZSTD_LEVEL', 10))
+
     # Validar variables de entorno críticas
     @classmethod
     def validate_config(cls):
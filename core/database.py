@@ -1,5 +1,6 @@
 from pymongo import MongoClient
 from .config import Config
+from utils.query_accounting import QueryAccountingListener
 
 class Database:
     _instance = None
@@ -15,7 +16,11 @@ class Database:
         """Establece conexión con MongoDB"""
         try:
             if self._client is None:
-                self._client = MongoClient(Config.MONGO_URI)
+                event_listeners = []
+                # El log de consultas lentas no depende de la contabilidad por petición
+                if Config.QUERY_ACCOUNTING_ENABLED or Config.SLOW_QUERY_THRESHOLD_MS:
+                    event_listeners.append(QueryAccountingListener(Config.SLOW_QUERY_THRESHOLD_MS))
+                self._client = MongoClient(Config.MONGO_URI, event_listeners=event_listeners)
                 self._db = self._client[Config.DATABASE_NAME]
                 # print(f"Conectado a MongoDB: {Config.DATABASE_NAME}")
             return self._db
@@ -0,0 +1,69 @@
+"""Proveedor JSON de Flask con soporte nativo para ObjectId y datetime.
+
+Usa orjson cuando está instalado y recurre al encoder estándar en caso
+contrario, de modo que la aplicación funciona igual sin la dependencia.
+Las fechas conservan el formato del proveedor por defecto de Flask (fecha
+HTTP RFC 1123, "Mon, 19 Oct 2026 11:14:13 GMT"), del que dependen los
+clientes que leen campos como `fecha_*` o `expires_at`.
+"""
+
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _default(value):
+    """Convierte tipos no soportados por el encoder"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return http_date(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"Objeto de tipo {type(value).__name__} no es serializable a JSON")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Serializa respuestas con orjson (o json estándar) sin ordenar llaves."""
+
+    sort_keys = False
+    ensure_ascii = False
+
+    if orjson is not None:
+        # Las fechas pasan por `_default` en vez del ISO 8601 nativo de orjson
+        _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=_default, option=self._ORJSON_OPTIONS)
+            except TypeError:
+                # Enteros fuera de 64 bits u otros casos no soportados por orjson
+                pass
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', False)
+            return json.dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
@@ -12,6 +12,7 @@ from utils.permissions import (
     require_empresa_token,
     require_super_admin_token,
 )
+from utils.conditional_get import conditional_get, empresa_scope, hardware_scope
 
 # ========== BLUEPRINT DE AUTENTICACIÓN ==========
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -57,16 +58,22 @@ def create_empresa():
     return empresa_controller.create_empresa()
 
 @empresa_bp.route('/', methods=['GET'])
+@require_empresa_or_admin_token
+@conditional_get('empresas')
 def get_all_empresas():
     """GET /api/empresas - Obtener todas las empresas activas (para formularios)"""
     return empresa_controller.get_all_empresas()
 
 @empresa_bp.route('/dashboard/all', methods=['GET'])
+@require_super_admin_token
+@conditional_get('empresas')
 def get_all_empresas_dashboard():
     """GET /api/empresas/dashboard/all - Obtener TODAS las empresas (activas e inactivas) para dashboards"""
     return empresa_controller.get_all_empresas_dashboard()
 
 @empresa_bp.route('/<empresa_id>', methods=['GET'])
+@require_empresa_or_admin_token
+@conditional_get('empresas', scope=empresa_scope)
 def get_empresa(empresa_id):
     """GET /api/empresas/<id> - Obtener empresa por ID"""
     return empresa_controller.get_empresa(empresa_id)
@@ -82,6 +89,8 @@ def delete_empresa(empresa_id):
     return empresa_controller.delete_empresa(empresa_id)
 
 @empresa_bp.route('/mis-empresas', methods=['GET'])
+@require_super_admin_token
+@conditional_get('empresas')
 def get_my_empresas():
     """GET /api/empresas/mis-empresas - Obtener empresas del super admin autenticado"""
     return empresa_controller.get_my_empresas()
@@ -97,6 +106,8 @@ def get_stats():
     return empresa_controller.get_empresa_stats()
 
 @empresa_bp.route('/<empresa_id>/including-inactive', methods=['GET'])
+@require_super_admin_token
+@conditional_get('empresas', scope=empresa_scope)
 def get_empresa_including_inactive(empresa_id):
     """GET /api/empresas/<id>/including-inactive - Obtener empresa incluyendo inactivas (solo super admin)"""
     return empresa_controller.get_empresa_including_inactive(empresa_id)
@@ -131,14 +142,18 @@ def create_hardware():
     return hardware_controller.create_hardware()
 
 @hardware_bp.route('/', methods=['GET'])
+@require_super_admin_token
+@conditional_get('hardware', 'empresas', scope=empresa_scope)
 def get_hardware_list():
     return hardware_controller.get_hardware_list()
 
 @hardware_bp.route('/empresa/<empresa_id>', methods=['GET'])
+@conditional_get('hardware', 'empresas', scope=empresa_scope)
 def get_hardware_by_empresa(empresa_id):
     return hardware_controller.get_hardware_by_empresa(empresa_id)
 
 @hardware_bp.route('/<hardware_id>', methods=['GET'])
+@conditional_get('hardware', 'empresas', scope=hardware_scope)
 def get_hardware(hardware_id):
     return hardware_controller.get_hardware(hardware_id)
 
@@ -166,17 +181,30 @@ def update_physical_status_by_topic():
     """PUT /api/hardware/physical-status - Actualizar physical_status por empresa y hardware (token interno)"""
     return hardware_controller.update_physical_status_by_topic()
 
+@hardware_bp.route('/physical-status/batch', methods=['PUT'])
+def update_physical_status_batch():
+    """PUT /api/hardware/physical-status/batch - Actualizar physical_status de muchos hardware por topic (token interno)"""
+    return hardware_controller.update_physical_status_batch()
+
+@hardware_bp.route('/physical-status/fleet', methods=['GET'])
+def get_fleet_status():
+    """GET /api/hardware/physical-status/fleet - Última señal de cada hardware (vista del worker)"""
+    return hardware_controller.get_fleet_status()
+
 @hardware_bp.route('/physical-status/check', methods=['POST'])
 def check_physical_status_stale():
     """POST /api/hardware/physical-status/check - Marcar hardware con status vencido"""
     return hardware_controller.check_physical_status_stale()
 
 @hardware_bp.route('/all-including-inactive', methods=['GET'])
+@require_super_admin_token
+@conditional_get('hardware', 'empresas', scope=empresa_scope)
 def get_all_hardware_including_inactive():
     """GET /api/hardware/all-including-inactive - Obtener todos los hardware incluyendo inactivos"""
     return hardware_controller.get_all_hardware_including_inactive()
 
 @hardware_bp.route('/empresa/<empresa_id>/including-inactive', methods=['GET'])
+@conditional_get('hardware', 'empresas', scope=empresa_scope)
 def get_hardware_by_empresa_including_inactive(empresa_id):
     """GET /api/hardware/empresa/<empresa_id>/including-inactive - Obtener hardware de empresa incluyendo inactivos"""
     return hardware_controller.get_hardware_by_empresa_including_inactive(empresa_id)
@@ -336,12 +364,14 @@ def create_alert():
 # Rutas de lectura (requieren autenticación general)
 @mqtt_alert_bp.route('/', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts')
 def get_alerts():
     """GET /api/mqtt-alerts - Obtener todas las alertas"""
     return mqtt_alert_controller.get_alerts()
 
 @mqtt_alert_bp.route('/<alert_id>', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts', 'mqtt_alerts_archive')
 def get_alert_by_id(alert_id):
     """GET /api/mqtt-alerts/<alert_id> - Obtener alerta por ID"""
     return mqtt_alert_controller.get_alert_by_id(alert_id)
@@ -375,30 +405,35 @@ def toggle_alert_status(alert_id):
 # Rutas de consulta específicas
 @mqtt_alert_bp.route('/empresa/<empresa_id>', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts')
 def get_alerts_by_empresa(empresa_id):
     """GET /api/mqtt-alerts/empresa/<empresa_id> - Obtener alertas por empresa"""
     return mqtt_alert_controller.get_alerts_by_empresa(empresa_id)
 
 @mqtt_alert_bp.route('/active', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts')
 def get_active_alerts():
     """GET /api/mqtt-alerts/active - Obtener alertas activas"""
     return mqtt_alert_controller.get_active_alerts()
 
 @mqtt_alert_bp.route('/unauthorized', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts')
 def get_unauthorized_alerts():
     """GET /api/mqtt-alerts/unauthorized - Obtener alertas no autorizadas"""
     return mqtt_alert_controller.get_unauthorized_alerts()
 
 @mqtt_alert_bp.route('/inactive', methods=['GET'])
 @require_empresa_token
+@conditional_get('mqtt_alerts', 'mqtt_alerts_archive')
 def get_inactive_alerts():
     """GET /api/mqtt-alerts/inactive - Obtener alertas inactivas/desactivadas"""
     return mqtt_alert_controller.get_inactive_alerts()
 
 @mqtt_alert_bp.route('/stats', methods=['GET'])
 @require_empresa_or_admin_token
+@conditional_get('mqtt_alerts', 'mqtt_alerts_archive')
 def get_alerts_stats():
     """GET /api/mqtt-alerts/stats - Obtener estadísticas de alertas"""
     return mqtt_alert_controller.get_alerts_stats()
@@ -410,10 +445,20 @@ def update_alert_user_status():
 
 @mqtt_alert_bp.route('/empresa/<empresa_id>/active-by-sede', methods=['GET'])
 @require_empresa_token
+@conditional_get('mqtt_alerts')
 def get_active_alerts_by_empresa_sede(empresa_id):
     """GET /api/mqtt-alerts/empresa/{empresaId}/active-by-sede - Obtener alertas activas por empresa y sede con paginación"""
     return mqtt_alert_controller.get_active_alerts_by_empresa_sede(empresa_id)
 
+# Stream SSE: lo registran la API (desarrollo) y stream_app.py (producción, workers gevent)
+alert_stream_bp = Blueprint('alert_stream', __name__, url_prefix='/api/mqtt-alerts')
+
+@alert_stream_bp.route('/stream', methods=['GET'])
+@require_empresa_token
+def stream_alerts():
+    """GET /api/mqtt-alerts/stream?sede=X - Stream SSE de eventos de alertas de la empresa"""
+    return mqtt_alert_controller.stream_alerts()
+
 # Rutas de utilidad y verificación
 @mqtt_alert_bp.route('/verify-empresa-sede', methods=['GET'])
 @require_empresa_or_admin_token
@@ -496,6 +541,7 @@ def register_routes(app):
     app.register_blueprint(hardware_type_bp)
     app.register_blueprint(multitenant_bp)
     app.register_blueprint(mqtt_alert_bp)  # Rehabilitado para manejar alertas MQTT
+    app.register_blueprint(alert_stream_bp)
     app.register_blueprint(hardware_auth_bp)
     app.register_blueprint(phone_lookup_bp)  # Búsqueda por teléfono
     app.register_blueprint(contact_bp)  # Formulario de contacto
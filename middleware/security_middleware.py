@@ -1,12 +1,11 @@
 import hashlib
-import time
 from flask import request, jsonify
 from flask_jwt_extended import get_jwt, get_jwt_identity
-from core.database import Database
+from services.session_service import SessionService
 
 class SecurityMiddleware:
     def __init__(self):
-        self.db = Database().get_database()
+        self.session_service = SessionService()
     
     def get_client_fingerprint(self, request):
         """
@@ -27,86 +26,20 @@ class SecurityMiddleware:
     
     def validate_token_binding(self, user_id, current_fingerprint):
         """
-        Valida que el token esté vinculado al cliente original
+        Valida que el token esté vinculado a un cliente con sesión activa.
+        La huella se guarda en la sesión (`sessions`) al iniciar sesión.
         """
-        try:
-            # Buscar sesión activa
-            session = self.db.user_sessions.find_one({
-                'user_id': user_id,
-                'is_active': True
-            })
-            
-            if not session:
-                return False
-            
-            # Verificar huella digital
-            if session.get('fingerprint') != current_fingerprint:
-                # Token está siendo usado desde otro dispositivo/navegador
-                return False
-            
-            # Verificar tiempo de última actividad (para detectar uso simultáneo)
-            last_activity = session.get('last_activity')
-            if last_activity:
-                time_diff = time.time() - last_activity
-                # Si la última actividad fue hace más de 10 minutos, actualizar
-                if time_diff > 600:  # 10 minutos
-                    self.db.user_sessions.update_one(
-                        {'_id': session['_id']},
-                        {'$set': {'last_activity': time.time()}}
-                    )
-            
-            return True
-            
-        except Exception as e:
-            # print(f"Error validando token binding: {str(e)}")
-            return False
-    
-    def create_session_record(self, user_id, fingerprint, jti):
-        """
-        Crea un registro de sesión vinculado al token
-        """
-        try:
-            # Invalidar sesiones anteriores del mismo usuario
-            self.db.user_sessions.update_many(
-                {'user_id': user_id},
-                {'$set': {'is_active': False}}
-            )
-            
-            # Crear nueva sesión
-            session_data = {
-                'user_id': user_id,
-                'fingerprint': fingerprint,
-                'jti': jti,  # JWT ID único
-                'created_at': time.time(),
-                'last_activity': time.time(),
-                'is_active': True
-            }
-            
-            self.db.user_sessions.insert_one(session_data)
-            return True
-            
-        except Exception as e:
-            # print(f"Error creando registro de sesión: {str(e)}")
-            return False
+        return self.session_service.is_client_bound(user_id, current_fingerprint)
     
     def invalidate_session(self, user_id, jti=None):
         """
-        Invalida sesiones del usuario
+        Invalida sesiones del usuario (una sola si se indica el JTI del refresh token)
         """
-        try:
-            query = {'user_id': user_id}
-            if jti:
-                query['jti'] = jti
-            
-            self.db.user_sessions.update_many(
-                query,
-                {'$set': {'is_active': False}}
-            )
-            return True
-            
-        except Exception as e:
-            # print(f"Error invalidando sesión: {str(e)}")
-            return False
+        if jti:
+            result = self.session_service.invalidate_session(refresh_token_jti=jti)
+        else:
+            result = self.session_service.logout_all_user_sessions(user_id)
+        return result.get('success', False)
     
     def validate_request_security(self):
         """
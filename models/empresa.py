@@ -1,9 +1,37 @@
 from datetime import datetime
 from bson import ObjectId
 
+from utils.bson_codec import DATETIME, OBJECT_ID, RAW, DocumentCodec
+from utils.change_tracking import ChangeTracking
 from utils.role_utils import sanitize_roles
 
-class Empresa:
+class Empresa(ChangeTracking):
+    __slots__ = (
+        '_id', 'nombre', 'descripcion', 'ubicacion', 'creado_por', 'username',
+        'email', 'password_hash', 'sedes', 'roles', 'last_login',
+        'tipo_empresa_id', 'fecha_creacion', 'fecha_actualizacion', 'activa',
+    )
+
+    # Esquema de salida de to_json (sin password_hash)
+    JSON_SCHEMA = (
+        ('_id', OBJECT_ID, None),
+        ('nombre', RAW, None),
+        ('descripcion', RAW, None),
+        ('ubicacion', RAW, None),
+        ('creado_por', OBJECT_ID, None),
+        ('username', RAW, None),
+        ('email', RAW, None),
+        ('sedes', RAW, list),
+        ('roles', RAW, list),
+        ('last_login', DATETIME, None),
+        ('tipo_empresa_id', OBJECT_ID, None),
+        ('fecha_creacion', DATETIME, None),
+        ('fecha_actualizacion', DATETIME, None),
+        ('activa', RAW, True),
+        ('version', RAW, None),
+    )
+    _JSON_CODEC = DocumentCodec(JSON_SCHEMA)
+
     def __init__(
         self,
         nombre=None,
@@ -35,6 +63,8 @@ class Empresa:
         self.fecha_creacion = datetime.utcnow()
         self.fecha_actualizacion = datetime.utcnow()
         self.activa = activa  # Campo adicional para soft delete
+        self.version = None  # control de concurrencia optimista
+        self._snapshot = None
     
     def to_dict(self):
         """Convierte el objeto Empresa a diccionario para MongoDB"""
@@ -61,7 +91,8 @@ class Empresa:
     @classmethod
     def from_dict(cls, data):
         """Crea un objeto Empresa desde un diccionario de MongoDB"""
-        empresa = cls()
+        # Sin pasar por __init__: evita generar un ObjectId y fechas que se sobrescriben
+        empresa = cls.__new__(cls)
         empresa._id = data.get('_id')
         empresa.nombre = data.get('nombre')
         empresa.descripcion = data.get('descripcion')
@@ -77,26 +108,23 @@ class Empresa:
         empresa.fecha_creacion = data.get('fecha_creacion')
         empresa.fecha_actualizacion = data.get('fecha_actualizacion')
         empresa.activa = data.get('activa', True)
+        empresa.version = data.get('version')
+        empresa._snapshot = None
         return empresa
     
     def to_json(self):
         """Convierte a JSON serializable"""
-        return {
-            '_id': str(self._id) if self._id else None,
-            'nombre': self.nombre,
-            'descripcion': self.descripcion,
-            'ubicacion': self.ubicacion,
-            'creado_por': str(self.creado_por) if self.creado_por else None,
-            'username': self.username,
-            'email': self.email,
-            'sedes': self.sedes,
-            'roles': self.roles,
-            'last_login': self.last_login.isoformat() if isinstance(self.last_login, datetime) else self.last_login,
-            'tipo_empresa_id': str(self.tipo_empresa_id) if self.tipo_empresa_id else None,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None,
-            'activa': self.activa
-        }
+        return self._JSON_CODEC.from_object(self)
+    
+    @classmethod
+    def json_from_document(cls, data):
+        """Convierte un documento de MongoDB directamente a JSON (sin instanciar el modelo).
+
+        Los roles se sanean igual que en `from_dict`.
+        """
+        result = cls._JSON_CODEC.from_document(data)
+        result['roles'] = sanitize_roles(result['roles'])
+        return result
     
     def validate(self):
         """Valida los datos de la empresa"""
@@ -1,8 +1,39 @@
 from datetime import datetime
 from bson import ObjectId
 
-class Hardware:
+from utils.bson_codec import DATETIME, NESTED, OBJECT_ID, RAW, DocumentCodec
+from utils.change_tracking import ChangeTracking
+from utils.search_keys import build_search_fields
+
+class Hardware(ChangeTracking):
     """Modelo generico para cualquier hardware"""
+    __slots__ = (
+        '_id', 'nombre', 'tipo', 'empresa_id', 'sede', 'datos', 'direccion',
+        'direccion_url', 'direccion_open_maps', 'topic', 'physical_status',
+        'fecha_creacion', 'fecha_actualizacion', 'activa',
+        'coordenadas',  # transitorio: resultado de la geocodificación, no se persiste
+    )
+
+    # Esquema de salida de to_json (campo, tipo, default si falta en el documento)
+    JSON_SCHEMA = (
+        ('_id', OBJECT_ID, None),
+        ('nombre', RAW, None),
+        ('tipo', RAW, None),
+        ('empresa_id', OBJECT_ID, None),
+        ('sede', RAW, None),
+        ('datos', RAW, dict),
+        ('direccion', RAW, None),
+        ('direccion_url', RAW, None),
+        ('direccion_open_maps', RAW, None),
+        ('topic', RAW, None),
+        ('physical_status', NESTED, dict),
+        ('fecha_creacion', DATETIME, None),
+        ('fecha_actualizacion', DATETIME, None),
+        ('activa', RAW, True),
+        ('version', RAW, None),
+    )
+    _JSON_CODEC = DocumentCodec(JSON_SCHEMA)
+
     def __init__(self, nombre=None, tipo=None, empresa_id=None, sede=None, datos=None, _id=None, activa=True, topic=None, physical_status=None):
         self._id = _id or ObjectId()
         self.nombre = nombre
@@ -18,6 +49,9 @@ class Hardware:
         self.fecha_creacion = datetime.utcnow()
         self.fecha_actualizacion = datetime.utcnow()
         self.activa = activa
+        self.coordenadas = None
+        self.version = None  # control de concurrencia optimista
+        self._snapshot = None
 
     def to_dict(self):
         hardware_dict = {
@@ -35,13 +69,25 @@ class Hardware:
             'fecha_actualizacion': self.fecha_actualizacion,
             'activa': self.activa
         }
+        hardware_dict.update(self.search_fields())
         if self._id:
             hardware_dict['_id'] = self._id
         return hardware_dict
 
+    def search_fields(self):
+        """Claves de búsqueda: nombre, tipo, sede y marca/modelo en datos"""
+        datos = self.datos if isinstance(self.datos, dict) else {}
+        anidados = datos.get('datos') if isinstance(datos.get('datos'), dict) else {}
+        return build_search_fields(
+            self.nombre, self.tipo, self.sede,
+            datos.get('brand'), datos.get('model'),
+            anidados.get('brand'), anidados.get('model')
+        )
+
     @classmethod
     def from_dict(cls, data):
-        hw = cls()
+        # Sin pasar por __init__: evita generar un ObjectId y fechas que se sobrescriben
+        hw = cls.__new__(cls)
         hw._id = data.get('_id')
         hw.nombre = data.get('nombre')
         hw.tipo = data.get('tipo')
@@ -56,25 +102,18 @@ class Hardware:
         hw.fecha_creacion = data.get('fecha_creacion')
         hw.fecha_actualizacion = data.get('fecha_actualizacion')
         hw.activa = data.get('activa', True)
+        hw.coordenadas = None
+        hw.version = data.get('version')
+        hw._snapshot = None
         return hw
 
     def to_json(self):
-        return {
-            '_id': str(self._id) if self._id else None,
-            'nombre': self.nombre,
-            'tipo': self.tipo,
-            'empresa_id': str(self.empresa_id) if self.empresa_id else None,
-            'sede': self.sede,
-            'datos': self.datos,
-            'direccion': self.direccion,  # Nueva dirección
-            'direccion_url': self.direccion_url,  # Nueva URL de dirección (Google Maps)
-            'direccion_open_maps': self.direccion_open_maps,  # Nueva URL de dirección (OpenStreetMap)
-            'topic': self.topic,
-            'physical_status': self.physical_status,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None,
-            'activa': self.activa
-        }
+        return self._JSON_CODEC.from_object(self)
+
+    @classmethod
+    def json_from_document(cls, data):
+        """Convierte un documento de MongoDB directamente a JSON (sin instanciar el modelo)"""
+        return cls._JSON_CODEC.from_document(data)
 
     def update_timestamp(self):
         self.fecha_actualizacion = datetime.utcnow()
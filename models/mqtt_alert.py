@@ -1,9 +1,51 @@
 from datetime import datetime
 from bson import ObjectId
 
-class MqttAlert:
+from utils.bson_codec import DATETIME, NESTED, OBJECT_ID, RAW, DocumentCodec
+from utils.change_tracking import ChangeTracking
+
+class MqttAlert(ChangeTracking):
     """Modelo para almacenar alertas recibidas por MQTT o creadas por usuarios"""
     
+    __slots__ = (
+        '_id', 'empresa_id', 'empresa_nombre', 'sede', 'sede_key', 'data',
+        'tipo_alerta', 'nombre_alerta', 'descripcion', 'prioridad', 'image_alert',
+        'elementos_necesarios', 'instrucciones', 'numeros_telefonicos', 'topic',
+        'topics_otros_hardware', 'activacion_alerta', 'ubicacion', 'activo',
+        'fecha_creacion', 'fecha_actualizacion', 'fecha_desactivacion',
+        'desactivado_por', 'mensaje_desactivacion',
+        'hardware_nombre',  # transitorio: no se persiste
+    )
+    
+    # Esquema de salida de to_json (campo, tipo, default si falta en el documento)
+    JSON_SCHEMA = (
+        ('_id', OBJECT_ID, None),
+        ('empresa_id', OBJECT_ID, None),
+        ('empresa_nombre', RAW, None),
+        ('sede', RAW, None),
+        ('data', NESTED, dict),
+        ('tipo_alerta', RAW, None),
+        ('nombre_alerta', RAW, None),
+        ('descripcion', RAW, None),
+        ('prioridad', RAW, 'media'),
+        ('image_alert', RAW, None),
+        ('elementos_necesarios', RAW, list),
+        ('instrucciones', RAW, list),
+        ('numeros_telefonicos', RAW, list),
+        ('topic', RAW, None),
+        ('topics_otros_hardware', RAW, list),
+        ('activacion_alerta', NESTED, dict),
+        ('ubicacion', RAW, dict),
+        ('activo', RAW, True),
+        ('fecha_creacion', DATETIME, None),
+        ('fecha_actualizacion', DATETIME, None),
+        ('fecha_desactivacion', DATETIME, None),
+        ('desactivado_por', RAW, dict),
+        ('mensaje_desactivacion', RAW, None),
+        ('version', RAW, None),
+    )
+    _JSON_CODEC = DocumentCodec(JSON_SCHEMA)
+    
     def __init__(self, empresa_nombre=None, sede=None, data=None, 
                  tipo_alerta=None,
                  nombre_alerta=None,
@@ -19,10 +61,13 @@ class MqttAlert:
                  ubicacion=None, 
                  fecha_desactivacion=None, 
                  activo=True, 
+                 empresa_id=None,
                  _id=None):
         self._id = _id or ObjectId()
+        self.empresa_id = empresa_id  # referencia estable a la empresa (no cambia al renombrarla)
         self.empresa_nombre = empresa_nombre
         self.sede = sede
+        self.sede_key = self.build_sede_key(sede)  # sede normalizada para consultas por tenant
         self.data = data or {}  # datos de la alerta
         
         # Campos de la alerta
@@ -52,12 +97,17 @@ class MqttAlert:
         self.fecha_desactivacion = fecha_desactivacion  # cuando se desactivó la alerta
         self.desactivado_por = {}  # información sobre quién/qué desactivó la alerta
         self.mensaje_desactivacion = None  # mensaje opcional de desactivación
+        self.hardware_nombre = None
+        self.version = None  # control de concurrencia optimista
+        self._snapshot = None
         
     def to_dict(self):
         """Convierte el objeto a diccionario para MongoDB"""
         alert_dict = {
+            'empresa_id': self.empresa_id,
             'empresa_nombre': self.empresa_nombre,
             'sede': self.sede,
+            'sede_key': self.sede_key,
             'data': self.data,
             'tipo_alerta': self.tipo_alerta,
             'nombre_alerta': self.nombre_alerta,
@@ -85,10 +135,13 @@ class MqttAlert:
     @classmethod
     def from_dict(cls, data):
         """Crea un objeto MqttAlert desde un diccionario de MongoDB"""
-        alert = cls()
+        # Sin pasar por __init__: evita generar un ObjectId y fechas que se sobrescriben
+        alert = cls.__new__(cls)
         alert._id = data.get('_id')
+        alert.empresa_id = data.get('empresa_id')
         alert.empresa_nombre = data.get('empresa_nombre')
         alert.sede = data.get('sede')
+        alert.sede_key = data.get('sede_key') or cls.build_sede_key(alert.sede)
         alert.data = data.get('data', {})
         alert.tipo_alerta = data.get('tipo_alerta')
         alert.nombre_alerta = data.get('nombre_alerta')
@@ -108,50 +161,19 @@ class MqttAlert:
         alert.fecha_desactivacion = data.get('fecha_desactivacion')
         alert.desactivado_por = data.get('desactivado_por', {})
         alert.mensaje_desactivacion = data.get('mensaje_desactivacion')
+        alert.hardware_nombre = None
+        alert.version = data.get('version')
+        alert._snapshot = None
         return alert
     
     def to_json(self):
         """Convierte a JSON serializable"""
-        from bson import ObjectId
-        import json
-        
-        def convert_objectids(obj):
-            """Convierte recursivamente ObjectIds a strings"""
-            if isinstance(obj, ObjectId):
-                return str(obj)
-            elif isinstance(obj, dict):
-                return {key: convert_objectids(value) for key, value in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_objectids(item) for item in obj]
-            elif hasattr(obj, 'isoformat'):  # datetime objects
-                return obj.isoformat()
-            else:
-                return obj
-        
-        return {
-            '_id': str(self._id) if self._id else None,
-            'empresa_nombre': self.empresa_nombre,
-            'sede': self.sede,
-            'data': convert_objectids(self.data),
-            'tipo_alerta': self.tipo_alerta,
-            'nombre_alerta': self.nombre_alerta,
-            'descripcion': self.descripcion,
-            'prioridad': self.prioridad,
-            'image_alert': self.image_alert,
-            'elementos_necesarios': self.elementos_necesarios,
-            'instrucciones': self.instrucciones,
-            'numeros_telefonicos': self.numeros_telefonicos,
-            'topic': self.topic,
-            'topics_otros_hardware': self.topics_otros_hardware,
-            'activacion_alerta': convert_objectids(self.activacion_alerta),
-            'ubicacion': self.ubicacion,
-            'activo': self.activo,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None,
-            'fecha_desactivacion': self.fecha_desactivacion.isoformat() if self.fecha_desactivacion else None,
-            'desactivado_por': self.desactivado_por,
-            'mensaje_desactivacion': self.mensaje_desactivacion
-        }
+        return self._JSON_CODEC.from_object(self)
+    
+    @classmethod
+    def json_from_document(cls, data):
+        """Convierte un documento de MongoDB directamente a JSON (sin instanciar el modelo)"""
+        return cls._JSON_CODEC.from_document(data)
     
     def deactivate(self, desactivado_por_id=None, desactivado_por_tipo=None, mensaje_desactivacion=None):
         """Desactiva la alerta"""
@@ -207,6 +229,16 @@ class MqttAlert:
             self.empresa_nombre = self.empresa_nombre.strip()
         if self.sede:
             self.sede = self.sede.strip()
+        if isinstance(self.empresa_id, str) and ObjectId.is_valid(self.empresa_id):
+            self.empresa_id = ObjectId(self.empresa_id)
+        self.sede_key = self.build_sede_key(self.sede)
+    
+    @staticmethod
+    def build_sede_key(sede):
+        """Genera la clave normalizada de la sede (sin espacios extremos, en minúsculas)"""
+        if not sede or not isinstance(sede, str):
+            return None
+        return sede.strip().lower()
     
     @classmethod
     def create_from_hardware(cls, empresa_nombre, sede, hardware_nombre, hardware_id, 
@@ -1,9 +1,18 @@
 from datetime import datetime
 from bson import ObjectId
 
+from utils.bson_codec import DATETIME, OBJECT_ID, RAW, DocumentCodec
+from utils.search_keys import build_search_fields
+
 class TipoAlarma:
     """Modelo para tipos de alarma con colores, imágenes y recomendaciones"""
     
+    __slots__ = (
+        '_id', 'nombre', 'descripcion', 'tipo_alerta', 'color_alerta',
+        'imagen_base64', 'sonido_link', 'recomendaciones', 'implementos_necesarios',
+        'empresa_id', 'activo', 'fecha_creacion', 'fecha_actualizacion',
+    )
+    
     # Enum para tipos de alerta
     TIPOS_ALERTA = {
         'ROJO': 'ROJO',
@@ -13,6 +22,24 @@ class TipoAlarma:
         'NARANJA': 'NARANJA'
     }
     
+    # Esquema de salida de to_json (campo, tipo, default si falta en el documento)
+    JSON_SCHEMA = (
+        ('_id', OBJECT_ID, None),
+        ('nombre', RAW, None),
+        ('descripcion', RAW, None),
+        ('tipo_alerta', RAW, None),
+        ('color_alerta', RAW, None),
+        ('imagen_base64', RAW, None),
+        ('sonido_link', RAW, None),
+        ('recomendaciones', RAW, list),
+        ('implementos_necesarios', RAW, list),
+        ('empresa_id', OBJECT_ID, None),
+        ('activo', RAW, True),
+        ('fecha_creacion', DATETIME, None),
+        ('fecha_actualizacion', DATETIME, None),
+    )
+    _JSON_CODEC = DocumentCodec(JSON_SCHEMA)
+    
     def __init__(self, nombre=None, descripcion=None, tipo_alerta=None, color_alerta=None, 
                  imagen_base64=None, sonido_link=None, recomendaciones=None, implementos_necesarios=None, 
                  empresa_id=None, activo=True, _id=None):
@@ -46,6 +73,7 @@ class TipoAlarma:
             'fecha_creacion': self.fecha_creacion,
             'fecha_actualizacion': self.fecha_actualizacion
         }
+        tipo_alarma_dict.update(build_search_fields(self.nombre, self.descripcion))
         if self._id:
             tipo_alarma_dict['_id'] = self._id
         return tipo_alarma_dict
@@ -53,7 +81,8 @@ class TipoAlarma:
     @classmethod
     def from_dict(cls, data):
         """Crea un objeto TipoAlarma desde un diccionario de MongoDB"""
-        tipo_alarma = cls()
+        # Sin pasar por __init__: evita generar un ObjectId y fechas que se sobrescriben
+        tipo_alarma = cls.__new__(cls)
         tipo_alarma._id = data.get('_id')
         tipo_alarma.nombre = data.get('nombre')
         tipo_alarma.descripcion = data.get('descripcion')
@@ -71,21 +100,12 @@ class TipoAlarma:
     
     def to_json(self):
         """Convierte a JSON serializable"""
-        return {
-            '_id': str(self._id) if self._id else None,
-            'nombre': self.nombre,
-            'descripcion': self.descripcion,
-            'tipo_alerta': self.tipo_alerta,
-            'color_alerta': self.color_alerta,
-            'imagen_base64': self.imagen_base64,
-            'sonido_link': self.sonido_link,
-            'recomendaciones': self.recomendaciones,
-            'implementos_necesarios': self.implementos_necesarios,
-            'empresa_id': str(self.empresa_id) if self.empresa_id else None,
-            'activo': self.activo,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
-        }
+        return self._JSON_CODEC.from_object(self)
+    
+    @classmethod
+    def json_from_document(cls, data):
+        """Convierte un documento de MongoDB directamente a JSON (sin instanciar el modelo)"""
+        return cls._JSON_CODEC.from_document(data)
     
     def validate(self):
         """Valida los datos del tipo de alarma"""
@@ -1,6 +1,8 @@
 from datetime import datetime
 from bson import ObjectId
 
+from utils.search_keys import build_search_fields
+
 class TipoEmpresa:
     def __init__(
         self,
@@ -31,6 +33,7 @@ class TipoEmpresa:
             'fecha_creacion': self.fecha_creacion,
             'fecha_actualizacion': self.fecha_actualizacion
         }
+        tipo_empresa_dict.update(build_search_fields(self.nombre, self.descripcion))
         if self._id:
             tipo_empresa_dict['_id'] = self._id
         return tipo_empresa_dict
@@ -1,7 +1,36 @@
 from datetime import datetime
 from bson import ObjectId
+from utils.bson_codec import DATETIME, OBJECT_ID, RAW, DocumentCodec
+from utils.change_tracking import ChangeTracking
+from utils.phone_utils import normalize_phone_e164
 
-class Usuario:
+class Usuario(ChangeTracking):
+    __slots__ = (
+        '_id', 'nombre', 'cedula', 'rol', 'empresa_id', 'especialidades',
+        'certificaciones', 'tipo_turno', 'telefono', 'telefono_normalizado',
+        'email', 'sede', 'fecha_creacion', 'fecha_actualizacion', 'activo',
+    )
+    
+    # Esquema de salida de to_json (campo, tipo, default si falta en el documento)
+    JSON_SCHEMA = (
+        ('_id', OBJECT_ID, None),
+        ('nombre', RAW, None),
+        ('cedula', RAW, None),
+        ('rol', RAW, None),
+        ('empresa_id', OBJECT_ID, None),
+        ('especialidades', RAW, list),
+        ('certificaciones', RAW, list),
+        ('tipo_turno', RAW, None),
+        ('telefono', RAW, None),
+        ('email', RAW, None),
+        ('sede', RAW, None),
+        ('fecha_creacion', DATETIME, None),
+        ('fecha_actualizacion', DATETIME, None),
+        ('activo', RAW, True),
+        ('version', RAW, None),
+    )
+    _JSON_CODEC = DocumentCodec(JSON_SCHEMA)
+    
     def __init__(self, nombre=None, cedula=None, rol=None, empresa_id=None, 
                  especialidades=None, certificaciones=None, tipo_turno=None, 
                  telefono=None, email=None, sede=None, _id=None):
@@ -14,11 +43,14 @@ class Usuario:
         self.certificaciones = certificaciones or []  # lista de certificaciones
         self.tipo_turno = tipo_turno  # medio_dia, dia_completo, nocturno, 24_horas
         self.telefono = telefono  # contacto directo
+        self.telefono_normalizado = normalize_phone_e164(telefono)  # forma canónica E.164 para búsquedas
         self.email = email  # email de contacto
         self.sede = sede  # sede de la empresa a la que pertenece
         self.fecha_creacion = datetime.utcnow()
         self.fecha_actualizacion = datetime.utcnow()
         self.activo = True
+        self.version = None  # control de concurrencia optimista
+        self._snapshot = None
     
     def to_dict(self):
         """Convierte el objeto Usuario a diccionario para MongoDB"""
@@ -31,6 +63,7 @@ class Usuario:
             'certificaciones': self.certificaciones,
             'tipo_turno': self.tipo_turno,
             'telefono': self.telefono,
+            'telefono_normalizado': self.telefono_normalizado,
             'email': self.email,
             'sede': self.sede,
             'fecha_creacion': self.fecha_creacion,
@@ -44,7 +77,8 @@ class Usuario:
     @classmethod
     def from_dict(cls, data):
         """Crea un objeto Usuario desde un diccionario de MongoDB"""
-        usuario = cls()
+        # Sin pasar por __init__: evita normalizar el teléfono y generar fechas que se sobrescriben
+        usuario = cls.__new__(cls)
         usuario._id = data.get('_id')
         usuario.nombre = data.get('nombre')
         usuario.cedula = data.get('cedula')
@@ -54,31 +88,24 @@ class Usuario:
         usuario.certificaciones = data.get('certificaciones', [])
         usuario.tipo_turno = data.get('tipo_turno')
         usuario.telefono = data.get('telefono')
+        usuario.telefono_normalizado = data.get('telefono_normalizado') or normalize_phone_e164(usuario.telefono)
         usuario.email = data.get('email')
         usuario.sede = data.get('sede')
         usuario.fecha_creacion = data.get('fecha_creacion')
         usuario.fecha_actualizacion = data.get('fecha_actualizacion')
         usuario.activo = data.get('activo', True)
+        usuario.version = data.get('version')
+        usuario._snapshot = None
         return usuario
     
     def to_json(self):
         """Convierte a JSON serializable"""
-        return {
-            '_id': str(self._id) if self._id else None,
-            'nombre': self.nombre,
-            'cedula': self.cedula,
-            'rol': self.rol,
-            'empresa_id': str(self.empresa_id) if self.empresa_id else None,
-            'especialidades': self.especialidades,
-            'certificaciones': self.certificaciones,
-            'tipo_turno': self.tipo_turno,
-            'telefono': self.telefono,
-            'email': self.email,
-            'sede': self.sede,
-            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
-            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None,
-            'activo': self.activo
-        }
+        return self._JSON_CODEC.from_object(self)
+    
+    @classmethod
+    def json_from_document(cls, data):
+        """Convierte un documento de MongoDB directamente a JSON (sin instanciar el modelo)"""
+        return cls._JSON_CODEC.from_document(data)
     
     def validate(self):
         """Valida los datos del usuario"""
@@ -170,6 +197,7 @@ class Usuario:
             self.rol = self.rol.strip().lower()
         if self.telefono:
             self.telefono = str(self.telefono).strip()
+        self.telefono_normalizado = normalize_phone_e164(self.telefono)
         if self.email:
             self.email = self.email.strip()
         if self.sede:
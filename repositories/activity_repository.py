@@ -1,7 +1,9 @@
 from bson import ObjectId
 from datetime import datetime
 from core.database import Database
+from utils.tracing import trace_methods
 
+@trace_methods
 class ActivityRepository:
     """Maneja el almacenamiento de logs de actividad."""
 
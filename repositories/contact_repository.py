@@ -2,7 +2,9 @@ from typing import List, Optional
 from bson.objectid import ObjectId
 from models.contact import Contact
 from core.database import Database
+from utils.tracing import trace_methods
 
+@trace_methods
 class ContactRepository:
     """Repository para manejar operaciones CRUD de contactos"""
     
@@ -1,8 +1,54 @@
+import copy
+
 from bson import ObjectId
 from datetime import datetime
+from core.config import Config
 from core.database import Database
 from models.empresa import Empresa
+from utils.change_tracking import VersionConflictError, versioned_update
+from utils.ttl_cache import TTLCache
+from utils.tracing import trace_methods
+
+# Collation del índice único de `nombre`: las búsquedas por igualdad con esta
+# collation usan el índice y no distinguen mayúsculas/minúsculas.
+NOMBRE_COLLATION = {'locale': 'es', 'strength': 2}
+
+# Caches por worker compartidas por todas las instancias del repositorio:
+# - id -> documento de la empresa sin password_hash (None si no existe)
+# - nombre normalizado -> id (solo nombres encontrados)
+# Las escrituras de este repositorio las invalidan solo en el worker que las
+# hace; el TTL acota lo que otro worker puede servir después de un cambio.
+# Por eso los nombres no encontrados no se guardan, y quien rechaza una
+# petición por datos de la empresa (sedes) relee con `refresh=True`.
+_empresa_cache = TTLCache(
+    maxsize=Config.EMPRESA_CACHE_SIZE,
+    ttl_seconds=Config.EMPRESA_CACHE_TTL_SECONDS
+)
+_nombre_index = TTLCache(
+    maxsize=Config.EMPRESA_CACHE_SIZE,
+    ttl_seconds=Config.EMPRESA_CACHE_TTL_SECONDS
+)
+_MISSING = object()
+_CACHE_PROJECTION = {"password_hash": 0}
+
+
+def _nombre_key(nombre):
+    return str(nombre).casefold()
 
+
+def invalidate_empresa_cache(empresa_id=None):
+    """Invalida las caches de empresas (una empresa o completas).
+
+    El índice por nombre se vacía siempre: un cambio de nombre afecta dos llaves.
+    """
+    _nombre_index.clear()
+    if empresa_id is None:
+        _empresa_cache.clear()
+        return
+    _empresa_cache.pop(str(empresa_id))
+
+
+@trace_methods
 class EmpresaRepository:
     def __init__(self):
         self.db = Database().get_database()
@@ -40,6 +86,7 @@ class EmpresaRepository:
             empresa_dict = empresa.to_dict()
             result = self.collection.insert_one(empresa_dict)
             empresa._id = result.inserted_id
+            invalidate_empresa_cache(empresa._id)
             return empresa
         except Exception as e:
             # Verificar si es error de duplicado
@@ -73,6 +120,97 @@ class EmpresaRepository:
         except Exception as e:
             raise Exception(f"Error buscando empresa por ID (incluyendo inactivas): {str(e)}")
     
+    def _cached_documents(self, empresa_ids):
+        """Retorna {str(id): documento} usando la cache y una sola consulta `$in` para los faltantes"""
+        documents = {}
+        missing = set()
+        for empresa_id in empresa_ids:
+            if not empresa_id:
+                continue
+            key = str(empresa_id)
+            if key in documents or key in missing:
+                continue
+            cached = _empresa_cache.get(key, _MISSING)
+            if cached is _MISSING:
+                missing.add(key)
+            elif cached is not None:
+                documents[key] = cached
+        if missing:
+            ids = [ObjectId(key) for key in missing if ObjectId.is_valid(key)]
+            for doc in self.collection.find({"_id": {"$in": ids}}, _CACHE_PROJECTION):
+                key = str(doc["_id"])
+                documents[key] = doc
+                missing.discard(key)
+                _empresa_cache.set(key, doc)
+            for key in missing:
+                _empresa_cache.set(key, None)
+        return documents
+
+    def get_cached_document(self, empresa_id, include_inactive=False):
+        """Copia del documento de la empresa (sin password_hash) desde la cache del worker.
+
+        Para lecturas frecuentes que toleran el TTL de la cache; las
+        actualizaciones deben leer con find_by_id*.
+        """
+        try:
+            doc = self._cached_documents([empresa_id]).get(str(empresa_id)) if empresa_id else None
+            if not doc or (not include_inactive and not doc.get("activa", True)):
+                return None
+            return copy.deepcopy(doc)
+        except Exception as e:
+            raise Exception(f"Error buscando empresa en cache: {str(e)}")
+
+    def get_cached_document_by_nombre(self, nombre, include_inactive=False, refresh=False):
+        """Como get_cached_document pero por nombre (igualdad con la collation del índice).
+
+        Con `refresh=True` lee de MongoDB y actualiza las caches: para
+        confirmar un rechazo (empresa o sede inexistente) que puede deberse a
+        una empresa creada o editada en otro worker.
+        """
+        try:
+            if not nombre:
+                return None
+            key = _nombre_key(nombre)
+            empresa_id = _MISSING if refresh else _nombre_index.get(key, _MISSING)
+            if empresa_id is _MISSING:
+                doc = self.collection.find_one({"nombre": nombre}, _CACHE_PROJECTION, collation=NOMBRE_COLLATION)
+                if not doc:
+                    _nombre_index.pop(key)
+                    return None
+                empresa_id = str(doc["_id"])
+                _nombre_index.set(key, empresa_id)
+                _empresa_cache.set(empresa_id, doc)
+            return self.get_cached_document(empresa_id, include_inactive=include_inactive)
+        except Exception as e:
+            raise Exception(f"Error buscando empresa por nombre en cache: {str(e)}")
+
+    def get_cached_by_nombre(self, nombre, refresh=False):
+        """Empresa activa por nombre desde la cache (sin password_hash)"""
+        doc = self.get_cached_document_by_nombre(nombre, refresh=refresh)
+        return Empresa.from_dict(doc) if doc else None
+
+    def find_nombres_by_ids(self, empresa_ids, include_inactive=False):
+        """Retorna {str(id): nombre} de las empresas activas indicadas.
+
+        Usa la cache compartida y resuelve todos los faltantes con una sola
+        consulta `$in`; los ids inexistentes (o inactivos, salvo con
+        `include_inactive`) no aparecen en el resultado.
+        """
+        try:
+            return {
+                key: doc.get("nombre")
+                for key, doc in self._cached_documents(empresa_ids).items()
+                if include_inactive or doc.get("activa", True)
+            }
+        except Exception as e:
+            raise Exception(f"Error buscando nombres de empresas: {str(e)}")
+
+    def find_nombre_by_id(self, empresa_id):
+        """Nombre de una empresa activa (None si no existe), usando la cache compartida"""
+        if not empresa_id:
+            return None
+        return self.find_nombres_by_ids([empresa_id]).get(str(empresa_id))
+    
     def find_all(self, include_inactive=False):
         """Obtiene todas las empresas activas"""
         try:
@@ -86,10 +224,11 @@ class EmpresaRepository:
             raise Exception(f"Error obteniendo empresas: {str(e)}")
     
     def find_by_nombre(self, nombre):
-        """Busca una empresa por nombre (case-insensitive)"""
+        """Busca una empresa por nombre (case-insensitive, usando el índice)"""
         try:
             empresa_data = self.collection.find_one(
-                {"nombre": {"$regex": f"^{nombre}$", "$options": "i"}, "activa": True}
+                {"nombre": nombre, "activa": True},
+                collation=NOMBRE_COLLATION
             )
             if empresa_data:
                 return Empresa.from_dict(empresa_data)
@@ -103,11 +242,14 @@ class EmpresaRepository:
             if isinstance(exclude_id, str):
                 exclude_id = ObjectId(exclude_id)
                 
-            empresa_data = self.collection.find_one({
-                "nombre": {"$regex": f"^{nombre}$", "$options": "i"}, 
-                "activa": True,
-                "_id": {"$ne": exclude_id}
-            })
+            empresa_data = self.collection.find_one(
+                {
+                    "nombre": nombre,
+                    "activa": True,
+                    "_id": {"$ne": exclude_id}
+                },
+                collation=NOMBRE_COLLATION
+            )
             if empresa_data:
                 return Empresa.from_dict(empresa_data)
             return None
@@ -186,18 +328,13 @@ class EmpresaRepository:
             
             empresa.normalize_data()
             empresa.update_timestamp()
-            empresa_dict = empresa.to_dict()
-            empresa_dict.pop('_id', None)  # Remover _id del dict para actualización
             
-            # Remover filtro de activa para permitir actualizar empresas inactivas
-            result = self.collection.update_one(
-                {"_id": empresa_id},
-                {"$set": empresa_dict}
-            )
-            
-            if result.matched_count > 0:
-                return self.find_by_id_including_inactive(empresa_id)
-            return None
+            # Solo los campos modificados; sin filtro de activa para permitir actualizar empresas inactivas
+            updated = versioned_update(self.collection, empresa_id, empresa)
+            invalidate_empresa_cache(empresa_id)
+            return Empresa.from_dict(updated) if updated else None
+        except VersionConflictError:
+            raise
         except Exception as e:
             if "duplicate key error" in str(e).lower() or "11000" in str(e):
                 raise Exception("Ya existe una empresa con ese nombre")
@@ -219,6 +356,7 @@ class EmpresaRepository:
                     }
                 }
             )
+            invalidate_empresa_cache(empresa_id)
             return result.modified_count > 0
         except Exception as e:
             raise Exception(f"Error eliminando empresa: {str(e)}")
@@ -230,6 +368,7 @@ class EmpresaRepository:
                 empresa_id = ObjectId(empresa_id)
             
             result = self.collection.delete_one({"_id": empresa_id})
+            invalidate_empresa_cache(empresa_id)
             return result.deleted_count > 0
         except Exception as e:
             raise Exception(f"Error eliminando empresa permanentemente: {str(e)}")
@@ -0,0 +1,122 @@
+from datetime import datetime
+from pymongo import UpdateOne
+from core.database import Database
+from repositories.mqtt_alert_archive_repository import ARCHIVE_COLLECTION
+from utils.tracing import trace_methods
+
+MIGRATION_ID = 'hardware_links'
+
+
+@trace_methods
+class HardwareLinkRepository:
+    """Índice de adyacencia entre topics de hardware que coinciden en alertas.
+
+    Cada documento de `hardware_links` es `{_id: topic, peers: [...]}`. Al
+    crear una alerta, el topic principal y los `topics_otros_hardware` quedan
+    vinculados entre sí con `$addToSet`; consultar los vecinos de un topic es
+    una lectura por `_id`.
+    """
+
+    def __init__(self):
+        self.db = Database().get_database()
+        self.collection = self.db.hardware_links
+        self._built = False
+
+    @staticmethod
+    def _members(topic, topics_otros_hardware):
+        members = []
+        for item in [topic] + list(topics_otros_hardware or []):
+            if isinstance(item, str) and item and item not in members:
+                members.append(item)
+        return members
+
+    def add_alert_links(self, topic, topics_otros_hardware):
+        """Vincula entre sí todos los topics de una alerta"""
+        try:
+            members = self._members(topic, topics_otros_hardware)
+            if len(members) < 2:
+                return 0
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {'_id': member},
+                    {
+                        '$addToSet': {'peers': {'$each': [peer for peer in members if peer != member]}},
+                        '$set': {'fecha_actualizacion': now}
+                    },
+                    upsert=True
+                )
+                for member in members
+            ]
+            result = self.collection.bulk_write(operations, ordered=False)
+            return result.upserted_count + result.modified_count
+        except Exception as exc:
+            raise Exception(f'Error vinculando topics de hardware: {str(exc)}')
+
+    def is_built(self):
+        """True si el índice ya se reconstruyó a partir del historial de alertas"""
+        if not self._built:
+            self._built = self.db.migrations.count_documents(
+                {'_id': MIGRATION_ID, 'completed_at': {'$exists': True}}, limit=1
+            ) > 0
+        return self._built
+
+    def find_peers(self, topic):
+        """Topics vinculados con `topic` en alguna alerta"""
+        try:
+            doc = self.collection.find_one({'_id': topic}, {'peers': 1})
+            return list((doc or {}).get('peers') or [])
+        except Exception as exc:
+            raise Exception(f'Error buscando topics vinculados: {str(exc)}')
+
+    def rebuild_from_alerts(self):
+        """Recalcula el índice completo desde `mqtt_alerts` y `mqtt_alerts_archive`.
+
+        El resultado reemplaza la colección con `$out` (`$unionWith` requiere MongoDB 4.4+).
+
+        Retorna el número de topics con vecinos.
+        """
+        now = datetime.utcnow()
+        alerts = [
+            {'$match': {'topic': {'$type': 'string'}}},
+            {'$project': {'_id': 0, 'topic': 1, 'topics_otros_hardware': 1}},
+        ]
+        pipeline = alerts + [
+            # Las alertas archivadas también vinculan hardware
+            {'$unionWith': {'coll': ARCHIVE_COLLECTION, 'pipeline': alerts}},
+            {'$project': {
+                '_id': 0,
+                'members': {
+                    '$setDifference': [
+                        {'$setUnion': [['$topic'], {'$ifNull': ['$topics_otros_hardware', []]}]},
+                        [None, '']
+                    ]
+                }
+            }},
+            {'$match': {'members.1': {'$exists': True}}},
+            {'$project': {'members': 1, 'member': '$members'}},
+            {'$unwind': '$member'},
+            {'$group': {'_id': '$member', 'groups': {'$addToSet': '$members'}}},
+            {'$project': {
+                'peers': {
+                    '$setDifference': [
+                        {'$reduce': {
+                            'input': '$groups',
+                            'initialValue': [],
+                            'in': {'$setUnion': ['$$value', '$$this']}
+                        }},
+                        ['$_id']
+                    ]
+                },
+                'fecha_actualizacion': {'$literal': now}
+            }},
+            {'$out': self.collection.name}
+        ]
+        self.db.mqtt_alerts.aggregate(pipeline, allowDiskUse=True)
+        self.db.migrations.update_one(
+            {'_id': MIGRATION_ID},
+            {'$set': {'completed_at': datetime.utcnow()}},
+            upsert=True
+        )
+        self._built = True
+        return self.collection.estimated_document_count()
@@ -1,12 +1,24 @@
 from bson import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne
 from core.database import Database
 from models.hardware import Hardware
+from repositories.empresa_repository import EmpresaRepository
+from utils.change_tracking import VersionConflictError, versioned_update
+from utils.keyset import KEYSET_SORT, encode_cursor, keyset_condition
+from utils.search_keys import search_condition, search_page_pipeline, search_tokens
+from utils.tracing import trace_methods
 
+# Las claves de búsqueda solo se usan para filtrar; no viajan en los listados
+LISTING_PROJECTION = {'search_keys': 0, 'search_words': 0}
+
+
+@trace_methods
 class HardwareRepository:
     def __init__(self):
         self.db = Database().get_database()
         self.collection = self.db.hardware
+        self.empresa_repo = EmpresaRepository()
         self._create_indexes()
 
     def _create_indexes(self):
@@ -14,6 +26,13 @@ class HardwareRepository:
             self.collection.create_index([('nombre', 1)], unique=True)
             self.collection.create_index([('empresa_id', 1)])
             self.collection.create_index([('activa', 1)])
+            self.collection.create_index([('search_keys', 1)])
+            self.collection.create_index([('fecha_creacion', -1), ('_id', -1)])
+            self.collection.create_index([('empresa_id', 1), ('fecha_creacion', -1), ('_id', -1)])
+            self.collection.create_index([('topic', 1)])
+            self.collection.create_index([('physical_status.updated_at', 1)])
+            self.collection.create_index([('physical_status.estado', 1)])
+            self.collection.create_index([('physical_status.inactivado_en', 1)], sparse=True)
         except Exception as exc:
             # print(f'Error creando indices de hardware: {exc}')
             pass
@@ -83,61 +102,123 @@ class HardwareRepository:
         except Exception as exc:
             raise Exception(f'Error obteniendo hardware por empresa: {str(exc)}')
     
-    def find_with_filters(self, filters=None):
-        """Find hardware with optional filters"""
+    def _build_filter_query(self, filters, include_inactive=False):
+        """Compone los filtros con $and; retorna (query, palabras de búsqueda)"""
+        filters = filters or {}
+        conditions = []
+        if not include_inactive:
+            conditions.append({'activa': True})
+        elif filters.get('activa') is not None:
+            conditions.append({'activa': filters['activa']})
+
+        if filters.get('tipo'):
+            conditions.append({'tipo': filters['tipo']})
+
+        if filters.get('empresa_id'):
+            empresa_id = filters['empresa_id']
+            if isinstance(empresa_id, str):
+                empresa_id = ObjectId(empresa_id)
+            conditions.append({'empresa_id': empresa_id})
+
+        if filters.get('sede'):
+            conditions.append({'sede': filters['sede']})
+
+        # Búsqueda por prefijo en nombre, tipo, sede y marca/modelo (índice search_keys)
+        tokens = search_tokens(filters.get('search')) if filters.get('search') else []
+        if tokens:
+            conditions.append(search_condition(tokens))
+
+        # Status y stock pueden estar en datos o en datos.datos
+        if filters.get('status'):
+            status = filters['status']
+            conditions.append({'$or': [
+                {'datos.status': status},
+                {'datos.datos.status': status}
+            ]})
+
+        if filters.get('min_stock') is not None:
+            min_stock = filters['min_stock']
+            conditions.append({'$or': [
+                {'datos.stock': {'$gte': min_stock}},
+                {'datos.datos.stock': {'$gte': min_stock}}
+            ]})
+
+        if not conditions:
+            return {}, tokens
+        if len(conditions) == 1:
+            return conditions[0], tokens
+        return {'$and': conditions}, tokens
+
+    def search(self, filters=None, include_inactive=False, skip=0, limit=None):
+        """Busca hardware con filtros combinables.
+
+        Con término de búsqueda ordena por relevancia (palabras completas
+        primero) y luego por fecha de creación. Si se indica `limit` retorna
+        (hardware, total); si no, (hardware, None).
+        """
         try:
-            query = {'activa': True}
-            
-            if filters:
-                # Filter by type
-                if filters.get('tipo'):
-                    query['tipo'] = filters['tipo']
-                
-                # Filter by empresa
-                if filters.get('empresa_id'):
-                    empresa_id = filters['empresa_id']
-                    if isinstance(empresa_id, str):
-                        empresa_id = ObjectId(empresa_id)
-                    query['empresa_id'] = empresa_id
-                
-                # Filter by sede
-                if filters.get('sede'):
-                    query['sede'] = filters['sede']
-                
-                # Search in name (case insensitive)
-                if filters.get('search'):
-                    search_term = filters['search']
-                    query['$or'] = [
-                        {'nombre': {'$regex': search_term, '$options': 'i'}},
-                        {'tipo': {'$regex': search_term, '$options': 'i'}},
-                        {'sede': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.brand': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.model': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.datos.brand': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.datos.model': {'$regex': search_term, '$options': 'i'}}
-                    ]
-                
-                # Filter by status (in nested datos)
-                if filters.get('status'):
-                    status = filters['status']
-                    query['$or'] = [
-                        {'datos.status': status},
-                        {'datos.datos.status': status}
-                    ]
-                
-                # Filter by stock level
-                if filters.get('min_stock') is not None:
-                    min_stock = filters['min_stock']
-                    query['$or'] = [
-                        {'datos.stock': {'$gte': min_stock}},
-                        {'datos.datos.stock': {'$gte': min_stock}}
-                    ]
-            
-            cursor = self.collection.find(query).sort('fecha_creacion', -1)
-            return [Hardware.from_dict(d) for d in cursor]
+            query, tokens = self._build_filter_query(filters, include_inactive)
+            sort = {'fecha_creacion': -1}
+            if tokens:
+                cursor = self.collection.aggregate(search_page_pipeline(query, tokens, sort, skip, limit))
+            else:
+                cursor = self.collection.find(query, LISTING_PROJECTION).sort(list(sort.items()))
+                if skip:
+                    cursor = cursor.skip(skip)
+                if limit:
+                    cursor = cursor.limit(limit)
+            hardware = [Hardware.from_dict(d) for d in cursor]
+            total = self.collection.count_documents(query) if limit else None
+            return hardware, total
         except Exception as exc:
             raise Exception(f'Error filtrando hardware: {str(exc)}')
 
+    def find_page_after(self, filters=None, include_inactive=False, after=None, limit=50):
+        """Página por cursor ordenada por (fecha_creacion, _id) descendente.
+
+        `after` es el par (fecha_creacion, _id) decodificado del cursor. Retorna
+        (documentos, cursor siguiente o None si no hay más).
+        """
+        try:
+            query, tokens = self._build_filter_query(filters, include_inactive)
+            if tokens:
+                raise ValueError('La paginación por cursor no admite search; use page y limit')
+            if after is not None:
+                condition = keyset_condition(*after)
+                query = {'$and': [query, condition]} if query else condition
+            docs = list(
+                self.collection.find(query, LISTING_PROJECTION)
+                .sort(KEYSET_SORT)
+                .limit(limit + 1)
+            )
+            next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+            return docs[:limit], next_cursor
+        except ValueError:
+            raise
+        except Exception as exc:
+            raise Exception(f'Error paginando hardware: {str(exc)}')
+
+    def iter_documents(self, filters=None, include_inactive=False, batch_size=500):
+        """Cursor de documentos crudos para recorrer el listado completo por lotes"""
+        try:
+            query, tokens = self._build_filter_query(filters, include_inactive)
+            if tokens:
+                return self.collection.aggregate(
+                    search_page_pipeline(query, tokens, dict(KEYSET_SORT)),
+                    batchSize=batch_size
+                )
+            return (
+                self.collection.find(query, LISTING_PROJECTION)
+                .sort(KEYSET_SORT)
+                .batch_size(batch_size)
+            )
+        except Exception as exc:
+            raise Exception(f'Error recorriendo hardware: {str(exc)}')
+
+    def find_with_filters(self, filters=None):
+        """Find hardware with optional filters"""
+        return self.search(filters)[0]
+
     def find_all_including_inactive(self):
         """Find all hardware including inactive ones"""
         try:
@@ -158,62 +239,7 @@ class HardwareRepository:
 
     def find_with_filters_including_inactive(self, filters=None):
         """Find hardware with optional filters including inactive ones"""
-        try:
-            query = {}
-            
-            if filters:
-                # Filter by type
-                if filters.get('tipo'):
-                    query['tipo'] = filters['tipo']
-                
-                # Filter by empresa
-                if filters.get('empresa_id'):
-                    empresa_id = filters['empresa_id']
-                    if isinstance(empresa_id, str):
-                        empresa_id = ObjectId(empresa_id)
-                    query['empresa_id'] = empresa_id
-                
-                # Filter by sede
-                if filters.get('sede'):
-                    query['sede'] = filters['sede']
-                
-                # Filter by active status
-                if filters.get('activa') is not None:
-                    query['activa'] = filters['activa']
-                
-                # Search in name (case insensitive)
-                if filters.get('search'):
-                    search_term = filters['search']
-                    query['$or'] = [
-                        {'nombre': {'$regex': search_term, '$options': 'i'}},
-                        {'tipo': {'$regex': search_term, '$options': 'i'}},
-                        {'sede': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.brand': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.model': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.datos.brand': {'$regex': search_term, '$options': 'i'}},
-                        {'datos.datos.model': {'$regex': search_term, '$options': 'i'}}
-                    ]
-                
-                # Filter by status (in nested datos)
-                if filters.get('status'):
-                    status = filters['status']
-                    query['$or'] = [
-                        {'datos.status': status},
-                        {'datos.datos.status': status}
-                    ]
-                
-                # Filter by stock level
-                if filters.get('min_stock') is not None:
-                    min_stock = filters['min_stock']
-                    query['$or'] = [
-                        {'datos.stock': {'$gte': min_stock}},
-                        {'datos.datos.stock': {'$gte': min_stock}}
-                    ]
-            
-            cursor = self.collection.find(query).sort('fecha_creacion', -1)
-            return [Hardware.from_dict(d) for d in cursor]
-        except Exception as exc:
-            raise Exception(f'Error filtrando hardware (incluyendo inactivos): {str(exc)}')
+        return self.search(filters, include_inactive=True)[0]
 
     def find_by_topic_including_inactive(self, topic):
         """Find hardware by topic including inactive ones"""
@@ -237,10 +263,108 @@ class HardwareRepository:
         except Exception as exc:
             raise Exception(f'Error actualizando physical_status por topic: {str(exc)}')
 
+    def bulk_update_physical_status(self, full_updates, touches, now=None):
+        """Aplica heartbeats en un solo bulk_write y retorna cuántos documentos coincidieron.
+
+        `full_updates` es {topic: physical_status} y reescribe el estado completo;
+        `touches` es {topic: estado} y solo refresca `physical_status.updated_at`
+        si el estado guardado sigue siendo el mismo.
+        """
+        try:
+            now = now or datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {'topic': topic},
+                    {'$set': {'physical_status': physical_status, 'fecha_actualizacion': now}}
+                )
+                for topic, physical_status in full_updates.items()
+            ]
+            operations.extend(
+                UpdateOne(
+                    {'topic': topic, 'physical_status.estado': estado},
+                    {'$set': {'physical_status.updated_at': now}}
+                )
+                for topic, estado in touches.items()
+            )
+            if not operations:
+                return 0
+            result = self.collection.bulk_write(operations, ordered=False)
+            return result.matched_count
+        except Exception as exc:
+            raise Exception(f'Error actualizando physical_status por lotes: {str(exc)}')
+
+    def mark_stale_physical_status(self, cutoff, excluded_types=None, empresa_id=None, now=None):
+        """Marca como Inactivo, en un solo update_many, el hardware sin señal desde `cutoff`.
+
+        También cubre el hardware reportado como 'desactivado' y los
+        `updated_at` guardados como texto ISO por versiones anteriores.
+        Retorna los documentos afectados (_id, nombre, sede, empresa_id, topic).
+        """
+        try:
+            now = now or datetime.utcnow()
+            # MongoDB guarda milisegundos: se trunca para poder buscar por igualdad
+            now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+            query = {
+                'activa': True,
+                # El hardware que nunca reportó estado (sin physical_status o vacío) no está vencido
+                'physical_status.estado': {'$exists': True, '$ne': 'Inactivo'},
+                '$or': [
+                    {'physical_status.updated_at': {'$lt': cutoff}},
+                    {'physical_status.updated_at': {'$lt': cutoff.isoformat()}},
+                    {'physical_status.updated_at': None},
+                    {'physical_status.estado': {'$in': ['desactivado', 'Desactivado', 'DESACTIVADO']}}
+                ]
+            }
+            if excluded_types:
+                query['tipo'] = {'$nin': list(excluded_types)}
+            if empresa_id:
+                query['empresa_id'] = ObjectId(empresa_id) if isinstance(empresa_id, str) else empresa_id
+
+            result = self.collection.update_many(query, {
+                '$set': {
+                    'physical_status.estado': 'Inactivo',
+                    'physical_status.inactivado_en': now,
+                    'fecha_actualizacion': now
+                }
+            })
+            if not result.modified_count:
+                return []
+            cursor = self.collection.find(
+                {'physical_status.inactivado_en': now},
+                {'nombre': 1, 'sede': 1, 'empresa_id': 1, 'topic': 1}
+            )
+            return list(cursor)
+        except Exception as exc:
+            raise Exception(f'Error marcando hardware con status vencido: {str(exc)}')
+
+    def find_estados_by_topics(self, topics):
+        """Retorna {topic: estado} de los topics que existen"""
+        try:
+            cursor = self.collection.find(
+                {'topic': {'$in': list(topics)}},
+                {'_id': 0, 'topic': 1, 'physical_status.estado': 1}
+            )
+            return {
+                doc['topic']: (doc.get('physical_status') or {}).get('estado')
+                for doc in cursor
+            }
+        except Exception as exc:
+            raise Exception(f'Error buscando estados por topic: {str(exc)}')
+
+    def find_topics_by_empresa(self, empresa_id):
+        """Retorna los topics del hardware de una empresa"""
+        try:
+            if isinstance(empresa_id, str):
+                empresa_id = ObjectId(empresa_id)
+            cursor = self.collection.find({'empresa_id': empresa_id}, {'_id': 0, 'topic': 1})
+            return [doc['topic'] for doc in cursor if doc.get('topic')]
+        except Exception as exc:
+            raise Exception(f'Error buscando topics por empresa: {str(exc)}')
+
     def update_physical_status_by_empresa_hardware(self, empresa_nombre, hardware_nombre, physical_status):
         """Update physical_status by empresa nombre and hardware nombre"""
         try:
-            empresa = self.db.empresas.find_one({'nombre': empresa_nombre})
+            empresa = self.empresa_repo.get_cached_document_by_nombre(empresa_nombre, include_inactive=True)
             if not empresa:
                 return None
 
@@ -281,13 +405,11 @@ class HardwareRepository:
             if isinstance(hardware_id, str):
                 hardware_id = ObjectId(hardware_id)
             hardware.update_timestamp()
-            hw_dict = hardware.to_dict()
-            hw_dict.pop('_id', None)
-            # Remove activa filter from update query to allow updating inactive hardware
-            result = self.collection.update_one({'_id': hardware_id}, {'$set': hw_dict})
-            if result.matched_count > 0:
-                return self.find_by_id_including_inactive(hardware_id)
-            return None
+            # Solo los campos modificados; sin filtro de activa para permitir actualizar hardware inactivo
+            updated = versioned_update(self.collection, hardware_id, hardware)
+            return Hardware.from_dict(updated) if updated else None
+        except VersionConflictError:
+            raise
         except Exception as exc:
             raise Exception(f'Error actualizando hardware: {str(exc)}')
 
@@ -2,7 +2,9 @@ from bson import ObjectId
 from datetime import datetime
 from core.database import Database
 from models.hardware_type import HardwareType
+from utils.tracing import trace_methods
 
+@trace_methods
 class HardwareTypeRepository:
     def __init__(self):
         self.collection = Database().get_database().hardware_types
@@ -0,0 +1,145 @@
+from core.database import Database
+from bson import ObjectId
+from datetime import datetime
+import copy
+import hashlib
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
+
+from utils.tracing import trace_methods
+
+ARCHIVE_COLLECTION = 'mqtt_alerts_archive'
+
+# Campos de la alerta que pueden traer una imagen embebida (base64)
+IMAGE_PATHS = (
+    ('image_alert',),
+    ('data', 'image_alert'),
+    ('data', 'tipo_alarma_detalle', 'imagen_base64'),
+)
+IMAGE_REF_KEY = 'archive_image_ref'
+# Los valores más cortos (URLs) se conservan en el documento archivado
+MIN_IMAGE_LENGTH = 512
+
+
+def _get_path(doc, path):
+    for key in path[:-1]:
+        doc = doc.get(key) if isinstance(doc, dict) else None
+        if doc is None:
+            return None, None
+    if not isinstance(doc, dict):
+        return None, None
+    return doc, doc.get(path[-1])
+
+
+def extract_images(doc):
+    """Reemplaza las imágenes embebidas por referencias.
+
+    Modifica `doc` y retorna {sha256: imagen}. Las imágenes se guardan una
+    sola vez: las alertas de un mismo tipo comparten la imagen del catálogo.
+    """
+    images = {}
+    for path in IMAGE_PATHS:
+        parent, value = _get_path(doc, path)
+        if not isinstance(value, str) or len(value) < MIN_IMAGE_LENGTH:
+            continue
+        digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+        images[digest] = value
+        parent[path[-1]] = {IMAGE_REF_KEY: digest}
+    return images
+
+
+@trace_methods
+class MqttAlertArchiveRepository:
+    """Alertas desactivadas hace tiempo, fuera de la colección caliente.
+
+    `mqtt_alerts_archive` guarda el documento con las imágenes reemplazadas
+    por referencias a `mqtt_alerts_archive_images` (una entrada por imagen
+    distinta). Las lecturas devuelven el documento con las imágenes restauradas.
+    """
+
+    def __init__(self):
+        self.db = Database().get_database()
+        self.collection = self.db[ARCHIVE_COLLECTION]
+        self.images = self.db.mqtt_alerts_archive_images
+        self._create_indexes()
+
+    def _create_indexes(self):
+        try:
+            self.collection.create_index([("empresa_id", 1), ("fecha_creacion", -1)])
+            self.collection.create_index([("fecha_creacion", -1)])
+        except Exception:
+            pass
+
+    def archive_documents(self, docs):
+        """Copia al archivo los documentos (idempotente: reintentar un lote no duplica)"""
+        images = {}
+        operations = []
+        archived_at = datetime.utcnow()
+        for doc in docs:
+            archived = copy.deepcopy(doc)
+            images.update(extract_images(archived))
+            archived['archivado_en'] = archived_at
+            operations.append(ReplaceOne({'_id': archived['_id']}, archived, upsert=True))
+        if images:
+            self.images.bulk_write([
+                UpdateOne({'_id': digest}, {'$setOnInsert': {'imagen': image, 'fecha_creacion': archived_at}}, upsert=True)
+                for digest, image in images.items()
+            ], ordered=False)
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+        return len(operations)
+
+    def remove_documents(self, alert_ids):
+        """Quita del archivo alertas que siguen en la colección caliente"""
+        if not alert_ids:
+            return 0
+        result = self.collection.bulk_write([DeleteOne({'_id': alert_id}) for alert_id in alert_ids], ordered=False)
+        return result.deleted_count
+
+    def _restore_images(self, docs):
+        refs = set()
+        for doc in docs:
+            for path in IMAGE_PATHS:
+                _, value = _get_path(doc, path)
+                if isinstance(value, dict) and IMAGE_REF_KEY in value:
+                    refs.add(value[IMAGE_REF_KEY])
+        if not refs:
+            return docs
+        images = {item['_id']: item.get('imagen') for item in self.images.find({'_id': {'$in': list(refs)}})}
+        for doc in docs:
+            for path in IMAGE_PATHS:
+                parent, value = _get_path(doc, path)
+                if isinstance(value, dict) and IMAGE_REF_KEY in value:
+                    parent[path[-1]] = images.get(value[IMAGE_REF_KEY])
+        return docs
+
+    def find_by_id(self, alert_id, projection=None):
+        """Documento archivado con sus imágenes, o None"""
+        doc = self.collection.find_one({'_id': ObjectId(str(alert_id))}, projection)
+        if not doc:
+            return None
+        return self._restore_images([doc])[0]
+
+    def exists(self, alert_id):
+        return self.collection.count_documents({'_id': ObjectId(str(alert_id))}, limit=1) > 0
+
+    def find_by_ids(self, alert_ids):
+        """{_id: documento} de los ids archivados, con una sola consulta de imágenes"""
+        if not alert_ids:
+            return {}
+        docs = list(self.collection.find({'_id': {'$in': list(alert_ids)}}))
+        return {doc['_id']: doc for doc in self._restore_images(docs)}
+
+    def rank(self, query, limit):
+        """(_id, fecha_creacion) de las primeras `limit` alertas por fecha descendente"""
+        cursor = self.collection.find(query, {'fecha_creacion': 1}).sort('fecha_creacion', -1).limit(limit)
+        return [(doc['_id'], doc.get('fecha_creacion')) for doc in cursor]
+
+    def count(self, query):
+        return self.collection.count_documents(query)
+
+    def aggregate(self, pipeline):
+        return list(self.collection.aggregate(pipeline))
+
+    def delete(self, alert_id):
+        result = self.collection.delete_one({'_id': ObjectId(str(alert_id))})
+        return result.deleted_count > 0
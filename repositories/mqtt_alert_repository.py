@@ -1,16 +1,61 @@
 from core.database import Database
 from models.mqtt_alert import MqttAlert
+from repositories.hardware_link_repository import HardwareLinkRepository
+from repositories.empresa_repository import EmpresaRepository
+from repositories.mqtt_alert_archive_repository import MqttAlertArchiveRepository
 from bson import ObjectId
 from datetime import datetime
+from pymongo import ReturnDocument
 
+from utils.change_tracking import VersionConflictError, versioned_update
 from utils.role_utils import sanitize_roles, normalize_role_name
+from utils.alert_stream import (
+    get_alert_stream_broker,
+    EVENT_CREATED,
+    EVENT_UPDATED,
+    EVENT_DEACTIVATED,
+    EVENT_RECIPIENT_STATUS
+)
+from utils.tracing import trace_methods
 
+@trace_methods
 class MqttAlertRepository:
     """Repositorio para operaciones de alertas MQTT"""
     
     def __init__(self):
         self.db = Database().get_database()
         self.collection = self.db.mqtt_alerts
+        self.link_repo = HardwareLinkRepository()
+        self.empresa_repo = EmpresaRepository()
+        self.archive_repo = MqttAlertArchiveRepository()
+        self._create_indexes()
+    
+    def _create_indexes(self):
+        """Crea los índices necesarios para consultas por empresa y por destinatario"""
+        try:
+            self.collection.create_index([("empresa_id", 1), ("activo", 1), ("fecha_creacion", -1)])
+            self.collection.create_index([("empresa_id", 1), ("sede_key", 1), ("activo", 1), ("fecha_creacion", -1)])
+            # Índice multikey: alertas en las que participa un destinatario
+            self.collection.create_index([("numeros_telefonicos.usuario_id", 1), ("activo", 1)])
+            # Recorrido de scripts/archive_alerts.py
+            self.collection.create_index([("activo", 1), ("_id", 1)])
+        except Exception:
+            pass
+    
+    def _link_topics(self, topic, topics_otros_hardware):
+        """Registra los topics de la alerta en hardware_links sin afectar la operación principal"""
+        try:
+            self.link_repo.add_alert_links(topic, topics_otros_hardware)
+        except Exception:
+            # Un vínculo perdido se recupera con scripts/rebuild_hardware_links.py
+            pass
+    
+    @staticmethod
+    def _to_object_id(value):
+        """Convierte un id (str u ObjectId) a ObjectId"""
+        if isinstance(value, ObjectId):
+            return value
+        return ObjectId(str(value))
     
     def create_alert(self, alert):
         """Crea una nueva alerta MQTT"""
@@ -18,6 +63,8 @@ class MqttAlertRepository:
             alert.normalize_data()
             result = self.collection.insert_one(alert.to_dict())
             alert._id = result.inserted_id
+            self._link_topics(alert.topic, alert.topics_otros_hardware)
+            get_alert_stream_broker().publish(EVENT_CREATED, alert.to_dict())
             return alert
         except Exception as e:
             # print(f"Error creando alerta MQTT: {e}")
@@ -34,6 +81,9 @@ class MqttAlertRepository:
             # print(f"🔍 Ejecutando query en MongoDB...")
             alert_data = self.collection.find_one({'_id': object_id})
             # print(f"📄 Datos obtenidos de MongoDB: {alert_data}")
+            if not alert_data:
+                # Alertas desactivadas hace tiempo viven en el archivo
+                alert_data = self.archive_repo.find_by_id(object_id)
             
             if alert_data:
                 # print(f"✅ Datos encontrados, creando objeto MqttAlert...")
@@ -49,6 +99,14 @@ class MqttAlertRepository:
             traceback.print_exc()
             return None
     
+    def _publish_local(self, alert_id, event_type, modified_count):
+        """Publica el estado actual de la alerta cuando el stream funciona en modo local"""
+        broker = get_alert_stream_broker()
+        if not modified_count or not broker.publishes_locally:
+            return
+        alert_data = self.collection.find_one({'_id': ObjectId(alert_id)})
+        broker.publish(event_type, alert_data)
+    
     def get_all_alerts(self, page=1, limit=50):
         """Obtiene todas las alertas con paginación"""
         try:
@@ -61,11 +119,11 @@ class MqttAlertRepository:
             # print(f"Error obteniendo alertas: {e}")
             return [], 0
     
-    def get_alerts_by_empresa(self, empresa_nombre, page=1, limit=50):
+    def get_alerts_by_empresa(self, empresa_id, page=1, limit=50):
         """Obtiene alertas por empresa"""
         try:
             skip = (page - 1) * limit
-            query = {'empresa_nombre': empresa_nombre}
+            query = {'empresa_id': self._to_object_id(empresa_id)}
             alerts_data = self.collection.find(query).sort('fecha_creacion', -1).skip(skip).limit(limit)
             alerts = [MqttAlert.from_dict(alert_data) for alert_data in alerts_data]
             total = self.collection.count_documents(query)
@@ -74,11 +132,11 @@ class MqttAlertRepository:
             # print(f"Error obteniendo alertas por empresa: {e}")
             return [], 0
     
-    def get_alerts_by_sede(self, empresa_nombre, sede, page=1, limit=50):
+    def get_alerts_by_sede(self, empresa_id, sede, page=1, limit=50):
         """Obtiene alertas por empresa y sede"""
         try:
             skip = (page - 1) * limit
-            query = {'empresa_nombre': empresa_nombre, 'sede': sede}
+            query = {'empresa_id': self._to_object_id(empresa_id), 'sede_key': MqttAlert.build_sede_key(sede)}
             alerts_data = self.collection.find(query).sort('fecha_creacion', -1).skip(skip).limit(limit)
             alerts = [MqttAlert.from_dict(alert_data) for alert_data in alerts_data]
             total = self.collection.count_documents(query)
@@ -113,15 +171,40 @@ class MqttAlertRepository:
             # print(f"Error obteniendo alertas no autorizadas: {e}")
             return [], 0
     
+    def _find_with_archive(self, query, page, limit):
+        """Pagina `query` sobre la colección caliente y el archivo como si fueran una sola.
+
+        Primero se ordenan solo `_id` y `fecha_creacion` de las dos colecciones,
+        luego se leen completos únicamente los documentos de la página.
+        """
+        skip = (page - 1) * limit
+        window = skip + limit
+        hot = [
+            (doc['_id'], doc.get('fecha_creacion'), False)
+            for doc in self.collection.find(query, {'fecha_creacion': 1}).sort('fecha_creacion', -1).limit(window)
+        ]
+        # Mientras un lote se archiva, la alerta puede estar en ambas colecciones
+        hot_seen = {alert_id for alert_id, _, _ in hot}
+        archived = [
+            (alert_id, fecha, True)
+            for alert_id, fecha in self.archive_repo.rank(query, window)
+            if alert_id not in hot_seen
+        ]
+        ranked = sorted(hot + archived, key=lambda item: item[1] or datetime.min, reverse=True)[skip:window]
+
+        hot_ids = [alert_id for alert_id, _, is_archived in ranked if not is_archived]
+        archived_ids = [alert_id for alert_id, _, is_archived in ranked if is_archived]
+        documents = {doc['_id']: doc for doc in self.collection.find({'_id': {'$in': hot_ids}})} if hot_ids else {}
+        documents.update(self.archive_repo.find_by_ids(archived_ids))
+
+        alerts = [MqttAlert.from_dict(documents[alert_id]) for alert_id, _, _ in ranked if alert_id in documents]
+        total = self.collection.count_documents(query) + self.archive_repo.count(query)
+        return alerts, total
+    
     def get_inactive_alerts(self, page=1, limit=50):
         """Obtiene alertas desactivadas/inactivas"""
         try:
-            skip = (page - 1) * limit
-            query = {'activo': False}
-            alerts_data = self.collection.find(query).sort('fecha_creacion', -1).skip(skip).limit(limit)
-            alerts = [MqttAlert.from_dict(alert_data) for alert_data in alerts_data]
-            total = self.collection.count_documents(query)
-            return alerts, total
+            return self._find_with_archive({'activo': False}, page, limit)
         except Exception as e:
             # print(f"Error obteniendo alertas inactivas: {e}")
             return [], 0
@@ -129,118 +212,198 @@ class MqttAlertRepository:
     def get_inactive_alerts_by_empresa(self, empresa_id, page=1, limit=50):
         """Obtiene alertas desactivadas/inactivas por empresa específica"""
         try:
-            print(f"🔍 DEBUG repo.get_inactive_alerts_by_empresa:")
-            print(f"  - empresa_id: {empresa_id}")
-            print(f"  - page: {page}, limit: {limit}")
-            
-            skip = (page - 1) * limit
-            
-            # Primero buscar la empresa por ID para obtener su nombre
-            empresa = self.db.empresas.find_one({'_id': ObjectId(empresa_id)})
-            if not empresa:
-                print(f"  ❌ Empresa no encontrada con ID: {empresa_id}")
-                return [], 0
-            
-            empresa_nombre = empresa['nombre']
-            print(f"  ✅ Empresa encontrada: {empresa_nombre}")
-            
-            # Buscar alertas por empresa_nombre y activo=False
-            query = {'empresa_nombre': empresa_nombre, 'activo': False}
-            print(f"  🔍 Query MongoDB: {query}")
-            print(f"  🔍 Skip: {skip}, Limit: {limit}")
-            
-            alerts_data = self.collection.find(query).sort('fecha_creacion', -1).skip(skip).limit(limit)
-            alerts_list = list(alerts_data)  # Convertir cursor a lista
-            print(f"  📊 Documentos encontrados: {len(alerts_list)}")
-            
-            alerts = []
-            for i, alert_data in enumerate(alerts_list):
-                try:
-                    alert_obj = MqttAlert.from_dict(alert_data)
-                    alerts.append(alert_obj)
-                    if i == 0:  # Solo mostrar la primera para debug
-                        print(f"  📄 Primera alerta: ID={alert_obj._id}, activo={alert_obj.activo}")
-                except Exception as e:
-                    print(f"  ⚠️ Error convirtiendo alerta {i}: {e}")
-            
-            total = self.collection.count_documents(query)
-            print(f"  📊 Total en DB: {total}, Convertidos a objetos: {len(alerts)}")
-            
-            return alerts, total
+            query = {'empresa_id': self._to_object_id(empresa_id), 'activo': False}
+            return self._find_with_archive(query, page, limit)
         except Exception as e:
             # print(f"Error obteniendo alertas inactivas por empresa: {e}")
             return [], 0
     
     def update_alert(self, alert_id, alert):
-        """Actualiza una alerta"""
+        """Actualiza una alerta escribiendo solo los campos modificados.
+
+        Lanza VersionConflictError si la alerta cambió desde que se leyó
+        (por ejemplo, un destinatario actualizó su estado).
+        """
         try:
             alert.normalize_data()
             alert.update_timestamp()
-            update_data = alert.to_dict()
-            del update_data['_id']  # No actualizar el ID
-            
-            result = self.collection.update_one(
-                {'_id': ObjectId(alert_id)},
-                {'$set': update_data}
-            )
-            return result.modified_count > 0
+            updated = versioned_update(self.collection, ObjectId(alert_id), alert)
+            if updated:
+                alert.version = updated.get('version')
+                self._link_topics(updated.get('topic'), updated.get('topics_otros_hardware'))
+                get_alert_stream_broker().publish(
+                    EVENT_UPDATED if updated.get('activo') else EVENT_DEACTIVATED,
+                    updated
+                )
+            return updated is not None
+        except VersionConflictError:
+            raise
         except Exception as e:
             # print(f"Error actualizando alerta: {e}")
             return False
     
+    # Ciclo de vida: creada -> autorizada -> desactivada. Cada transición es una
+    # actualización condicional sobre el estado actual que devuelve el documento final.
+    LIFECYCLE_NOT_FOUND = 'not_found'
+    LIFECYCLE_INACTIVE = 'inactive'
+    LIFECYCLE_ALREADY_AUTHORIZED = 'already_authorized'
+    LIFECYCLE_ALREADY_DEACTIVATED = 'already_deactivated'
+    # Las alertas archivadas son de solo lectura (scripts/archive_alerts.py)
+    LIFECYCLE_ARCHIVED = 'archived'
+    LIFECYCLE_FORBIDDEN = 'forbidden'
+    
+    # Campos pesados que no se devuelven en las transiciones
+    _LIFECYCLE_PROJECTION = {'image_alert': 0, 'data': 0}
+    
     def authorize_alert(self, alert_id, usuario_id):
-        """Autoriza una alerta"""
+        """Autoriza una alerta activa que aún no está autorizada.
+
+        Retorna (documento, None) o (None, motivo) con motivo en LIFECYCLE_*.
+        """
         try:
-            result = self.collection.update_one(
-                {'_id': ObjectId(alert_id)},
+            now = datetime.utcnow()
+            object_id = ObjectId(alert_id)
+            updated = self.collection.find_one_and_update(
+                {'_id': object_id, 'activo': {'$ne': False}, 'autorizado': {'$ne': True}},
                 {
                     '$set': {
                         'autorizado': True,
                         'usuario_autorizador': ObjectId(usuario_id) if usuario_id else None,
-                        'fecha_autorizacion': datetime.utcnow(),
-                        'fecha_actualizacion': datetime.utcnow()
-                    }
-                }
+                        'fecha_autorizacion': now,
+                        'fecha_actualizacion': now
+                    },
+                    '$inc': {'version': 1}
+                },
+                projection=self._LIFECYCLE_PROJECTION,
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0
+            if updated:
+                get_alert_stream_broker().publish(EVENT_UPDATED, updated)
+                return updated, None
+            
+            current = self.collection.find_one({'_id': object_id}, {'activo': 1, 'autorizado': 1})
+            if not current:
+                if self.archive_repo.exists(object_id):
+                    return None, self.LIFECYCLE_ARCHIVED
+                return None, self.LIFECYCLE_NOT_FOUND
+            if not current.get('activo', True):
+                return None, self.LIFECYCLE_INACTIVE
+            return None, self.LIFECYCLE_ALREADY_AUTHORIZED
         except Exception as e:
             # print(f"Error autorizando alerta: {e}")
-            return False
+            return None, str(e)
     
     def toggle_alert_status(self, alert_id):
-        """Alterna el estado activo de una alerta"""
+        """Alterna el estado activo de una alerta en una sola actualización (pipeline).
+
+        Retorna el documento actualizado o None si la alerta no existe o está
+        archivada (ver `is_archived`).
+        """
         try:
-            alert = self.get_alert_by_id(alert_id)
-            if not alert:
-                return False
-            
-            new_status = not alert.activo
-            result = self.collection.update_one(
+            now = datetime.utcnow()
+            was_active = {'$ifNull': ['$activo', True]}
+            updated = self.collection.find_one_and_update(
                 {'_id': ObjectId(alert_id)},
-                {
+                [{
                     '$set': {
-                        'activo': new_status,
-                        'fecha_actualizacion': datetime.utcnow()
+                        'activo': {'$not': [was_active]},
+                        'fecha_desactivacion': {'$cond': [was_active, now, None]},
+                        'fecha_actualizacion': now,
+                        'version': {'$add': [{'$ifNull': ['$version', 0]}, 1]}
                     }
-                }
+                }],
+                projection=self._LIFECYCLE_PROJECTION,
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0
+            if updated:
+                get_alert_stream_broker().publish(
+                    EVENT_UPDATED if updated.get('activo') else EVENT_DEACTIVATED,
+                    updated
+                )
+            return updated
         except Exception as e:
             # print(f"Error cambiando estado de alerta: {e}")
-            return False
+            return None
+    
+    def deactivate_alert(self, alert_id, desactivado_por_id, desactivado_por_tipo,
+                         mensaje_desactivacion=None, empresa=None):
+        """Desactiva una alerta activa registrando quién la desactivó.
+
+        Si se indica `empresa`, la alerta debe pertenecerle (por `empresa_id`, o
+        por nombre en alertas antiguas sin `empresa_id`). Retorna (documento, None)
+        o (documento_actual, motivo) con motivo en LIFECYCLE_*; el documento actual
+        es None si la alerta no existe.
+        """
+        now = datetime.utcnow()
+        object_id = ObjectId(alert_id)
+        query = {'_id': object_id, 'activo': {'$ne': False}}
+        if empresa is not None:
+            query['$or'] = [
+                {'empresa_id': empresa._id},
+                {'empresa_id': {'$exists': False}, 'empresa_nombre': empresa.nombre}
+            ]
+        
+        updated = self.collection.find_one_and_update(
+            query,
+            {
+                '$set': {
+                    'activo': False,
+                    'fecha_desactivacion': now,
+                    'fecha_actualizacion': now,
+                    'mensaje_desactivacion': mensaje_desactivacion,
+                    'desactivado_por': {
+                        'id': desactivado_por_id,
+                        'tipo': desactivado_por_tipo,
+                        'fecha_desactivacion': now.isoformat()
+                    }
+                },
+                '$inc': {'version': 1}
+            },
+            projection=self._LIFECYCLE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if updated:
+            get_alert_stream_broker().publish(EVENT_DEACTIVATED, updated)
+            return updated, None
+        
+        current = self.collection.find_one({'_id': object_id}, self._LIFECYCLE_PROJECTION)
+        if not current:
+            # Solo se archivan alertas desactivadas
+            current = self.archive_repo.find_by_id(object_id, self._LIFECYCLE_PROJECTION)
+            if current:
+                return current, self.LIFECYCLE_ALREADY_DEACTIVATED
+            return None, self.LIFECYCLE_NOT_FOUND
+        if not current.get('activo', True):
+            return current, self.LIFECYCLE_ALREADY_DEACTIVATED
+        return current, self.LIFECYCLE_FORBIDDEN
     
+    def is_archived(self, alert_id):
+        """True si la alerta está en el archivo (no en la colección caliente)"""
+        try:
+            return self.archive_repo.exists(alert_id)
+        except Exception:
+            return False
+
     def delete_alert(self, alert_id):
         """Elimina una alerta"""
         try:
             result = self.collection.delete_one({'_id': ObjectId(alert_id)})
-            return result.deleted_count > 0
+            if result.deleted_count > 0:
+                return True
+            return self.archive_repo.delete(alert_id)
         except Exception as e:
             # print(f"Error eliminando alerta: {e}")
             return False
     
     def update_user_status_in_alert(self, alert_id, usuario_id, updates):
         """
-        Actualiza el estado de un usuario en la lista de numeros_telefonicos de una alerta.
+        Actualiza el estado de un destinatario de `numeros_telefonicos` en una sola operación.
+
+        El filtro por `numeros_telefonicos.usuario_id` valida la existencia del
+        destinatario en la misma consulta y la proyección devuelve solo ese
+        destinatario y la versión de la alerta, sin releer el documento completo.
+        Con `arrayFilters` se actualizan todas las entradas del usuario, como antes,
+        si está repetido en la lista.
         """
         try:
             # Filtrar solo las llaves permitidas para actualizar
@@ -250,37 +413,61 @@ class MqttAlertRepository:
             if not update_fields:
                 return None, "No valid fields to update"
 
-            result = self.collection.update_one(
-                {'_id': ObjectId(alert_id)},
-                {'$set': update_fields},
-                array_filters=[{'elem.usuario_id': usuario_id}]
+            update_fields['fecha_actualizacion'] = datetime.utcnow()
+            object_id = ObjectId(alert_id)
+            recipient_projection = {'$elemMatch': {'usuario_id': usuario_id}}
+
+            updated = self.collection.find_one_and_update(
+                {'_id': object_id, 'numeros_telefonicos.usuario_id': usuario_id},
+                {'$set': update_fields, '$inc': {'version': 1}},
+                array_filters=[{'elem.usuario_id': usuario_id}],
+                projection={
+                    'numeros_telefonicos': recipient_projection,
+                    'version': 1,
+                    'fecha_actualizacion': 1
+                },
+                return_document=ReturnDocument.AFTER
             )
 
-            if result.modified_count > 0:
-                return self.get_alert_by_id(alert_id), None
-            else:
-                # Check if the alert and user exist
-                alert = self.collection.find_one({'_id': ObjectId(alert_id)})
-                if not alert:
-                    return None, "Alert not found"
-                
-                user_in_alert = any(user['usuario_id'] == usuario_id for user in alert.get('numeros_telefonicos', []))
-                if not user_in_alert:
-                    return None, "User not found in this alert"
-                
-                return None, "No changes were made"
+            if updated:
+                self._publish_local(object_id, EVENT_RECIPIENT_STATUS, 1)
+                recipients = updated.get('numeros_telefonicos') or []
+                return {
+                    'alert_id': str(updated['_id']),
+                    'version': updated.get('version'),
+                    'fecha_actualizacion': updated.get('fecha_actualizacion'),
+                    'recipient': recipients[0] if recipients else None
+                }, None
+
+            # Distinguir alerta inexistente de destinatario ausente (consulta por _id)
+            alert = self.collection.find_one(
+                {'_id': object_id},
+                {'numeros_telefonicos': recipient_projection}
+            )
+            if not alert:
+                return None, "Alert not found"
+            if not alert.get('numeros_telefonicos'):
+                return None, "User not found in this alert"
+            return None, "No changes were made"
 
         except Exception as e:
             # print(f"Error updating user status in alert: {e}")
             return None, str(e)
 
     def get_alerts_stats(self):
-        """Obtiene estadísticas de alertas"""
+        """Obtiene estadísticas de alertas, incluidas las archivadas"""
         try:
-            total = self.collection.count_documents({})
-            active = self.collection.count_documents({'activo': True})
-            authorized = self.collection.count_documents({'autorizado': True})
-            unauthorized = self.collection.count_documents({'autorizado': False})
+            # Un solo $group por colección en vez de un conteo por cifra
+            pipeline = [{'$group': {
+                '_id': '$autorizado',
+                'total': {'$sum': 1},
+                'activas': {'$sum': {'$cond': [{'$eq': ['$activo', True]}, 1, 0]}}
+            }}]
+            rows = list(self.collection.aggregate(pipeline)) + self.archive_repo.aggregate(pipeline)
+            total = sum(row['total'] for row in rows)
+            active = sum(row['activas'] for row in rows)
+            authorized = sum(row['total'] for row in rows if row['_id'] is True)
+            unauthorized = sum(row['total'] for row in rows if row['_id'] is False)
             
             return {
                 'total': total,
@@ -299,11 +486,43 @@ class MqttAlertRepository:
                 'unauthorized': 0
             }
     
+    def get_empresa_alerts_stats(self, empresa_id, since):
+        """Conteos de alertas de una empresa (activas y archivadas) por prioridad.
+
+        Retorna {prioridad: {'total', 'activas', 'recientes'}}, donde
+        `recientes` son las creadas desde `since`.
+        """
+        pipeline = [
+            {'$match': {'empresa_id': self._to_object_id(empresa_id)}},
+            {'$group': {
+                '_id': {'$toLower': {'$ifNull': ['$prioridad', 'media']}},
+                'total': {'$sum': 1},
+                'activas': {'$sum': {'$cond': [{'$eq': ['$activo', True]}, 1, 0]}},
+                'recientes': {'$sum': {'$cond': [{'$gte': ['$fecha_creacion', since]}, 1, 0]}}
+            }}
+        ]
+        stats = {}
+        for row in list(self.collection.aggregate(pipeline)) + self.archive_repo.aggregate(pipeline):
+            current = stats.setdefault(row['_id'], {'total': 0, 'activas': 0, 'recientes': 0})
+            for key in current:
+                current[key] += row[key]
+        return stats
+
+    @staticmethod
+    def _sede_valida(empresa, sede):
+        sedes = empresa.get('sedes')
+        return not isinstance(sedes, list) or sede in sedes
+
     def verify_empresa_sede_exists(self, empresa_nombre, sede):
         """Verifica si existe una empresa con la sede especificada"""
         try:
-            # Buscar en la colección de empresas
-            empresa = self.db.empresas.find_one({'nombre': empresa_nombre})
+            # Buscar la empresa (cache del worker, igualdad con la collation del índice)
+            empresa = self.empresa_repo.get_cached_document_by_nombre(empresa_nombre, include_inactive=True)
+            if not empresa or not self._sede_valida(empresa, sede):
+                # La cache puede ser anterior a una empresa o sede creada en otro worker
+                empresa = self.empresa_repo.get_cached_document_by_nombre(
+                    empresa_nombre, include_inactive=True, refresh=True
+                )
             if not empresa:
                 return False, "Empresa no encontrada"
             
@@ -320,11 +539,18 @@ class MqttAlertRepository:
             # print(f"Error verificando empresa y sede: {e}")
             return False, "Error en la verificación"
     
-    def get_users_by_empresa_sede(self, empresa_nombre, sede):
-        """Obtiene usuarios por empresa y sede"""
+    def get_users_by_empresa_sede(self, empresa_nombre=None, sede=None, empresa_id=None, empresa_data=None):
+        """Obtiene usuarios por empresa y sede.
+
+        Prefiere `empresa_data` (documento ya cargado) o `empresa_id`; el nombre
+        solo se usa para compatibilidad con alertas antiguas sin `empresa_id`.
+        """
         try:
-            # Buscar la empresa primero
-            empresa = self.db.empresas.find_one({'nombre': empresa_nombre})
+            empresa = empresa_data
+            if not empresa and empresa_id:
+                empresa = self.empresa_repo.get_cached_document(empresa_id, include_inactive=True)
+            if not empresa and empresa_nombre:
+                empresa = self.empresa_repo.get_cached_document_by_nombre(empresa_nombre, include_inactive=True)
             if not empresa:
                 return []
             
@@ -403,7 +629,7 @@ class MqttAlertRepository:
             sede = hardware_data.get('sede')
             
             # Buscar empresa
-            empresa = self.db.empresas.find_one({'_id': empresa_id})
+            empresa = self.empresa_repo.get_cached_document(empresa_id, include_inactive=True)
             if not empresa:
                 return {
                     'hardware_exists': True,
@@ -422,7 +648,7 @@ class MqttAlertRepository:
             # Obtener usuarios
             usuarios = []
             if sede_exists:
-                usuarios = self.get_users_by_empresa_sede(empresa['nombre'], sede)
+                usuarios = self.get_users_by_empresa_sede(sede=sede, empresa_data=empresa)
             
             return {
                 'hardware_exists': True,
@@ -475,17 +701,7 @@ class MqttAlertRepository:
         """Obtiene alertas activas por empresa y sede"""
         try:
             skip = (page - 1) * limit
-            
-            # Primero buscar la empresa por ID para obtener su nombre
-            empresa = self.db.empresas.find_one({'_id': ObjectId(empresa_id)})
-            if not empresa:
-                # print(f"Empresa no encontrada con ID: {empresa_id}")
-                return [], 0
-            
-            empresa_nombre = empresa['nombre']
-            
-            # Buscar alertas por empresa_nombre y activo=True
-            query = {'empresa_nombre': empresa_nombre, 'activo': True}
+            query = {'empresa_id': self._to_object_id(empresa_id), 'activo': True}
             alerts_data = self.collection.find(query).sort('fecha_creacion', -1).skip(skip).limit(limit)
             alerts = [MqttAlert.from_dict(alert_data) for alert_data in alerts_data]
             total = self.collection.count_documents(query)
@@ -1,15 +1,75 @@
+from core.config import Config
 from core.database import Database
 from datetime import datetime, timedelta
+from threading import Lock
+import time
 from bson import ObjectId
+from pymongo import ReturnDocument
 import logging
+from utils.ttl_cache import TTLCache
+from utils.tracing import trace_methods
 
 logger = logging.getLogger(__name__)
 
+# Sesiones ya validadas en este worker: ('jti', jti) -> sesión y
+# ('client', user_id, huella) -> expires_at. Solo se guardan resultados positivos.
+_session_cache = TTLCache(
+    maxsize=Config.SESSION_CACHE_SIZE,
+    ttl_seconds=Config.SESSION_CACHE_TTL_SECONDS
+)
+
+# Cada revocación incrementa un contador global en `session_revocations` y
+# agrega el usuario afectado a `revoked` (las últimas SESSION_REVOCATION_LOG_SIZE).
+# Los workers lo consultan cada SESSION_REVOCATION_POLL_SECONDS y desalojan
+# solo las entradas de esos usuarios, por lo que una sesión revocada deja de
+# aceptarse en todos los workers dentro de ese plazo sin perder el resto del
+# cache. Si el worker se atrasó más que el registro, vacía el cache completo.
+REVOCATION_EPOCH_ID = 'sessions'
+_epoch_state = {'epoch': None, 'checked_at': None}
+_epoch_lock = Lock()
+
+
+def invalidate_session_cache():
+    """Vacía el cache de sesiones de este worker"""
+    _session_cache.clear()
+
+
+def evict_user_sessions(user_ids):
+    """Desaloja del cache de este worker las sesiones y huellas de esos usuarios"""
+    user_ids = set(user_ids)
+
+    def belongs(key, value):
+        if key[0] == 'client':
+            return key[1] in user_ids
+        return (value or {}).get('user_id') in user_ids
+
+    return _session_cache.evict(belongs)
+
+@trace_methods
 class SessionRepository:
     def __init__(self):
         self.db = Database().get_database()
         self.collection = self.db.sessions
-        
+        self.revocations = self.db.session_revocations
+        self._create_indexes()
+
+    def _create_indexes(self):
+        """Índices de consulta y expiración automática de sesiones"""
+        try:
+            # Validación del refresh token
+            self.collection.create_index([("refresh_token_jti", 1)])
+            # Sesiones activas de un usuario ordenadas por uso (listado y desalojo)
+            self.collection.create_index([("user_id", 1), ("active", 1), ("last_used", -1)])
+            # MongoDB elimina las sesiones al expirar...
+            self.collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+            # ...y las invalidadas tras un periodo de gracia para auditoría
+            self.collection.create_index(
+                [("invalidated_at", 1)],
+                expireAfterSeconds=Config.SESSION_INVALIDATED_RETENTION_SECONDS
+            )
+        except Exception as e:
+            logger.error(f"Error creando índices de sesiones: {str(e)}")
+
     def create_session(self, session_data):
         """Crear una nueva sesión"""
         try:
@@ -32,18 +92,18 @@ class SessionRepository:
     def get_session_by_jti(self, jti):
         """Obtener sesión por JWT ID"""
         try:
-            session = self.collection.find_one({
-                'refresh_token_jti': jti,
-                'active': True,
-                'expires_at': {'$gt': datetime.utcnow()}
-            })
+            # Validar y registrar el uso en una sola operación
+            session = self.collection.find_one_and_update(
+                {
+                    'refresh_token_jti': jti,
+                    'active': True,
+                    'expires_at': {'$gt': datetime.utcnow()}
+                },
+                {'$set': {'last_used': datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER
+            )
             
             if session:
-                # Actualizar last_used
-                self.collection.update_one(
-                    {'_id': session['_id']},
-                    {'$set': {'last_used': datetime.utcnow()}}
-                )
                 session['_id'] = str(session['_id'])
                 return {
                     'success': True,
@@ -61,6 +121,94 @@ class SessionRepository:
                 'errors': [f'Error obteniendo sesión: {str(e)}']
             }
     
+    def _sync_revocation_epoch(self):
+        """Vacía el cache si otro worker revocó sesiones desde la última consulta"""
+        now = time.monotonic()
+        checked_at = _epoch_state['checked_at']
+        if checked_at is not None and now - checked_at < Config.SESSION_REVOCATION_POLL_SECONDS:
+            return
+        with _epoch_lock:
+            checked_at = _epoch_state['checked_at']
+            if checked_at is not None and now - checked_at < Config.SESSION_REVOCATION_POLL_SECONDS:
+                return
+            try:
+                doc = self.revocations.find_one({'_id': REVOCATION_EPOCH_ID}, {'epoch': 1, 'revoked': 1})
+            except Exception as e:
+                # Sin contador no se puede confiar en el cache
+                logger.warning(f"No se pudo leer el contador de revocaciones: {str(e)}")
+                invalidate_session_cache()
+                return
+            doc = doc or {}
+            epoch = doc.get('epoch', 0)
+            previous = _epoch_state['epoch']
+            if previous is not None and epoch != previous:
+                missed = epoch - previous
+                revoked = doc.get('revoked', [])
+                if 0 < missed <= len(revoked):
+                    evict_user_sessions(revoked[-missed:])
+                else:
+                    invalidate_session_cache()
+            _epoch_state['epoch'] = epoch
+            _epoch_state['checked_at'] = now
+
+    def _bump_revocation_epoch(self, user_id):
+        """Avisa a todos los workers de que se revocaron sesiones de `user_id`"""
+        evict_user_sessions([user_id])
+        try:
+            self.revocations.update_one(
+                {'_id': REVOCATION_EPOCH_ID},
+                {
+                    '$inc': {'epoch': 1},
+                    '$push': {'revoked': {'$each': [user_id], '$slice': -Config.SESSION_REVOCATION_LOG_SIZE}},
+                    '$set': {'updated_at': datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error publicando revocación de sesiones: {str(e)}")
+
+    def get_cached_session_by_jti(self, jti):
+        """Como get_session_by_jti, pero reutiliza sesiones validadas hace poco en este worker.
+
+        En un acierto no se actualiza `last_used`; como mucho se retrasa
+        SESSION_CACHE_TTL_SECONDS.
+        """
+        self._sync_revocation_epoch()
+        key = ('jti', jti)
+        session = _session_cache.get(key)
+        if session is not None and session.get('expires_at') and session['expires_at'] > datetime.utcnow():
+            return {'success': True, 'data': dict(session)}
+
+        result = self.get_session_by_jti(jti)
+        if result['success']:
+            _session_cache.set(key, dict(result['data']))
+        return result
+
+    def has_active_client(self, user_id, client_fingerprint):
+        """True si el usuario tiene una sesión activa iniciada desde ese cliente"""
+        if not user_id or not client_fingerprint:
+            return False
+        self._sync_revocation_epoch()
+        key = ('client', user_id, client_fingerprint)
+        expires_at = _session_cache.get(key)
+        now = datetime.utcnow()
+        if expires_at is not None and expires_at > now:
+            return True
+
+        session = self.collection.find_one(
+            {
+                'user_id': user_id,
+                'active': True,
+                'client_fingerprint': client_fingerprint,
+                'expires_at': {'$gt': now}
+            },
+            {'expires_at': 1}
+        )
+        if not session:
+            return False
+        _session_cache.set(key, session['expires_at'])
+        return True
+
     def get_active_sessions_by_user(self, user_id):
         """Obtener todas las sesiones activas de un usuario"""
         try:
@@ -96,12 +244,14 @@ class SessionRepository:
             else:
                 return {'success': False, 'errors': ['Debe proporcionar session_id o jti']}
             
-            result = self.collection.update_one(
+            session = self.collection.find_one_and_update(
                 query,
-                {'$set': {'active': False, 'invalidated_at': datetime.utcnow()}}
+                {'$set': {'active': False, 'invalidated_at': datetime.utcnow()}},
+                projection={'user_id': 1}
             )
             
-            if result.modified_count > 0:
+            if session:
+                self._bump_revocation_epoch(session.get('user_id'))
                 return {
                     'success': True,
                     'message': 'Sesión invalidada correctamente'
@@ -133,6 +283,8 @@ class SessionRepository:
                 query,
                 {'$set': {'active': False, 'invalidated_at': datetime.utcnow()}}
             )
+            if result.modified_count:
+                self._bump_revocation_epoch(user_id)
             
             return {
                 'success': True,
@@ -146,8 +298,41 @@ class SessionRepository:
                 'errors': [f'Error invalidando sesiones: {str(e)}']
             }
     
+    def evict_oldest_sessions(self, user_id, keep):
+        """Invalida las sesiones activas del usuario salvo las `keep` usadas más recientemente"""
+        try:
+            stale_ids = [
+                doc['_id'] for doc in self.collection.find(
+                    {'user_id': user_id, 'active': True, 'expires_at': {'$gt': datetime.utcnow()}},
+                    {'_id': 1}
+                ).sort('last_used', -1).skip(max(0, keep))
+            ]
+            if not stale_ids:
+                return {'success': True, 'invalidated_count': 0}
+
+            result = self.collection.update_many(
+                {'_id': {'$in': stale_ids}, 'active': True},
+                {'$set': {'active': False, 'invalidated_at': datetime.utcnow()}}
+            )
+            if result.modified_count:
+                self._bump_revocation_epoch(user_id)
+            return {
+                'success': True,
+                'invalidated_count': result.modified_count
+            }
+        except Exception as e:
+            logger.error(f"Error desalojando sesiones antiguas: {str(e)}")
+            return {
+                'success': False,
+                'errors': [f'Error desalojando sesiones: {str(e)}']
+            }
+    
     def cleanup_expired_sessions(self):
-        """Limpiar sesiones expiradas (para job de limpieza)"""
+        """Limpiar sesiones expiradas.
+
+        Los índices TTL de `expires_at` e `invalidated_at` ya eliminan estas
+        sesiones; se conserva para limpiezas manuales.
+        """
         try:
             # Eliminar sesiones expiradas hace más de 30 días
             cutoff_date = datetime.utcnow() - timedelta(days=30)
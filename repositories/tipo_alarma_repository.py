@@ -1,16 +1,29 @@
+import logging
 import re
 
 from core.database import Database
 from models.tipo_alarma import TipoAlarma
+from utils.search_keys import search_condition, search_page_pipeline, search_tokens
 from bson import ObjectId
 from datetime import datetime
+from utils.tracing import trace_methods
 
+logger = logging.getLogger(__name__)
+
+@trace_methods
 class TipoAlarmaRepository:
     """Repositorio para operaciones de tipos de alarma"""
     
     def __init__(self):
         self.db = Database().get_database()
         self.collection = self.db.tipos_alarma
+        self._create_indexes()
+
+    def _create_indexes(self):
+        try:
+            self.collection.create_index([('search_keys', 1)])
+        except Exception as e:
+            logger.error(f"Error creando índices de tipos de alarma: {str(e)}")
 
     def _global_conditions(self):
         """Devuelve condiciones OR para tipos sin empresa asociada."""
@@ -422,24 +435,19 @@ class TipoAlarmaRepository:
             return False
     
     def search_tipos_alarma(self, search_term, page=1, limit=50, include_globales=True):
-        """Busca tipos de alarma por nombre o descripción"""
+        """Busca tipos de alarma por prefijo en nombre o descripción, ordenados por relevancia"""
         try:
+            tokens = search_tokens(search_term)
+            if not tokens:
+                return [], 0
             skip = (page - 1) * limit
-            query = {
-                '$or': [
-                    {'nombre': {'$regex': search_term, '$options': 'i'}},
-                    {'descripcion': {'$regex': search_term, '$options': 'i'}}
-                ]
-            }
+            conditions = [search_condition(tokens)]
             if not include_globales:
-                query.update(self._non_global_filter())
+                conditions.append(self._non_global_filter())
+            query = conditions[0] if len(conditions) == 1 else {'$and': conditions}
 
-            tipos_alarma_data = (
-                self.collection
-                .find(query)
-                .sort('fecha_creacion', -1)
-                .skip(skip)
-                .limit(limit)
+            tipos_alarma_data = self.collection.aggregate(
+                search_page_pipeline(query, tokens, {'fecha_creacion': -1}, skip, limit)
             )
             tipos_alarma = [TipoAlarma.from_dict(tipo_data) for tipo_data in tipos_alarma_data]
             total = self.collection.count_documents(query)
@@ -1,13 +1,28 @@
+import logging
 from pymongo import MongoClient
 from bson import ObjectId
 from models.tipo_empresa import TipoEmpresa
 from core.database import Database
+from utils.search_keys import search_condition, search_page_pipeline, search_tokens
+from utils.tracing import trace_methods
 
+logger = logging.getLogger(__name__)
+
+@trace_methods
 class TipoEmpresaRepository:
     def __init__(self):
         db_instance = Database()
         self.db = db_instance.get_database()
         self.collection = self.db.tipos_empresa
+        self._create_indexes()
+    
+    def _create_indexes(self):
+        """Crea los índices necesarios para la colección"""
+        try:
+            # Índice de búsqueda por prefijo (multikey)
+            self.collection.create_index([("search_keys", 1)])
+        except Exception as e:
+            logger.error(f"Error creando índices de tipos de empresa: {str(e)}")
     
     def create(self, tipo_empresa):
         """Crea un nuevo tipo de empresa"""
@@ -185,17 +200,14 @@ class TipoEmpresaRepository:
             return {"success": False, "errors": [f"Error interno: {str(e)}"]}
     
     def search(self, query, skip=0, limit=100):
-        """Busca tipos de empresa por nombre o descripción"""
+        """Busca tipos de empresa por prefijo en nombre o descripción, ordenados por relevancia"""
         try:
-            search_filter = {
-                "activo": True,
-                "$or": [
-                    {"nombre": {"$regex": query, "$options": "i"}},
-                    {"descripcion": {"$regex": query, "$options": "i"}}
-                ]
-            }
+            tokens = search_tokens(query)
+            search_filter = {"$and": [{"activo": True}, search_condition(tokens)]}
             
-            cursor = self.collection.find(search_filter).skip(skip).limit(limit).sort("nombre", 1)
+            cursor = self.collection.aggregate(
+                search_page_pipeline(search_filter, tokens, {"nombre": 1}, skip, limit)
+            ) if tokens else []
             tipos_empresa = []
             
             for data in cursor:
@@ -203,7 +215,7 @@ class TipoEmpresaRepository:
                 tipos_empresa.append(tipo_empresa.to_json())
             
             # Contar total de documentos que coinciden
-            total = self.collection.count_documents(search_filter)
+            total = self.collection.count_documents(search_filter) if tokens else 0
             
             return {
                 "success": True,
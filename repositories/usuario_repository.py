@@ -1,9 +1,14 @@
 from bson import ObjectId
 import re
 from datetime import datetime
+from core.config import Config
 from core.database import Database
 from models.usuario import Usuario
+from utils.change_tracking import VersionConflictError, versioned_update
+from utils.phone_utils import normalize_phone_e164
+from utils.tracing import trace_methods
 
+@trace_methods
 class UsuarioRepository:
     def __init__(self):
         self.db = Database().get_database()
@@ -43,6 +48,31 @@ class UsuarioRepository:
         escaped = re.escape(value_str)
         clauses.append({field_name: {"$regex": f"^\\s*{escaped}\\s*$"}})
         return clauses
+
+    def _build_telefono_query(self, telefono, activo):
+        """Construye la consulta por teléfono usando el campo canónico E.164.
+
+        Mientras `Config.PHONE_LOOKUP_LEGACY_FALLBACK` esté activo también se
+        consideran documentos aún sin `telefono_normalizado` (previos al backfill).
+        """
+        telefono_normalizado = normalize_phone_e164(telefono)
+        if not telefono_normalizado:
+            return None
+
+        query = {"activo": activo}
+        if not Config.PHONE_LOOKUP_LEGACY_FALLBACK:
+            query["telefono_normalizado"] = telefono_normalizado
+            return query
+
+        legacy_clauses = self._build_phone_or_query("telefono", telefono)
+        query["$or"] = [
+            {"telefono_normalizado": telefono_normalizado},
+            {
+                "telefono_normalizado": {"$exists": False},
+                "$or": legacy_clauses
+            }
+        ]
+        return query
     
     def _create_indexes(self):
         """Crea los índices necesarios para la colección"""
@@ -59,6 +89,20 @@ class UsuarioRepository:
             # Índices para búsquedas por cédula y teléfono (no únicos para permitir validación personalizada)
             self.collection.create_index([("cedula", 1)])
             self.collection.create_index([("telefono", 1)])
+
+            # Usuarios recientes (dashboard del super admin)
+            self.collection.create_index([("fecha_creacion", -1)])
+
+            # Teléfono canónico E.164: único entre usuarios activos
+            self.collection.create_index(
+                [("telefono_normalizado", 1)],
+                name="telefono_normalizado_activo_unique",
+                unique=True,
+                partialFilterExpression={
+                    "activo": True,
+                    "telefono_normalizado": {"$type": "string"}
+                }
+            )
             
             # print("Índices de usuarios creados correctamente")
         except Exception as e:
@@ -89,6 +133,8 @@ class UsuarioRepository:
                 raise e
             # Verificar si es error de duplicado de MongoDB
             if "duplicate key error" in str(e).lower() or "11000" in str(e):
+                if "telefono_normalizado" in str(e):
+                    raise Exception(f"El teléfono {usuario.telefono} ya está en uso por otro usuario")
                 raise Exception("Ya existe un usuario con esa cédula en esta empresa")
             raise Exception(f"Error creando usuario: {str(e)}")
     
@@ -211,23 +257,18 @@ class UsuarioRepository:
             if validation_errors:
                 raise Exception("; ".join(validation_errors))
             
-            usuario_dict = usuario.to_dict()
-            usuario_dict.pop('_id', None)
-            
-            # Removemos el filtro de activo para permitir actualizar usuarios inactivos
-            result = self.collection.update_one(
-                {"_id": usuario_id},
-                {"$set": usuario_dict}
-            )
-            
-            if result.matched_count > 0:
-                return self.find_by_id_including_inactive(usuario_id)
-            return None
+            # Solo los campos modificados; sin filtro de activo para permitir actualizar usuarios inactivos
+            updated = versioned_update(self.collection, usuario_id, usuario)
+            return Usuario.from_dict(updated) if updated else None
+        except VersionConflictError:
+            raise
         except Exception as e:
             # Si el error ya es de validación, lo re-lanzamos
             if "ya está en uso" in str(e):
                 raise e
             if "duplicate key error" in str(e).lower() or "11000" in str(e):
+                if "telefono_normalizado" in str(e):
+                    raise Exception(f"El teléfono {usuario.telefono} ya está en uso por otro usuario")
                 raise Exception("Ya existe un usuario con esa cédula en esta empresa")
             raise Exception(f"Error actualizando usuario: {str(e)}")
     
@@ -339,13 +380,8 @@ class UsuarioRepository:
     def find_by_telefono_global(self, telefono, exclude_id=None):
         """Busca un usuario por teléfono a nivel global (todas las empresas)"""
         try:
-            query = {
-                "activo": True
-            }
-            telefono_clauses = self._build_phone_or_query("telefono", telefono)
-            if telefono_clauses:
-                query["$or"] = telefono_clauses
-            else:
+            query = self._build_telefono_query(telefono, activo=True)
+            if not query:
                 return None
             
             if exclude_id:
@@ -361,6 +397,37 @@ class UsuarioRepository:
         except Exception as e:
             raise Exception(f"Error buscando usuario por teléfono global: {str(e)}")
 
+    def find_by_telefono_with_empresa(self, telefono):
+        """Busca un usuario activo por teléfono junto con su empresa en una sola consulta.
+
+        Retorna una tupla (Usuario, empresa_dict) o (None, None) si no existe.
+        """
+        try:
+            query = self._build_telefono_query(telefono, activo=True)
+            if not query:
+                return None, None
+
+            pipeline = [
+                {"$match": query},
+                {"$limit": 1},
+                {"$lookup": {
+                    "from": "empresas",
+                    "localField": "empresa_id",
+                    "foreignField": "_id",
+                    "as": "_empresa"
+                }},
+                {"$project": {"_empresa.password_hash": 0}}
+            ]
+            resultados = list(self.collection.aggregate(pipeline))
+            if not resultados:
+                return None, None
+
+            usuario_data = resultados[0]
+            empresas = usuario_data.pop("_empresa", None) or []
+            return Usuario.from_dict(usuario_data), (empresas[0] if empresas else None)
+        except Exception as e:
+            raise Exception(f"Error buscando usuario y empresa por teléfono: {str(e)}")
+
     def find_inactive_by_cedula_global(self, cedula):
         """Busca un usuario inactivo por cédula a nivel global"""
         try:
@@ -378,13 +445,8 @@ class UsuarioRepository:
     def find_inactive_by_telefono_global(self, telefono):
         """Busca un usuario inactivo por teléfono a nivel global"""
         try:
-            query = {
-                "activo": False
-            }
-            telefono_clauses = self._build_phone_or_query("telefono", telefono)
-            if telefono_clauses:
-                query["$or"] = telefono_clauses
-            else:
+            query = self._build_telefono_query(telefono, activo=False)
+            if not query:
                 return None
             usuario_data = self.collection.find_one(query)
             if usuario_data:
@@ -411,6 +473,14 @@ class UsuarioRepository:
         
         return errors
     
+    def find_recent_including_inactive(self, limit):
+        """Últimos usuarios creados en todas las empresas, incluyendo inactivos"""
+        try:
+            usuarios_data = self.collection.find({}).sort("fecha_creacion", -1).limit(limit)
+            return [Usuario.from_dict(usuario_data) for usuario_data in usuarios_data]
+        except Exception as e:
+            raise Exception(f"Error obteniendo usuarios recientes: {str(e)}")
+    
     def count_all(self):
         """Cuenta todos los usuarios (activos e inactivos)"""
         try:
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Script para archivar alertas MQTT desactivadas hace más de N días.
+
+Mueve las alertas de `mqtt_alerts` a `mqtt_alerts_archive` por lotes:
+
+1. Escribe el lote completo (con imágenes) en un segmento JSONL comprimido
+   con zstd dentro de ALERT_ARCHIVE_SEGMENT_DIR (almacenamiento frío).
+2. Copia los documentos al archivo con las imágenes reemplazadas por
+   referencias (`mqtt_alerts_archive_images` guarda cada imagen una vez).
+3. Elimina el lote de la colección caliente. Si una alerta se reactivó
+   mientras tanto, se conserva en caliente y se quita del archivo.
+4. Guarda el avance en `archive_checkpoints` y espera antes del siguiente
+   lote para no competir con el tráfico de la API.
+
+Si se interrumpe, la siguiente ejecución retoma desde el último lote
+confirmado con la misma fecha de corte. Repetir un lote es seguro.
+
+`get_alert_by_id` y los listados de alertas inactivas consultan también el
+archivo, así que las alertas archivadas siguen visibles en la API.
+
+Uso:
+    python scripts/archive_alerts.py
+    python scripts/archive_alerts.py --days 180 --batch-size 500 --sleep 1
+    python scripts/archive_alerts.py --dry-run
+    python scripts/archive_alerts.py --restart
+"""
+
+import sys
+import os
+import argparse
+import gzip
+import logging
+import time
+from datetime import datetime, timedelta
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import json_util
+
+from core.config import Config
+from core.database import Database
+from repositories.mqtt_alert_archive_repository import MqttAlertArchiveRepository
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ID = 'mqtt_alerts'
+
+
+def archive_query(cutoff, last_id=None):
+    """Alertas desactivadas antes de `cutoff`, recorridas por _id"""
+    query = {'activo': False, 'fecha_desactivacion': {'$lt': cutoff}}
+    if last_id is not None:
+        query['_id'] = {'$gt': last_id}
+    return query
+
+
+def write_segment(segment_dir, docs, level):
+    """Escribe el lote en un segmento JSONL comprimido; retorna la ruta"""
+    os.makedirs(segment_dir, exist_ok=True)
+    name = f"mqtt_alerts-{docs[0]['_id']}-{docs[-1]['_id']}.jsonl"
+    payload = ''.join(
+        json_util.dumps(doc, json_options=json_util.CANONICAL_JSON_OPTIONS) + '\n' for doc in docs
+    ).encode('utf-8')
+    if zstandard is not None:
+        name += '.zst'
+        data = zstandard.ZstdCompressor(level=level).compress(payload)
+    else:
+        name += '.gz'
+        data = gzip.compress(payload)
+
+    path = os.path.join(segment_dir, name)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as handle:
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+    # El segmento aparece completo o no aparece
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_checkpoint(db, days, restart):
+    """Retorna el checkpoint a usar: el incompleto anterior o uno nuevo"""
+    checkpoints = db.archive_checkpoints
+    checkpoint = checkpoints.find_one({'_id': CHECKPOINT_ID})
+    if checkpoint and not checkpoint.get('completed') and not restart:
+        logger.info(
+            f"⏯️  Reanudando desde {checkpoint.get('last_id')} "
+            f"({checkpoint.get('archived', 0)} alertas ya archivadas, corte {checkpoint['cutoff'].isoformat()})"
+        )
+        return checkpoint
+
+    checkpoint = {
+        '_id': CHECKPOINT_ID,
+        'cutoff': datetime.utcnow() - timedelta(days=days),
+        'last_id': None,
+        'archived': 0,
+        'completed': False,
+        'started_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }
+    return checkpoint
+
+
+def save_checkpoint(db, checkpoint):
+    checkpoint['updated_at'] = datetime.utcnow()
+    db.archive_checkpoints.replace_one({'_id': CHECKPOINT_ID}, checkpoint, upsert=True)
+
+
+def archive_batch(db, archive_repo, docs, cutoff, segment_dir, level):
+    """Archiva un lote; retorna cuántas alertas salieron de la colección caliente"""
+    path = write_segment(segment_dir, docs, level)
+    archive_repo.archive_documents(docs)
+
+    ids = [doc['_id'] for doc in docs]
+    result = db.mqtt_alerts.delete_many({'_id': {'$in': ids}, 'activo': False, 'fecha_desactivacion': {'$lt': cutoff}})
+
+    if result.deleted_count != len(ids):
+        # Reactivadas entre la lectura y el borrado: siguen en caliente
+        still_hot = [doc['_id'] for doc in db.mqtt_alerts.find({'_id': {'$in': ids}}, {'_id': 1})]
+        archive_repo.remove_documents(still_hot)
+        logger.warning(f"⚠️  {len(still_hot)} alertas cambiaron durante el lote y se conservan en caliente")
+
+    logger.info(f"📦 {result.deleted_count} alertas archivadas → {path}")
+    return result.deleted_count
+
+
+def run(days, batch_size, sleep_seconds, segment_dir, level, dry_run=False, restart=False):
+    db = Database().get_database()
+    checkpoint = load_checkpoint(db, days, restart)
+    cutoff = checkpoint['cutoff']
+
+    if dry_run:
+        pending = db.mqtt_alerts.count_documents(archive_query(cutoff, checkpoint.get('last_id')))
+        logger.info(f"🔎 {pending} alertas desactivadas antes de {cutoff.isoformat()} se archivarían")
+        return checkpoint
+
+    if zstandard is None:
+        logger.warning("⚠️  zstandard no instalado; los segmentos se escriben con gzip")
+
+    archive_repo = MqttAlertArchiveRepository()
+    save_checkpoint(db, checkpoint)
+    while True:
+        docs = list(
+            db.mqtt_alerts.find(archive_query(cutoff, checkpoint.get('last_id')))
+            .sort('_id', 1)
+            .limit(batch_size)
+        )
+        if not docs:
+            break
+
+        checkpoint['archived'] += archive_batch(db, archive_repo, docs, cutoff, segment_dir, level)
+        checkpoint['last_id'] = docs[-1]['_id']
+        save_checkpoint(db, checkpoint)
+
+        if len(docs) < batch_size:
+            break
+        if sleep_seconds:
+            time.sleep(sleep_seconds)
+
+    checkpoint['completed'] = True
+    checkpoint['finished_at'] = datetime.utcnow()
+    save_checkpoint(db, checkpoint)
+    return checkpoint
+
+
+def main():
+    """Función principal del script"""
+    parser = argparse.ArgumentParser(description="Archiva alertas MQTT desactivadas hace más de N días")
+    parser.add_argument('--days', type=int, default=Config.ALERT_ARCHIVE_AFTER_DAYS,
+                        help='Antigüedad mínima de la desactivación, en días')
+    parser.add_argument('--batch-size', type=int, default=Config.ALERT_ARCHIVE_BATCH_SIZE,
+                        help='Alertas por lote')
+    parser.add_argument('--sleep', type=float, default=Config.ALERT_ARCHIVE_BATCH_SLEEP_SECONDS,
+                        help='Segundos de espera entre lotes')
+    parser.add_argument('--segment-dir', default=Config.ALERT_ARCHIVE_SEGMENT_DIR,
+                        help='Directorio de los segmentos comprimidos')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Solo cuenta las alertas pendientes de archivar')
+    parser.add_argument('--restart', action='store_true',
+                        help='Descarta el checkpoint incompleto y calcula una nueva fecha de corte')
+    args = parser.parse_args()
+
+    if args.days < 1 or args.batch_size < 1:
+        logger.error("❌ --days y --batch-size deben ser mayores que cero")
+        sys.exit(2)
+
+    logger.info("🗄️  INICIANDO ARCHIVO DE ALERTAS DESACTIVADAS")
+    try:
+        checkpoint = run(
+            args.days, args.batch_size, args.sleep, args.segment_dir,
+            Config.ALERT_ARCHIVE_ZSTD_LEVEL, dry_run=args.dry_run, restart=args.restart
+        )
+    except KeyboardInterrupt:
+        logger.warning("⏸️  Interrumpido; la próxima ejecución retoma desde el último lote")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"❌ Error durante el archivo: {str(e)}")
+        sys.exit(1)
+
+    if not args.dry_run:
+        logger.info(f"✅ {checkpoint['archived']} alertas archivadas (corte {checkpoint['cutoff'].isoformat()})")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Script para poblar `empresa_id` y `sede_key` en alertas MQTT existentes.
+
+Las alertas antiguas solo guardan `empresa_nombre`. Este script resuelve cada
+nombre contra la colección `empresas` (comparación sin distinguir mayúsculas
+ni tildes) y actualiza en bloque las alertas sin `empresa_id`. Es idempotente:
+puede ejecutarse varias veces o reanudarse tras una interrupción.
+
+Uso:
+    python scripts/backfill_alert_empresa_id.py
+"""
+
+import sys
+import os
+import logging
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.database import Database
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_COLLATION = {'locale': 'es', 'strength': 2}
+
+
+def backfill_empresa_id(db):
+    """Asigna empresa_id a las alertas que no lo tienen, agrupando por nombre"""
+    alerts = db.mqtt_alerts
+    pendientes = alerts.distinct('empresa_nombre', {'empresa_id': {'$exists': False}})
+
+    actualizadas = 0
+    sin_empresa = []
+    for empresa_nombre in pendientes:
+        if not empresa_nombre:
+            continue
+        empresa = db.empresas.find_one(
+            {'nombre': empresa_nombre.strip()},
+            {'_id': 1},
+            collation=NOMBRE_COLLATION
+        )
+        if not empresa:
+            sin_empresa.append(empresa_nombre)
+            continue
+
+        result = alerts.update_many(
+            {'empresa_nombre': empresa_nombre, 'empresa_id': {'$exists': False}},
+            {'$set': {'empresa_id': empresa['_id']}}
+        )
+        actualizadas += result.modified_count
+        logger.info(f"🏢 {empresa_nombre}: {result.modified_count} alertas actualizadas")
+
+    for nombre in sin_empresa:
+        logger.warning(f"⚠️  Empresa '{nombre}' no encontrada; sus alertas quedan sin empresa_id")
+
+    return actualizadas, sin_empresa
+
+
+def backfill_sede_key(db):
+    """Calcula sede_key (sede sin espacios extremos y en minúsculas) en una sola operación.
+
+    Igual que `MqttAlert.build_sede_key`, las alertas sin sede quedan con
+    `sede_key: None`. También corrige el `''` que escribían ejecuciones anteriores.
+    """
+    tiene_sede = {'$ne': [{'$ifNull': ['$sede', '']}, '']}
+    result = db.mqtt_alerts.update_many(
+        {'$or': [{'sede_key': {'$exists': False}}, {'sede_key': '', 'sede': {'$in': [None, '']}}]},
+        [{'$set': {'sede_key': {'$cond': [tiene_sede, {'$toLower': {'$trim': {'input': '$sede'}}}, None]}}}]
+    )
+    return result.modified_count
+
+
+def main():
+    """Función principal del script"""
+    logger.info("🔄 INICIANDO BACKFILL DE empresa_id EN ALERTAS")
+    try:
+        db = Database().get_database()
+        actualizadas, sin_empresa = backfill_empresa_id(db)
+        sedes = backfill_sede_key(db)
+    except Exception as e:
+        logger.error(f"❌ Error durante el backfill: {str(e)}")
+        sys.exit(1)
+
+    logger.info(f"✅ empresa_id asignado en {actualizadas} alertas; sede_key en {sedes} alertas")
+    sys.exit(0 if not sin_empresa else 2)
+
+
+if __name__ == "__main__":
+    main()
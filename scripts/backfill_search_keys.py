@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Script para poblar `search_words` y `search_keys` en documentos existentes.
+
+Los modelos calculan estas claves en cada escritura; este script las agrega
+a los documentos creados antes de la búsqueda indexada. Recorre cada
+colección por `_id` en lotes y solo escribe los documentos cuyas claves
+difieren, por lo que puede ejecutarse varias veces sin efectos extra.
+
+Uso:
+    python scripts/backfill_search_keys.py [--collection hardware] [--batch-size 500]
+"""
+
+import sys
+import os
+import argparse
+import logging
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+
+from core.database import Database
+from models.hardware import Hardware
+from utils.search_keys import build_search_fields
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _hardware_fields(doc):
+    return Hardware.from_dict(doc).search_fields()
+
+
+def _nombre_descripcion_fields(doc):
+    return build_search_fields(doc.get('nombre'), doc.get('descripcion'))
+
+
+# Colección -> función que calcula las claves a partir del documento
+COLLECTIONS = {
+    'hardware': _hardware_fields,
+    'tipos_alarma': _nombre_descripcion_fields,
+    'tipos_empresa': _nombre_descripcion_fields,
+}
+
+
+def backfill_collection(collection, build_fields, batch_size=500):
+    """Actualiza las claves de una colección. Retorna (revisados, actualizados)."""
+    processed = updated = 0
+    last_id = None
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id else {}
+        batch = list(collection.find(query, {'imagen_base64': 0}).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            fields = build_fields(doc)
+            if all(doc.get(key) == value for key, value in fields.items()):
+                continue
+            operations.append(UpdateOne({'_id': doc['_id']}, {'$set': fields}))
+
+        if operations:
+            result = collection.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+        processed += len(batch)
+        last_id = batch[-1]['_id']
+        logger.info(f"   {collection.name}: {processed} revisados, {updated} actualizados")
+    return processed, updated
+
+
+def main():
+    """Función principal del script"""
+    parser = argparse.ArgumentParser(description='Backfill de claves de búsqueda por prefijo')
+    parser.add_argument('--collection', choices=sorted(COLLECTIONS), help='Procesar solo esta colección')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    logger.info("🔎 INICIANDO BACKFILL DE CLAVES DE BÚSQUEDA")
+    names = [args.collection] if args.collection else sorted(COLLECTIONS)
+    try:
+        db = Database().get_database()
+        for name in names:
+            collection = db[name]
+            collection.create_index([('search_keys', 1)])
+            processed, updated = backfill_collection(collection, COLLECTIONS[name], args.batch_size)
+            logger.info(f"✅ {name}: {processed} revisados, {updated} actualizados")
+    except Exception as e:
+        logger.error(f"❌ Error durante el backfill: {str(e)}")
+        sys.exit(1)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Script para poblar `telefono_normalizado` (E.164) en usuarios existentes.
+
+Procesa la colección `usuarios` en lotes ordenados por `_id` y guarda el
+último `_id` procesado en la colección `migrations`, por lo que puede
+interrumpirse y reanudarse sin repetir trabajo.
+
+Uso:
+    python scripts/backfill_telefono_normalizado.py [--batch-size 500] [--restart]
+
+Una vez completado, puede desactivarse la búsqueda legacy con
+PHONE_LOOKUP_LEGACY_FALLBACK=False.
+"""
+
+import sys
+import os
+import argparse
+import logging
+import time
+from datetime import datetime
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.database import Database
+from utils.phone_utils import normalize_phone_e164
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = 'telefono_normalizado'
+
+
+def backfill(batch_size=500, restart=False, pause_seconds=0.0):
+    """Ejecuta el backfill por lotes. Retorna un dict con el resumen."""
+    db = Database().get_database()
+    usuarios = db.usuarios
+    migrations = db.migrations
+
+    if restart:
+        migrations.delete_one({'_id': MIGRATION_ID})
+
+    checkpoint = migrations.find_one({'_id': MIGRATION_ID}) or {}
+    last_id = checkpoint.get('last_id')
+    if last_id:
+        logger.info(f"⏩ Reanudando desde _id {last_id}")
+
+    processed = updated = conflicts = 0
+
+    while True:
+        query = {'_id': {'$gt': last_id}} if last_id else {}
+        batch = list(
+            usuarios.find(query, {'telefono': 1, 'telefono_normalizado': 1})
+            .sort('_id', 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+
+        operations = []
+        operation_ids = []
+        for doc in batch:
+            normalizado = normalize_phone_e164(doc.get('telefono'))
+            if doc.get('telefono_normalizado') != normalizado:
+                operations.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'telefono_normalizado': normalizado}}
+                ))
+                operation_ids.append(doc['_id'])
+
+        if operations:
+            try:
+                result = usuarios.bulk_write(operations, ordered=False)
+                updated += result.modified_count
+            except BulkWriteError as e:
+                # Teléfonos duplicados entre usuarios activos: se reportan y se dejan sin normalizar
+                details = e.details or {}
+                updated += details.get('nModified', 0)
+                for error in details.get('writeErrors', []):
+                    conflicts += 1
+                    doc_id = operation_ids[error['index']]
+                    logger.warning(f"⚠️  Teléfono duplicado en usuario {doc_id}: {error.get('errmsg')}")
+
+        processed += len(batch)
+        last_id = batch[-1]['_id']
+        migrations.update_one(
+            {'_id': MIGRATION_ID},
+            {'$set': {'last_id': last_id, 'processed': processed, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info(f"📦 Lote procesado: {processed} usuarios revisados, {updated} actualizados")
+
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    migrations.update_one(
+        {'_id': MIGRATION_ID},
+        {'$set': {'completed_at': datetime.utcnow()}},
+        upsert=True
+    )
+    return {'processed': processed, 'updated': updated, 'conflicts': conflicts}
+
+
+def main():
+    """Función principal del script"""
+    parser = argparse.ArgumentParser(description='Backfill de telefono_normalizado en usuarios')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.0, help='Segundos de pausa entre lotes')
+    parser.add_argument('--restart', action='store_true', help='Ignorar el checkpoint guardado')
+    args = parser.parse_args()
+
+    logger.info("📞 INICIANDO BACKFILL DE TELÉFONOS NORMALIZADOS")
+    try:
+        summary = backfill(batch_size=args.batch_size, restart=args.restart, pause_seconds=args.pause)
+    except Exception as e:
+        logger.error(f"❌ Error durante el backfill: {str(e)}")
+        sys.exit(1)
+
+    logger.info(
+        f"✅ Backfill completado: {summary['processed']} revisados, "
+        f"{summary['updated']} actualizados, {summary['conflicts']} conflictos"
+    )
+    sys.exit(0 if summary['conflicts'] == 0 else 2)
+
+
+if __name__ == "__main__":
+    main()
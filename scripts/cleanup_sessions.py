@@ -2,13 +2,12 @@
 """
 Script para limpiar sesiones expiradas del sistema de autenticación.
 
-Este script puede ejecutarse como cron job para mantener la base de datos limpia.
+Ya no hace falta programarlo: los índices TTL de `sessions` eliminan las
+sesiones expiradas y, tras SESSION_INVALIDATED_RETENTION_SECONDS, las
+invalidadas. Sirve para una limpieza manual o para ver estadísticas.
 
 Uso:
     python scripts/cleanup_sessions.py
-
-Como cron job (ejecutar cada hora):
-    0 * * * * cd /path/to/RescueBack && python scripts/cleanup_sessions.py
 """
 
 import sys
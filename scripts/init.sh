@@ -65,6 +65,21 @@ else
     echo "⚠️  Error al preparar el administrador, continuando..."
 fi
 
+# Servidor del stream SSE de alertas (stream_app.py): workers gevent, una
+# greenlet por conexión en vez de un hilo de la API. El proxy envía
+# /api/mqtt-alerts/stream a este puerto
+echo "📡 Iniciando stream de alertas en el puerto ${ALERT_STREAM_PORT:-5003}..."
+gunicorn \
+    --bind 0.0.0.0:${ALERT_STREAM_PORT:-5003} \
+    --workers ${ALERT_STREAM_WORKERS:-1} \
+    --worker-class gevent \
+    --worker-connections ${ALERT_STREAM_WORKER_CONNECTIONS:-1100} \
+    --timeout 60 \
+    --access-logfile - \
+    --error-logfile - \
+    --log-level info \
+    "stream_app:create_stream_app()" &
+
 echo "🚀 Iniciando aplicación con Gunicorn..."
 echo "========================================"
 
@@ -72,7 +87,8 @@ echo "========================================"
 exec gunicorn \
     --bind 0.0.0.0:5002 \
     --workers 3 \
-    --worker-class sync \
+    --worker-class gthread \
+    --threads ${GUNICORN_THREADS:-8} \
     --timeout 60 \
     --keep-alive 2 \
     --access-logfile - \
@@ -15,6 +15,7 @@ load_dotenv()
 # Agregar el directorio padre al path para poder importar los módulos
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from core.config import Config
 from core.database import Database
 
 def crear_super_admin():
@@ -48,7 +49,7 @@ def crear_super_admin():
         return False
     
     # Hash de la contraseña
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)).decode('utf-8')
     
     # Crear el documento del administrador
     admin_doc = {
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Script para reconstruir `hardware_links` a partir del historial de alertas.
+
+Recorre `mqtt_alerts` y `mqtt_alerts_archive` (`$unionWith`, MongoDB 4.4+)
+con una agregación en el servidor, vincula entre sí
+el topic principal y los `topics_otros_hardware` de cada alerta y reemplaza
+la colección con `$out`. Al terminar marca el índice como construido en
+`migrations`, con lo que la búsqueda de topics vinculados deja de recorrer
+el historial.
+
+Puede ejecutarse de nuevo en cualquier momento (por ejemplo, si se editaron
+alertas a mano). Los vínculos de alertas creadas durante la reconstrucción
+pueden perderse; basta con volver a ejecutarlo.
+
+Uso:
+    python scripts/rebuild_hardware_links.py
+"""
+
+import sys
+import os
+import logging
+import time
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repositories.hardware_link_repository import HardwareLinkRepository
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Función principal del script"""
+    logger.info("🔗 RECONSTRUYENDO HARDWARE_LINKS DESDE EL HISTORIAL DE ALERTAS")
+    start = time.perf_counter()
+    try:
+        topics = HardwareLinkRepository().rebuild_from_alerts()
+    except Exception as e:
+        logger.error(f"❌ Error durante la reconstrucción: {str(e)}")
+        sys.exit(1)
+
+    logger.info(f"✅ {topics} topics con vínculos ({time.perf_counter() - start:.1f} s)")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
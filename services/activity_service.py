@@ -19,11 +19,14 @@ class ActivityService:
     def get_all(self):
         try:
             logs = self.repo.get_all()
+            # Una sola consulta $in para los nombres de todas las empresas del listado
+            nombres = self.empresa_repo.find_nombres_by_ids(
+                [log["empresa_id"] for log in logs if log.get("empresa_id")]
+            )
             for log in logs:
                 empresa_id = log.get("empresa_id")
                 if empresa_id:
-                    empresa = self.empresa_repo.find_by_id(empresa_id)
-                    log["empresa_nombre"] = empresa.nombre if empresa else None
+                    log["empresa_nombre"] = nombres.get(str(empresa_id))
             return {"success": True, "data": logs}
         except Exception as exc:
             return {"success": False, "errors": [str(exc)]}
@@ -31,8 +34,7 @@ class ActivityService:
     def get_by_empresa(self, empresa_id: str):
         try:
             logs = self.repo.get_by_empresa(empresa_id)
-            empresa = self.empresa_repo.find_by_id(empresa_id)
-            nombre = empresa.nombre if empresa else None
+            nombre = self.empresa_repo.find_nombre_by_id(empresa_id)
             for log in logs:
                 log["empresa_nombre"] = nombre
             return {"success": True, "data": logs}
@@ -1,9 +1,23 @@
 from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_jwt_identity, verify_jwt_in_request
-import bcrypt
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from bson import ObjectId
 from core.database import Database
 from services.session_service import SessionService
+from utils.login_throttle import get_login_throttle
+from utils.password_hasher import PasswordHasherBusy, get_password_hasher
+
+logger = logging.getLogger(__name__)
+
+# Búsqueda de credenciales en administradores y empresas en paralelo
+_lookup_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='auth-lookup')
+
+# Campos con los que se puede iniciar sesión en cada colección
+LOGIN_FIELDS = {
+    'administradores': ['email', 'username', 'usuario'],
+    'empresas': ['email', 'username'],
+}
 
 # Endpoints permitidos por rol si el usuario no tiene lista propia
 ROLE_PERMISSIONS = {
@@ -28,41 +42,89 @@ class AuthService:
     def __init__(self):
         self.db = Database().get_database()
         self.session_service = SessionService()
+        self.password_hasher = get_password_hasher()
+        self.login_throttle = get_login_throttle()
+        self._create_indexes()
+
+    def _create_indexes(self):
+        """Índices para que la búsqueda de credenciales no recorra la colección"""
+        try:
+            for field in LOGIN_FIELDS['administradores']:
+                self.db.administradores.create_index([(field, 1)], sparse=True)
+        except Exception:
+            pass
+
+    def _find_credentials(self, usuario):
+        """Busca al usuario en ambas colecciones a la vez; administradores tiene prioridad"""
+        futures = {
+            collection: _lookup_executor.submit(
+                self.db[collection].find_one,
+                {'$or': [{field: usuario} for field in fields]}
+            )
+            for collection, fields in LOGIN_FIELDS.items()
+        }
+        for collection in LOGIN_FIELDS:
+            user = futures[collection].result()
+            if user:
+                return user, collection
+        return None, None
+
+    def _rehash_if_needed(self, collection, user, password):
+        """Regenera el hash si se generó con un costo distinto al configurado"""
+        stored_hash = user.get('password_hash', '')
+        if not self.password_hasher.needs_rehash(stored_hash):
+            return
+        try:
+            new_hash = self.password_hasher.hash(password)
+            # Solo si nadie cambió la contraseña mientras tanto
+            self.db[collection].update_one(
+                {'_id': user['_id'], 'password_hash': stored_hash},
+                {'$set': {'password_hash': new_hash}}
+            )
+        except Exception as e:
+            logger.warning(f'No se pudo regenerar el hash de {user["_id"]}: {e}')
 
     def login(self, usuario, password, request_data=None):
         """Valida credenciales y genera un JWT"""
         try:
-            user = self.db.administradores.find_one({
-                '$or': [
-                    {'email': usuario},
-                    {'username': usuario},
-                    {'usuario': usuario}
-                ]
-            })
-            collection = 'administradores'
+            ip = (request_data or {}).get('remote_addr')
+            retry_after = self.login_throttle.retry_after(ip, usuario)
+            if retry_after:
+                return {
+                    'success': False,
+                    'errors': ['Demasiados intentos fallidos, intenta más tarde'],
+                    'status_code': 429,
+                    'retry_after': retry_after
+                }
 
+            user, collection = self._find_credentials(usuario)
             if not user:
-                user = self.db.empresas.find_one({
-                    '$or': [
-                        {'email': usuario},
-                        {'username': usuario}
-                    ]
-                })
-                if user:
-                    collection = 'empresas'
-            if not user:
+                self.login_throttle.register_failure(ip, usuario)
                 return {'success': False, 'errors': ['Credenciales inválidas']}
 
             is_active = user.get('activo') if collection == 'administradores' else user.get('activa', True)
             if is_active is None:
                 is_active = user.get('is_active', True)
             if not is_active:
+                self.login_throttle.register_failure(ip, usuario)
                 return {'success': False, 'errors': ['Credenciales inválidas']}
 
-            stored_hash = user.get('password_hash', '')
-            if not stored_hash or not bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+            try:
+                valid = self.password_hasher.verify(password, user.get('password_hash', ''))
+            except PasswordHasherBusy:
+                return {
+                    'success': False,
+                    'errors': ['Servicio de autenticación ocupado, intenta de nuevo'],
+                    'status_code': 503,
+                    'retry_after': 1
+                }
+            if not valid:
+                self.login_throttle.register_failure(ip, usuario)
                 return {'success': False, 'errors': ['Credenciales inválidas']}
 
+            self.login_throttle.reset_username(usuario)
+            self._rehash_if_needed(collection, user, password)
+
             role = user.get('role') or user.get('rol')
             if not role and collection == 'empresas':
                 role = 'empresa'
@@ -234,7 +296,14 @@ class AuthService:
             return result
         except Exception as e:
             return {'success': False, 'errors': [f'Error cerrando sesiones: {str(e)}']}
-    
+
+    def invalidate_session(self, session_id):
+        """Cerrar una sesión específica por su ID"""
+        try:
+            return self.session_service.invalidate_session(session_id=session_id)
+        except Exception as e:
+            return {'success': False, 'errors': [f'Error cerrando sesión: {str(e)}']}
+
     def get_user_sessions(self, user_id):
         """Obtener sesiones activas de un usuario"""
         try:
@@ -1,4 +1,5 @@
 import resend
+from utils.tracing import span
 import os
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -350,7 +351,8 @@ Este email fue generado por el sistema RESCUE
                 # print(f"📤 Parámetros del email: {email_params['from']} -> {email_params['to']}")
                 
                 # Enviar el email
-                response = resend.Emails.send(email_params)
+                with span('HTTP POST resend', kind='client', **{'peer.service': 'resend'}):
+                    response = resend.Emails.send(email_params)
                 
                 # print(f"📬 Respuesta de Resend: {response}")
                 # print(f"📬 Tipo de respuesta: {type(response)}")
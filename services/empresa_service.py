@@ -1,7 +1,9 @@
 from bson import ObjectId
-import bcrypt
 from models.empresa import Empresa
 from repositories.empresa_repository import EmpresaRepository
+from services.phone_lookup_service import invalidate_phone_lookup_cache
+from utils.change_tracking import VersionConflictError
+from utils.password_hasher import get_password_hasher
 
 class EmpresaService:
     def __init__(self):
@@ -31,7 +33,7 @@ class EmpresaService:
             if not password:
                 return {'success': False, 'errors': ['La contraseña es obligatoria']}
 
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            password_hash = get_password_hasher().hash(password)
 
             # Validar tipo_empresa_id si se proporciona
             tipo_empresa_id = empresa_data.get('tipo_empresa_id')
@@ -191,11 +193,19 @@ class EmpresaService:
                         'errors': ['No tienes permisos para modificar esta empresa']
                     }
             
+            # Concurrencia optimista: el cliente puede enviar la versión que leyó
+            if 'version' in empresa_data and empresa_data['version'] != existing_empresa.version:
+                return {
+                    'success': False,
+                    'errors': [str(VersionConflictError())],
+                    'status_code': 409
+                }
+            
             # Preparar password
             new_password = empresa_data.get('password')
             password_hash = existing_empresa.password_hash
             if new_password:
-                password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                password_hash = get_password_hasher().hash(new_password)
 
             # Validar tipo_empresa_id si se proporciona para actualización
             tipo_empresa_id = empresa_data.get('tipo_empresa_id', existing_empresa.tipo_empresa_id)
@@ -227,6 +237,8 @@ class EmpresaService:
             # Mantener datos originales
             updated_empresa.fecha_creacion = existing_empresa.fecha_creacion
             updated_empresa.last_login = existing_empresa.last_login
+            # Solo se escribirán los campos que difieran de la empresa leída
+            updated_empresa.track_changes(existing_empresa)
             
             # Validar datos
             validation_errors = updated_empresa.validate()
@@ -269,6 +281,7 @@ class EmpresaService:
             
             # Actualizar empresa
             result = self.empresa_repository.update(empresa_id, updated_empresa)
+            invalidate_phone_lookup_cache()
             if result:
                 return {
                     'success': True,
@@ -281,6 +294,12 @@ class EmpresaService:
                     'errors': ['Error actualizando empresa']
                 }
                 
+        except VersionConflictError as e:
+            return {
+                'success': False,
+                'errors': [str(e)],
+                'status_code': 409
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -311,6 +330,7 @@ class EmpresaService:
             
             # Eliminar empresa (soft delete)
             deleted = self.empresa_repository.soft_delete(empresa_id)
+            invalidate_phone_lookup_cache()
             if deleted:
                 return {
                     'success': True,
@@ -351,10 +371,12 @@ class EmpresaService:
                     }
             
             # Actualizar solo el campo activa
+            existing_empresa.track_changes()
             existing_empresa.activa = activa
             existing_empresa.update_timestamp()
             
             updated = self.empresa_repository.update(empresa_id, existing_empresa)
+            invalidate_phone_lookup_cache()
             if updated:
                 status_text = "activada" if activa else "desactivada"
                 return {
@@ -366,6 +388,12 @@ class EmpresaService:
                 'success': False, 
                 'errors': ['Error al actualizar el estado de la empresa']
             }
+        except VersionConflictError as e:
+            return {
+                'success': False,
+                'errors': [str(e)],
+                'status_code': 409
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -423,7 +451,6 @@ class EmpresaService:
             from services.usuario_service import UsuarioService
             from services.hardware_service import HardwareService
             from services.mqtt_alert_service import MqttAlertService
-            from datetime import datetime, timedelta
             
             usuario_service = UsuarioService()
             hardware_service = HardwareService()
@@ -470,7 +497,7 @@ class EmpresaService:
                     'por_tipo': por_tipo
                 }
             
-            # Obtener estadísticas de alertas
+            # Obtener estadísticas de alertas (incluye las archivadas)
             alertas_stats = {
                 'total_alertas': 0,
                 'alertas_activas': 0,
@@ -484,49 +511,9 @@ class EmpresaService:
                 }
             }
             
-            try:
-                # Obtener alertas por nombre de empresa
-                alertas_result = alert_service.get_alerts_by_empresa(empresa.nombre, page=1, limit=1000)
-                if alertas_result.get('success'):
-                    alertas_data = alertas_result.get('alerts', [])
-                    
-                    # Estadísticas básicas
-                    alertas_stats['total_alertas'] = len(alertas_data)
-                    alertas_stats['alertas_activas'] = len([a for a in alertas_data if a.get('activo', False)])
-                    alertas_stats['alertas_inactivas'] = len([a for a in alertas_data if not a.get('activo', False)])
-                    
-                    # Estadísticas por prioridad
-                    for alerta in alertas_data:
-                        prioridad = alerta.get('prioridad', 'media').lower()
-                        if prioridad in alertas_stats['alertas_por_prioridad']:
-                            alertas_stats['alertas_por_prioridad'][prioridad] += 1
-                    
-                    # Alertas de los últimos 30 días
-                    hace_30_dias = datetime.utcnow() - timedelta(days=30)
-                    
-                    for alerta in alertas_data:
-                        fecha_creacion_str = alerta.get('fecha_creacion')
-                        if fecha_creacion_str:
-                            try:
-                                # Manejar diferentes formatos de fecha
-                                if isinstance(fecha_creacion_str, str):
-                                    if 'T' in fecha_creacion_str:
-                                        fecha_creacion = datetime.fromisoformat(fecha_creacion_str.replace('Z', '+00:00'))
-                                    else:
-                                        fecha_creacion = datetime.fromisoformat(fecha_creacion_str)
-                                else:
-                                    # Si es un objeto datetime directamente
-                                    fecha_creacion = fecha_creacion_str
-                                
-                                if fecha_creacion >= hace_30_dias:
-                                    alertas_stats['alertas_recientes_30d'] += 1
-                            except (ValueError, TypeError, AttributeError):
-                                continue
-                    
-            except Exception as e:
-                # print(f"Error obteniendo estadísticas de alertas: {e}")
-                # Mantener las estadísticas vacías si hay error
-                pass
+            alertas_result = alert_service.get_empresa_alerts_stats(empresa._id, recent_days=30)
+            if alertas_result.get('success'):
+                alertas_stats = alertas_result['stats']
             
             return {
                 'success': True,
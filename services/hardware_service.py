@@ -1,11 +1,16 @@
+import itertools
 from bson import ObjectId
 from datetime import datetime, timedelta
 from models.hardware import Hardware
 from repositories.hardware_repository import HardwareRepository
 from repositories.empresa_repository import EmpresaRepository
 from repositories.mqtt_alert_repository import MqttAlertRepository
+from repositories.hardware_link_repository import HardwareLinkRepository
 from services.hardware_type_service import HardwareTypeService
+from utils.change_tracking import VersionConflictError
 from utils.geocoding import procesar_direccion_para_hardware
+from utils.heartbeat_coalescer import get_heartbeat_coalescer
+from utils.keyset import decode_cursor
 from core.config import Config
 
 class HardwareService:
@@ -14,11 +19,20 @@ class HardwareService:
         self.empresa_repo = EmpresaRepository()
         self.type_service = HardwareTypeService()
         self.mqtt_alert_repo = MqttAlertRepository()
+        self.link_repo = HardwareLinkRepository()
+        self.heartbeats = get_heartbeat_coalescer()
 
 
-    def _get_empresa(self, empresa_nombre):
-        """Obtiene la empresa a partir de su nombre."""
-        return self.empresa_repo.find_by_nombre(empresa_nombre)
+    def _get_empresa(self, empresa_nombre, sede=None):
+        """Obtiene la empresa activa a partir de su nombre (cache del worker).
+
+        Si no aparece, o no tiene la sede, se relee de MongoDB antes de
+        rechazar: la cache puede ser anterior a un cambio hecho en otro worker.
+        """
+        empresa = self.empresa_repo.get_cached_by_nombre(empresa_nombre)
+        if not empresa or (sede and sede not in (empresa.sedes or [])):
+            empresa = self.empresa_repo.get_cached_by_nombre(empresa_nombre, refresh=True)
+        return empresa
     
     def _procesar_direccion(self, direccion):
         """Procesa una dirección y devuelve URLs, coordenadas y posible error."""
@@ -29,6 +43,11 @@ class HardwareService:
     def _get_topics_otros_hardware_from_alerts(self, hardware_topic):
         """Obtiene los topics de otros hardware que están vinculados en alertas con este hardware"""
         try:
+            # Lectura indexada en hardware_links; el recorrido del historial solo se usa
+            # mientras el índice no se ha construido (scripts/rebuild_hardware_links.py)
+            if self.link_repo.is_built():
+                return self.link_repo.find_peers(hardware_topic)
+
             # Buscar alertas que contengan el topic del hardware desactivado
             # Buscar en el campo 'topic' (hardware principal) o 'topics_otros_hardware' (hardware secundario)
             query = {
@@ -38,7 +57,12 @@ class HardwareService:
                 ]
             }
             
-            alerts_data = self.mqtt_alert_repo.collection.find(query)
+            projection = {'topic': 1, 'topics_otros_hardware': 1}
+            # Las alertas archivadas también vinculan hardware
+            alerts_data = itertools.chain(
+                self.mqtt_alert_repo.collection.find(query, projection),
+                self.mqtt_alert_repo.archive_repo.collection.find(query, projection)
+            )
             topics_otros_hardware = set()  # Usar set para evitar duplicados
             
             for alert_data in alerts_data:
@@ -74,7 +98,7 @@ class HardwareService:
             nombre_empresa = data.pop('empresa_nombre', None)
             if not nombre_empresa:
                 return {'success': False, 'errors': ['El nombre de la empresa es obligatorio']}
-            empresa = self._get_empresa(nombre_empresa)
+            empresa = self._get_empresa(nombre_empresa, sede)
             if not empresa:
                 return {'success': False, 'errors': ['Empresa no encontrada']}
             if not sede:
@@ -119,19 +143,101 @@ class HardwareService:
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
 
-    def get_all_hardware(self, filters=None):
+    def _to_json_with_empresa(self, hardware_list):
+        """Serializa una lista de hardware con el nombre de su empresa (una consulta como máximo)"""
+        nombres = self.empresa_repo.find_nombres_by_ids(h.empresa_id for h in hardware_list)
+        resultados = []
+        for h in hardware_list:
+            j = h.to_json()
+            j['empresa_nombre'] = nombres.get(str(h.empresa_id)) if h.empresa_id else None
+            resultados.append(j)
+        return resultados
+
+    def _search_page(self, filters, include_inactive, page, limit):
+        """Una página de hardware filtrado (por relevancia si hay búsqueda)"""
+        page = max(1, page or 1)
+        limit = min(max(1, limit or 50), Config.HARDWARE_PAGE_MAX_LIMIT)
+        hardware_list, total = self.hardware_repo.search(
+            filters, include_inactive=include_inactive, skip=(page - 1) * limit, limit=limit
+        )
+        resultados = self._to_json_with_empresa(hardware_list)
+        return {
+            'success': True,
+            'data': resultados,
+            'count': len(resultados),
+            'pagination': {
+                'page': page,
+                'limit': limit,
+                'total': total,
+                'pages': (total + limit - 1) // limit
+            }
+        }
+
+    def get_hardware_keyset_page(self, filters=None, include_inactive=False, cursor=None, limit=None):
+        """Página por cursor; `cursor` vacío o None pide la primera página"""
+        try:
+            limit = min(max(1, limit or 50), Config.HARDWARE_PAGE_MAX_LIMIT)
+            after = decode_cursor(cursor) if cursor else None
+            docs, next_cursor = self.hardware_repo.find_page_after(
+                filters, include_inactive=include_inactive, after=after, limit=limit
+            )
+            resultados = list(self._json_rows(docs))
+            return {
+                'success': True,
+                'data': resultados,
+                'count': len(resultados),
+                'pagination': {
+                    'limit': limit,
+                    'next_cursor': next_cursor,
+                    'has_more': next_cursor is not None
+                }
+            }
+        except ValueError as exc:
+            return {'success': False, 'errors': [str(exc)], 'status_code': 400}
+        except Exception as exc:
+            return {'success': False, 'errors': [str(exc)]}
+
+    def iter_hardware_json(self, filters=None, include_inactive=False):
+        """Generador de hardware serializado para streaming.
+
+        El cursor se abre de inmediato (los errores de consulta ocurren antes
+        de empezar a responder) y se recorre por lotes de
+        HARDWARE_STREAM_BATCH_SIZE, resolviendo los nombres de empresa una vez
+        por lote; la memoria usada no depende del tamaño de la flota.
+        """
+        batch_size = Config.HARDWARE_STREAM_BATCH_SIZE
+        cursor = self.hardware_repo.iter_documents(filters, include_inactive, batch_size)
+
+        def rows():
+            batch = []
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    yield from self._json_rows(batch)
+                    batch = []
+            if batch:
+                yield from self._json_rows(batch)
+
+        return rows()
+
+    def _json_rows(self, docs):
+        """Serializa documentos crudos con el nombre de su empresa"""
+        nombres = self.empresa_repo.find_nombres_by_ids(doc.get('empresa_id') for doc in docs)
+        for doc in docs:
+            row = Hardware.json_from_document(doc)
+            row['empresa_nombre'] = nombres.get(row['empresa_id']) if row['empresa_id'] else None
+            yield row
+
+    def get_all_hardware(self, filters=None, page=None, limit=None):
         try:
+            if page or limit:
+                return self._search_page(filters, False, page, limit)
             if filters:
                 hardware_list = self.hardware_repo.find_with_filters(filters)
             else:
                 hardware_list = self.hardware_repo.find_all()
             
-            resultados = []
-            for h in hardware_list:
-                empresa = self.empresa_repo.find_by_id(h.empresa_id) if h.empresa_id else None
-                j = h.to_json()
-                j['empresa_nombre'] = empresa.nombre if empresa else None
-                resultados.append(j)
+            resultados = self._to_json_with_empresa(hardware_list)
             return {'success': True, 'data': resultados, 'count': len(resultados)}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
@@ -141,9 +247,8 @@ class HardwareService:
             hardware = self.hardware_repo.find_by_id(hardware_id)
             if not hardware:
                 return {'success': False, 'errors': ['Hardware no encontrado']}
-            empresa = self.empresa_repo.find_by_id(hardware.empresa_id) if hardware.empresa_id else None
             result = hardware.to_json()
-            result['empresa_nombre'] = empresa.nombre if empresa else None
+            result['empresa_nombre'] = self.empresa_repo.find_nombre_by_id(hardware.empresa_id)
             return {'success': True, 'data': result}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
@@ -154,9 +259,8 @@ class HardwareService:
             hardware = self.hardware_repo.find_by_id_including_inactive(hardware_id)
             if not hardware:
                 return {'success': False, 'errors': ['Hardware no encontrado']}
-            empresa = self.empresa_repo.find_by_id(hardware.empresa_id) if hardware.empresa_id else None
             result = hardware.to_json()
-            result['empresa_nombre'] = empresa.nombre if empresa else None
+            result['empresa_nombre'] = self.empresa_repo.find_nombre_by_id(hardware.empresa_id)
             return {'success': True, 'data': result}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
@@ -164,8 +268,7 @@ class HardwareService:
     def get_hardware_by_empresa(self, empresa_id):
         try:
             hardware_list = self.hardware_repo.find_by_empresa(empresa_id)
-            empresa = self.empresa_repo.find_by_id(empresa_id)
-            nombre = empresa.nombre if empresa else None
+            nombre = self.empresa_repo.find_nombre_by_id(empresa_id)
             resultados = []
             for h in hardware_list:
                 j = h.to_json()
@@ -175,20 +278,17 @@ class HardwareService:
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
 
-    def get_all_hardware_including_inactive(self, filters=None):
+    def get_all_hardware_including_inactive(self, filters=None, page=None, limit=None):
         """Obtiene todos los hardware incluyendo los inactivos"""
         try:
+            if page or limit:
+                return self._search_page(filters, True, page, limit)
             if filters:
                 hardware_list = self.hardware_repo.find_with_filters_including_inactive(filters)
             else:
                 hardware_list = self.hardware_repo.find_all_including_inactive()
             
-            resultados = []
-            for h in hardware_list:
-                empresa = self.empresa_repo.find_by_id(h.empresa_id) if h.empresa_id else None
-                j = h.to_json()
-                j['empresa_nombre'] = empresa.nombre if empresa else None
-                resultados.append(j)
+            resultados = self._to_json_with_empresa(hardware_list)
             return {'success': True, 'data': resultados, 'count': len(resultados)}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
@@ -197,8 +297,7 @@ class HardwareService:
         """Obtiene todos los hardware de una empresa incluyendo los inactivos"""
         try:
             hardware_list = self.hardware_repo.find_by_empresa_including_inactive(empresa_id)
-            empresa = self.empresa_repo.find_by_id(empresa_id)
-            nombre = empresa.nombre if empresa else None
+            nombre = self.empresa_repo.find_nombre_by_id(empresa_id)
             resultados = []
             for h in hardware_list:
                 j = h.to_json()
@@ -213,6 +312,9 @@ class HardwareService:
             existing = self.hardware_repo.find_by_id_including_inactive(hardware_id)
             if not existing:
                 return {'success': False, 'errors': ['Hardware no encontrado']}
+            # Concurrencia optimista: el cliente puede enviar la versión que leyó
+            if 'version' in data and data.pop('version') != existing.version:
+                return {'success': False, 'errors': [str(VersionConflictError())], 'status_code': 409}
             nombre = data.pop('nombre', existing.nombre)
             tipo = data.pop('tipo', existing.tipo)
             sede = data.pop('sede', existing.sede)
@@ -226,12 +328,14 @@ class HardwareService:
                 if existing_hardware:
                     return {'success': False, 'errors': ['Ya existe un hardware con ese nombre']}
             if nombre_empresa:
-                empresa = self._get_empresa(nombre_empresa)
+                empresa = self._get_empresa(nombre_empresa, sede)
                 if not empresa:
                     return {'success': False, 'errors': ['Empresa no encontrada']}
                 empresa_id = empresa._id
             else:
+                # La sede se valida contra la empresa actual del hardware
                 empresa = self.empresa_repo.find_by_id(existing.empresa_id) if existing.empresa_id else None
+                nombre_empresa = empresa.nombre if empresa else None
             if not sede:
                 return {'success': False, 'errors': ['La sede es obligatoria']}
             if not direccion:
@@ -265,20 +369,22 @@ class HardwareService:
             updated.coordenadas = coordenadas
             updated.fecha_creacion = existing.fecha_creacion
             updated.physical_status = existing.physical_status or {}
+            # Solo se escribirán los campos que difieran del hardware leído
+            updated.track_changes(existing)
             
             # Regenerar topic con los nuevos datos
-            empresa_nombre_final = nombre_empresa if nombre_empresa else (empresa.nombre if empresa else None)
-            if empresa_nombre_final:
-                updated.topic = updated.generate_topic(empresa_nombre_final, sede, tipo, nombre)
+            if nombre_empresa:
+                updated.topic = updated.generate_topic(nombre_empresa, sede, tipo, nombre)
             
             result = self.hardware_repo.update(hardware_id, updated)
             if result:
                 res = result.to_json()
-                empresa = self.empresa_repo.find_by_id(result.empresa_id) if result.empresa_id else None
-                res['empresa_nombre'] = empresa.nombre if empresa else None
+                res['empresa_nombre'] = self.empresa_repo.find_nombre_by_id(result.empresa_id)
                 return {'success': True, 'data': res}
             else:
                 return {'success': False, 'errors': ['Error actualizando hardware']}
+        except VersionConflictError as exc:
+            return {'success': False, 'errors': [str(exc)], 'status_code': 409}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
 
@@ -304,6 +410,7 @@ class HardwareService:
                 topics_otros_hardware = self._get_topics_otros_hardware_from_alerts(existing.topic)
             
             # Actualizar solo el campo activa
+            existing.track_changes()
             existing.activa = activa
             existing.update_timestamp()
             
@@ -311,8 +418,7 @@ class HardwareService:
             if updated:
                 status_text = "activado" if activa else "desactivado"
                 result = updated.to_json()
-                empresa = self.empresa_repo.find_by_id(updated.empresa_id) if updated.empresa_id else None
-                result['empresa_nombre'] = empresa.nombre if empresa else None
+                result['empresa_nombre'] = self.empresa_repo.find_nombre_by_id(updated.empresa_id)
                 
                 response = {
                     'success': True, 
@@ -327,6 +433,8 @@ class HardwareService:
                 
                 return response
             return {'success': False, 'errors': ['Error al actualizar el estado del hardware']}
+        except VersionConflictError as exc:
+            return {'success': False, 'errors': [str(exc)], 'status_code': 409}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
     
@@ -361,7 +469,7 @@ class HardwareService:
             if physical_status is None or not isinstance(physical_status, dict):
                 return {'success': False, 'errors': ['physical_status debe ser un objeto JSON']}
 
-            physical_status['updated_at'] = datetime.utcnow().isoformat()
+            physical_status['updated_at'] = datetime.utcnow()
             updated = self.hardware_repo.update_physical_status_by_empresa_hardware(
                 empresa_nombre,
                 hardware_nombre,
@@ -369,70 +477,132 @@ class HardwareService:
             )
             if not updated:
                 return {'success': False, 'errors': ['Hardware no encontrado']}
+            if updated.topic:
+                self.heartbeats.commit(full={updated.topic: physical_status})
 
             result = updated.to_json()
-            empresa = self.empresa_repo.find_by_id(updated.empresa_id) if updated.empresa_id else None
-            result['empresa_nombre'] = empresa.nombre if empresa else None
+            result['empresa_nombre'] = self.empresa_repo.find_nombre_by_id(updated.empresa_id)
             return {'success': True, 'data': result}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
 
-    def check_physical_status_stale(self, empresa_id=None):
-        """Marca como inactivo el hardware con status vencido"""
+    def update_physical_status_batch(self, items):
+        """Aplica muchos heartbeats (topic + physical_status) con un solo bulk_write"""
         try:
-            excluded_types = [
-                item.strip().upper()
-                for item in (Config.HARDWARE_STATUS_DEFAULT_EXCLUDED_TYPES or '').split(',')
-                if item.strip()
-            ]
-            stale_seconds = Config.HARDWARE_STATUS_STALE_SECONDS
-            now = datetime.utcnow()
-
-            if empresa_id:
-                hardware_list = self.hardware_repo.find_by_empresa(empresa_id)
-            else:
-                hardware_list = self.hardware_repo.find_all()
+            if not isinstance(items, list) or not items:
+                return {'success': False, 'errors': ['Debe enviar items como una lista no vacía']}
+            max_items = Config.HEARTBEAT_BATCH_MAX_ITEMS
+            if len(items) > max_items:
+                return {'success': False, 'errors': [f'Máximo {max_items} items por lote']}
 
-            updated_hardware = []
-            for hardware in hardware_list:
-                if not hardware.activa:
+            # Si un topic llega varias veces en el lote, gana el último
+            latest = {}
+            errors = []
+            for index, item in enumerate(items):
+                if not isinstance(item, dict):
+                    errors.append(f'items[{index}]: debe ser un objeto JSON')
                     continue
-                tipo = (hardware.tipo or '').upper()
-                if tipo in excluded_types:
+                topic = item.get('topic')
+                physical_status = item.get('physical_status')
+                if not isinstance(topic, str) or not topic.strip():
+                    errors.append(f'items[{index}]: topic es obligatorio')
                     continue
-
-                physical_status = hardware.physical_status or {}
-                estado_actual = physical_status.get('estado')
-                updated_at = physical_status.get('updated_at')
-                last_update = None
-                if isinstance(updated_at, str):
-                    try:
-                        last_update = datetime.fromisoformat(updated_at)
-                    except ValueError:
-                        last_update = None
-
-                is_stale = not last_update or (now - last_update) > timedelta(seconds=stale_seconds)
-                should_update = False
-                if isinstance(estado_actual, str) and estado_actual.strip().lower() == 'desactivado':
-                    physical_status['estado'] = 'Inactivo'
-                    should_update = True
-                elif is_stale:
-                    if physical_status.get('estado') != 'Inactivo':
-                        physical_status['estado'] = 'Inactivo'
-                    should_update = True
-                if not should_update:
+                if not isinstance(physical_status, dict):
+                    errors.append(f'items[{index}]: physical_status debe ser un objeto JSON')
                     continue
-                updated = self.hardware_repo.update_physical_status_by_id(hardware._id, physical_status)
-                if updated:
-                    empresa = self.empresa_repo.find_by_id(updated.empresa_id) if updated.empresa_id else None
-                    updated_hardware.append({
-                        '_id': str(updated._id) if updated._id else None,
-                        'nombre': updated.nombre,
-                        'empresa_nombre': empresa.nombre if empresa else None,
-                        'sede': updated.sede,
-                        'estado': (updated.physical_status or {}).get('estado')
-                    })
+                latest[topic.strip()] = dict(physical_status)
+
+            now = datetime.utcnow()
+            full, touch, skipped = self.heartbeats.plan(latest, now)
+            for physical_status in full.values():
+                physical_status['updated_at'] = now
+
+            not_found = []
+            matched = self.hardware_repo.bulk_update_physical_status(full, touch, now)
+            if matched < len(full) + len(touch):
+                # Algún topic no existe o su estado cambió en otro worker: se resuelve con una consulta
+                estados = self.hardware_repo.find_estados_by_topics(list(full) + list(touch))
+                not_found = [topic for topic in list(full) + list(touch) if topic not in estados]
+                retry = {
+                    topic: latest[topic]
+                    for topic, estado in touch.items()
+                    if topic in estados and estados[topic] != estado
+                }
+                for topic in not_found:
+                    full.pop(topic, None)
+                    touch.pop(topic, None)
+                if retry:
+                    for topic, physical_status in retry.items():
+                        physical_status['updated_at'] = now
+                        touch.pop(topic, None)
+                    self.hardware_repo.bulk_update_physical_status(retry, {}, now)
+                    full.update(retry)
+
+            self.heartbeats.commit(full, touch, now)
+            self.heartbeats.forget(not_found)
+            return {
+                'success': True,
+                'data': {
+                    'received': len(items),
+                    'written': len(full),
+                    'touched': len(touch),
+                    'coalesced': len(skipped),
+                    'not_found': not_found,
+                    'errors': errors
+                }
+            }
+        except Exception as exc:
+            return {'success': False, 'errors': [str(exc)]}
 
+    def get_fleet_status(self, empresa_id=None):
+        """Vista en vivo de la última señal de cada hardware vista por este worker"""
+        try:
+            topics = set(self.hardware_repo.find_topics_by_empresa(empresa_id)) if empresa_id else None
+            fleet = self.heartbeats.snapshot(topics)
+            return {
+                'success': True,
+                'data': fleet,
+                'count': len(fleet),
+                'worker': self.heartbeats.stats()
+            }
+        except Exception as exc:
+            return {'success': False, 'errors': [str(exc)]}
+
+    def _status_excluded_types(self):
+        """Nombres de tipo (tal como están guardados) excluidos de la revisión de vencidos"""
+        excluded = {
+            item.strip().upper()
+            for item in (Config.HARDWARE_STATUS_DEFAULT_EXCLUDED_TYPES or '').split(',')
+            if item.strip()
+        }
+        if not excluded:
+            return []
+        return [nombre for nombre in self.type_service.get_type_names() if (nombre or '').upper() in excluded]
+
+    def check_physical_status_stale(self, empresa_id=None):
+        """Marca como inactivo el hardware con status vencido"""
+        try:
+            now = datetime.utcnow()
+            cutoff = now - timedelta(seconds=Config.HARDWARE_STATUS_STALE_SECONDS)
+            affected = self.hardware_repo.mark_stale_physical_status(
+                cutoff,
+                excluded_types=self._status_excluded_types(),
+                empresa_id=empresa_id,
+                now=now
+            )
+            self.heartbeats.forget([doc.get('topic') for doc in affected])
+
+            empresa_nombres = self.empresa_repo.find_nombres_by_ids(doc.get('empresa_id') for doc in affected)
+            updated_hardware = [
+                {
+                    '_id': str(doc['_id']),
+                    'nombre': doc.get('nombre'),
+                    'empresa_nombre': empresa_nombres.get(str(doc.get('empresa_id'))),
+                    'sede': doc.get('sede'),
+                    'estado': 'Inactivo'
+                }
+                for doc in affected
+            ]
             return {'success': True, 'data': updated_hardware, 'count': len(updated_hardware)}
         except Exception as exc:
             return {'success': False, 'errors': [str(exc)]}
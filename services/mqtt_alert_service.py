@@ -1,7 +1,7 @@
 from repositories.mqtt_alert_repository import MqttAlertRepository
 from repositories.usuario_repository import UsuarioRepository
 from models.mqtt_alert import MqttAlert
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 
 class MqttAlertService:
@@ -198,8 +198,11 @@ class MqttAlertService:
                 topics_otros_hardware = []
             
             # Crear la alerta usando el método de fábrica actualizado
+            empresa_id_final = (verification_info.get('empresa_data') or {}).get('_id')
+            
             alert = MqttAlert.create_from_hardware(
                 empresa_nombre=empresa_nombre_final,
+                empresa_id=empresa_id_final,
                 sede=sede_final,
                 hardware_nombre=hardware_nombre,
                 hardware_id=hardware_id,
@@ -340,10 +343,10 @@ class MqttAlertService:
             # print(f"❌ Error obteniendo alerta para usuario: {e}")
             return {'success': False, 'error': str(e)}
     
-    def get_alerts_by_empresa(self, empresa_nombre, page=1, limit=50):
+    def get_alerts_by_empresa(self, empresa_id, page=1, limit=50):
         """Obtiene alertas por empresa"""
         try:
-            alerts, total = self.alert_repo.get_alerts_by_empresa(empresa_nombre, page, limit)
+            alerts, total = self.alert_repo.get_alerts_by_empresa(empresa_id, page, limit)
             return {
                 'success': True,
                 'alerts': [alert.to_json() for alert in alerts],
@@ -457,19 +460,28 @@ class MqttAlertService:
             }
     
     def authorize_alert(self, alert_id, usuario_id):
-        """Autoriza una alerta"""
+        """Autoriza una alerta (solo si está activa y no autorizada)"""
         try:
-            success = self.alert_repo.authorize_alert(alert_id, usuario_id)
-            if success:
+            alert_data, motivo = self.alert_repo.authorize_alert(alert_id, usuario_id)
+            if alert_data:
                 return {
                     'success': True,
-                    'message': 'Alerta autorizada exitosamente'
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': 'No se pudo autorizar la alerta'
+                    'message': 'Alerta autorizada exitosamente',
+                    'version': alert_data.get('version')
                 }
+            
+            errores = {
+                self.alert_repo.LIFECYCLE_NOT_FOUND: ('Alerta no encontrada', 404),
+                self.alert_repo.LIFECYCLE_INACTIVE: ('La alerta está desactivada y no puede autorizarse', 409),
+                self.alert_repo.LIFECYCLE_ALREADY_AUTHORIZED: ('La alerta ya estaba autorizada', 409),
+                self.alert_repo.LIFECYCLE_ARCHIVED: ('La alerta está archivada y es de solo lectura', 409),
+            }
+            error, status_code = errores.get(motivo, ('No se pudo autorizar la alerta', 400))
+            return {
+                'success': False,
+                'error': error,
+                'status_code': status_code
+            }
         except Exception as e:
             # print(f"Error autorizando alerta: {e}")
             return {
@@ -480,11 +492,19 @@ class MqttAlertService:
     def toggle_alert_status(self, alert_id):
         """Alterna el estado de una alerta"""
         try:
-            success = self.alert_repo.toggle_alert_status(alert_id)
-            if success:
+            alert_data = self.alert_repo.toggle_alert_status(alert_id)
+            if alert_data:
                 return {
                     'success': True,
-                    'message': 'Estado de alerta actualizado exitosamente'
+                    'message': 'Estado de alerta actualizado exitosamente',
+                    'activo': alert_data.get('activo'),
+                    'version': alert_data.get('version')
+                }
+            elif self.alert_repo.is_archived(alert_id):
+                return {
+                    'success': False,
+                    'error': 'La alerta está archivada y es de solo lectura',
+                    'status_code': 409
                 }
             else:
                 return {
@@ -524,11 +544,18 @@ class MqttAlertService:
         Actualiza el estado de un usuario en una alerta.
         """
         try:
-            alert, error = self.alert_repo.update_user_status_in_alert(alert_id, usuario_id, updates)
+            result, error = self.alert_repo.update_user_status_in_alert(alert_id, usuario_id, updates)
             if error:
                 return {'success': False, 'error': error}
             
-            return {'success': True, 'alert': alert.to_json()}
+            fecha_actualizacion = result['fecha_actualizacion']
+            return {
+                'success': True,
+                'alert_id': result['alert_id'],
+                'version': result['version'],
+                'fecha_actualizacion': fecha_actualizacion.isoformat() if fecha_actualizacion else None,
+                'recipient': result['recipient']
+            }
         except Exception as e:
             # print(f"Error updating alert user status: {e}")
             return {'success': False, 'error': str(e)}
@@ -549,6 +576,34 @@ class MqttAlertService:
                 'stats': {}
             }
     
+    def get_empresa_alerts_stats(self, empresa_id, recent_days=30):
+        """Estadísticas de alertas de una empresa, incluidas las archivadas"""
+        try:
+            since = datetime.utcnow() - timedelta(days=recent_days)
+            por_prioridad = self.alert_repo.get_empresa_alerts_stats(empresa_id, since)
+            total = sum(row['total'] for row in por_prioridad.values())
+            activas = sum(row['activas'] for row in por_prioridad.values())
+            stats = {
+                'total_alertas': total,
+                'alertas_activas': activas,
+                'alertas_inactivas': total - activas,
+                'alertas_recientes_30d': sum(row['recientes'] for row in por_prioridad.values()),
+                'alertas_por_prioridad': {
+                    prioridad: por_prioridad.get(prioridad, {}).get('total', 0)
+                    for prioridad in ('critica', 'alta', 'media', 'baja')
+                }
+            }
+            return {
+                'success': True,
+                'stats': stats
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'stats': {}
+            }
+    
     def verify_empresa_sede(self, empresa_nombre, sede):
         """Verifica si existe una empresa con la sede especificada"""
         try:
@@ -556,7 +611,7 @@ class MqttAlertService:
             usuarios = []
             
             if exists:
-                usuarios = self.alert_repo.get_users_by_empresa_sede(empresa_nombre, sede)
+                usuarios = self.alert_repo.get_users_by_empresa_sede(empresa_nombre=empresa_nombre, sede=sede)
             
             return {
                 'success': exists,
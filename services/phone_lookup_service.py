@@ -1,25 +1,48 @@
 from repositories.usuario_repository import UsuarioRepository
 from repositories.empresa_repository import EmpresaRepository
+from models.empresa import Empresa
+from core.config import Config
+from utils.phone_utils import normalize_phone_e164
+from utils.ttl_cache import TTLCache
 from typing import Dict, Any, Optional
 
 
+# Cache por worker de resultados exitosos (usuario + empresa + rol), indexado
+# por teléfono canónico E.164. Se invalida desde UsuarioService y EmpresaService.
+_lookup_cache = TTLCache(
+    maxsize=Config.PHONE_LOOKUP_CACHE_SIZE,
+    ttl_seconds=Config.PHONE_LOOKUP_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_phone_lookup_cache(*telefonos: Optional[str]) -> None:
+    """Invalida las entradas de los teléfonos indicados; sin argumentos vacía la cache."""
+    if not telefonos:
+        _lookup_cache.clear()
+        return
+    for telefono in telefonos:
+        telefono_normalizado = normalize_phone_e164(telefono) if telefono else None
+        if telefono_normalizado:
+            _lookup_cache.pop(telefono_normalizado)
+
+
 class PhoneLookupService:
     """
     Servicio para buscar información de una persona por su número de teléfono.
     No requiere autenticación.
     """
-    
+
     def __init__(self):
         self.usuario_repository = UsuarioRepository()
         self.empresa_repository = EmpresaRepository()
-    
+
     def lookup_by_phone(self, telefono: str) -> Dict[str, Any]:
         """
         Busca información de una persona por su número de teléfono.
-        
+
         Args:
             telefono: Número de teléfono a buscar
-            
+
         Returns:
             Dict con la información encontrada o error si no se encuentra
         """
@@ -31,30 +54,35 @@ class PhoneLookupService:
                     'error': 'Teléfono requerido',
                     'message': 'El número de teléfono es obligatorio'
                 }
-            
+
             # Normalizar el teléfono
             telefono_normalizado = telefono.strip()
-            
-            # Buscar usuario por teléfono
-            usuario = self.usuario_repository.find_by_telefono_global(telefono_normalizado)
-            
+            cache_key = normalize_phone_e164(telefono_normalizado)
+
+            cached = _lookup_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return {'success': True, 'data': dict(cached)}
+
+            # Buscar usuario y empresa por teléfono en una sola consulta
+            usuario, empresa_data = self.usuario_repository.find_by_telefono_with_empresa(telefono_normalizado)
+
             if not usuario:
                 return {
                     'success': False,
                     'error': 'Usuario no encontrado',
                     'message': f'No se encontró ningún usuario con el teléfono {telefono_normalizado}'
                 }
-            
-            # Obtener información de la empresa
-            empresa = self.empresa_repository.find_by_id(usuario.empresa_id)
-            
-            if not empresa:
+
+            # Obtener información de la empresa (solo activas)
+            empresa = Empresa.from_dict(empresa_data) if empresa_data else None
+
+            if not empresa or not empresa.activa:
                 return {
                     'success': False,
                     'error': 'Empresa no encontrada',
                     'message': 'La empresa asociada al usuario no fue encontrada'
                 }
-            
+
             # Determinar detalles del rol, buscando en la empresa
             rol_detalle = next(
                 (
@@ -70,21 +98,25 @@ class PhoneLookupService:
             )
 
             # Construir respuesta con la información solicitada
+            data = {
+                'id': str(usuario._id),
+                'nombre': usuario.nombre,
+                'empresa_id': str(empresa._id) if getattr(empresa, '_id', None) else None,
+                'empresa': empresa.nombre,
+                'sede': usuario.sede,
+                'telefono': usuario.telefono,
+                'cedula': usuario.cedula,
+                'rol': rol_detalle or usuario.rol,
+                'email': usuario.email
+            }
+            if cache_key:
+                _lookup_cache.set(cache_key, data)
+
             return {
                 'success': True,
-                'data': {
-                    'id': str(usuario._id),
-                    'nombre': usuario.nombre,
-                    'empresa_id': str(empresa._id) if getattr(empresa, '_id', None) else None,
-                    'empresa': empresa.nombre,
-                    'sede': usuario.sede,
-                    'telefono': usuario.telefono,
-                    'cedula': usuario.cedula,
-                    'rol': rol_detalle or usuario.rol,
-                    'email': usuario.email
-                }
+                'data': dict(data)
             }
-            
+
         except Exception as e:
             return {
                 'success': False,
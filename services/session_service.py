@@ -16,10 +16,13 @@ class SessionService:
             ip_address = None
             user_agent = None
             fingerprint = None
+            client_fingerprint = None
             
             if request_data:
                 ip_address = request_data.get('remote_addr')
                 user_agent = request_data.get('user_agent')
+                # Huella del cliente que valida SecurityMiddleware en cada petición
+                client_fingerprint = request_data.get('client_fingerprint')
                 
                 # Generar fingerprint único basado en IP + User-Agent + otros datos
                 fingerprint_data = f"{ip_address}_{user_agent}_{user_id}"
@@ -32,6 +35,7 @@ class SessionService:
                 'ip_address': ip_address,
                 'user_agent': user_agent,
                 'fingerprint': fingerprint,
+                'client_fingerprint': client_fingerprint,
                 'expires_at': datetime.utcnow() + timedelta(days=7)  # 7 días como el refresh token
             }
             
@@ -53,8 +57,8 @@ class SessionService:
     def validate_refresh_token_session(self, refresh_token_jti, request_data=None):
         """Validar que el refresh token tenga una sesión activa válida"""
         try:
-            # Obtener sesión por JTI
-            session_result = self.session_repository.get_session_by_jti(refresh_token_jti)
+            # Obtener sesión por JTI (cache del worker, respetando revocaciones)
+            session_result = self.session_repository.get_cached_session_by_jti(refresh_token_jti)
             
             if not session_result['success']:
                 return {
@@ -88,6 +92,14 @@ class SessionService:
                 'errors': [f'Error validando sesión: {str(e)}']
             }
     
+    def is_client_bound(self, user_id, client_fingerprint):
+        """True si el usuario tiene una sesión activa iniciada desde este cliente"""
+        try:
+            return self.session_repository.has_active_client(user_id, client_fingerprint)
+        except Exception as e:
+            logger.error(f"Error validando cliente de la sesión: {str(e)}")
+            return False
+    
     def get_user_active_sessions(self, user_id):
         """Obtener sesiones activas de un usuario"""
         try:
@@ -178,25 +190,13 @@ class SessionService:
     def enforce_max_sessions_per_user(self, user_id, max_sessions=5):
         """Limitar número máximo de sesiones por usuario"""
         try:
-            # Obtener sesiones activas del usuario
-            sessions_result = self.get_user_active_sessions(user_id)
-            
-            if not sessions_result['success']:
-                return sessions_result
-            
-            active_sessions = sessions_result['data']
-            
-            # Si hay más sesiones del límite, invalidar las más antiguas
-            if len(active_sessions) >= max_sessions:
-                # Ordenar por last_used (las más antiguas primero)
-                sessions_to_remove = sorted(active_sessions, key=lambda x: x['last_used'])[:len(active_sessions) - max_sessions + 1]
-                
-                invalidated_count = 0
-                for session in sessions_to_remove:
-                    result = self.invalidate_session(session_id=session['_id'])
-                    if result['success']:
-                        invalidated_count += 1
-                
+            # Al alcanzar el límite se conservan solo las max_sessions - 1 más recientes
+            result = self.session_repository.evict_oldest_sessions(user_id, keep=max_sessions - 1)
+            if not result['success']:
+                return result
+
+            invalidated_count = result['invalidated_count']
+            if invalidated_count:
                 logger.info(f"Usuario {user_id}: Invalidadas {invalidated_count} sesiones antiguas (límite: {max_sessions})")
                 
                 return {
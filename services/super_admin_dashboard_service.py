@@ -141,27 +141,21 @@ class SuperAdminDashboardService:
     def get_recent_users(self, limit=5):
         """Obtiene usuarios recientes"""
         try:
-            # Obtener usuarios de todas las empresas
-            empresas_result = self.empresa_service.get_all_empresas(include_inactive=True)
-            
-            if not empresas_result['success']:
-                return {'success': False, 'errors': ['Error al obtener empresas']}
-            
-            all_users = []
-            for empresa in empresas_result['data']:
-                users_result = self.usuario_service.get_usuarios_by_empresa_including_inactive(empresa['_id'])
-                if users_result['success']:
-                    for user in users_result['data']:
-                        user['empresa_nombre'] = empresa['nombre']
-                        all_users.append(user)
-            
-            # Ordenar por fecha de creación descendente
-            users_sorted = sorted(all_users, 
-                                key=lambda x: x.get('fecha_creacion', ''), 
-                                reverse=True)
+            # Una consulta ordenada por fecha y una para los nombres de empresa, sin importar cuántas haya
+            usuarios = self.usuario_repository.find_recent_including_inactive(limit)
+            nombres = self.empresa_repository.find_nombres_by_ids(
+                [usuario.empresa_id for usuario in usuarios if usuario.empresa_id], include_inactive=True
+            )
             
-            # Tomar solo los más recientes
-            recent_users = users_sorted[:limit]
+            recent_users = []
+            for usuario in usuarios:
+                empresa_nombre = nombres.get(str(usuario.empresa_id))
+                if empresa_nombre is None:
+                    # Usuarios de empresas eliminadas
+                    continue
+                user = usuario.to_json()
+                user['empresa_nombre'] = empresa_nombre
+                recent_users.append(user)
             
             # Formatear datos para el frontend
             formatted_users = []
@@ -369,7 +363,9 @@ class SuperAdminDashboardService:
                 'avg_session_duration': session_stats.get('avg_session_duration', 0),  # minutes
                 'cpu_usage': cpu_usage,
                 'memory_usage': memory_usage,
-                'disk_usage': disk_usage
+                'disk_usage': disk_usage,
+                # Rutas de este worker con más tiempo en MongoDB
+                'routes': get_performance_metrics().get_route_stats()
             }
             
             return {'success': True, 'data': performance_data}
@@ -4,6 +4,8 @@ from repositories.usuario_repository import UsuarioRepository
 from repositories.empresa_repository import EmpresaRepository
 from utils.role_utils import is_role_allowed, normalize_role_name
 from utils.whatsapp_service_client import whatsapp_client
+from services.phone_lookup_service import invalidate_phone_lookup_cache
+from utils.change_tracking import VersionConflictError
 
 class UsuarioService:
     def __init__(self):
@@ -122,6 +124,7 @@ class UsuarioService:
                 )
                 updated_usuario.fecha_creacion = usuario_inactivo.fecha_creacion
                 updated_usuario.activo = True
+                updated_usuario.track_changes(usuario_inactivo)
 
                 validation_errors = updated_usuario.validate()
                 if validation_errors:
@@ -132,6 +135,7 @@ class UsuarioService:
                     }
 
                 result = self.usuario_repository.update(usuario_inactivo._id, updated_usuario)
+                invalidate_phone_lookup_cache(usuario_inactivo.telefono)
                 if not result:
                     return {
                         'success': False,
@@ -173,6 +177,7 @@ class UsuarioService:
             
             # 9. Crear usuario
             created_usuario = self.usuario_repository.create(usuario)
+            invalidate_phone_lookup_cache(created_usuario.telefono)
             
             # 10. Incluir información de la empresa en la respuesta
             response_data = created_usuario.to_json()
@@ -354,6 +359,14 @@ class UsuarioService:
             
             existing_usuario = self.usuario_repository.find_by_id(usuario_id)
             
+            # Concurrencia optimista: el cliente puede enviar la versión que leyó
+            if 'version' in usuario_data and usuario_data['version'] != existing_usuario.version:
+                return {
+                    'success': False,
+                    'errors': [str(VersionConflictError())],
+                    'status_code': 409
+                }
+            
             empresa_info = existing_result['data']['empresa']
             if isinstance(empresa_info['id'], str):
                 empresa_id_obj = ObjectId(empresa_info['id'])
@@ -399,6 +412,8 @@ class UsuarioService:
             # Mantener datos originales
             updated_usuario.fecha_creacion = existing_usuario.fecha_creacion
             updated_usuario.activo = existing_usuario.activo
+            # Solo se escribirán los campos que difieran del usuario leído
+            updated_usuario.track_changes(existing_usuario)
             
             # Validar datos
             validation_errors = updated_usuario.validate()
@@ -423,6 +438,8 @@ class UsuarioService:
             
             # Actualizar usuario
             result = self.usuario_repository.update(usuario_id, updated_usuario)
+            # El teléfono anterior y el nuevo (si cambió)
+            invalidate_phone_lookup_cache(existing_usuario.telefono, updated_usuario.telefono)
             if result:
                 self._delete_whatsapp_number(result.telefono)
                 response_data = result.to_json()
@@ -445,6 +462,12 @@ class UsuarioService:
                     'status_code': 500
                 }
                 
+        except VersionConflictError as e:
+            return {
+                'success': False,
+                'errors': [str(e)],
+                'status_code': 409
+            }
         except Exception as e:
             return {
                 'success': False,
@@ -487,6 +510,7 @@ class UsuarioService:
             
             # Eliminar usuario (hard delete)
             deleted = self.usuario_repository.delete(usuario_id)
+            invalidate_phone_lookup_cache(usuario.telefono)
             if deleted:
                 if usuario:
                     self._delete_whatsapp_number(usuario.telefono)
@@ -548,6 +572,7 @@ class UsuarioService:
             usuario.update_timestamp()
             
             updated = self.usuario_repository.update_status_only(usuario_id, activo)
+            invalidate_phone_lookup_cache(usuario.telefono)
             if updated:
                 self._delete_whatsapp_number(updated.telefono)
                 status_text = "activado" if activo else "desactivado"
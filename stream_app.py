@@ -0,0 +1,68 @@
+"""Servidor del stream SSE de alertas, en un proceso aparte de la API.
+
+Una conexión SSE queda abierta mientras el dashboard está visible. En los
+workers gthread de la API eso ocupa un hilo por conexión; aquí se sirve con
+workers gevent, donde cada conexión es una greenlet:
+
+    gunicorn --worker-class gevent --worker-connections 1100 \\
+        --bind 0.0.0.0:5003 "stream_app:create_stream_app()"
+
+El proxy envía `GET /api/mqtt-alerts/stream` a este servidor. Necesita
+change streams (replica set o mongos): en modo local los eventos se publican
+en el proceso de la API que modifica la alerta y no llegan aquí.
+"""
+
+import logging
+
+from flask import Flask, jsonify
+from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from core.config import Config
+from core.json_provider import FastJSONProvider
+from core.routes import alert_stream_bp
+from utils.alert_stream import get_alert_stream_broker
+
+logger = logging.getLogger(__name__)
+
+
+def create_stream_app():
+    """Factory de la aplicación que solo atiende el stream de alertas"""
+    app = Flask(__name__)
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
+    app.config.from_object(Config)
+
+    if Config.PROXY_FIX_X_FOR:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.PROXY_FIX_X_FOR)
+
+    CORS(app,
+         resources={r"/api/mqtt-alerts/stream": {"origins": [
+             "https://rescue.com.co",  # Dominio de producción
+             "http://localhost:5000", "http://127.0.0.1:5000",
+             "http://localhost:5004", "http://127.0.0.1:5004",
+             "http://localhost:5050", "http://127.0.0.1:5050",
+             "http://localhost:5051", "http://127.0.0.1:5051"  # Frontend principal
+         ]}},
+         supports_credentials=True)
+
+    broker = get_alert_stream_broker()
+    # Sin --preload: el lector del change stream arranca en cada worker
+    broker.configure(max_subscribers=Config.ALERT_STREAM_MAX_SUBSCRIBERS, start_reader=True)
+    if broker.publishes_locally:
+        logger.error(
+            "Stream de alertas en modo local: este proceso no recibe los eventos de la API. "
+            "Use un replica set o sirva el stream desde la API"
+        )
+
+    app.register_blueprint(alert_stream_bp)
+
+    @app.route('/health', methods=['GET'])
+    def health_check():
+        return jsonify({
+            'status': 'OK',
+            'stream_mode': broker.mode,
+            'subscribers': broker.subscriber_count()
+        }), 200
+
+    return app
@@ -0,0 +1,64 @@
+"""Configuración de las pruebas: la app corre sobre mongomock, sin mongod.
+
+El entorno y la base en memoria se preparan aquí, antes de que cualquier
+prueba importe `core` o los repositorios.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Añadir el directorio raíz al path para importar módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update({
+    'MONGO_URI': 'mongodb://localhost:27017',
+    'DATABASE_NAME': 'rescue_test',
+    'SECRET_KEY': 'test-secret',
+    'JWT_SECRET_KEY': 'test-jwt-secret',
+    'INTERNAL_TOKEN': 'test-internal-token',
+    'RESEND_API_KEY': 'test-resend-key',
+    'RESEND_DOMAIN': 'test.local',
+    'CONTACT_EMAIL': 'contacto@test.local',
+    'ALERT_STREAM_MODE': 'local',
+    'HARDWARE_STATUS_SWEEP_INTERVAL_SECONDS': '0',
+    'PASSWORD_HASH_PROCESSES': '0',
+    'BCRYPT_ROUNDS': '4',
+})
+
+from benchmarks.mongo_stand_in import CommandRecorder, install  # noqa: E402
+
+_database = install(os.environ['DATABASE_NAME'])
+
+
+@pytest.fixture
+def db():
+    """Base vacía (se conservan los índices creados por los repositorios)"""
+    from repositories.empresa_repository import invalidate_empresa_cache
+
+    for name in _database.list_collection_names():
+        _database[name].delete_many({})
+    invalidate_empresa_cache()
+    yield _database
+
+
+@pytest.fixture
+def mongo_commands():
+    """Operaciones de MongoDB ejecutadas durante la prueba"""
+    with CommandRecorder() as recorder:
+        yield recorder
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Aplicación completa sobre la base en memoria"""
+    from app import create_app
+
+    return create_app()
+
+
+@pytest.fixture
+def client(app, db):
+    """Cliente HTTP de la aplicación con la base vacía"""
+    return app.test_client()
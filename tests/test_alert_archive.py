@@ -0,0 +1,101 @@
+"""Las alertas archivadas son de solo lectura y siguen vinculando hardware."""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from models.empresa import Empresa
+from repositories.mqtt_alert_repository import MqttAlertRepository
+from services.empresa_service import EmpresaService
+from services.hardware_service import HardwareService
+from services.mqtt_alert_service import MqttAlertService
+
+
+def _archive(db, **fields):
+    alert = {
+        '_id': ObjectId(),
+        'activo': False,
+        'fecha_creacion': datetime.utcnow(),
+        'fecha_desactivacion': datetime.utcnow(),
+        'empresa_nombre': 'Acme',
+        **fields
+    }
+    MqttAlertRepository().archive_repo.archive_documents([alert])
+    return str(alert['_id'])
+
+
+def test_lifecycle_transitions_on_archived_alert(db):
+    alert_id = _archive(db)
+    service = MqttAlertService()
+
+    toggled = service.toggle_alert_status(alert_id)
+    assert toggled == {
+        'success': False, 'error': 'La alerta está archivada y es de solo lectura', 'status_code': 409
+    }
+    authorized = service.authorize_alert(alert_id, None)
+    assert (authorized['error'], authorized['status_code']) == ('La alerta está archivada y es de solo lectura', 409)
+
+    repo = service.alert_repo
+    alert, motivo = repo.deactivate_alert(alert_id, str(ObjectId()), 'administrador')
+    assert motivo == repo.LIFECYCLE_ALREADY_DEACTIVATED
+    assert str(alert['_id']) == alert_id
+    assert db.mqtt_alerts.count_documents({}) == 0
+
+
+def test_unknown_alert_is_still_not_found(db):
+    service = MqttAlertService()
+    alert_id = str(ObjectId())
+
+    assert service.toggle_alert_status(alert_id)['error'] == 'No se pudo actualizar el estado de la alerta'
+    assert service.authorize_alert(alert_id, None)['status_code'] == 404
+    assert service.alert_repo.deactivate_alert(alert_id, str(ObjectId()), 'administrador') == (
+        None, service.alert_repo.LIFECYCLE_NOT_FOUND
+    )
+
+
+def test_linked_topics_fallback_reads_archive(db):
+    _archive(db, topic='empresa/sede/semaforo/a', topics_otros_hardware=['empresa/sede/semaforo/b'])
+    db.mqtt_alerts.insert_one({
+        'topic': 'empresa/sede/semaforo/c', 'topics_otros_hardware': ['empresa/sede/semaforo/a'], 'activo': True
+    })
+
+    peers = HardwareService()._get_topics_otros_hardware_from_alerts('empresa/sede/semaforo/a')
+
+    assert sorted(peers) == ['empresa/sede/semaforo/b', 'empresa/sede/semaforo/c']
+
+
+def test_alert_stats_include_archived_alerts(db):
+    _archive(db, autorizado=True)
+    _archive(db, autorizado=False)
+    db.mqtt_alerts.insert_many([
+        {'activo': True, 'autorizado': False, 'fecha_creacion': datetime.utcnow()},
+        {'activo': False, 'autorizado': True, 'fecha_creacion': datetime.utcnow()},
+    ])
+
+    stats = MqttAlertService().get_alerts_stats()['stats']
+
+    assert stats == {'total': 4, 'active': 1, 'inactive': 3, 'authorized': 2, 'unauthorized': 2}
+
+
+def test_empresa_statistics_include_archived_alerts(db):
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    hace_60_dias = datetime.utcnow() - timedelta(days=60)
+    _archive(db, empresa_id=empresa._id, prioridad='ALTA', fecha_creacion=hace_60_dias)
+    _archive(db, empresa_id=empresa._id, prioridad='media', fecha_creacion=hace_60_dias)
+    _archive(db, empresa_id=ObjectId(), prioridad='alta')
+    db.mqtt_alerts.insert_many([
+        {'empresa_id': empresa._id, 'activo': True, 'prioridad': 'alta', 'fecha_creacion': datetime.utcnow()},
+        {'empresa_id': empresa._id, 'activo': False, 'fecha_creacion': datetime.utcnow()},
+    ])
+
+    result = EmpresaService().get_empresa_statistics(str(empresa._id))
+
+    assert result['success'], result
+    assert result['data']['alertas'] == {
+        'total_alertas': 4,
+        'alertas_activas': 1,
+        'alertas_inactivas': 3,
+        'alertas_recientes_30d': 2,
+        'alertas_por_prioridad': {'critica': 0, 'alta': 2, 'media': 2, 'baja': 0},
+    }
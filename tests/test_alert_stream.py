@@ -0,0 +1,179 @@
+"""Stream SSE de alertas: reenvío por Last-Event-ID, filtros y detección del modo."""
+
+import jwt
+import pytest
+from bson import ObjectId
+
+from utils import alert_stream
+from utils.alert_stream import (
+    EVENT_CREATED,
+    EVENT_RESYNC,
+    AlertStreamBroker,
+    AlertStreamFullError,
+)
+
+EMPRESA = str(ObjectId())
+OTRA_EMPRESA = str(ObjectId())
+
+
+def _alert(empresa_id=EMPRESA, sede='Principal', **fields):
+    return {'_id': ObjectId(), 'empresa_id': ObjectId(empresa_id), 'sede': sede, 'image_alert': 'x' * 10, **fields}
+
+
+def _drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+
+@pytest.fixture
+def broker():
+    return AlertStreamBroker(mode=AlertStreamBroker.MODE_LOCAL, queue_size=3, replay_size=10, max_subscribers=2)
+
+
+def test_replay_after_last_event_id_is_filtered_by_empresa_and_sede(broker):
+    broker.publish(EVENT_CREATED, _alert())
+    first = broker._replay[-1]['id']
+    broker.publish(EVENT_CREATED, _alert(sede='Norte'))
+    broker.publish(EVENT_CREATED, _alert(empresa_id=OTRA_EMPRESA))
+    broker.publish(EVENT_CREATED, _alert(sede=' PRINCIPAL '))
+
+    subscription = broker.subscribe(EMPRESA, sede='principal', last_event_id=first)
+
+    events = _drain(subscription)
+    assert [event['sede_key'] for event in events] == ['principal']
+    assert events[0]['payload']['empresa_id'] == EMPRESA
+    assert 'image_alert' not in events[0]['payload']
+
+
+def test_live_events_reach_only_matching_subscribers(broker):
+    todas = broker.subscribe(EMPRESA)
+    norte = broker.subscribe(EMPRESA, sede='Norte')
+
+    broker.publish(EVENT_CREATED, _alert())
+    broker.publish(EVENT_CREATED, _alert(empresa_id=OTRA_EMPRESA, sede='Norte'))
+
+    assert len(_drain(todas)) == 1
+    assert _drain(norte) == []
+
+
+def test_unknown_last_event_id_asks_for_resync(broker):
+    subscription = broker.subscribe(EMPRESA, last_event_id='local-999')
+
+    message = next(subscription.iter_messages(heartbeat_seconds=0.01))
+
+    assert message.startswith(f'event: {EVENT_RESYNC}\n')
+
+
+def test_slow_subscriber_gets_resync_instead_of_blocking(broker):
+    subscription = broker.subscribe(EMPRESA)
+    for _ in range(5):
+        broker.publish(EVENT_CREATED, _alert())
+
+    messages = subscription.iter_messages(heartbeat_seconds=0.01)
+
+    assert next(messages).startswith(f'event: {EVENT_RESYNC}\n')
+    assert next(messages) == ': keepalive\n\n'
+
+
+def test_subscriber_limit(broker):
+    broker.subscribe(EMPRESA)
+    second = broker.subscribe(EMPRESA)
+    with pytest.raises(AlertStreamFullError):
+        broker.subscribe(EMPRESA)
+
+    broker.unsubscribe(second)
+    broker.subscribe(EMPRESA)
+
+
+class _Admin:
+    def __init__(self, hello):
+        self.hello = hello
+
+    def command(self, name):
+        assert name == 'hello'
+        if isinstance(self.hello, Exception):
+            raise self.hello
+        return self.hello
+
+
+def _fake_mongo(monkeypatch, hello):
+    class Client:
+        admin = _Admin(hello)
+
+    class Db:
+        client = Client()
+
+    class FakeDatabase:
+        def get_database(self):
+            return Db()
+
+    monkeypatch.setattr(alert_stream, 'Database', FakeDatabase)
+
+
+@pytest.mark.parametrize('hello, mode', [
+    ({'isWritablePrimary': True, 'setName': 'rs0'}, AlertStreamBroker.MODE_CHANGE_STREAM),
+    ({'isWritablePrimary': True, 'msg': 'isdbgrid'}, AlertStreamBroker.MODE_CHANGE_STREAM),
+    ({'isWritablePrimary': True}, AlertStreamBroker.MODE_LOCAL),
+    (RuntimeError('sin conexión'), AlertStreamBroker.MODE_AUTO),
+])
+def test_auto_mode_is_resolved_at_startup(monkeypatch, hello, mode):
+    _fake_mongo(monkeypatch, hello)
+    broker = AlertStreamBroker(mode=AlertStreamBroker.MODE_AUTO)
+
+    broker.configure(max_subscribers=50)
+
+    assert (broker.mode, broker.max_subscribers) == (mode, 50)
+
+
+def test_standalone_publishes_before_the_first_subscriber(monkeypatch):
+    _fake_mongo(monkeypatch, {'isWritablePrimary': True})
+    broker = AlertStreamBroker(mode=AlertStreamBroker.MODE_AUTO)
+    broker.configure()
+
+    broker.publish(EVENT_CREATED, _alert())
+
+    assert len(broker._replay) == 1
+
+
+def test_stream_endpoint_replays_missed_events(client, db):
+    broker = alert_stream.get_alert_stream_broker()
+    broker.publish(EVENT_CREATED, _alert())
+    last_event_id = broker._replay[-1]['id']
+    broker.publish(EVENT_CREATED, _alert(nombre_alerta='Incendio'))
+    token = jwt.encode({'sub': EMPRESA, 'role': 'empresa'}, 'test-jwt-secret', algorithm='HS256')
+
+    response = client.get(
+        '/api/mqtt-alerts/stream',
+        headers={'Authorization': f'Bearer {token}', 'Last-Event-ID': last_event_id},
+        buffered=False
+    )
+    try:
+        chunks = iter(response.response)
+        assert response.mimetype == 'text/event-stream'
+        assert next(chunks) == b'retry: 5000\n\n'
+        event = next(chunks).decode('utf-8')
+    finally:
+        response.close()
+
+    assert f'event: {EVENT_CREATED}\n' in event
+    assert '"nombre_alerta":"Incendio"' in event
+    assert broker.subscriber_count() == 0
+
+
+def test_stream_requires_empresa_token(client):
+    assert client.get('/api/mqtt-alerts/stream').status_code == 401
+
+
+def test_stream_app_serves_only_the_stream(db, monkeypatch):
+    from stream_app import create_stream_app
+
+    broker = alert_stream.get_alert_stream_broker()
+    monkeypatch.setattr(broker, 'max_subscribers', broker.max_subscribers)
+    stream_client = create_stream_app().test_client()
+
+    assert broker.max_subscribers == 1000
+    assert stream_client.get('/health').get_json()['subscribers'] == 0
+    assert stream_client.get('/api/mqtt-alerts/stream').status_code == 401
+    assert stream_client.get('/api/mqtt-alerts/active').status_code == 404
@@ -0,0 +1,106 @@
+"""Las actualizaciones escriben solo lo modificado y responden 409 si la versión cambió."""
+
+import jwt
+import pytest
+from bson import ObjectId
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from models.hardware_type import HardwareType
+from services.hardware_service import HardwareService
+from utils.change_tracking import VersionConflictError, diff_paths, versioned_update
+
+
+def _seed(db):
+    db.hardware_types.insert_one(HardwareType(nombre='SEMAFORO', descripcion='Semáforo de prueba').to_dict())
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    hardware = Hardware(nombre='HW-1', tipo='SEMAFORO', empresa_id=empresa._id, sede='Principal',
+                        datos={'modelo': 'M1', 'marca': 'Bench'})
+    hardware.direccion = 'Calle 10 # 20-30'
+    db.hardware.insert_one(hardware.to_dict())
+    return hardware._id
+
+
+def _tracked(db, hardware_id):
+    hardware = Hardware.from_dict(db.hardware.find_one({'_id': hardware_id}))
+    hardware.track_changes()
+    return hardware
+
+
+def test_diff_paths_descends_into_dicts():
+    original = {'nombre': 'A', 'datos': {'modelo': 'M1', 'marca': 'B'}, 'tags': [1]}
+    current = {'nombre': 'A', 'datos': {'modelo': 'M2', 'marca': 'B'}, 'tags': [1, 2]}
+
+    assert diff_paths(original, current) == {'datos.modelo': 'M2', 'tags': [1, 2]}
+
+
+def test_diff_paths_replaces_dict_with_removed_keys():
+    assert diff_paths({'datos': {'a': 1, 'b': 2}}, {'datos': {'a': 1}}) == {'datos': {'a': 1}}
+
+
+def test_versioned_update_writes_only_changed_paths(db, mongo_commands):
+    hardware_id = _seed(db)
+    hardware = _tracked(db, hardware_id)
+    hardware.datos['modelo'] = 'M2'
+    mongo_commands.reset()
+
+    updated = versioned_update(db.hardware, hardware_id, hardware)
+
+    assert updated['datos'] == {'modelo': 'M2', 'marca': 'Bench'}
+    assert updated['version'] == 1
+    command = next(command for command in mongo_commands.commands if command['name'] == 'find_one_and_update')
+    assert command['query'] == {'_id': hardware_id, 'version': None}
+
+
+def test_versioned_update_raises_on_concurrent_change(db):
+    hardware_id = _seed(db)
+    first = _tracked(db, hardware_id)
+    second = _tracked(db, hardware_id)
+    first.datos['modelo'] = 'M2'
+    versioned_update(db.hardware, hardware_id, first)
+    second.datos['marca'] = 'Otra'
+
+    with pytest.raises(VersionConflictError):
+        versioned_update(db.hardware, hardware_id, second)
+
+    assert db.hardware.find_one({'_id': hardware_id})['datos'] == {'modelo': 'M2', 'marca': 'Bench'}
+
+
+def test_versioned_update_missing_document_returns_none(db):
+    hardware_id = _seed(db)
+    hardware = _tracked(db, hardware_id)
+    db.hardware.delete_one({'_id': hardware_id})
+
+    assert versioned_update(db.hardware, hardware_id, hardware) is None
+
+
+def test_service_reports_conflict_when_document_changes_mid_update(db, monkeypatch):
+    hardware_id = _seed(db)
+    service = HardwareService()
+    find = service.hardware_repo.find_by_id_including_inactive
+
+    def find_then_concurrent_write(*args, **kwargs):
+        existing = find(*args, **kwargs)
+        db.hardware.update_one({'_id': hardware_id}, {'$inc': {'version': 1}})
+        return existing
+
+    monkeypatch.setattr(service.hardware_repo, 'find_by_id_including_inactive', find_then_concurrent_write)
+
+    result = service.update_hardware(str(hardware_id), {'datos': {'modelo': 'M2'}})
+
+    assert result['success'] is False
+    assert result['status_code'] == 409
+
+
+def test_put_with_stale_version_returns_409(client, db):
+    hardware_id = _seed(db)
+    db.hardware.update_one({'_id': hardware_id}, {'$set': {'version': 3}})
+    token = jwt.encode({'sub': str(ObjectId()), 'role': 'super_admin'}, 'test-jwt-secret', algorithm='HS256')
+
+    response = client.put(f'/api/hardware/{hardware_id}', json={'version': 2, 'datos': {'modelo': 'M2'}},
+                          headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 409
+    assert response.get_json()['success'] is False
+    assert db.hardware.find_one({'_id': hardware_id})['datos']['modelo'] == 'M1'
@@ -0,0 +1,94 @@
+"""La compresión se negocia con Accept-Encoding y solo aplica a cuerpos grandes."""
+
+import gzip
+import json
+
+import jwt
+import pytest
+from bson import ObjectId
+from flask import Response
+
+import utils.compression as compression
+from models.hardware_type import HardwareType
+from utils.compression import choose_encoding, compress_response
+
+BODY = json.dumps({'items': [{'id': index, 'nombre': f'Hardware {index}'} for index in range(200)]})
+
+
+def _response(body=BODY, mimetype='application/json', status=200):
+    return Response(body, status=status, mimetype=mimetype)
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip', 'gzip'),
+    ('br;q=0, gzip', 'gzip'),
+    ('*', 'gzip'),
+    ('identity', None),
+    ('gzip;q=0', None),
+    (None, None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_without_brotli_falls_back_to_gzip(monkeypatch):
+    monkeypatch.setattr(compression, 'brotli', None)
+
+    assert choose_encoding('br, gzip') == 'gzip'
+    assert choose_encoding('br') is None
+
+
+def test_gzip_body_round_trips():
+    response = compress_response(_response(), 'gzip')
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Length'] == str(len(response.get_data()))
+    assert gzip.decompress(response.get_data()).decode('utf-8') == BODY
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_brotli_body_round_trips():
+    brotli = pytest.importorskip('brotli')
+
+    response = compress_response(_response(), 'br, gzip')
+
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()).decode('utf-8') == BODY
+
+
+@pytest.mark.parametrize('response, header', [
+    (_response(body='{"ok": true}'), 'gzip'),
+    (_response(mimetype='image/png'), 'gzip'),
+    (_response(status=304), 'gzip'),
+    (_response(), 'identity'),
+])
+def test_left_uncompressed(response, header):
+    body = response.get_data()
+
+    result = compress_response(response, header)
+
+    assert 'Content-Encoding' not in result.headers
+    assert result.get_data() == body
+
+
+def test_small_body_still_varies_on_accept_encoding():
+    response = compress_response(_response(body='{"ok": true}'), 'gzip')
+
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_app_compresses_large_json(client, db):
+    db.hardware_types.insert_many([
+        HardwareType(nombre=f'TIPO_{index:03d}', descripcion='Tipo de hardware de prueba').to_dict()
+        for index in range(40)
+    ])
+    token = jwt.encode({'sub': str(ObjectId()), 'role': 'super_admin'}, 'test-jwt-secret', algorithm='HS256')
+
+    response = client.get('/api/hardware-types/', headers={
+        'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'
+    })
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.get_data()))['data']) == 40
@@ -0,0 +1,96 @@
+"""GET condicional: 401 antes que 304 y ETag limitado a la empresa consultada."""
+
+from datetime import datetime, timedelta
+
+import jwt
+from bson import ObjectId
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+
+
+def _token(role, user_id=None):
+    return jwt.encode({'sub': str(user_id or ObjectId()), 'role': role}, 'test-jwt-secret', algorithm='HS256')
+
+
+def _seed(db):
+    empresas = [
+        Empresa(nombre=nombre, username=nombre.lower(), email=f'{nombre.lower()}@test.local', sedes=['Principal'])
+        for nombre in ('Acme', 'Globex')
+    ]
+    db.empresas.insert_many([empresa.to_dict() for empresa in empresas])
+    hace_una_hora = datetime.utcnow() - timedelta(hours=1)
+    for empresa in empresas:
+        hardware = Hardware(nombre=f'HW-{empresa.nombre}', tipo='SEMAFORO', empresa_id=empresa._id, sede='Principal')
+        document = hardware.to_dict()
+        document['fecha_actualizacion'] = hace_una_hora
+        document['physical_status'] = {'estado': 'Activo', 'updated_at': hace_una_hora}
+        db.hardware.insert_one(document)
+    return empresas
+
+
+def _heartbeat(db, empresa):
+    db.hardware.update_one(
+        {'empresa_id': empresa._id},
+        {'$set': {'physical_status.updated_at': datetime.utcnow()}}
+    )
+
+
+def _get(client, url, token=None, etag=None):
+    headers = {}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    if etag:
+        headers['If-None-Match'] = etag
+    return client.get(url, headers=headers)
+
+
+def test_missing_token_gets_401_not_304(client, db):
+    _seed(db)
+    token = _token('super_admin')
+    etag = _get(client, '/api/hardware/', token).headers['ETag']
+
+    response = client.get('/api/hardware/', headers={
+        'If-None-Match': etag,
+        'If-Modified-Since': 'Mon, 19 Oct 2099 00:00:00 GMT',
+    })
+
+    assert response.status_code == 401
+    assert 'ETag' not in response.headers
+
+
+def test_unchanged_listing_gets_304(client, db):
+    _seed(db)
+    token = _token('super_admin')
+    first = _get(client, '/api/hardware/', token)
+
+    second = _get(client, '/api/hardware/', token, first.headers['ETag'])
+
+    assert first.status_code == 200
+    assert second.status_code == 304
+    assert second.data == b''
+
+
+def test_heartbeat_changes_only_its_empresa_etag(client, db):
+    acme, globex = _seed(db)
+    token = _token('empresa', acme._id)
+    url = f'/api/hardware/empresa/{acme._id}'
+    etag = _get(client, url, token).headers['ETag']
+
+    _heartbeat(db, globex)
+    assert _get(client, url, token, etag).status_code == 304
+
+    _heartbeat(db, acme)
+    response = _get(client, url, token, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_global_listing_changes_with_any_heartbeat(client, db):
+    _, globex = _seed(db)
+    token = _token('super_admin')
+    etag = _get(client, '/api/hardware/', token).headers['ETag']
+
+    _heartbeat(db, globex)
+
+    assert _get(client, '/api/hardware/', token, etag).status_code == 200
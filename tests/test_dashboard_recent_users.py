@@ -0,0 +1,48 @@
+"""Los usuarios recientes del dashboard se leen sin una consulta por empresa."""
+
+from datetime import datetime, timedelta
+
+from models.empresa import Empresa
+from models.usuario import Usuario
+from services.super_admin_dashboard_service import SuperAdminDashboardService
+
+
+def _seed(db, empresa_count, usuarios_por_empresa=3):
+    empresas = [
+        Empresa(nombre=f'Empresa {index}', username=f'empresa{index}', email=f'empresa{index}@test.local',
+                sedes=['Principal'])
+        for index in range(empresa_count)
+    ]
+    db.empresas.insert_many([empresa.to_dict() for empresa in empresas])
+    inicio = datetime.utcnow()
+    usuarios = []
+    for e_index, empresa in enumerate(empresas):
+        for u_index in range(usuarios_por_empresa):
+            usuario = Usuario(
+                nombre=f'Usuario {e_index}-{u_index}', cedula=f'{e_index + 1}{u_index:06d}', rol='brigadista',
+                empresa_id=empresa._id, telefono=f'57300{e_index:03d}{u_index:04d}', sede='Principal'
+            )
+            usuario.fecha_creacion = inicio - timedelta(minutes=e_index * usuarios_por_empresa + u_index)
+            usuarios.append(usuario.to_dict())
+    db.usuarios.insert_many(usuarios)
+
+
+def test_recent_users_command_count_does_not_grow_with_empresas(db, mongo_commands):
+    counts = {}
+    for empresa_count in (2, 8):
+        db.empresas.delete_many({})
+        db.usuarios.delete_many({})
+        _seed(db, empresa_count)
+        service = SuperAdminDashboardService()
+        mongo_commands.reset()
+
+        result = service.get_recent_users(limit=4)
+
+        assert result['success'], result
+        assert [user['name'] for user in result['data']] == [
+            'Usuario 0-0', 'Usuario 0-1', 'Usuario 0-2', 'Usuario 1-0'
+        ]
+        assert [user['company'] for user in result['data']] == ['Empresa 0'] * 3 + ['Empresa 1']
+        counts[empresa_count] = len(mongo_commands.commands)
+
+    assert counts[2] == counts[8], counts
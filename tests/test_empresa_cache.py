@@ -0,0 +1,66 @@
+"""Cache por worker de empresas por nombre: collation, fallos no cacheados e invalidación."""
+
+from models.empresa import Empresa
+from repositories.empresa_repository import NOMBRE_COLLATION, EmpresaRepository
+from repositories.mqtt_alert_repository import MqttAlertRepository
+
+
+def _insert(db, nombre='Acme', sedes=None):
+    empresa = Empresa(nombre=nombre, username=nombre.lower(), email=f'{nombre.lower()}@test.local',
+                      sedes=sedes or ['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    return empresa
+
+
+def test_lookup_by_nombre_uses_collation_equality_and_casefolded_key(db, mongo_commands):
+    empresa = _insert(db)
+    repo = EmpresaRepository()
+    mongo_commands.reset()
+
+    doc = repo.get_cached_document_by_nombre('Acme')
+
+    assert str(doc['_id']) == str(empresa._id)
+    assert 'password_hash' not in doc
+    [command] = mongo_commands.commands
+    assert command['name'] == 'find_one'
+    assert command['query'] == {'nombre': 'Acme'}
+    assert command['kwargs']['collation'] == NOMBRE_COLLATION
+
+    # Otra capitalización usa la misma llave de la cache
+    mongo_commands.reset()
+    assert str(repo.get_cached_document_by_nombre('ACME')['_id']) == str(empresa._id)
+    assert len(mongo_commands.commands) == 0, mongo_commands.shapes()
+
+
+def test_missing_nombre_is_not_cached(db, mongo_commands):
+    repo = EmpresaRepository()
+    assert repo.get_cached_document_by_nombre('Acme') is None
+
+    # Creada por otro worker: no pasa por las invalidaciones de este
+    empresa = _insert(db)
+
+    assert str(repo.get_cached_document_by_nombre('Acme')['_id']) == str(empresa._id)
+
+
+def test_sede_added_elsewhere_is_reread_before_rejecting(db):
+    empresa = _insert(db, sedes=['Principal'])
+    alerts = MqttAlertRepository()
+    assert alerts.verify_empresa_sede_exists('Acme', 'Principal') == (True, 'Empresa y sede válidas')
+
+    db.empresas.update_one({'_id': empresa._id}, {'$push': {'sedes': 'Norte'}})
+
+    assert alerts.verify_empresa_sede_exists('Acme', 'Norte') == (True, 'Empresa y sede válidas')
+    assert alerts.verify_empresa_sede_exists('Acme', 'Sur') == (False, 'Sede no encontrada en la empresa')
+
+
+def test_update_invalidates_nombre_index(db):
+    empresa = _insert(db)
+    repo = EmpresaRepository()
+    assert repo.get_cached_by_nombre('Acme') is not None
+
+    stored = repo.find_by_id(str(empresa._id))
+    stored.nombre = 'Acme Renombrada'
+    repo.update(str(empresa._id), stored)
+
+    assert repo.get_cached_by_nombre('Acme') is None
+    assert repo.get_cached_by_nombre('Acme Renombrada').nombre == 'Acme Renombrada'
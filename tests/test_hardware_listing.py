@@ -0,0 +1,58 @@
+"""Los listados de hardware resuelven las empresas con una consulta, sin N+1."""
+
+import pytest
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from repositories.empresa_repository import invalidate_empresa_cache
+from services.hardware_service import HardwareService
+
+
+def _seed(db, hardware_count, empresa_count=4):
+    empresas = [
+        Empresa(nombre=f'Empresa {index}', username=f'empresa{index}', email=f'empresa{index}@test.local',
+                sedes=['Principal'])
+        for index in range(empresa_count)
+    ]
+    db.empresas.insert_many([empresa.to_dict() for empresa in empresas])
+    db.hardware.insert_many([
+        Hardware(nombre=f'HW-{index}', tipo='semaforo', empresa_id=empresas[index % empresa_count]._id,
+                 sede='Principal').to_dict()
+        for index in range(hardware_count)
+    ])
+    return {str(empresa._id): empresa.nombre for empresa in empresas}
+
+
+@pytest.mark.parametrize('method', ['get_all_hardware', 'get_all_hardware_including_inactive'])
+def test_listing_command_count_does_not_grow_with_hardware(db, mongo_commands, method):
+    service = HardwareService()
+    counts = {}
+    for size in (3, 30):
+        db.empresas.delete_many({})
+        db.hardware.delete_many({})
+        nombres = _seed(db, size)
+        # Cache del worker vacía: se mide el peor caso
+        invalidate_empresa_cache()
+        mongo_commands.reset()
+
+        result = getattr(service, method)()
+
+        assert result['success'], result
+        assert result['count'] == size
+        assert {item['empresa_nombre'] for item in result['data']} <= set(nombres.values())
+        assert all(item['empresa_nombre'] for item in result['data'])
+        counts[size] = len(mongo_commands.commands)
+        assert mongo_commands.count('empresas') == 1, mongo_commands.shapes()
+
+    assert counts[3] == counts[30], counts
+
+
+def test_listing_uses_worker_cache_for_empresas(db, mongo_commands):
+    service = HardwareService()
+    _seed(db, 10)
+    service.get_all_hardware()
+    mongo_commands.reset()
+
+    service.get_all_hardware()
+
+    assert mongo_commands.count('empresas') == 0, mongo_commands.shapes()
@@ -0,0 +1,121 @@
+"""Listado de hardware por cursor (keyset) y en streaming NDJSON."""
+
+import json
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from bson import ObjectId
+
+from core.config import Config
+from models.empresa import Empresa
+from models.hardware import Hardware
+from services.hardware_service import HardwareService
+from utils.keyset import decode_cursor, encode_cursor
+
+
+def _token():
+    return jwt.encode({'sub': str(ObjectId()), 'role': 'super_admin'}, 'test-jwt-secret', algorithm='HS256')
+
+
+def _seed(db, count=7):
+    empresas = [
+        Empresa(nombre=nombre, username=nombre.lower(), email=f'{nombre.lower()}@test.local', sedes=['Principal'])
+        for nombre in ('Acme', 'Globex')
+    ]
+    db.empresas.insert_many([empresa.to_dict() for empresa in empresas])
+    inicio = datetime.utcnow().replace(microsecond=0)
+    docs = []
+    for index in range(count):
+        hardware = Hardware(nombre=f'HW-{index}', tipo='SEMAFORO', empresa_id=empresas[index % 2]._id,
+                            sede='Principal')
+        # Pares con la misma fecha: el _id desempata
+        hardware.fecha_creacion = inicio - timedelta(minutes=index // 2)
+        docs.append(hardware.to_dict())
+    db.hardware.insert_many(docs)
+    expected = sorted(docs, key=lambda doc: (doc['fecha_creacion'], doc['_id']), reverse=True)
+    return [doc['nombre'] for doc in expected]
+
+
+def test_cursor_round_trip():
+    document = {'_id': ObjectId(), 'fecha_creacion': datetime(2026, 10, 19, 11, 14, 13)}
+
+    assert decode_cursor(encode_cursor(document)) == (document['fecha_creacion'], document['_id'])
+
+
+@pytest.mark.parametrize('token', ['no-es-un-cursor', 'eyJmIjpudWxsfQ'])
+def test_invalid_cursor_raises_value_error(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_keyset_pages_cover_every_hardware_once(db):
+    expected = _seed(db)
+    service = HardwareService()
+    nombres, cursor, pages = [], None, 0
+
+    while True:
+        result = service.get_hardware_keyset_page(cursor=cursor, limit=3)
+        assert result['success'], result
+        nombres.extend(item['nombre'] for item in result['data'])
+        pages += 1
+        cursor = result['pagination']['next_cursor']
+        if not result['pagination']['has_more']:
+            break
+
+    assert nombres == expected
+    assert pages == 3
+
+
+def test_keyset_page_is_stable_when_newer_hardware_arrives(db):
+    expected = _seed(db)
+    service = HardwareService()
+    first = service.get_hardware_keyset_page(cursor='', limit=3)
+    db.hardware.insert_one(Hardware(nombre='HW-nuevo', tipo='SEMAFORO', sede='Principal').to_dict())
+
+    second = service.get_hardware_keyset_page(cursor=first['pagination']['next_cursor'], limit=3)
+
+    assert [item['nombre'] for item in second['data']] == expected[3:6]
+
+
+def test_cursor_errors_are_400(client, db):
+    _seed(db)
+    headers = {'Authorization': f'Bearer {_token()}'}
+
+    assert client.get('/api/hardware/?cursor=no-es-un-cursor', headers=headers).status_code == 400
+    assert client.get('/api/hardware/?cursor=&search=hw', headers=headers).status_code == 400
+
+
+def test_cursor_listing_over_http(client, db):
+    expected = _seed(db)
+
+    response = client.get('/api/hardware/?cursor=&limit=4', headers={'Authorization': f'Bearer {_token()}'})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [item['nombre'] for item in body['data']] == expected[:4]
+    assert body['pagination']['has_more'] is True
+
+
+@pytest.mark.parametrize('query, accept', [('?format=ndjson', None), ('', 'application/x-ndjson')])
+def test_ndjson_streams_one_hardware_per_line(client, db, mongo_commands, monkeypatch, query, accept):
+    expected = _seed(db)
+    monkeypatch.setattr(Config, 'HARDWARE_STREAM_BATCH_SIZE', 3)
+    headers = {'Authorization': f'Bearer {_token()}'}
+    if accept:
+        headers['Accept'] = accept
+    mongo_commands.reset()
+
+    response = client.get(f'/api/hardware/{query}', headers=headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row['nombre'] for row in rows) == sorted(expected)
+    assert all(row['empresa_nombre'] in ('Acme', 'Globex') for row in rows)
+    # Los nombres de empresa se resuelven una vez por lote (3 lotes), no por hardware
+    lookups = [
+        command for command in mongo_commands.commands
+        if command['collection'] == 'empresas' and command['name'] == 'find'
+    ]
+    assert len(lookups) <= 3, mongo_commands.shapes()
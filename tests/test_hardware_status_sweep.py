@@ -0,0 +1,67 @@
+"""Revisión de hardware vencido y lease entre workers."""
+
+from datetime import datetime, timedelta
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from services.hardware_service import HardwareService
+from utils.periodic_task import PeriodicTask
+
+
+def _seed(db):
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    now = datetime.utcnow()
+    estados = {
+        'HW-vencido': {'estado': 'Activo', 'updated_at': now - timedelta(hours=2)},
+        'HW-reciente': {'estado': 'Activo', 'updated_at': now},
+        'HW-sin-fecha': {'estado': 'Activo'},
+        'HW-desactivado': {'estado': 'desactivado', 'updated_at': now},
+        'HW-nuevo': None,
+        'HW-sin-reportes': {},
+    }
+    docs = []
+    for nombre, estado in estados.items():
+        doc = Hardware(nombre=nombre, tipo='SEMAFORO', empresa_id=empresa._id, sede='Principal').to_dict()
+        if estado is None:
+            doc.pop('physical_status', None)
+        else:
+            doc['physical_status'] = estado
+        docs.append(doc)
+    db.hardware.insert_many(docs)
+
+
+def test_sweep_marks_only_stale_hardware_with_status(db):
+    _seed(db)
+
+    result = HardwareService().check_physical_status_stale()
+
+    assert result['success'], result
+    assert sorted(item['nombre'] for item in result['data']) == ['HW-desactivado', 'HW-sin-fecha', 'HW-vencido']
+    assert all(item['empresa_nombre'] == 'Acme' for item in result['data'])
+    assert 'physical_status' not in db.hardware.find_one({'nombre': 'HW-nuevo'})
+    assert db.hardware.find_one({'nombre': 'HW-sin-reportes'})['physical_status'] == {}
+    assert db.hardware.find_one({'nombre': 'HW-reciente'})['physical_status']['estado'] == 'Activo'
+
+
+def test_sweep_is_idempotent(db):
+    _seed(db)
+    service = HardwareService()
+    service.check_physical_status_stale()
+
+    assert service.check_physical_status_stale()['count'] == 0
+
+
+def test_lease_runs_the_task_in_one_worker_per_interval(db):
+    calls = []
+    first = PeriodicTask('sweep-test', 60, lambda: calls.append('first'))
+    second = PeriodicTask('sweep-test', 60, lambda: calls.append('second'))
+
+    first.run_once()
+    second.run_once()
+    assert calls == ['first']
+
+    # Al expirar el lease lo puede tomar otro worker
+    db.scheduler_leases.update_one({'_id': 'sweep-test'}, {'$set': {'expires_at': datetime.utcnow()}})
+    second.run_once()
+    assert calls == ['first', 'second']
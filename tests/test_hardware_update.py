@@ -0,0 +1,34 @@
+"""La edición de hardware sin `empresa_nombre` usa la empresa actual del hardware."""
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from models.hardware_type import HardwareType
+from services.hardware_service import HardwareService
+
+
+def _seed(db):
+    db.hardware_types.insert_one(HardwareType(nombre='SEMAFORO', descripcion='Semáforo de prueba').to_dict())
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    hardware = Hardware(nombre='HW-1', tipo='SEMAFORO', empresa_id=empresa._id, sede='Principal')
+    hardware.direccion = 'Calle 10 # 20-30'
+    db.hardware.insert_one(hardware.to_dict())
+    return str(hardware._id)
+
+
+def test_update_without_empresa_nombre(db):
+    hardware_id = _seed(db)
+
+    result = HardwareService().update_hardware(hardware_id, {'datos': {'modelo': 'M2'}})
+
+    assert result['success'], result
+    assert result['data']['empresa_nombre'] == 'Acme'
+    assert result['data']['topic'] == 'Acme/Principal/SEMAFORO/HW-1'
+
+
+def test_update_rejects_sede_outside_current_empresa(db):
+    hardware_id = _seed(db)
+
+    result = HardwareService().update_hardware(hardware_id, {'sede': 'Norte'})
+
+    assert result == {'success': False, 'errors': ['La sede no pertenece a la empresa']}
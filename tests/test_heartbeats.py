@@ -0,0 +1,138 @@
+"""Los heartbeats se aplican en lote y los repetidos sin cambio de estado no escriben."""
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from services.hardware_service import HardwareService
+from utils.heartbeat_coalescer import HeartbeatCoalescer
+
+TOPICS = [f'Acme/Principal/SEMAFORO/HW-{index}' for index in range(3)]
+
+
+def _seed(db):
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'])
+    db.empresas.insert_one(empresa.to_dict())
+    docs = []
+    for topic in TOPICS:
+        hardware = Hardware(nombre=topic.rsplit('/', 1)[1], tipo='SEMAFORO', empresa_id=empresa._id, sede='Principal')
+        hardware.topic = topic
+        docs.append(hardware.to_dict())
+    db.hardware.insert_many(docs)
+
+
+def _service(touch_interval=60, full_interval=300):
+    service = HardwareService()
+    # Tabla propia por prueba: la del worker es un singleton
+    service.heartbeats = HeartbeatCoalescer(maxsize=100, touch_interval=touch_interval, full_interval=full_interval)
+    return service
+
+
+def _items(estado='Activo', topics=TOPICS):
+    return [{'topic': topic, 'physical_status': {'estado': estado}} for topic in topics]
+
+
+def _writes(mongo_commands):
+    return [command for command in mongo_commands.commands if command['name'] in ('bulk_write', 'update_one')]
+
+
+def test_plan_classifies_heartbeats():
+    coalescer = HeartbeatCoalescer(maxsize=10, touch_interval=60, full_interval=300)
+    statuses = {'a': {'estado': 'Activo'}, 'b': {'estado': 'Activo'}}
+
+    full, touch, skipped = coalescer.plan(statuses)
+    assert (list(full), touch, skipped) == (['a', 'b'], {}, [])
+    coalescer.commit(full)
+
+    full, touch, skipped = coalescer.plan({'a': {'estado': 'Activo'}, 'b': {'estado': 'Inactivo'}})
+    assert (list(full), touch, skipped) == (['b'], {}, ['a'])
+
+
+def test_plan_touches_after_interval():
+    coalescer = HeartbeatCoalescer(maxsize=10, touch_interval=0, full_interval=300)
+    coalescer.commit({'a': {'estado': 'Activo'}})
+
+    full, touch, skipped = coalescer.plan({'a': {'estado': 'Activo'}})
+
+    assert (full, touch, skipped) == ({}, {'a': 'Activo'}, [])
+
+
+def test_table_is_bounded():
+    coalescer = HeartbeatCoalescer(maxsize=2)
+    for topic in ('a', 'b', 'c'):
+        coalescer.commit({topic: {'estado': 'Activo'}})
+
+    assert [item['topic'] for item in coalescer.snapshot()] == ['c', 'b']
+
+
+def test_batch_is_one_bulk_write(db, mongo_commands):
+    _seed(db)
+    service = _service()
+    mongo_commands.reset()
+
+    result = service.update_physical_status_batch(_items())
+
+    assert result['success'], result
+    assert result['data']['written'] == 3
+    assert [command['name'] for command in _writes(mongo_commands)] == ['bulk_write']
+    assert all(doc['physical_status']['estado'] == 'Activo' for doc in db.hardware.find())
+
+
+def test_repeated_heartbeats_are_coalesced(db, mongo_commands):
+    _seed(db)
+    service = _service()
+    service.update_physical_status_batch(_items())
+    mongo_commands.reset()
+
+    result = service.update_physical_status_batch(_items())
+
+    assert result['data']['coalesced'] == 3
+    assert result['data']['written'] == 0
+    assert mongo_commands.commands == []
+
+
+def test_last_heartbeat_of_a_topic_wins(db):
+    _seed(db)
+
+    result = _service().update_physical_status_batch(
+        _items('Activo', TOPICS[:1]) + _items('Inactivo', TOPICS[:1])
+    )
+
+    assert result['data']['written'] == 1
+    assert db.hardware.find_one({'topic': TOPICS[0]})['physical_status']['estado'] == 'Inactivo'
+
+
+def test_unknown_topics_and_invalid_items_are_reported(db):
+    _seed(db)
+
+    result = _service().update_physical_status_batch(
+        _items(topics=TOPICS[:1] + ['Acme/Principal/SEMAFORO/NO-EXISTE']) + [{'topic': '', 'physical_status': {}}]
+    )
+
+    assert result['data']['written'] == 1
+    assert result['data']['not_found'] == ['Acme/Principal/SEMAFORO/NO-EXISTE']
+    assert result['data']['errors'] == ['items[2]: topic es obligatorio']
+
+
+def test_touch_rewrites_state_changed_by_another_worker(db):
+    _seed(db)
+    service = _service(touch_interval=0)
+    service.update_physical_status_batch(_items())
+    # Otro worker (o la revisión de vencidos) lo marcó Inactivo
+    db.hardware.update_one({'topic': TOPICS[0]}, {'$set': {'physical_status.estado': 'Inactivo'}})
+
+    result = service.update_physical_status_batch(_items(topics=TOPICS[:1]))
+
+    assert result['data']['written'] == 1
+    assert result['data']['touched'] == 0
+    assert db.hardware.find_one({'topic': TOPICS[0]})['physical_status']['estado'] == 'Activo'
+
+
+def test_batch_endpoint_requires_internal_token(client, db):
+    _seed(db)
+
+    assert client.put('/api/hardware/physical-status/batch', json={'items': _items()}).status_code == 401
+
+    response = client.put('/api/hardware/physical-status/batch', json={'items': _items()},
+                          headers={'X-Internal-Token': 'test-internal-token'})
+
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['data']['received'] == 3
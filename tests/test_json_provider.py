@@ -0,0 +1,48 @@
+"""El proveedor JSON serializa igual con orjson que con el encoder estándar."""
+
+from datetime import date, datetime
+
+from bson import ObjectId
+from flask import Flask, jsonify
+
+import core.json_provider as json_provider
+from core.json_provider import FastJSONProvider
+
+FECHA = datetime(2026, 10, 19, 11, 14, 13)
+OBJECT_ID = ObjectId('64b7f0c2a1b2c3d4e5f60718')
+
+
+def _provider():
+    return FastJSONProvider(Flask('test-json'))
+
+
+def _payload():
+    return {'zeta': OBJECT_ID, 'fecha': FECHA, 'dia': date(2026, 10, 19), 'tags': ('a', 'b')}
+
+
+def test_dates_keep_rfc_1123_format():
+    body = _provider().dumps(_payload())
+
+    assert body == (
+        '{"zeta":"64b7f0c2a1b2c3d4e5f60718","fecha":"Mon, 19 Oct 2026 11:14:13 GMT",'
+        '"dia":"Mon, 19 Oct 2026 00:00:00 GMT","tags":["a","b"]}'
+    )
+
+
+def test_fallback_encoder_matches_orjson(monkeypatch):
+    expected = _provider().dumps_bytes(_payload())
+    monkeypatch.setattr(json_provider, 'orjson', None)
+
+    assert _provider().dumps_bytes(_payload()) == expected
+
+
+def test_integers_beyond_64_bits_fall_back_to_json():
+    assert _provider().dumps({'n': 2 ** 70}) == '{"n":1180591620717411303424}'
+
+
+def test_jsonify_uses_the_provider(app):
+    with app.app_context():
+        response = jsonify(fecha=FECHA, id=OBJECT_ID)
+
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {'fecha': 'Mon, 19 Oct 2026 11:14:13 GMT', 'id': str(OBJECT_ID)}
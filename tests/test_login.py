@@ -0,0 +1,75 @@
+"""Límite de intentos fallidos, rehash de bcrypt y pool de verificación acotado."""
+
+import threading
+
+import bcrypt
+import pytest
+
+from models.empresa import Empresa
+from utils.password_hasher import PasswordHasher, PasswordHasherBusy, hash_cost
+
+
+def _seed_empresa(db, password='secreto-123', rounds=4):
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', password_hash=password_hash)
+    db.empresas.insert_one(empresa.to_dict())
+    return empresa
+
+
+def _login(client, password):
+    return client.post('/auth/login', json={'usuario': 'acme', 'password': password})
+
+
+def test_failed_logins_are_throttled_per_username(client, db):
+    _seed_empresa(db)
+
+    for _ in range(5):
+        assert _login(client, 'incorrecta').status_code == 401
+    response = _login(client, 'secreto-123')
+
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['errors'] == ['Demasiados intentos fallidos, intenta más tarde']
+
+
+def test_successful_login_resets_the_username_counter(client, db):
+    _seed_empresa(db)
+
+    for _ in range(4):
+        _login(client, 'incorrecta')
+    assert _login(client, 'secreto-123').status_code == 200
+
+    assert db.login_attempts.count_documents({'_id': {'$regex': '^user:acme:'}}) == 0
+
+
+def test_login_rehashes_with_the_configured_cost(client, db):
+    empresa = _seed_empresa(db, rounds=5)
+
+    assert _login(client, 'secreto-123').status_code == 200
+
+    stored = db.empresas.find_one({'_id': empresa._id})['password_hash']
+    assert hash_cost(stored) == 4
+    assert bcrypt.checkpw(b'secreto-123', stored.encode('utf-8'))
+
+
+def test_hasher_rejects_when_no_slot_is_free():
+    hasher = PasswordHasher(processes=0, concurrency=1, queue_timeout=0.01, rounds=4)
+    release = threading.Event()
+    started = threading.Event()
+
+    def hold_slot(*args):
+        started.set()
+        release.wait(5)
+        return True
+
+    holder = threading.Thread(target=hasher._run, args=(hold_slot,))
+    holder.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.verify('secreto', bcrypt.hashpw(b'secreto', bcrypt.gensalt(rounds=4)).decode('utf-8'))
+    finally:
+        release.set()
+        holder.join()
+
+    assert hasher.stats()['rejected'] == 1
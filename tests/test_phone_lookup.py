@@ -0,0 +1,77 @@
+"""Normalización de teléfonos y cache de búsqueda por teléfono."""
+
+import pytest
+from bson import ObjectId
+
+from models.empresa import Empresa
+from models.usuario import Usuario
+from services import phone_lookup_service
+from services.phone_lookup_service import PhoneLookupService
+from services.usuario_service import UsuarioService
+from utils.phone_utils import normalize_phone_e164
+
+
+@pytest.mark.parametrize('value', [
+    '3001234567', '300 123 4567', '(300) 123-4567', '+57 300 123 4567', '0057 3001234567',
+    '573001234567', 573001234567,
+])
+def test_normalize_phone_e164(value):
+    assert normalize_phone_e164(value) == '+573001234567'
+
+
+@pytest.mark.parametrize('value', [None, '', '   ', 'sin número'])
+def test_normalize_phone_without_digits(value):
+    assert normalize_phone_e164(value) is None
+
+
+def _seed(db):
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal'],
+                      roles=[{'nombre': 'brigadista', 'is_creator': False}])
+    db.empresas.insert_one(empresa.to_dict())
+    usuarios = [
+        Usuario(nombre=f'Usuario {index}', cedula=f'10000{index}', rol='brigadista', empresa_id=empresa._id,
+                telefono=telefono, sede='Principal', _id=ObjectId())
+        for index, telefono in enumerate(['573001234567', '573009876543'])
+    ]
+    db.usuarios.insert_many([usuario.to_dict() for usuario in usuarios])
+    phone_lookup_service._lookup_cache.clear()
+    return empresa, usuarios
+
+
+def test_lookup_accepts_any_format(db):
+    _seed(db)
+    service = PhoneLookupService()
+
+    for telefono in ('3001234567', '+57 300 123 4567', '573001234567'):
+        result = service.lookup_by_phone(telefono)
+        assert result['success'], result
+        assert result['data']['nombre'] == 'Usuario 0'
+        assert result['data']['rol'] == {'nombre': 'brigadista', 'is_creator': False}
+
+
+def test_lookup_is_served_from_cache(db, mongo_commands):
+    _seed(db)
+    service = PhoneLookupService()
+    service.lookup_by_phone('3001234567')
+    mongo_commands.reset()
+
+    assert service.lookup_by_phone('+573001234567')['success']
+    assert mongo_commands.commands == []
+
+
+def test_user_update_invalidates_only_its_phone_numbers(db):
+    empresa, usuarios = _seed(db)
+    service = PhoneLookupService()
+    service.lookup_by_phone('3001234567')
+    service.lookup_by_phone('3009876543')
+
+    result = UsuarioService().update_usuario_for_empresa(
+        str(usuarios[0]._id), str(empresa._id), {'telefono': '573005550000'}
+    )
+
+    assert result['success'], result
+    cache = phone_lookup_service._lookup_cache
+    assert cache.get('+573001234567') is None
+    assert cache.get('+573009876543')['nombre'] == 'Usuario 1'
+    assert service.lookup_by_phone('3001234567')['success'] is False
+    assert service.lookup_by_phone('3005550000')['data']['nombre'] == 'Usuario 0'
@@ -0,0 +1,77 @@
+"""Búsqueda por prefijo sobre `search_keys`, ordenada por relevancia."""
+
+from datetime import datetime, timedelta
+
+from models.empresa import Empresa
+from models.hardware import Hardware
+from repositories.hardware_repository import HardwareRepository
+from utils.search_keys import build_search_fields, search_condition, search_page_pipeline, search_tokens
+
+
+def _seed(db, nombres):
+    empresa = Empresa(nombre='Acme', username='acme', email='acme@test.local', sedes=['Principal', 'Norte'])
+    db.empresas.insert_one(empresa.to_dict())
+    inicio = datetime.utcnow()
+    docs = []
+    # El primero de la lista es el más reciente
+    for index, (nombre, sede) in enumerate(nombres):
+        hardware = Hardware(nombre=nombre, tipo='SEMAFORO', empresa_id=empresa._id, sede=sede,
+                            datos={'brand': 'Bench', 'model': 'M1'})
+        hardware.fecha_creacion = inicio - timedelta(minutes=index)
+        docs.append(hardware.to_dict())
+    db.hardware.insert_many(docs)
+
+
+def _search(term, **filters):
+    hardware, total = HardwareRepository().search({'search': term, **filters}, skip=0, limit=10)
+    return [item.nombre for item in hardware], total
+
+
+def test_search_fields_are_normalized_prefixes():
+    fields = build_search_fields('Cámara-Norte', ['Bodega'])
+
+    assert fields['search_words'] == ['bodega', 'camara', 'norte']
+    assert {'c', 'ca', 'cam', 'camara', 'n', 'nor', 'norte', 'b', 'bodega'} <= set(fields['search_keys'])
+    assert 'amara' not in fields['search_keys']
+
+
+def test_search_tokens_are_unique_and_bounded():
+    assert search_tokens('  Sémaforo  semaforo NORTE ') == ['semaforo', 'norte']
+    assert len(search_tokens(' '.join(f'palabra{index}' for index in range(20)))) == 8
+
+
+def test_every_token_must_match_a_prefix(db):
+    _seed(db, [('sirena-central', 'Principal'), ('sirena-bodega', 'Norte'), ('camara-central', 'Norte')])
+
+    assert _search('sir') == (['sirena-central', 'sirena-bodega'], 2)
+    assert _search('sir nor') == (['sirena-bodega'], 1)
+    assert _search('Cámara') == (['camara-central'], 1)
+    assert _search('irena') == ([], 0)
+
+
+def test_whole_words_rank_before_prefixes(db):
+    # El de palabra completa es el más antiguo: sin relevancia quedaría al final
+    _seed(db, [('norteno-1', 'Principal'), ('nortes-2', 'Principal'), ('norte-3', 'Principal')])
+
+    nombres, total = _search('norte')
+
+    assert total == 3
+    assert nombres == ['norte-3', 'norteno-1', 'nortes-2']
+
+
+def test_search_combines_with_filters(db):
+    _seed(db, [('sirena-central', 'Principal'), ('sirena-bodega', 'Norte')])
+
+    assert _search('sirena', sede='Norte') == (['sirena-bodega'], 1)
+
+
+def test_search_page_does_not_return_search_fields(db):
+    _seed(db, [('sirena-central', 'Principal')])
+    tokens = search_tokens('sir')
+
+    documents = list(db.hardware.aggregate(
+        search_page_pipeline(search_condition(tokens), tokens, {'fecha_creacion': -1}, limit=10)
+    ))
+
+    assert [document['nombre'] for document in documents] == ['sirena-central']
+    assert not {'search_keys', 'search_words', '_score'} & set(documents[0])
@@ -0,0 +1,119 @@
+"""Cache de sesiones por worker y revocaciones entre workers."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from repositories import session_repository
+from repositories.session_repository import SessionRepository
+from services.session_service import SessionService
+
+
+@pytest.fixture
+def repo(db):
+    session_repository.invalidate_session_cache()
+    session_repository._epoch_state.update(epoch=None, checked_at=None)
+    return SessionRepository()
+
+
+def _create(repo, user_id, jti, last_used=None, client='cliente'):
+    repo.create_session({
+        'user_id': user_id,
+        'refresh_token_jti': jti,
+        'client_fingerprint': client,
+        'expires_at': datetime.utcnow() + timedelta(days=7),
+    })
+    if last_used:
+        repo.collection.update_one({'refresh_token_jti': jti}, {'$set': {'last_used': last_used}})
+
+
+def _warm(repo, *jtis):
+    for jti in jtis:
+        assert repo.get_cached_session_by_jti(jti)['success']
+
+
+def _other_worker_revokes(repo, user_id):
+    """Revocación publicada por otro worker: no toca el cache de este"""
+    cached = dict(session_repository._session_cache._data)
+    repo.invalidate_all_user_sessions(user_id)
+    session_repository._session_cache._data.update(cached)
+    session_repository._epoch_state['checked_at'] = None
+
+
+def test_cached_session_skips_the_database(repo, mongo_commands):
+    _create(repo, 'u1', 'jti-1')
+    _warm(repo, 'jti-1')
+    mongo_commands.reset()
+
+    assert repo.get_cached_session_by_jti('jti-1')['success']
+
+    assert mongo_commands.count('sessions') == 0
+
+
+def test_logout_evicts_only_the_revoked_user(repo, mongo_commands):
+    _create(repo, 'u1', 'jti-1')
+    _create(repo, 'u2', 'jti-2')
+    _warm(repo, 'jti-1', 'jti-2')
+
+    assert repo.invalidate_session(jti='jti-1')['success']
+    session_repository._epoch_state['checked_at'] = None
+    mongo_commands.reset()
+
+    assert not repo.get_cached_session_by_jti('jti-1')['success']
+    assert repo.get_cached_session_by_jti('jti-2')['success']
+    assert mongo_commands.count('sessions') == 1
+
+
+def test_other_worker_revocation_evicts_only_that_user(repo, mongo_commands):
+    _create(repo, 'u1', 'jti-1')
+    _create(repo, 'u2', 'jti-2')
+    _warm(repo, 'jti-1', 'jti-2')
+    assert repo.has_active_client('u1', 'cliente')
+
+    _other_worker_revokes(repo, 'u1')
+    mongo_commands.reset()
+
+    assert not repo.get_cached_session_by_jti('jti-1')['success']
+    assert not repo.has_active_client('u1', 'cliente')
+    assert repo.get_cached_session_by_jti('jti-2')['success']
+    assert mongo_commands.count('sessions') == 2
+
+
+def test_worker_behind_the_log_clears_its_cache(repo, monkeypatch):
+    monkeypatch.setattr(session_repository.Config, 'SESSION_REVOCATION_LOG_SIZE', 1)
+    _create(repo, 'u1', 'jti-1')
+    _create(repo, 'u2', 'jti-2')
+    _create(repo, 'u3', 'jti-3')
+    _warm(repo, 'jti-3')
+
+    cached = dict(session_repository._session_cache._data)
+    repo.invalidate_all_user_sessions('u1')
+    repo.invalidate_all_user_sessions('u2')
+    session_repository._session_cache._data.update(cached)
+    session_repository._epoch_state['checked_at'] = None
+    repo.get_cached_session_by_jti('jti-1')
+
+    assert ('jti', 'jti-3') not in session_repository._session_cache._data
+
+
+def test_sessions_expire_through_ttl_indexes(repo):
+    indexes = {tuple(info['key']): info for info in repo.collection.index_information().values()}
+
+    assert indexes[(('expires_at', 1),)]['expireAfterSeconds'] == 0
+    assert indexes[(('invalidated_at', 1),)]['expireAfterSeconds'] == \
+        session_repository.Config.SESSION_INVALIDATED_RETENTION_SECONDS
+
+
+def test_login_limit_evicts_the_least_recently_used_sessions(repo):
+    inicio = datetime.utcnow() - timedelta(hours=1)
+    for index in range(6):
+        _create(repo, 'u1', f'jti-{index}', last_used=inicio + timedelta(minutes=index))
+    _create(repo, 'u2', 'otro-usuario')
+
+    result = SessionService().enforce_max_sessions_per_user('u1', max_sessions=5)
+
+    assert result['invalidated_count'] == 2
+    active = repo.collection.find({'user_id': 'u1', 'active': True})
+    assert sorted(doc['refresh_token_jti'] for doc in active) == ['jti-2', 'jti-3', 'jti-4', 'jti-5']
+    assert repo.collection.find_one({'refresh_token_jti': 'jti-0'})['invalidated_at'] is not None
+    assert repo.collection.find_one({'user_id': 'u2'})['active'] is True
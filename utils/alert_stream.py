@@ -0,0 +1,306 @@
+"""Distribución de eventos de alertas en tiempo real (Server-Sent Events).
+
+Cada worker mantiene un único lector del change stream de `mqtt_alerts` que
+reparte los eventos entre todas las suscripciones SSE del worker. Si MongoDB
+no soporta change streams (instancia sin replica set) el broker trabaja en
+modo local y los repositorios publican los eventos en proceso. En modo `auto`
+el modo se decide una sola vez al arrancar (`configure`), antes de la primera
+publicación.
+
+En producción las conexiones SSE las atiende `stream_app.py`, un proceso
+aparte con workers gevent: cada conexión es una greenlet y no un hilo de los
+workers gthread de la API.
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from core.config import Config
+from core.database import Database
+from utils.bson_codec import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+EVENT_CREATED = 'alert_created'
+EVENT_UPDATED = 'alert_updated'
+EVENT_DEACTIVATED = 'alert_deactivated'
+EVENT_RECIPIENT_STATUS = 'recipient_status_changed'
+EVENT_RESYNC = 'resync'
+
+# Campos pesados que no viajan en los eventos (se consultan con GET /<alert_id>)
+_EXCLUDED_FIELDS = ('image_alert', 'data')
+
+# Códigos de MongoDB cuando $changeStream no está disponible (sin replica set)
+_CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 40324}
+
+
+class AlertStreamFullError(Exception):
+    """El worker ya tiene el máximo de suscripciones SSE abiertas"""
+
+
+def _sede_key(sede):
+    if not sede or not isinstance(sede, str):
+        return None
+    return sede.strip().lower()
+
+
+class AlertStreamSubscription:
+    """Suscripción SSE de una empresa (opcionalmente filtrada por sede)."""
+
+    def __init__(self, empresa_id, sede=None, queue_size=100):
+        self.empresa_id = str(empresa_id)
+        self.sede_key = _sede_key(sede)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def matches(self, event):
+        if event['empresa_id'] != self.empresa_id:
+            return False
+        return self.sede_key is None or event['sede_key'] == self.sede_key
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Cliente lento: se descartan eventos y se le pide recargar
+            self.overflowed = True
+
+    def iter_messages(self, heartbeat_seconds):
+        """Genera mensajes SSE ya formateados; envía comentarios de keepalive."""
+        while True:
+            if self.overflowed:
+                self.overflowed = False
+                with self.queue.mutex:
+                    self.queue.queue.clear()
+                yield format_sse(None, EVENT_RESYNC, {'reason': 'overflow'})
+                continue
+            try:
+                event = self.queue.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event['id'], event['type'], event['payload'])
+
+
+def format_sse(event_id, event_type, payload):
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(payload, default=str, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class AlertStreamBroker:
+    """Lector único por worker que reparte eventos de alertas a los suscriptores."""
+
+    MODE_AUTO = 'auto'
+    MODE_CHANGE_STREAM = 'change_stream'
+    MODE_LOCAL = 'local'
+
+    def __init__(self, mode=None, queue_size=None, replay_size=None, max_subscribers=None):
+        self.mode = (mode or Config.ALERT_STREAM_MODE or self.MODE_AUTO).lower()
+        self.queue_size = queue_size or Config.ALERT_STREAM_QUEUE_SIZE
+        self.max_subscribers = (
+            Config.ALERT_STREAM_API_MAX_SUBSCRIBERS if max_subscribers is None else max_subscribers
+        )
+        self._subscribers = set()
+        self._replay = deque(maxlen=replay_size or Config.ALERT_STREAM_REPLAY_SIZE)
+        self._lock = threading.Lock()
+        self._reader = None
+        self._reader_pid = None
+        self._resume_token = None
+        self._local_sequence = itertools.count(1)
+
+    # ------------------------------------------------------------------
+    # Arranque
+    # ------------------------------------------------------------------
+    def configure(self, max_subscribers=None, start_reader=False):
+        """Fija el límite de suscripciones del proceso y resuelve el modo `auto`.
+
+        Se llama una vez al crear la aplicación. `start_reader` abre el change
+        stream de inmediato (servidor de streams) para que el buffer de
+        reenvío tenga eventos antes del primer suscriptor.
+        """
+        if max_subscribers is not None:
+            self.max_subscribers = max_subscribers
+        if self.mode == self.MODE_AUTO:
+            self.mode = self.detect_mode()
+            logger.info(f"Stream de alertas en modo {self.mode}")
+        if start_reader:
+            self._ensure_reader()
+
+    def detect_mode(self):
+        """change_stream si MongoDB es replica set o mongos; local si es standalone"""
+        try:
+            hello = Database().get_database().client.admin.command('hello')
+        except Exception as e:
+            # Se decide al abrir el change stream (ver _run_change_stream)
+            logger.warning(f"No se pudo detectar el tipo de despliegue de MongoDB: {e}")
+            return self.MODE_AUTO
+        if hello.get('setName') or hello.get('msg') == 'isdbgrid':
+            return self.MODE_CHANGE_STREAM
+        return self.MODE_LOCAL
+
+    # ------------------------------------------------------------------
+    # Suscripciones
+    # ------------------------------------------------------------------
+    def subscribe(self, empresa_id, sede=None, last_event_id=None):
+        """Registra una suscripción y reenvía los eventos posteriores a `last_event_id`.
+
+        Pasado `max_subscribers` se lanza AlertStreamFullError. En los workers
+        gthread de la API cada suscripción ocupa un hilo, por eso allí el
+        límite es bajo; el servidor de streams admite muchas más.
+        """
+        self._ensure_reader()
+        subscription = AlertStreamSubscription(empresa_id, sede, self.queue_size)
+
+        with self._lock:
+            if self.max_subscribers and len(self._subscribers) >= self.max_subscribers:
+                raise AlertStreamFullError()
+            if last_event_id:
+                replay = list(self._replay)
+                position = next(
+                    (index for index, event in enumerate(replay) if event['id'] == last_event_id),
+                    None
+                )
+                if position is None:
+                    # El evento ya no está en memoria: el cliente debe recargar
+                    subscription.overflowed = True
+                else:
+                    for event in replay[position + 1:]:
+                        if subscription.matches(event):
+                            subscription.offer(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    # ------------------------------------------------------------------
+    # Publicación
+    # ------------------------------------------------------------------
+    @property
+    def publishes_locally(self):
+        return self.mode == self.MODE_LOCAL
+
+    def publish(self, event_type, alert_doc):
+        """Publica un evento en proceso (solo en modo local)."""
+        if not self.publishes_locally or not alert_doc:
+            return
+        event_id = f"local-{next(self._local_sequence)}"
+        self._dispatch(self._build_event(event_id, event_type, alert_doc))
+
+    def _build_event(self, event_id, event_type, alert_doc):
+        payload = {
+            key: value for key, value in alert_doc.items()
+            if key not in _EXCLUDED_FIELDS
+        }
+        payload = to_jsonable(payload)
+        return {
+            'id': event_id,
+            'type': event_type,
+            'empresa_id': payload.get('empresa_id'),
+            'sede_key': payload.get('sede_key') or _sede_key(payload.get('sede')),
+            'payload': payload
+        }
+
+    def _dispatch(self, event):
+        if not event['empresa_id']:
+            return
+        with self._lock:
+            self._replay.append(event)
+            subscribers = [sub for sub in self._subscribers if sub.matches(event)]
+        for subscription in subscribers:
+            subscription.offer(event)
+
+    # ------------------------------------------------------------------
+    # Change stream
+    # ------------------------------------------------------------------
+    def _ensure_reader(self):
+        if self.mode == self.MODE_LOCAL:
+            return
+        with self._lock:
+            # Tras el fork de Gunicorn (--preload) el hilo del maestro no existe
+            if self._reader and self._reader.is_alive() and self._reader_pid == os.getpid():
+                return
+            self._reader = threading.Thread(
+                target=self._run_change_stream,
+                name='alert-change-stream',
+                daemon=True
+            )
+            self._reader_pid = os.getpid()
+            self._reader.start()
+
+    def _run_change_stream(self):
+        collection = Database().get_database().mqtt_alerts
+        pipeline = [
+            {'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}},
+            {'$project': {f'fullDocument.{field}': 0 for field in _EXCLUDED_FIELDS}}
+        ]
+
+        while self.mode != self.MODE_LOCAL:
+            try:
+                with collection.watch(
+                    pipeline,
+                    full_document='updateLookup',
+                    resume_after=self._resume_token
+                ) as stream:
+                    self.mode = self.MODE_CHANGE_STREAM
+                    for change in stream:
+                        self._resume_token = change.get('_id')
+                        event = self._event_from_change(change)
+                        if event:
+                            self._dispatch(event)
+            except OperationFailure as e:
+                if e.code in _CHANGE_STREAM_UNSUPPORTED_CODES and self.mode == self.MODE_AUTO:
+                    logger.warning("Change streams no disponibles; usando publicación local de alertas")
+                    self.mode = self.MODE_LOCAL
+                    return
+                logger.error(f"Error en change stream de alertas: {e}")
+                # Token inválido o fuera del oplog: continuar desde el presente
+                self._resume_token = None
+                time.sleep(1)
+            except PyMongoError as e:
+                logger.error(f"Error en change stream de alertas: {e}")
+                time.sleep(1)
+
+    def _event_from_change(self, change):
+        document = change.get('fullDocument')
+        if not document:
+            return None
+
+        operation = change.get('operationType')
+        if operation == 'insert':
+            event_type = EVENT_CREATED
+        else:
+            updated_fields = (change.get('updateDescription') or {}).get('updatedFields') or {}
+            if 'activo' in updated_fields and not document.get('activo', True):
+                event_type = EVENT_DEACTIVATED
+            elif any(field.startswith('numeros_telefonicos') for field in updated_fields):
+                event_type = EVENT_RECIPIENT_STATUS
+            else:
+                event_type = EVENT_UPDATED
+
+        event_id = (change.get('_id') or {}).get('_data')
+        return self._build_event(event_id, event_type, document)
+
+
+_broker = AlertStreamBroker()
+
+
+def get_alert_stream_broker():
+    return _broker
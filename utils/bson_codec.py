@@ -0,0 +1,83 @@
+"""Conversión de documentos BSON a estructuras listas para JSON en una sola pasada.
+
+Cada modelo declara su esquema de salida como una tupla de
+`(campo, tipo, default)`; el default puede ser un valor o un tipo como
+`list`/`dict` para crear uno nuevo en cada documento. El codec compila el
+esquema una vez y luego recorre el documento (o el objeto del modelo) campo
+por campo, convirtiendo ObjectId y fechas sobre la marcha, sin construir
+diccionarios intermedios.
+"""
+
+from datetime import date, datetime
+
+from bson import ObjectId
+
+# Tipos de campo del esquema
+RAW = 'raw'              # se copia tal cual
+OBJECT_ID = 'object_id'  # ObjectId -> str (None si está vacío)
+DATETIME = 'datetime'    # datetime -> ISO 8601 (None si está vacío)
+NESTED = 'nested'        # dict/list con ObjectId o fechas anidadas
+
+_MISSING = object()
+
+
+def to_jsonable(value):
+    """Convierte recursivamente ObjectId y fechas a tipos JSON"""
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _object_id(value):
+    return str(value) if value else None
+
+
+def _datetime(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value or None
+
+
+_CONVERTERS = {
+    RAW: None,
+    OBJECT_ID: _object_id,
+    DATETIME: _datetime,
+    NESTED: to_jsonable,
+}
+
+
+class DocumentCodec:
+    """Serializador compilado a partir del esquema de un modelo."""
+
+    __slots__ = ('_fields',)
+
+    def __init__(self, schema):
+        self._fields = tuple(
+            (name, _CONVERTERS[kind], default)
+            for name, kind, default in schema
+        )
+
+    def from_document(self, document):
+        """Convierte un documento crudo de MongoDB sin instanciar el modelo"""
+        result = {}
+        get = document.get
+        for name, convert, default in self._fields:
+            value = get(name, _MISSING)
+            if value is _MISSING:
+                value = default() if callable(default) else default
+            result[name] = convert(value) if convert is not None else value
+        return result
+
+    def from_object(self, obj):
+        """Convierte una instancia del modelo leyendo sus atributos"""
+        result = {}
+        for name, convert, _ in self._fields:
+            value = getattr(obj, name)
+            result[name] = convert(value) if convert is not None else value
+        return result
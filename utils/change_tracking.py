@@ -0,0 +1,104 @@
+"""Seguimiento de cambios en modelos y actualizaciones con control de versión.
+
+Un modelo que hereda de `ChangeTracking` puede tomar una referencia de su
+estado persistido (`track_changes`) y luego calcular solo las rutas
+modificadas (`get_changes`). `versioned_update` escribe esas rutas con
+`find_one_and_update`, exigiendo que la `version` del documento no haya
+cambiado desde la lectura, y devuelve el documento resultante.
+"""
+
+import copy
+
+from pymongo import ReturnDocument
+
+
+class VersionConflictError(Exception):
+    """El documento fue modificado por otra operación desde que se leyó."""
+
+    def __init__(self, message=None):
+        super().__init__(message or 'El registro fue modificado por otra operación; recárguelo e intente de nuevo')
+
+
+def _is_plain_key(key):
+    return isinstance(key, str) and '.' not in key and not key.startswith('$')
+
+
+def diff_paths(original, current, prefix=''):
+    """Retorna {ruta.con.puntos: valor} de lo que cambió entre dos documentos.
+
+    Los diccionarios anidados se comparan campo a campo; si se eliminaron
+    llaves (o alguna no es una ruta válida) se reemplaza el diccionario completo.
+    Las listas se comparan como un todo.
+    """
+    changes = {}
+    for key, value in current.items():
+        path = f'{prefix}{key}'
+        if key not in original:
+            changes[path] = value
+            continue
+        old = original[key]
+        if (
+            isinstance(value, dict) and isinstance(old, dict)
+            and old.keys() <= value.keys()
+            and all(_is_plain_key(item) for item in value)
+        ):
+            changes.update(diff_paths(old, value, f'{path}.'))
+        elif old != value:
+            changes[path] = value
+    return changes
+
+
+class ChangeTracking:
+    """Mixin para modelos con `to_dict()`: guarda una referencia y calcula cambios."""
+
+    __slots__ = ('_snapshot', 'version')
+
+    def track_changes(self, original=None):
+        """Toma el estado actual (o el de `original`, ya persistido) como referencia"""
+        source = original if original is not None else self
+        self._snapshot = copy.deepcopy(source.to_dict())
+        self.version = source.version
+
+    def is_tracked(self):
+        return self._snapshot is not None
+
+    def get_changes(self):
+        """Retorna las rutas modificadas desde `track_changes` (None si no hay referencia)"""
+        if self._snapshot is None:
+            return None
+        current = self.to_dict()
+        current.pop('_id', None)
+        return diff_paths(self._snapshot, current)
+
+
+def versioned_update(collection, document_id, model):
+    """Aplica los cambios del modelo y retorna el documento actualizado (None si no existe).
+
+    Si el modelo tiene referencia de cambios, solo se escriben las rutas
+    modificadas y el filtro exige la misma `version` leída (un documento sin
+    `version` coincide con None); si otra operación lo modificó se lanza
+    `VersionConflictError`. Sin referencia se escribe el documento completo
+    sin verificar la versión, como antes.
+    """
+    changes = model.get_changes()
+    query = {'_id': document_id}
+    if changes is None:
+        changes = model.to_dict()
+        changes.pop('_id', None)
+    else:
+        query['version'] = model.version
+
+    update = {'$inc': {'version': 1}}
+    if changes:
+        update['$set'] = changes
+
+    updated = collection.find_one_and_update(
+        query,
+        update,
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is None:
+        if 'version' in query and collection.count_documents({'_id': document_id}, limit=1):
+            raise VersionConflictError()
+        return None
+    return updated
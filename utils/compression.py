@@ -0,0 +1,76 @@
+"""Compresión de respuestas negociada con `Accept-Encoding` (brotli o gzip)."""
+
+import gzip
+
+from core.config import Config
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+_COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv', 'application/x-ndjson')
+
+
+def _accepted_encodings(header_value):
+    """Retorna las codificaciones aceptadas (q > 0) del header Accept-Encoding"""
+    accepted = set()
+    for part in (header_value or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 1.0
+        if quality > 0:
+            accepted.add(token)
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Elige brotli si está disponible y es aceptado; si no, gzip"""
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding):
+    """Comprime el cuerpo si supera `Config.COMPRESSION_MIN_SIZE` bytes"""
+    if not Config.COMPRESSION_ENABLED:
+        return response
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.status_code < 200 or response.status_code >= 300 or response.status_code == 204:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in _COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(accept_encoding)
+    if not encoding:
+        return response
+
+    body = response.get_data()
+    if len(body) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
+    return response
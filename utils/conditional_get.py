@@ -0,0 +1,167 @@
+"""Soporte de GET condicional (ETag / Last-Modified) para lecturas de listados.
+
+El validador de cada respuesta se deriva de la "versión" de las colecciones
+involucradas: la fecha de modificación más reciente y el número de documentos.
+Si el cliente envía un validador vigente se responde 304 sin ejecutar la
+vista, evitando materializar y serializar los documentos.
+
+Las vistas de una sola empresa o de un solo documento pasan un `scope` que
+limita la versión a esos documentos: así el heartbeat de un hardware de otra
+empresa no invalida su ETag. Los listados globales (super admin, sin
+`empresa_id`) muestran el estado de toda la flota y su versión sigue siendo
+la de la colección completa.
+"""
+
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime
+from functools import wraps
+from threading import Lock
+
+from bson import ObjectId
+from flask import g, make_response, request
+
+from core.database import Database
+
+# Campos que marcan una modificación por colección
+VERSION_FIELDS = {
+    'empresas': ('fecha_actualizacion', 'last_login'),
+    # Los heartbeats sin cambio de estado solo refrescan physical_status.updated_at
+    'hardware': ('fecha_actualizacion', 'physical_status.updated_at'),
+}
+DEFAULT_VERSION_FIELDS = ('fecha_actualizacion',)
+
+_indexed_fields = set()
+_index_lock = Lock()
+
+
+def _ensure_index(collection, field, prefix=()):
+    key = (collection.name, prefix, field)
+    if key in _indexed_fields:
+        return
+    with _index_lock:
+        if key in _indexed_fields:
+            return
+        try:
+            collection.create_index([(name, 1) for name in prefix] + [(field, -1)])
+        except Exception:
+            pass
+        _indexed_fields.add(key)
+
+
+def get_collection_version(collection_name, query=None):
+    """Retorna (conteo, última modificación) de una colección usando índices.
+
+    Con `query` (filtro de igualdad) la versión se limita a los documentos
+    que lo cumplen.
+    """
+    collection = Database().get_database()[collection_name]
+    prefix = tuple(query or ())
+    latest = None
+    for field in VERSION_FIELDS.get(collection_name, DEFAULT_VERSION_FIELDS):
+        # Por _id la consulta ya toca un solo documento
+        if '_id' not in prefix:
+            _ensure_index(collection, field, prefix)
+        doc = collection.find_one(
+            {**(query or {}), field: {'$type': 'date'}},
+            {field: 1, '_id': 0},
+            sort=[(field, -1)]
+        )
+        value = doc
+        # La proyección de un campo anidado devuelve el subdocumento
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value and (latest is None or value > latest):
+            latest = value
+    count = collection.count_documents(query) if query else collection.estimated_document_count()
+    return count, latest
+
+
+def _object_id(value):
+    return ObjectId(value) if ObjectId.is_valid(value) else value
+
+
+def empresa_scope(empresa_id=None, **_):
+    """Scope de hardware/empresas: la empresa de la ruta o del filtro `?empresa_id`."""
+    empresa_id = empresa_id or request.args.get('empresa_id')
+    if not empresa_id:
+        return {}
+    empresa_id = _object_id(empresa_id)
+    return {'hardware': {'empresa_id': empresa_id}, 'empresas': {'_id': empresa_id}}
+
+
+def hardware_scope(hardware_id=None, **_):
+    """Scope de un hardware por id; la empresa se resuelve en la vista."""
+    return {'hardware': {'_id': _object_id(hardware_id)}} if hardware_id else {}
+
+
+def _request_scope():
+    """Identifica al solicitante: la misma URL puede devolver datos distintos por rol/empresa.
+
+    Se incluye el token porque varias vistas validan la autenticación dentro
+    del controlador, después de este decorador.
+    """
+    auth_token = request.cookies.get('auth_token') or request.headers.get('Authorization') or ''
+    return '|'.join([
+        str(getattr(g, 'role', '') or ''),
+        str(getattr(g, 'empresa_id', '') or ''),
+        str(getattr(g, 'user_id', '') or ''),
+        hashlib.sha1(auth_token.encode('utf-8')).hexdigest(),
+        request.full_path
+    ])
+
+
+def _not_modified(etag, last_modified):
+    if_none_match = request.if_none_match
+    if if_none_match:
+        # Comparación débil (RFC 7232): se ignora el prefijo W/
+        return if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_get(*collection_names, scope=None):
+    """Decorador que responde 304 si las colecciones no cambiaron desde la última lectura.
+
+    Debe aplicarse después de los decoradores de autenticación para que el
+    validador incluya el rol y la empresa del solicitante. `scope` recibe los
+    argumentos de la vista y retorna {colección: filtro} para las colecciones
+    cuya versión se limita a la empresa o al documento solicitado.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            try:
+                queries = scope(**kwargs) if scope else {}
+                versions = [get_collection_version(name, queries.get(name)) for name in collection_names]
+            except Exception:
+                # Si no se puede calcular el validador se responde normalmente
+                return view(*args, **kwargs)
+
+            last_modified = max((latest for _, latest in versions if latest), default=None)
+            digest = hashlib.sha1()
+            digest.update(_request_scope().encode('utf-8'))
+            for name, (count, latest) in zip(collection_names, versions):
+                digest.update(f"{name}:{count}:{latest.isoformat() if latest else ''}".encode('utf-8'))
+            etag = digest.hexdigest()[:32]
+
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.headers['Last-Modified'] = format_datetime(
+                    last_modified.replace(tzinfo=timezone.utc, microsecond=0),
+                    usegmt=True
+                )
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
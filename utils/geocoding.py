@@ -1,5 +1,6 @@
 import requests
 import time
+from utils.tracing import http_request
 from typing import Tuple, Optional
 
 def obtener_lat_lon(direccion: str) -> Tuple[Optional[str], Optional[str]]:
@@ -31,7 +32,7 @@ def obtener_lat_lon(direccion: str) -> Tuple[Optional[str], Optional[str]]:
         # Respetar el rate limit de Nominatim (máximo 1 request por segundo)
         time.sleep(1)
         
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = http_request('nominatim', 'GET', url, params=params, headers=headers, timeout=10)
         
         if resp.status_code == 200:
             data = resp.json()
@@ -0,0 +1,140 @@
+"""Coalescencia de heartbeats de hardware y tabla de última señal (uno por worker).
+
+Cada worker recuerda, por topic, el último `estado` escrito en MongoDB y
+cuándo lo escribió. Con esa información decide qué hacer con cada heartbeat:
+
+- full: el estado cambió, el topic no se conoce en este worker o pasó
+  `HEARTBEAT_FULL_WRITE_INTERVAL_SECONDS` desde la última escritura completa;
+  se reescribe `physical_status` completo.
+- touch: el estado no cambió y pasó `HEARTBEAT_TOUCH_INTERVAL_SECONDS` desde
+  la última escritura; solo se refresca `physical_status.updated_at`.
+- skip: el estado no cambió y la última escritura es reciente; no se toca la
+  base de datos, solo la tabla en memoria.
+
+La tabla también sirve como vista en vivo de la flota, limitada a los
+heartbeats que recibió este worker.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+
+from core.config import Config
+
+ACTION_FULL = 'full'
+ACTION_TOUCH = 'touch'
+ACTION_SKIP = 'skip'
+
+
+class HeartbeatCoalescer:
+    """Tabla acotada topic -> última señal y estado escrito."""
+
+    def __init__(self, maxsize=None, touch_interval=None, full_interval=None):
+        self.maxsize = max(1, int(maxsize or Config.HEARTBEAT_TABLE_SIZE))
+        self.touch_interval = (
+            Config.HEARTBEAT_TOUCH_INTERVAL_SECONDS if touch_interval is None else touch_interval
+        )
+        self.full_interval = (
+            Config.HEARTBEAT_FULL_WRITE_INTERVAL_SECONDS if full_interval is None else full_interval
+        )
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def plan(self, statuses, now=None):
+        """Clasifica {topic: physical_status} y retorna (full, touch, skipped).
+
+        `full` es {topic: physical_status}, `touch` es {topic: estado} y
+        `skipped` la lista de topics que no requieren escritura; para estos
+        últimos la tabla se actualiza de inmediato.
+        """
+        now = now or datetime.utcnow()
+        monotonic = time.monotonic()
+        full, touch, skipped = {}, {}, []
+        with self._lock:
+            for topic, physical_status in statuses.items():
+                estado = physical_status.get('estado')
+                entry = self._entries.get(topic)
+                if (
+                    entry is None
+                    or entry['estado'] != estado
+                    or monotonic - entry['written_at'] >= self.full_interval
+                ):
+                    full[topic] = physical_status
+                elif monotonic - entry['touched_at'] >= self.touch_interval:
+                    touch[topic] = estado
+                else:
+                    entry['last_seen'] = now
+                    self._entries.move_to_end(topic)
+                    skipped.append(topic)
+        return full, touch, skipped
+
+    def commit(self, full=None, touch=None, now=None):
+        """Registra escrituras ya confirmadas en MongoDB"""
+        now = now or datetime.utcnow()
+        monotonic = time.monotonic()
+        with self._lock:
+            for topic, physical_status in (full or {}).items():
+                self._entries[topic] = {
+                    'estado': physical_status.get('estado'),
+                    'last_seen': now,
+                    'written_at': monotonic,
+                    'touched_at': monotonic
+                }
+                self._entries.move_to_end(topic)
+            for topic in (touch or {}):
+                entry = self._entries.get(topic)
+                if entry is None:
+                    continue
+                entry['last_seen'] = now
+                entry['touched_at'] = monotonic
+                self._entries.move_to_end(topic)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def forget(self, topics):
+        """Olvida topics cuyo estado cambió fuera de este worker (p. ej. al marcarlos inactivos)"""
+        with self._lock:
+            for topic in topics:
+                self._entries.pop(topic, None)
+
+    def snapshot(self, topics=None, now=None):
+        """Retorna la vista de la flota ordenada por última señal (más reciente primero)"""
+        now = now or datetime.utcnow()
+        stale_seconds = Config.HARDWARE_STATUS_STALE_SECONDS
+        with self._lock:
+            items = [
+                (topic, entry['estado'], entry['last_seen'])
+                for topic, entry in self._entries.items()
+                if topics is None or topic in topics
+            ]
+        fleet = []
+        for topic, estado, last_seen in sorted(items, key=lambda item: item[2], reverse=True):
+            seconds = (now - last_seen).total_seconds()
+            fleet.append({
+                'topic': topic,
+                'estado': estado,
+                'last_seen': last_seen.isoformat(),
+                'seconds_since_seen': round(seconds, 1),
+                'stale': seconds > stale_seconds
+            })
+        return fleet
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {'worker_pid': os.getpid(), 'size': size, 'maxsize': self.maxsize}
+
+
+_coalescer = None
+_coalescer_lock = Lock()
+
+
+def get_heartbeat_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = HeartbeatCoalescer()
+    return _coalescer
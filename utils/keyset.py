@@ -0,0 +1,52 @@
+"""Paginación por cursor (keyset) sobre `(fecha_creacion, _id)` descendente.
+
+El cursor es opaco para el cliente: codifica la fecha de creación y el `_id`
+del último documento entregado. La siguiente página se pide con una
+condición de rango que usa el índice `(fecha_creacion, _id)`, sin `skip`, por
+lo que su costo no crece con la posición en el listado.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from bson import ObjectId
+
+# Orden estable del listado; debe coincidir con la condición de keyset_condition
+KEYSET_SORT = [('fecha_creacion', -1), ('_id', -1)]
+
+
+def encode_cursor(document):
+    """Cursor que apunta justo después de `document`"""
+    fecha = document.get('fecha_creacion')
+    payload = {
+        'f': fecha.isoformat() if isinstance(fecha, datetime) else None,
+        'i': str(document['_id'])
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Retorna (fecha_creacion, _id); lanza ValueError si el cursor no es válido"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        fecha = datetime.fromisoformat(payload['f']) if payload.get('f') else None
+        return fecha, ObjectId(payload['i'])
+    except Exception:
+        raise ValueError('Cursor de paginación inválido')
+
+
+def keyset_condition(fecha, object_id):
+    """Documentos posteriores a (fecha, _id) en orden descendente.
+
+    En orden descendente los documentos sin `fecha_creacion` van al final.
+    """
+    if fecha is None:
+        return {'fecha_creacion': None, '_id': {'$lt': object_id}}
+    return {'$or': [
+        {'fecha_creacion': {'$lt': fecha}},
+        {'fecha_creacion': fecha, '_id': {'$lt': object_id}},
+        {'fecha_creacion': None}
+    ]}
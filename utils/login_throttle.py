@@ -0,0 +1,116 @@
+"""Límite de intentos fallidos de login por IP y por usuario.
+
+Los contadores viven en la colección `login_attempts` para que el límite
+sea el mismo sin importar qué worker atienda la petición. Cada documento
+cuenta los fallos de una clave (`ip:<dirección>` o `user:<usuario>`) en una
+ventana fija y expira solo mediante un índice TTL.
+
+La clave por IP está desactivada por defecto (LOGIN_THROTTLE_BY_IP): detrás
+de un proxy REMOTE_ADDR es la del proxy y un solo atacante bloquearía a
+todos. Se activa junto con PROXY_FIX_X_FOR, que toma la IP del cliente de
+X-Forwarded-For.
+
+La comprobación ocurre antes de buscar al usuario y de verificar la
+contraseña, de modo que un ataque de fuerza bruta no llega a consumir bcrypt.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+from core.config import Config
+from core.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class LoginThrottle:
+    """Ventanas fijas de fallos por IP y por usuario."""
+
+    def __init__(self, window_seconds=300, max_per_ip=20, max_per_username=5):
+        self.window_seconds = max(1, int(window_seconds))
+        self.max_per_ip = max_per_ip
+        self.max_per_username = max_per_username
+        self.collection = Database().get_database().login_attempts
+        self._create_indexes()
+
+    def _create_indexes(self):
+        try:
+            self.collection.create_index([('expires_at', 1)], expireAfterSeconds=0)
+        except Exception:
+            pass
+
+    def _window(self, now):
+        start = int(now // self.window_seconds) * self.window_seconds
+        return start, start + self.window_seconds
+
+    def _keys(self, ip, usuario, window_start):
+        keys = {}
+        if ip and self.max_per_ip:
+            keys[f'ip:{ip}:{window_start}'] = self.max_per_ip
+        if usuario and self.max_per_username:
+            keys[f'user:{usuario.strip().lower()}:{window_start}'] = self.max_per_username
+        return keys
+
+    def retry_after(self, ip, usuario):
+        """Segundos a esperar si la IP o el usuario superó el límite, o 0"""
+        try:
+            now = time.time()
+            window_start, window_end = self._window(now)
+            keys = self._keys(ip, usuario, window_start)
+            if not keys:
+                return 0
+            for doc in self.collection.find({'_id': {'$in': list(keys)}}, {'count': 1}):
+                if doc.get('count', 0) >= keys[doc['_id']]:
+                    return max(1, int(window_end - now))
+            return 0
+        except Exception as exc:
+            # Sin contadores no se bloquea el login
+            logger.warning(f'No se pudo consultar login_attempts: {exc}')
+            return 0
+
+    def register_failure(self, ip, usuario):
+        """Suma un fallo a los contadores de la IP y del usuario"""
+        try:
+            window_start, window_end = self._window(time.time())
+            keys = self._keys(ip, usuario, window_start)
+            if not keys:
+                return
+            expires_at = datetime.utcfromtimestamp(window_end) + timedelta(seconds=60)
+            self.collection.bulk_write([
+                UpdateOne(
+                    {'_id': key},
+                    {'$inc': {'count': 1}, '$setOnInsert': {'expires_at': expires_at}},
+                    upsert=True
+                )
+                for key in keys
+            ], ordered=False)
+        except Exception as exc:
+            logger.warning(f'No se pudo registrar el intento fallido: {exc}')
+
+    def reset_username(self, usuario):
+        """Limpia el contador del usuario tras un login correcto"""
+        try:
+            window_start, _ = self._window(time.time())
+            keys = list(self._keys(None, usuario, window_start))
+            if keys:
+                self.collection.delete_many({'_id': {'$in': keys}})
+        except Exception as exc:
+            logger.warning(f'No se pudo limpiar login_attempts: {exc}')
+
+
+_login_throttle = None
+
+
+def get_login_throttle():
+    """Instancia única por proceso configurada desde Config"""
+    global _login_throttle
+    if _login_throttle is None:
+        _login_throttle = LoginThrottle(
+            window_seconds=Config.LOGIN_THROTTLE_WINDOW_SECONDS,
+            max_per_ip=Config.LOGIN_MAX_FAILURES_PER_IP if Config.LOGIN_THROTTLE_BY_IP else 0,
+            max_per_username=Config.LOGIN_MAX_FAILURES_PER_USERNAME
+        )
+    return _login_throttle
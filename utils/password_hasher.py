@@ -0,0 +1,139 @@
+"""Verificación y hash de contraseñas bcrypt fuera del hilo de la petición.
+
+bcrypt es deliberadamente costoso: con el costo por defecto cada
+verificación ocupa un núcleo durante cientos de milisegundos. Para que una
+ráfaga de logins no deje sin CPU a los endpoints de alertas, el cálculo se
+hace en un pool pequeño de procesos (uno por worker de Gunicorn, creado de
+forma perezosa tras el fork de `--preload`) y cada worker admite a lo sumo
+`PASSWORD_VERIFY_CONCURRENCY` operaciones en curso. Si no hay cupo en
+`PASSWORD_VERIFY_QUEUE_TIMEOUT_SECONDS`, se lanza `PasswordHasherBusy`.
+
+Este módulo no importa la configuración a nivel de módulo: los procesos
+del pool se crean con `spawn` y solo necesitan `_checkpw` y `_hashpw`.
+"""
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+_COST_PATTERN = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class PasswordHasherBusy(Exception):
+    """No hay cupo para verificar la contraseña dentro del tiempo de espera"""
+
+
+def _checkpw(password, stored_hash):
+    return bcrypt.checkpw(password, stored_hash)
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def hash_cost(stored_hash):
+    """Factor de costo de un hash bcrypt, o None si no es un hash bcrypt"""
+    match = _COST_PATTERN.match(stored_hash or '')
+    return int(match.group(1)) if match else None
+
+
+class PasswordHasher:
+    """Pool de procesos acotado con límite de concurrencia por worker."""
+
+    def __init__(self, processes=2, concurrency=4, queue_timeout=2.0, rounds=12):
+        self.processes = max(0, int(processes))
+        self.concurrency = max(1, int(concurrency))
+        self.queue_timeout = queue_timeout
+        self.rounds = int(rounds)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self):
+        if self.processes == 0:
+            return None
+        pid = os.getpid()
+        if self._executor is not None and self._executor_pid == pid:
+            return self._executor
+        with self._lock:
+            if self._executor is None or self._executor_pid != pid:
+                # spawn: no se hereda el cliente de MongoDB ni los hilos del worker
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._executor_pid = pid
+        return self._executor
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusy('Servicio de autenticación ocupado')
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                return func(*args)
+            # El cupo ya acota la cola; este límite solo evita esperar indefinidamente
+            return executor.submit(func, *args).result(timeout=self.queue_timeout + 30)
+        except FutureTimeoutError:
+            raise PasswordHasherBusy('Servicio de autenticación ocupado')
+        except BrokenProcessPool:
+            # Un proceso del pool murió: se recrea en la siguiente operación
+            with self._lock:
+                self._executor = None
+            raise PasswordHasherBusy('Servicio de autenticación no disponible')
+        finally:
+            self._slots.release()
+
+    def verify(self, password, stored_hash):
+        """True si `password` corresponde a `stored_hash`"""
+        if not password or not stored_hash:
+            return False
+        try:
+            return self._run(_checkpw, password.encode('utf-8'), stored_hash.encode('utf-8'))
+        except ValueError:
+            # Hash mal formado en la base de datos
+            return False
+
+    def hash(self, password):
+        """Hash bcrypt de `password` con el costo configurado"""
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def needs_rehash(self, stored_hash):
+        """True si el hash se generó con un costo distinto al configurado"""
+        cost = hash_cost(stored_hash)
+        return cost is not None and cost != self.rounds
+
+    def stats(self):
+        return {
+            'processes': self.processes,
+            'concurrency': self.concurrency,
+            'rounds': self.rounds,
+            'rejected': self.rejected
+        }
+
+
+_password_hasher = None
+
+
+def get_password_hasher():
+    """Instancia única por proceso configurada desde Config"""
+    global _password_hasher
+    if _password_hasher is None:
+        from core.config import Config
+        _password_hasher = PasswordHasher(
+            processes=Config.PASSWORD_HASH_PROCESSES,
+            concurrency=Config.PASSWORD_VERIFY_CONCURRENCY,
+            queue_timeout=Config.PASSWORD_VERIFY_QUEUE_TIMEOUT_SECONDS,
+            rounds=Config.BCRYPT_ROUNDS
+        )
+    return _password_hasher
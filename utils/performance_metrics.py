@@ -6,6 +6,8 @@ class PerformanceMetrics:
     def __init__(self, max_samples=500):
         self._durations_ms = deque(maxlen=max_samples)
         self._status_codes = deque(maxlen=max_samples)
+        # Agregados por ruta (plantilla de Flask, cardinalidad acotada)
+        self._routes = {}
         self._lock = Lock()
 
     def record(self, duration_ms, status_code):
@@ -13,6 +15,47 @@ class PerformanceMetrics:
             self._durations_ms.append(duration_ms)
             self._status_codes.append(status_code)
 
+    def record_route(self, route, duration_ms, query_stats=None):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    'requests': 0, 'total_ms': 0.0, 'db_commands': 0,
+                    'db_ms': 0.0, 'db_bytes': 0, 'db_bytes_requests': 0, 'max_db_commands': 0
+                }
+            entry['requests'] += 1
+            entry['total_ms'] += duration_ms
+            if query_stats is not None:
+                entry['db_commands'] += query_stats.commands
+                entry['db_ms'] += query_stats.duration_ms
+                if query_stats.reply_bytes is not None:
+                    # Solo las peticiones con Server-Timing miden bytes
+                    entry['db_bytes'] += query_stats.reply_bytes
+                    entry['db_bytes_requests'] += 1
+                entry['max_db_commands'] = max(entry['max_db_commands'], query_stats.commands)
+
+    def get_route_stats(self, limit=20):
+        """Rutas ordenadas por tiempo total en la base de datos"""
+        with self._lock:
+            items = [(route, dict(entry)) for route, entry in self._routes.items()]
+        routes = []
+        for route, entry in items:
+            requests = entry['requests']
+            routes.append({
+                'route': route,
+                'requests': requests,
+                'avg_ms': round(entry['total_ms'] / requests, 2),
+                'avg_db_commands': round(entry['db_commands'] / requests, 2),
+                'max_db_commands': entry['max_db_commands'],
+                'avg_db_ms': round(entry['db_ms'] / requests, 2),
+                'avg_db_bytes': (
+                    int(entry['db_bytes'] / entry['db_bytes_requests']) if entry['db_bytes_requests'] else None
+                ),
+                'total_db_ms': round(entry['db_ms'], 2)
+            })
+        routes.sort(key=lambda item: item['total_db_ms'], reverse=True)
+        return routes[:limit]
+
     def get_average_response_time_ms(self):
         with self._lock:
             if not self._durations_ms:
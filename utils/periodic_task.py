@@ -0,0 +1,95 @@
+"""Tareas periódicas en segundo plano coordinadas entre workers.
+
+Cada worker de Gunicorn arranca su propio hilo (de forma perezosa, para
+sobrevivir al fork de `--preload`), pero antes de cada ejecución el hilo
+toma un lease en la colección `scheduler_leases`. Solo el worker que obtiene
+el lease ejecuta la tarea en ese intervalo; los demás la omiten.
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from core.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Ejecuta `func` cada `interval_seconds` en a lo sumo un worker a la vez."""
+
+    def __init__(self, name, interval_seconds, func):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self.last_result = None
+        self.last_run_at = None
+        self._thread = None
+        self._thread_pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.interval_seconds and self.interval_seconds > 0)
+
+    def ensure_started(self):
+        """Arranca el hilo en este proceso si aún no está corriendo (llamada barata)"""
+        if not self.enabled:
+            return
+        if self._thread_pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            # Tras el fork de Gunicorn (--preload) el hilo del maestro no existe
+            if self._thread_pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'periodic-{self.name}', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _acquire_lease(self):
+        """Toma el lease del intervalo actual; False si otro worker lo tiene"""
+        now = datetime.utcnow()
+        leases = Database().get_database().scheduler_leases
+        try:
+            leases.find_one_and_update(
+                {'_id': self.name, 'expires_at': {'$lte': now}},
+                {'$set': {
+                    'owner': self._owner(),
+                    'acquired_at': now,
+                    # Un poco menos que el intervalo para no perder ejecuciones por desfase
+                    'expires_at': now + timedelta(seconds=self.interval_seconds * 0.9)
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def run_once(self):
+        """Ejecuta la tarea si se obtiene el lease; retorna el resultado o None"""
+        if not self._acquire_lease():
+            return None
+        self.last_result = self.func()
+        self.last_run_at = datetime.utcnow()
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                result = self.run_once()
+                if isinstance(result, dict) and not result.get('success', True):
+                    logger.error(f"Tarea periódica {self.name} falló: {result.get('errors')}")
+            except Exception as e:
+                logger.error(f"Error en tarea periódica {self.name}: {e}")
@@ -0,0 +1,43 @@
+"""Utilidades para normalizar números telefónicos a formato E.164."""
+
+import re
+from typing import Optional
+
+_NON_DIGITS = re.compile(r'\D')
+
+# Longitud máxima de un número nacional (Colombia: 10 dígitos). Números más
+# largos sin prefijo "+" se asumen ya con indicativo de país.
+MAX_NATIONAL_DIGITS = 10
+
+
+def normalize_phone_e164(value, default_country_code: Optional[str] = None) -> Optional[str]:
+    """Convierte un teléfono a su forma canónica E.164 (`+<indicativo><número>`).
+
+    Acepta strings o enteros con espacios, guiones, paréntesis, prefijo `+`
+    o `00`. Los números nacionales reciben el indicativo configurado en
+    `Config.DEFAULT_PHONE_COUNTRY_CODE`. Retorna None si no hay dígitos.
+    """
+    if value is None:
+        return None
+
+    raw = str(value).strip()
+    if not raw:
+        return None
+
+    has_prefix = raw.startswith('+')
+    digits = _NON_DIGITS.sub('', raw)
+    if not has_prefix and digits.startswith('00'):
+        digits = digits[2:]
+        has_prefix = True
+    if not digits:
+        return None
+
+    country_code = default_country_code
+    if not country_code:
+        # Import diferido: `core` importa las rutas, que importan los modelos
+        from core.config import Config
+        country_code = Config.DEFAULT_PHONE_COUNTRY_CODE
+    if not has_prefix and country_code and len(digits) <= MAX_NATIONAL_DIGITS:
+        digits = f"{country_code}{digits}"
+
+    return f"+{digits}"
@@ -0,0 +1,169 @@
+"""Contabilidad de comandos de MongoDB por petición y log de consultas lentas.
+
+`QueryAccountingListener` se registra en el `MongoClient` y atribuye cada
+comando a la petición de Flask en curso: cantidad de comandos, tiempo total
+en la base de datos y, si se piden, bytes de las respuestas. Los eventos de PyMongo se
+publican en el mismo hilo que ejecuta el comando, así que la petición actual
+se guarda en un `ContextVar`. Los comandos lanzados desde otros hilos (por
+ejemplo pools de búsqueda en paralelo) no se atribuyen a la petición.
+
+Medir los bytes exige volver a codificar cada respuesta en BSON, así que
+solo se hace en las peticiones que llevan Server-Timing (`measure_bytes`);
+en las demás `reply_bytes` queda en None.
+
+Los comandos que superan `SLOW_QUERY_THRESHOLD_MS` se registran en el logger
+`rescue.slow_query` con la forma normalizada de la consulta (valores
+reemplazados por `?`) y la ruta que los originó.
+"""
+
+import json
+import logging
+from contextvars import ContextVar
+
+import bson
+from pymongo import monitoring
+
+slow_query_logger = logging.getLogger('rescue.slow_query')
+
+# Campos que agrega el driver y no describen la consulta
+_DRIVER_FIELDS = {
+    'lsid', '$db', '$clusterTime', 'txnNumber', '$readPreference', 'readConcern',
+    'writeConcern', 'autocommit', 'startTransaction', 'apiVersion', 'comment',
+    'documents', 'cursor', 'batchSize', 'singleBatch', 'maxTimeMS', 'ordered'
+}
+_SHAPE_MAX_LENGTH = 500
+
+_current = ContextVar('query_accounting_request', default=None)
+
+
+class RequestQueryStats:
+    """Acumulado de comandos de MongoDB de una petición"""
+
+    __slots__ = ('route', 'commands', 'duration_ms', 'reply_bytes', 'failures')
+
+    def __init__(self, route, measure_bytes=False):
+        self.route = route
+        self.commands = 0
+        self.duration_ms = 0.0
+        self.reply_bytes = 0 if measure_bytes else None
+        self.failures = 0
+
+    def to_dict(self):
+        return {
+            'route': self.route,
+            'commands': self.commands,
+            'duration_ms': round(self.duration_ms, 3),
+            'reply_bytes': self.reply_bytes,
+            'failures': self.failures
+        }
+
+
+def begin_request(route, measure_bytes=False):
+    """Empieza a acumular los comandos del hilo actual para `route`"""
+    stats = RequestQueryStats(route, measure_bytes)
+    _current.set(stats)
+    return stats
+
+
+def finish_request():
+    """Deja de acumular y retorna lo acumulado, o None"""
+    stats = _current.get()
+    _current.set(None)
+    return stats
+
+
+def current_request_stats():
+    return _current.get()
+
+
+def query_shape(value):
+    """Estructura de la consulta con los valores reemplazados por `?`"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if not value:
+            return []
+        # Las listas de operadores ($and, $or, pipelines) conservan cada etapa
+        if all(isinstance(item, dict) for item in value):
+            return [query_shape(item) for item in value]
+        return ['?']
+    return '?'
+
+
+def command_shape(command_name, command):
+    """Forma normalizada de un comando, truncada para el log"""
+    shape = {
+        key: query_shape(value)
+        for key, value in command.items()
+        if key != command_name and key not in _DRIVER_FIELDS
+    }
+    text = json.dumps(shape, ensure_ascii=False, sort_keys=True, default=str)
+    if len(text) > _SHAPE_MAX_LENGTH:
+        text = text[:_SHAPE_MAX_LENGTH] + '…'
+    return text
+
+
+class QueryAccountingListener(monitoring.CommandListener):
+    """Atribuye comandos a la petición actual y registra los lentos"""
+
+    def __init__(self, slow_threshold_ms=100):
+        self.slow_threshold_ms = slow_threshold_ms
+        # Comandos en curso: solo se normalizan si resultan lentos
+        self._in_flight = {}
+
+    def _key(self, event):
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        if self.slow_threshold_ms:
+            self._in_flight[self._key(event)] = (event.database_name, event.command)
+
+    def _finish(self, event, reply=None, failed=False):
+        started = self._in_flight.pop(self._key(event), None) if self.slow_threshold_ms else None
+        duration_ms = event.duration_micros / 1000.0
+        stats = _current.get()
+        if stats is not None:
+            stats.commands += 1
+            stats.duration_ms += duration_ms
+            if failed:
+                stats.failures += 1
+            elif reply is not None and stats.reply_bytes is not None:
+                try:
+                    stats.reply_bytes += len(bson.encode(reply))
+                except Exception:
+                    pass
+        if started and duration_ms >= self.slow_threshold_ms:
+            database_name, command = started
+            collection = command.get(event.command_name)
+            if not isinstance(collection, str):
+                # getMore y killCursors llevan la colección en otro campo
+                collection = command.get('collection')
+            slow_query_logger.warning(json.dumps({
+                'event': 'slow_query',
+                'route': stats.route if stats is not None else None,
+                'command': event.command_name,
+                'database': database_name,
+                'collection': collection if isinstance(collection, str) else None,
+                'duration_ms': round(duration_ms, 3),
+                'failed': failed,
+                'shape': command_shape(event.command_name, command)
+            }, ensure_ascii=False, default=str))
+
+    def succeeded(self, event):
+        self._finish(event, reply=event.reply)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+def server_timing_header(stats, total_ms=None):
+    """Valor del header Server-Timing para lo acumulado en la petición"""
+    parts = []
+    if stats is not None:
+        desc = f'{stats.commands} cmds'
+        if stats.reply_bytes is not None:
+            desc += f', {stats.reply_bytes} B'
+        parts.append(f'db;dur={stats.duration_ms:.2f};desc="{desc}"')
+    if total_ms is not None:
+        parts.append(f'app;dur={total_ms:.2f}')
+    return ', '.join(parts)
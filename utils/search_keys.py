@@ -0,0 +1,97 @@
+"""Claves de búsqueda por prefijo mantenidas en cada documento.
+
+Los modelos buscables guardan dos arreglos calculados en `to_dict()`:
+
+- `search_words`: palabras completas normalizadas (minúsculas, sin tildes).
+- `search_keys`: todos los prefijos de esas palabras (índice multikey).
+
+Una búsqueda exige que cada palabra del término sea prefijo de alguna
+palabra del documento (`$all` sobre `search_keys`, resuelto por índice) y
+ordena por relevancia: primero las palabras que coinciden completas.
+"""
+
+import re
+import unicodedata
+
+MAX_PREFIX_LENGTH = 20
+MAX_TERM_TOKENS = 8
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_text(value):
+    """Minúsculas, sin tildes y con separadores reducidos a espacios"""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value).lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def tokenize(value):
+    return normalize_text(value).split()
+
+
+def build_search_fields(*values):
+    """Retorna {'search_words': [...], 'search_keys': [...]} para los valores dados"""
+    words = set()
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                words.update(tokenize(item))
+        else:
+            words.update(tokenize(value))
+    keys = set()
+    for word in words:
+        for length in range(1, min(len(word), MAX_PREFIX_LENGTH) + 1):
+            keys.add(word[:length])
+    return {'search_words': sorted(words), 'search_keys': sorted(keys)}
+
+
+def search_tokens(term):
+    """Palabras normalizadas del término de búsqueda (sin repetir, máximo MAX_TERM_TOKENS)"""
+    tokens = []
+    for token in tokenize(term):
+        token = token[:MAX_PREFIX_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens[:MAX_TERM_TOKENS]
+
+
+def search_condition(tokens):
+    """Condición indexada: cada palabra debe ser prefijo de alguna palabra del documento"""
+    return {'search_keys': {'$all': tokens}}
+
+
+def relevance_stage(tokens, field='_score'):
+    """Etapa `$addFields` con el número de palabras que coinciden completas.
+
+    `tokens` viene sin repetidos (`search_tokens`), así que filtrarlo contra
+    `search_words` equivale a la intersección y también corre en mongomock.
+    """
+    return {
+        '$addFields': {
+            field: {
+                '$size': {
+                    '$filter': {
+                        'input': tokens,
+                        'as': 'token',
+                        'cond': {'$in': ['$$token', {'$ifNull': ['$search_words', []]}]}
+                    }
+                }
+            }
+        }
+    }
+
+
+def search_page_pipeline(match, tokens, sort, skip=0, limit=None):
+    """Pipeline ordenado por relevancia y luego por `sort` (página opcional)"""
+    order = {'_score': -1}
+    order.update(sort)
+    pipeline = [{'$match': match}, relevance_stage(tokens), {'$sort': order}]
+    if skip:
+        pipeline.append({'$skip': skip})
+    if limit:
+        pipeline.append({'$limit': limit})
+    pipeline.append({'$project': {'_score': 0, 'search_keys': 0, 'search_words': 0}})
+    return pipeline
@@ -0,0 +1,445 @@
+"""Trazas de peticiones con spans de controladores, repositorios y HTTP saliente.
+
+Cada petición muestreada abre un span raíz (`app.py`); dentro de él,
+`trace_methods` crea un span por método público de controladores y
+repositorios, y `http_request` uno por llamada HTTP saliente. El span activo
+vive en un `ContextVar`: los hilos que deban heredarlo se lanzan con
+`contextvars.copy_context().run`.
+
+El contexto se propaga con el header W3C `traceparent`: la petición entrante
+continúa la traza del llamador y el span activo se envía a los servicios
+internos (fanout MQTT y WhatsApp). La decisión de muestreo del llamador solo
+se respeta si es un servicio interno de confianza; para los demás se aplica
+`sample_rate`, así un cliente no puede forzar trazas en cada petición. Los
+spans terminados se encolan y un hilo por worker los exporta en lotes, a un
+archivo JSONL rotativo (uno por proceso) o por OTLP/HTTP (JSON) a un colector.
+
+Con `TRACING_SAMPLE_RATE=0` (por defecto) no se crean spans: el costo por
+llamada es una lectura del `ContextVar`.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Valores de `kind` en OTLP
+SPAN_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+_current = ContextVar('tracing_current_span', default=None)
+
+
+class Span:
+    """Intervalo de trabajo dentro de una traza"""
+
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'kind',
+                 'start_ns', 'end_ns', 'attributes', 'error', '_token')
+
+    def __init__(self, name, trace_id, parent_id=None, kind='internal', attributes=None):
+        self.trace_id = trace_id
+        self.span_id = '%016x' % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, exc):
+        self.error = f'{type(exc).__name__}: {exc}'
+
+    def traceparent(self):
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            get_tracer().export(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+
+def parse_traceparent(value):
+    """(trace_id, parent_id, sampled) de un header traceparent, o None si es inválido"""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    version, trace_id, parent_id, flags = parts[:4]
+    try:
+        int(trace_id, 16), int(parent_id, 16)
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    if version == 'ff' or trace_id == '0' * 32 or parent_id == '0' * 16:
+        return None
+    return trace_id, parent_id, sampled
+
+
+class _SpanScope:
+    """Context manager que activa un span hijo del actual"""
+
+    __slots__ = ('name', 'kind', 'attributes', 'span', '_token')
+
+    def __init__(self, name, kind, attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+
+    def __enter__(self):
+        parent = _current.get()
+        self.span = Span(self.name, parent.trace_id, parent.span_id, self.kind, self.attributes)
+        self._token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.span.record_error(exc)
+        _current.reset(self._token)
+        self.span.finish()
+        return False
+
+
+class _NoopScope:
+    """Scope sin traza activa: no crea ni exporta nada"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopScope()
+
+
+def span(name, kind='internal', **attributes):
+    """Span hijo del activo; sin traza muestreada retorna un scope vacío"""
+    if _current.get() is None:
+        return _NOOP
+    return _SpanScope(name, kind, attributes)
+
+
+def current_span():
+    return _current.get()
+
+
+def inject_headers(headers=None):
+    """Agrega `traceparent` del span activo a `headers`"""
+    headers = headers if headers is not None else {}
+    active = _current.get()
+    if active is not None:
+        headers['traceparent'] = active.traceparent()
+    return headers
+
+
+def trace_methods(cls):
+    """Decorador de clase: un span por cada método público"""
+    for attr_name, value in list(vars(cls).items()):
+        if attr_name.startswith('_') or not callable(value) or isinstance(value, (staticmethod, classmethod, type)):
+            continue
+        setattr(cls, attr_name, _traced_method(value, f'{cls.__name__}.{attr_name}'))
+    return cls
+
+
+def _traced_method(func, name):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return func(*args, **kwargs)
+        with _SpanScope(name, 'internal', {}):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def http_request(service, method, url, propagate=False, **kwargs):
+    """`requests.request` dentro de un span cliente.
+
+    Con `propagate=True` envía `traceparent` al servicio (solo servicios
+    internos: no se filtra el contexto a terceros). Las excepciones de
+    `requests` se registran en el span y se relanzan.
+    """
+    scope = span(f'HTTP {method.upper()} {service}', kind='client',
+                 **{'http.method': method.upper(), 'http.url': url.split('?')[0], 'peer.service': service})
+    with scope as active:
+        if propagate and active is not None:
+            kwargs['headers'] = inject_headers(dict(kwargs.get('headers') or {}))
+        response = requests.request(method, url, **kwargs)
+        if active is not None:
+            active.set_attribute('http.status_code', response.status_code)
+        return response
+
+
+# ---------------------------------------------------------------------------
+# Exportación
+# ---------------------------------------------------------------------------
+
+def worker_path(path):
+    """`path` con el PID antes de la extensión: `traces.jsonl` → `traces.<pid>.jsonl`"""
+    root, extension = os.path.splitext(path)
+    return f'{root}.{os.getpid()}{extension}'
+
+
+class JsonlSpanExporter:
+    """Una línea JSON por span en un archivo que rota por tamaño.
+
+    Cada worker escribe en su propio archivo (PID en el nombre): varios
+    RotatingFileHandler sobre el mismo archivo rotarían unos encima de otros.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        path = worker_path(path)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+
+    def export(self, spans, service_name):
+        for item in spans:
+            record = item.to_dict()
+            record['service'] = service_name
+            self._handler.emit(logging.makeLogRecord({
+                'msg': json.dumps(record, ensure_ascii=False, default=str), 'levelno': logging.INFO
+            }))
+
+
+class OtlpSpanExporter:
+    """OTLP/HTTP con codificación JSON (`/v1/traces`)"""
+
+    def __init__(self, endpoint, timeout=5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    @staticmethod
+    def _attributes(values):
+        attributes = []
+        for key, value in values.items():
+            if isinstance(value, bool):
+                encoded = {'boolValue': value}
+            elif isinstance(value, int):
+                encoded = {'intValue': str(value)}
+            elif isinstance(value, float):
+                encoded = {'doubleValue': value}
+            else:
+                encoded = {'stringValue': str(value)}
+            attributes.append({'key': key, 'value': encoded})
+        return attributes
+
+    def export(self, spans, service_name):
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': self._attributes({'service.name': service_name})},
+            'scopeSpans': [{
+                'scope': {'name': 'rescue.tracing'},
+                'spans': [{
+                    'traceId': item.trace_id,
+                    'spanId': item.span_id,
+                    'parentSpanId': item.parent_id or '',
+                    'name': item.name,
+                    'kind': SPAN_KINDS.get(item.kind, 1),
+                    'startTimeUnixNano': str(item.start_ns),
+                    'endTimeUnixNano': str(item.end_ns),
+                    'attributes': self._attributes(item.attributes),
+                    'status': {'code': 2, 'message': item.error} if item.error else {'code': 1}
+                } for item in spans]
+            }]
+        }]}
+        self._session.post(self.endpoint, json=payload, timeout=self.timeout)
+
+
+class Tracer:
+    """Muestreo y cola de exportación por worker."""
+
+    def __init__(self, sample_rate=0.0, exporter='jsonl', service_name='rescue-back',
+                 jsonl_path='logs/traces.jsonl', jsonl_max_bytes=10 * 1024 * 1024, jsonl_backups=5,
+                 otlp_endpoint='http://localhost:4318/v1/traces', queue_size=10000,
+                 batch_size=512, flush_interval=2.0):
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.exporter_name = exporter
+        self.service_name = service_name
+        self.jsonl_path = jsonl_path
+        self.jsonl_max_bytes = jsonl_max_bytes
+        self.jsonl_backups = jsonl_backups
+        self.otlp_endpoint = otlp_endpoint
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.exported = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def start_request(self, name, traceparent=None, trusted=False, **attributes):
+        """Span raíz de la petición si se muestrea, o None.
+
+        Con `trusted=True` (servicio interno) se respeta la decisión de
+        muestreo del `traceparent`; si no, se aplica `sample_rate`.
+        """
+        if not self.enabled:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None and trusted:
+            # El llamador interno ya decidió el muestreo
+            trace_id, parent_id, sampled = parent
+            if not sampled:
+                return None
+        else:
+            if random.random() >= self.sample_rate:
+                return None
+            if parent is not None:
+                trace_id, parent_id, _ = parent
+            else:
+                trace_id, parent_id = '%032x' % random.getrandbits(128), None
+        root = Span(name, trace_id, parent_id, 'server', attributes)
+        root._token = _current.set(root)
+        return root
+
+    def finish_request(self, root, status_code=None):
+        if root is None:
+            return
+        if status_code is not None:
+            root.set_attribute('http.status_code', status_code)
+            if status_code >= 500:
+                root.error = root.error or f'HTTP {status_code}'
+        try:
+            _current.reset(root._token)
+        except ValueError:
+            # Se terminó desde otro contexto (teardown): basta con limpiar
+            _current.set(None)
+        root.finish()
+
+    def export(self, finished):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != pid:
+                # Tras el fork de --preload el hilo del maestro no existe en el worker
+                self._thread = threading.Thread(target=self._run, name='tracing-exporter', daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _build_exporter(self):
+        if self.exporter_name == 'otlp':
+            return OtlpSpanExporter(self.otlp_endpoint)
+        return JsonlSpanExporter(self.jsonl_path, self.jsonl_max_bytes, self.jsonl_backups)
+
+    def _run(self):
+        try:
+            exporter = self._build_exporter()
+        except Exception as exc:
+            logger.warning(f'No se pudo iniciar el exportador de trazas: {exc}')
+            return
+        while True:
+            batch = self._drain(block=True)
+            if batch:
+                self._export(exporter, batch)
+
+    def _drain(self, block):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, exporter, batch):
+        try:
+            exporter.export(batch, self.service_name)
+            self.exported += len(batch)
+        except Exception as exc:
+            self.dropped += len(batch)
+            logger.warning(f'No se pudieron exportar {len(batch)} spans: {exc}')
+
+    def flush(self):
+        """Exporta lo pendiente en el hilo actual (al terminar el proceso)"""
+        if self._queue.empty():
+            return
+        try:
+            exporter = self._build_exporter()
+        except Exception:
+            return
+        while not self._queue.empty():
+            self._export(exporter, self._drain(block=False))
+
+    def stats(self):
+        return {
+            'sample_rate': self.sample_rate,
+            'exporter': self.exporter_name,
+            'queued': self._queue.qsize(),
+            'exported': self.exported,
+            'dropped': self.dropped
+        }
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    """Instancia única por proceso configurada desde Config"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from core.config import Config
+                _tracer = Tracer(
+                    sample_rate=Config.TRACING_SAMPLE_RATE,
+                    exporter=Config.TRACING_EXPORTER,
+                    service_name=Config.TRACING_SERVICE_NAME,
+                    jsonl_path=Config.TRACING_JSONL_PATH,
+                    jsonl_max_bytes=Config.TRACING_JSONL_MAX_BYTES,
+                    jsonl_backups=Config.TRACING_JSONL_BACKUPS,
+                    otlp_endpoint=Config.TRACING_OTLP_ENDPOINT
+                )
+                atexit.register(_tracer.flush)
+    return _tracer
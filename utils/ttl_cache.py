@@ -0,0 +1,80 @@
+"""Cache LRU en memoria con expiración por entrada (uno por worker)."""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Cache LRU acotado por tamaño y tiempo de vida.
+
+    Cada worker de Gunicorn mantiene su propia instancia, por lo que el TTL
+    define el tiempo máximo que un worker puede servir un valor que otro
+    worker ya invalidó.
+    """
+
+    def __init__(self, maxsize=1024, ttl_seconds=60):
+        self.maxsize = max(1, int(maxsize))
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        return entry[1]
+
+    def evict(self, predicate):
+        """Elimina las entradas para las que predicate(key, value) es verdadero"""
+        with self._lock:
+            keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -1,6 +1,7 @@
 import requests
 import json
 from core.config import Config
+from utils.tracing import http_request
 
 class WhatsAppServiceClient:
     """
@@ -40,8 +41,11 @@ class WhatsAppServiceClient:
         }
         
         try:
-            response = requests.post(
+            response = http_request(
+                'whatsapp',
+                'POST',
                 self.broadcast_endpoint, 
+                propagate=True,
                 headers=headers, 
                 json=payload,
                 timeout=self.timeout
@@ -119,8 +123,11 @@ class WhatsAppServiceClient:
         }
 
         try:
-            response = requests.delete(
+            response = http_request(
+                'whatsapp',
+                'DELETE',
                 endpoint,
+                propagate=True,
                 headers=headers,
                 timeout=self.timeout
             )